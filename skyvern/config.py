@@ -35,6 +35,11 @@ class Settings(BaseSettings):
     BROWSER_REMOTE_DEBUGGING_URL: str = "http://127.0.0.1:9222"
     CHROME_EXECUTABLE_PATH: str | None = None
     MAX_SCRAPING_RETRIES: int = 0
+    # reuse the element tree of the previous step when the page has not changed since it was scraped, or only scrape
+    # the changed elements again when the changes are inside of the scraped elements
+    ENABLE_INCREMENTAL_SCRAPE: bool = False
+    # above this many changed elements, the page is scraped again instead of patching the element tree
+    INCREMENTAL_SCRAPE_MAX_CHANGED_SUBTREES: int = 20
     VIDEO_PATH: str | None = "./video"
     HAR_PATH: str | None = "./har"
     LOG_PATH: str = "./log"
@@ -43,11 +48,24 @@ class Settings(BaseSettings):
     BROWSER_SCREENSHOT_TIMEOUT_MS: int = 20000
     BROWSER_LOADING_TIMEOUT_MS: int = 60000
     BROWSER_SCRAPING_BUILDING_ELEMENT_TREE_TIMEOUT_MS: int = 60 * 1000  # 1 minute
+    BROWSER_SCRAPING_FRAME_TIMEOUT_MS: int = 30 * 1000
+    BROWSER_SCRAPING_FRAME_CONCURRENCY: int = 5
+    # a frame which is invisible or empty for this many step scrapings in a row is skipped, 0 disables it. It's checked
+    # again every BROWSER_SCRAPING_FRAME_SKIP_RECHECK_INTERVAL scrapings, or as soon as its url or child frames change
+    BROWSER_SCRAPING_FRAME_SKIP_THRESHOLD: int = 0
+    BROWSER_SCRAPING_FRAME_SKIP_RECHECK_INTERVAL: int = 5
     OPTION_LOADING_TIMEOUT_MS: int = 600000
     MAX_STEPS_PER_RUN: int = 10
     MAX_STEPS_PER_TASK_V2: int = 25
     MAX_ITERATIONS_PER_TASK_V2: int = 10
     MAX_NUM_SCREENSHOTS: int = 10
+    # opt-in: insert the LLM artifacts and the step usage in background batches instead of inline in every LLM call.
+    # the writes not flushed yet are lost if the process dies
+    ENABLE_ARTIFACT_WRITE_BEHIND: bool = False
+    ARTIFACT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = 1.0
+    ARTIFACT_WRITE_BEHIND_BATCH_SIZE: int = 100
+    # capture the split screenshots with a single full page capture when the page has no fixed or lazy loaded content
+    ENABLE_FULL_PAGE_CAPTURE_SCREENSHOTS: bool = False
     # Ratio should be between 0 and 1.
     # If the task has been running for more steps than this ratio of the max steps per run, then we'll log a warning.
     LONG_RUNNING_TASK_WARNING_RATIO: float = 0.95
@@ -132,6 +150,12 @@ class Settings(BaseSettings):
     WORKFLOW_DOWNLOAD_DIRECTORY_PARAMETER_KEY: str = "SKYVERN_DOWNLOAD_DIRECTORY"
     WORKFLOW_TEMPLATING_STRICTNESS: str = "lax"  # options: "strict", "lax"
     WORKFLOW_WAIT_BLOCK_MAX_SEC: int = 30 * 60
+    # the most blocks running at once in the workflows opted in to the ENABLE_CONCURRENT_WORKFLOW_BLOCKS flag
+    WORKFLOW_MAX_CONCURRENT_BLOCKS: int = 4
+    # the most iterations of a ForLoopBlock running at once, each one in its own browser, whatever its max_concurrency
+    FOR_LOOP_MAX_CONCURRENCY: int = 5
+    # the workflow versions whose validated definition, block graph, templates and scripts are kept, 0 disables it
+    WORKFLOW_COMPILE_CACHE_SIZE: int = 0
 
     # Saved browser session settings
     BROWSER_SESSION_BASE_PATH: str = f"{constants.REPO_ROOT_DIR}/browser_sessions"
@@ -142,6 +166,16 @@ class Settings(BaseSettings):
     BITWARDEN_TIMEOUT_SECONDS: int = 60
     BITWARDEN_MAX_RETRIES: int = 2
 
+    # how many secrets of a workflow run are fetched at once from each secret backend
+    SECRET_RESOLUTION_CONCURRENCY: int = 4
+    # how long the unlocked vault sessions are reused across the runs of an organization, 0 disables it
+    VAULT_SESSION_CACHE_TTL_SECONDS: int = 0
+    # the bw CLI sessions kept unlocked per organization and account while the vault session cache is enabled
+    BITWARDEN_SESSION_POOL_SIZE: int = 2
+    BITWARDEN_SYNC_INTERVAL_SECONDS: int = 300
+    BITWARDEN_HEALTH_CHECK_INTERVAL_SECONDS: int = 60
+    BITWARDEN_CLI_PATH: str = "bw"
+
     # task generation settings
     PROMPT_CACHE_WINDOW_HOURS: int = 24
 
@@ -169,6 +203,33 @@ class Settings(BaseSettings):
     LLM_CONFIG_TEMPERATURE: float = 0
     LLM_CONFIG_SUPPORT_VISION: bool = True  # Whether the model supports vision
     LLM_CONFIG_ADD_ASSISTANT_PREFIX: bool = False  # Whether to add assistant prefix
+    # opt-in LLM response cache: the prompt template names whose responses can be reused, e.g. ["extract-actions"]
+    LLM_RESPONSE_CACHE_PROMPT_NAMES: list[str] = []
+    LLM_RESPONSE_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    LLM_RESPONSE_CACHE_MAX_SIZE: int = 1000
+    # opt-in: identical LLM requests of the same organization and llm_key running at the same time share a single
+    # provider call
+    ENABLE_LLM_REQUEST_COALESCING: bool = False
+    # opt-in process wide admission control of the LLM requests per llm_key, the concurrency adapts between min and max
+    ENABLE_LLM_ADMISSION_CONTROL: bool = False
+    LLM_ADMISSION_MAX_CONCURRENCY: int = 32
+    LLM_ADMISSION_MIN_CONCURRENCY: int = 1
+    LLM_ADMISSION_REQUESTS_PER_MINUTE: int | None = None
+    LLM_ADMISSION_TOKENS_PER_MINUTE: int | None = None
+    # per llm_key overrides of the limits above, e.g. {"OPENAI_GPT4O": {"tokens_per_minute": 800000}}
+    LLM_ADMISSION_KEY_LIMITS: dict[str, dict[str, int]] = {}
+    # the explicit provider prompt caches (vertex cachedContents) shared by the runs sending the same static prefix
+    PROMPT_CACHE_TTL_SECONDS: int = 60 * 60
+    PROMPT_CACHE_RENEW_BEFORE_SECONDS: int = 10 * 60
+    PROMPT_CACHE_IDLE_SECONDS: int = 10 * 60
+    # resize the screenshots of the prompts to the model's vision resolution and re-encode them
+    ENABLE_SCREENSHOT_OPTIMIZATION: bool = False
+    SCREENSHOT_OPTIMIZATION_FORMAT: str = "JPEG"  # PNG, JPEG or WEBP
+    SCREENSHOT_OPTIMIZATION_QUALITY: int = 85
+    # with the optimization, also drop the scrolled tiles with exactly the same pixels as the previous one
+    SCREENSHOT_OPTIMIZATION_DROP_DUPLICATE_TILES: bool = False
+    # stream the extract-actions responses and pre-validate every action as soon as the model has generated it
+    ENABLE_LLM_ACTION_STREAMING: bool = False
     # LLM PROVIDER SPECIFIC
     ENABLE_OPENAI: bool = False
     ENABLE_ANTHROPIC: bool = False
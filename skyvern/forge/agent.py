@@ -6,6 +6,7 @@ import os
 import random
 import re
 import string
+import time
 from asyncio.exceptions import CancelledError
 from dataclasses import dataclass
 from datetime import UTC, datetime
@@ -76,7 +77,8 @@ from skyvern.forge.sdk.api.llm.api_handler_factory import LLMAPIHandlerFactory,
 from skyvern.forge.sdk.api.llm.config_registry import LLMConfigRegistry
 from skyvern.forge.sdk.api.llm.exceptions import LLM_PROVIDER_ERROR_RETRYABLE_TASK_TYPE, LLM_PROVIDER_ERROR_TYPE
 from skyvern.forge.sdk.api.llm.ui_tars_llm_caller import UITarsLLMCaller
-from skyvern.forge.sdk.api.llm.vertex_cache_manager import get_cache_manager
+from skyvern.forge.sdk.api.llm.utils import ActionStreamCallback
+from skyvern.forge.sdk.api.llm.prompt_cache_manager import PromptCacheProvider, get_prompt_cache_manager
 from skyvern.forge.sdk.artifact.models import ArtifactType
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.core.security import generate_skyvern_webhook_signature
@@ -119,6 +121,7 @@ from skyvern.webeye.actions.actions import (
 from skyvern.webeye.actions.handler import ActionHandler
 from skyvern.webeye.actions.models import DetailedAgentStepOutput
 from skyvern.webeye.actions.parse_actions import (
+    parse_action,
     parse_actions,
     parse_anthropic_actions,
     parse_cua_actions,
@@ -127,13 +130,14 @@ from skyvern.webeye.actions.parse_actions import (
 from skyvern.webeye.actions.responses import ActionResult, ActionSuccess
 from skyvern.webeye.browser_state import BrowserState
 from skyvern.webeye.scraper.scraped_page import ElementTreeFormat, ScrapedPage
+from skyvern.webeye.scraper.scraper import is_page_unchanged_since_scraping, reuse_scraped_page_if_unchanged
+from skyvern.webeye.utils.dom import DomUtil
 from skyvern.webeye.utils.page import SkyvernFrame
 
 LOG = structlog.get_logger()
 
 EXTRACT_ACTION_TEMPLATE = "extract-action"
 EXTRACT_ACTION_PROMPT_NAME = "extract-actions"
-EXTRACT_ACTION_CACHE_KEY_PREFIX = f"{EXTRACT_ACTION_TEMPLATE}-static"
 
 
 @dataclass
@@ -144,6 +148,8 @@ class SpeculativePlan:
     llm_json_response: dict[str, Any] | None
     llm_metadata: SpeculativeLLMMetadata | None = None
     prompt_name: str = "extract-actions"
+    # how long building the plan took, the wall time saved when the next step commits it
+    build_seconds: float = 0
 
 
 class ActionLinkedNode:
@@ -938,6 +944,11 @@ class ForgeAgent:
             if context:
                 speculative_plan = context.speculative_plans.pop(step.step_id, None)
 
+            if speculative_plan and not await self._commit_speculative_plan(
+                task, step, browser_state, speculative_plan
+            ):
+                speculative_plan = None
+
             if speculative_plan:
                 step.is_speculative = False
                 scraped_page = speculative_plan.scraped_page
@@ -1021,11 +1032,26 @@ class ForgeAgent:
                             context.use_prompt_caching = True
 
                     if not reuse_speculative_llm_response:
+                        on_action: ActionStreamCallback | None = None
+                        if settings.ENABLE_LLM_ACTION_STREAMING:
+                            streamed_action_count = 0
+
+                            async def _prevalidate_streamed_action(action_json: dict[str, Any]) -> None:
+                                nonlocal streamed_action_count
+                                action_order = streamed_action_count
+                                streamed_action_count += 1
+                                await self._prevalidate_streamed_action(
+                                    task, step, scraped_page, browser_state, action_json, action_order
+                                )
+
+                            on_action = _prevalidate_streamed_action
+
                         json_response = await llm_api_handler(
                             prompt=extract_action_prompt,
                             prompt_name=prompt_name,
                             step=step,
                             screenshots=scraped_page.screenshots,
+                            on_action=on_action,
                         )
                     else:
                         LOG.debug(
@@ -1148,6 +1174,9 @@ class ForgeAgent:
 
             element_id_to_last_action: dict[str, int] = dict()
             for action_idx, action_node in enumerate(action_linked_list):
+                if action_idx > 0:
+                    # the streamed lookups ran before the first action changed the page
+                    scraped_page.reset_element_lookups()
                 context = skyvern_context.ensure_context()
                 if context.refresh_working_page:
                     LOG.warning(
@@ -1379,14 +1408,8 @@ class ForgeAgent:
                 )
 
                 # Check if parallel verification is enabled
-                distinct_id = task.workflow_run_id if task.workflow_run_id else task.task_id
                 enable_parallel_verification = (
-                    await app.EXPERIMENTATION_PROVIDER.is_feature_enabled_cached(
-                        "ENABLE_PARALLEL_USER_GOAL_CHECK",
-                        distinct_id,
-                        properties={"organization_id": task.organization_id, "task_url": task.url},
-                    )
-                    and not disable_user_goal_check
+                    await self._is_speculative_step_pipeline_enabled(task) and not disable_user_goal_check
                 )
 
                 if not disable_user_goal_check and not enable_parallel_verification:
@@ -1747,7 +1770,7 @@ class ForgeAgent:
 
         # Add the current screenshot to conversation
         if scraped_page.screenshots:
-            llm_caller.add_screenshot(scraped_page.screenshots[0])
+            await llm_caller.add_screenshot(scraped_page.screenshots[0])
         else:
             LOG.error("No screenshots found, skipping UI-TARS action generation")
             raise ValueError("No screenshots found, skipping UI-TARS action generation")
@@ -1791,6 +1814,7 @@ class ForgeAgent:
 
         try:
             next_step.is_speculative = True
+            start_time = time.perf_counter()
 
             scraped_page, extract_action_prompt, use_caching, prompt_name = await self.build_and_record_step_prompt(
                 task,
@@ -1831,6 +1855,7 @@ class ForgeAgent:
                 llm_json_response=llm_json_response,
                 llm_metadata=metadata_copy,
                 prompt_name=prompt_name,
+                build_seconds=time.perf_counter() - start_time,
             )
         except Exception:
             LOG.warning(
@@ -1841,6 +1866,125 @@ class ForgeAgent:
             next_step.is_speculative = False
             return None
 
+    async def _commit_speculative_plan(
+        self,
+        task: Task,
+        step: Step,
+        browser_state: BrowserState,
+        speculative_plan: SpeculativePlan,
+    ) -> bool:
+        """
+        Commit the plan speculated for the step if the page is still the one it was built from, or roll it back so the
+        step scrapes and plans again. The LLM usage of a rolled back plan is still recorded on the step.
+        When the DOM changes of the scraped page aren't tracked (it has frames), only its URL is compared.
+        """
+        context = skyvern_context.ensure_context()
+        if await is_page_unchanged_since_scraping(
+            browser_state, speculative_plan.scraped_page, require_dom_tracking=False
+        ):
+            context.speculative_plan_commits += 1
+            LOG.info(
+                "Committed the speculative step plan",
+                task_id=task.task_id,
+                step_id=step.step_id,
+                dom_tracked=speculative_plan.scraped_page.get_dom_change_tracker_id() is not None,
+                saved_seconds=speculative_plan.build_seconds,
+                speculation_commits=context.speculative_plan_commits,
+                speculation_rollbacks=context.speculative_plan_rollbacks,
+            )
+            return True
+
+        context.speculative_plan_rollbacks += 1
+        LOG.info(
+            "Rolled back the speculative step plan, the page changed since it was built",
+            task_id=task.task_id,
+            step_id=step.step_id,
+            wasted_seconds=speculative_plan.build_seconds,
+            speculation_commits=context.speculative_plan_commits,
+            speculation_rollbacks=context.speculative_plan_rollbacks,
+        )
+        if speculative_plan.llm_metadata:
+            await self._persist_speculative_llm_metadata(
+                step,
+                speculative_plan.llm_metadata,
+                screenshots=speculative_plan.scraped_page.screenshots,
+            )
+        return False
+
+    async def _is_speculative_step_pipeline_enabled(self, task: Task) -> bool:
+        """
+        Whether the next step is planned while the current one is verified. It's enabled per run with the
+        ENABLE_PARALLEL_USER_GOAL_CHECK flag, or per organization with the ENABLE_SPECULATIVE_STEP_PIPELINE flag.
+        """
+        distinct_id = task.workflow_run_id if task.workflow_run_id else task.task_id
+        if await app.EXPERIMENTATION_PROVIDER.is_feature_enabled_cached(
+            "ENABLE_PARALLEL_USER_GOAL_CHECK",
+            distinct_id,
+            properties={"organization_id": task.organization_id, "task_url": task.url},
+        ):
+            return True
+        return await app.EXPERIMENTATION_PROVIDER.is_feature_enabled_cached(
+            "ENABLE_SPECULATIVE_STEP_PIPELINE",
+            task.organization_id,
+            properties={"organization_id": task.organization_id},
+        )
+
+    async def _prevalidate_streamed_action(
+        self,
+        task: Task,
+        step: Step,
+        scraped_page: ScrapedPage,
+        browser_state: BrowserState,
+        action_json: dict[str, Any],
+        action_order: int,
+    ) -> None:
+        """
+        Check an action streamed by the LLM while the rest of the response is still being generated: it must be a valid
+        action, and the lookup of the first action's element starts in the background. The lookup runs on the page as
+        it is before any action of the plan, so only the first action can reuse it: its handling takes the resolved
+        locator when the lookup is done by then, and never waits for it nor fails because of it.
+        """
+        try:
+            action = parse_action(
+                action=action_json,
+                scraped_page=scraped_page,
+                data_extraction_goal=task.data_extraction_goal,
+            )
+        except Exception:
+            LOG.warning(
+                "Streamed action is invalid",
+                step_id=step.step_id,
+                action_order=action_order,
+                raw_action=action_json,
+                exc_info=True,
+            )
+            return
+
+        if action_order > 0 or not isinstance(action, WebAction) or not action.element_id:
+            return
+
+        page = await browser_state.get_working_page()
+        if page is None:
+            return
+
+        def _log_lookup(lookup: asyncio.Task) -> None:
+            if lookup.cancelled():
+                return
+            LOG.info(
+                "Pre-validated streamed action",
+                step_id=step.step_id,
+                action_order=action_order,
+                action_type=action.action_type,
+                element_id=action.element_id,
+                element_found=lookup.exception() is None,
+            )
+
+        lookup = asyncio.create_task(
+            DomUtil(scraped_page=scraped_page, page=page).resolve_skyvern_element_by_id(action.element_id)
+        )
+        lookup.add_done_callback(_log_lookup)
+        scraped_page.add_element_lookup(action.element_id, lookup)
+
     async def _persist_speculative_llm_metadata(
         self,
         step: Step,
@@ -1910,15 +2054,13 @@ class ForgeAgent:
             or incremental_reasoning_tokens is not None
             or incremental_cached_tokens is not None
         ):
-            await app.DATABASE.update_step(
-                task_id=step.task_id,
-                step_id=step.step_id,
-                organization_id=step.organization_id,
-                incremental_cost=incremental_cost,
-                incremental_input_tokens=incremental_input_tokens,
-                incremental_output_tokens=incremental_output_tokens,
-                incremental_reasoning_tokens=incremental_reasoning_tokens,
-                incremental_cached_tokens=incremental_cached_tokens,
+            await app.ARTIFACT_MANAGER.record_step_usage(
+                step=step,
+                cost=incremental_cost,
+                input_tokens=incremental_input_tokens or 0,
+                output_tokens=incremental_output_tokens or 0,
+                reasoning_tokens=incremental_reasoning_tokens or 0,
+                cached_tokens=incremental_cached_tokens or 0,
             )
 
             if incremental_input_tokens:
@@ -2280,14 +2422,40 @@ class ForgeAgent:
             draw_boxes = False
             scroll = False
 
-        return await browser_state.scrape_website(
+        context = skyvern_context.current()
+        if (
+            settings.ENABLE_INCREMENTAL_SCRAPE
+            and context
+            and scrape_type == ScrapeType.NORMAL
+            and task.task_id in context.last_scraped_page
+        ):
+            scraped_page = await reuse_scraped_page_if_unchanged(
+                browser_state=browser_state,
+                scraped_page=context.last_scraped_page[task.task_id],
+                cleanup_element_tree=app.AGENT_FUNCTION.cleanup_element_tree_factory(task=task, step=step),
+                scrape_exclude=app.scrape_exclude,
+                max_screenshot_number=max_screenshot_number,
+                draw_boxes=draw_boxes,
+                scroll=scroll,
+            )
+            if scraped_page is not None:
+                context.last_scraped_page = {task.task_id: scraped_page}
+                return scraped_page
+
+        scraped_page = await browser_state.scrape_website(
             url=task.url,
             cleanup_element_tree=app.AGENT_FUNCTION.cleanup_element_tree_factory(task=task, step=step),
             scrape_exclude=app.scrape_exclude,
             max_screenshot_number=max_screenshot_number,
             draw_boxes=draw_boxes,
             scroll=scroll,
+            skip_empty_frames=True,
+            # a speculative plan is only adopted if the page didn't change since its scraping
+            track_dom_changes=step.is_speculative,
         )
+        if settings.ENABLE_INCREMENTAL_SCRAPE and context:
+            context.last_scraped_page = {task.task_id: scraped_page}
+        return scraped_page
 
     async def build_and_record_step_prompt(
         self,
@@ -2519,7 +2687,7 @@ class ForgeAgent:
             variant_parts.append(f"cc{digest}")
         return "-".join(variant_parts) if variant_parts else "std"
 
-    async def _create_vertex_cache_for_task(
+    async def _acquire_prompt_cache_for_task(
         self,
         task: Task,
         static_prompt: str,
@@ -2528,12 +2696,13 @@ class ForgeAgent:
         prompt_variant: str | None = None,
     ) -> None:
         """
-        Create a Vertex AI cache for the task's static prompt.
+        Acquire the Vertex AI cache of the task's static prompt.
 
-        Uses llm_key as cache key to enable cache sharing across tasks with the same model.
+        The cache is shared by every task sending the same static prompt to the same model, it's only created by the
+        first one. The lease is kept in the context until the next step or the end of the task.
 
         Args:
-            task: The task to create cache for
+            task: The task to acquire the cache for
             static_prompt: The static prompt content to cache
             context: The Skyvern context to store the cache name in
             llm_key_override: Optional override when we explicitly pick an LLM key
@@ -2551,101 +2720,96 @@ class ForgeAgent:
         cache_variant = prompt_variant or "std"
 
         try:
-            LOG.info(
-                "Attempting Vertex AI cache creation",
-                task_id=task.task_id,
-                llm_key=resolved_llm_key,
-                cache_variant=cache_variant,
-            )
-            cache_manager = get_cache_manager()
-
-            variant_suffix = f"-{cache_variant}" if cache_variant else ""
-
-            cache_key = f"{EXTRACT_ACTION_CACHE_KEY_PREFIX}{variant_suffix}-{resolved_llm_key}"
-
-            # Get the actual model name from LLM config to ensure correct format
-            # (e.g., "gemini-2.5-flash" with decimal, not "gemini-2-5-flash")
-            model_name = "gemini-2.5-flash"  # Default
-
-            try:
-                llm_config = LLMConfigRegistry.get_config(resolved_llm_key)
-                extracted_name = None
-
-                # Try to extract from model_name if it contains "vertex_ai/" or starts with "gemini-"
-                if hasattr(llm_config, "model_name") and isinstance(llm_config.model_name, str):
-                    if "vertex_ai/" in llm_config.model_name:
-                        # Direct Vertex config: "vertex_ai/gemini-2.5-flash" -> "gemini-2.5-flash"
-                        extracted_name = llm_config.model_name.split("/")[-1]
-                    elif llm_config.model_name.startswith("gemini-"):
-                        # Already in correct format
-                        extracted_name = llm_config.model_name
-
-                # For router/fallback configs, extract from api_base or infer from key name
-                if not extracted_name and hasattr(llm_config, "litellm_params") and llm_config.litellm_params:
-                    params = llm_config.litellm_params
-                    api_base = getattr(params, "api_base", None)
-                    if api_base and isinstance(api_base, str) and "/models/" in api_base:
-                        # Extract from URL: .../models/gemini-2.5-flash -> "gemini-2.5-flash"
-                        extracted_name = api_base.split("/models/")[-1]
-
-                # For router configs without api_base, infer from the llm_key itself
-                if not extracted_name:
-                    # Extract version from llm_key (e.g., VERTEX_GEMINI_1_5_FLASH -> "1_5" or VERTEX_GEMINI_2.5_FLASH -> "2.5")
-                    # Pattern: GEMINI_{version}_{flavor} where version can use dots, underscores, or dashes
-                    version_match = re.search(r"GEMINI[_-](\d+[._-]\d+)", resolved_llm_key, re.IGNORECASE)
-                    version = version_match.group(1).replace("_", ".").replace("-", ".") if version_match else "2.5"
-
-                    # Determine flavor
-                    if "_PRO_" in resolved_llm_key or resolved_llm_key.endswith("_PRO"):
-                        extracted_name = f"gemini-{version}-pro"
-                    elif "_FLASH_LITE_" in resolved_llm_key or resolved_llm_key.endswith("_FLASH_LITE"):
-                        extracted_name = f"gemini-{version}-flash-lite"
-                    else:
-                        # Default to flash flavor
-                        extracted_name = f"gemini-{version}-flash"
-
-                if extracted_name:
-                    model_name = extracted_name
-            except Exception as e:
-                LOG.debug("Failed to extract model name from config, using default", error=str(e))
-
-            # Normalize model name to the canonical Vertex identifier (e.g., gemini-2.5-pro)
-            match = re.search(r"(gemini-\d+(?:\.\d+)?-(?:flash-lite|flash|pro))", model_name, re.IGNORECASE)
-            if match:
-                model_name = match.group(1).lower()
-
-            # Create cache for this task
-            # Use asyncio.to_thread to offload blocking HTTP request (requests.post)
-            # This prevents freezing the event loop during cache creation
-            cache_data = await asyncio.to_thread(
-                cache_manager.create_cache,
-                model_name=model_name,
-                static_content=static_prompt,
-                cache_key=cache_key,
-                ttl_seconds=3600,  # 1 hour
-            )
+            model_name = self._get_vertex_cache_model_name(resolved_llm_key)
+            lease = await get_prompt_cache_manager().acquire(PromptCacheProvider.VERTEX, model_name, static_prompt)
 
             # Store cache metadata in context
-            context.vertex_cache_name = cache_data["name"]
-            context.vertex_cache_key = cache_key
+            context.prompt_cache_lease = lease
+            context.vertex_cache_name = lease.cache_name
+            context.vertex_cache_key = lease.key
             context.vertex_cache_variant = cache_variant
 
             LOG.info(
-                "Created Vertex AI cache for task",
+                "Acquired Vertex AI cache for task",
                 task_id=task.task_id,
-                cache_key=cache_key,
-                cache_name=cache_data["name"],
+                cache_key=lease.key,
+                cache_name=lease.cache_name,
                 model_name=model_name,
                 cache_variant=cache_variant,
             )
         except Exception as e:
             LOG.warning(
-                "Failed to create Vertex AI cache, proceeding without caching",
+                "Failed to acquire Vertex AI cache, proceeding without caching",
                 task_id=task.task_id,
                 error=str(e),
                 exc_info=True,
             )
 
+    @staticmethod
+    async def _release_prompt_cache(context: SkyvernContext) -> None:
+        lease = context.prompt_cache_lease
+        context.prompt_cache_lease = None
+        if lease is None:
+            return
+        try:
+            await get_prompt_cache_manager().release(lease)
+        except Exception:
+            LOG.warning("Failed to release the prompt cache", cache_key=lease.key, exc_info=True)
+
+    @staticmethod
+    def _get_vertex_cache_model_name(resolved_llm_key: str) -> str:
+        # Get the actual model name from LLM config to ensure correct format
+        # (e.g., "gemini-2.5-flash" with decimal, not "gemini-2-5-flash")
+        model_name = "gemini-2.5-flash"  # Default
+
+        try:
+            llm_config = LLMConfigRegistry.get_config(resolved_llm_key)
+            extracted_name = None
+
+            # Try to extract from model_name if it contains "vertex_ai/" or starts with "gemini-"
+            if hasattr(llm_config, "model_name") and isinstance(llm_config.model_name, str):
+                if "vertex_ai/" in llm_config.model_name:
+                    # Direct Vertex config: "vertex_ai/gemini-2.5-flash" -> "gemini-2.5-flash"
+                    extracted_name = llm_config.model_name.split("/")[-1]
+                elif llm_config.model_name.startswith("gemini-"):
+                    # Already in correct format
+                    extracted_name = llm_config.model_name
+
+            # For router/fallback configs, extract from api_base or infer from key name
+            if not extracted_name and hasattr(llm_config, "litellm_params") and llm_config.litellm_params:
+                params = llm_config.litellm_params
+                api_base = getattr(params, "api_base", None)
+                if api_base and isinstance(api_base, str) and "/models/" in api_base:
+                    # Extract from URL: .../models/gemini-2.5-flash -> "gemini-2.5-flash"
+                    extracted_name = api_base.split("/models/")[-1]
+
+            # For router configs without api_base, infer from the llm_key itself
+            if not extracted_name:
+                # Extract version from llm_key (e.g., VERTEX_GEMINI_1_5_FLASH -> "1_5" or VERTEX_GEMINI_2.5_FLASH -> "2.5")
+                # Pattern: GEMINI_{version}_{flavor} where version can use dots, underscores, or dashes
+                version_match = re.search(r"GEMINI[_-](\d+[._-]\d+)", resolved_llm_key, re.IGNORECASE)
+                version = version_match.group(1).replace("_", ".").replace("-", ".") if version_match else "2.5"
+
+                # Determine flavor
+                if "_PRO_" in resolved_llm_key or resolved_llm_key.endswith("_PRO"):
+                    extracted_name = f"gemini-{version}-pro"
+                elif "_FLASH_LITE_" in resolved_llm_key or resolved_llm_key.endswith("_FLASH_LITE"):
+                    extracted_name = f"gemini-{version}-flash-lite"
+                else:
+                    # Default to flash flavor
+                    extracted_name = f"gemini-{version}-flash"
+
+            if extracted_name:
+                model_name = extracted_name
+        except Exception as e:
+            LOG.debug("Failed to extract model name from config, using default", error=str(e))
+
+        # Normalize model name to the canonical Vertex identifier (e.g., gemini-2.5-pro)
+        match = re.search(r"(gemini-\d+(?:\.\d+)?-(?:flash-lite|flash|pro))", model_name, re.IGNORECASE)
+        if match:
+            model_name = match.group(1).lower()
+        return model_name
+
     async def _build_extract_action_prompt(
         self,
         task: Task,
@@ -2715,6 +2879,7 @@ class ForgeAgent:
         # This prevents extract-action cache from being attached to other prompts like decisive-criterion-validate.
         context.cached_static_prompt = None
         context.vertex_cache_name = None
+        await self._release_prompt_cache(context)
 
         # Check if prompt caching is enabled for extract-action
         use_caching = False
@@ -2771,7 +2936,7 @@ class ForgeAgent:
                     has_magic_link_page=context.has_magic_link_page(task.task_id),
                     complete_criterion=task.complete_criterion.strip() if task.complete_criterion else None,
                 )
-                static_prompt = prompt_engine.load_prompt(f"{template}-static", **prompt_kwargs)
+                static_prompt = prompt_engine.load_static_prompt(f"{template}-static", **prompt_kwargs)
                 dynamic_prompt = prompt_engine.load_prompt(
                     f"{template}-dynamic",
                     elements=elements_for_prompt,
@@ -2788,7 +2953,7 @@ class ForgeAgent:
 
                 # Create Vertex AI cache for Gemini models
                 if effective_llm_key and "GEMINI" in effective_llm_key:
-                    await self._create_vertex_cache_for_task(
+                    await self._acquire_prompt_cache_for_task(
                         task,
                         static_prompt,
                         context,
@@ -3154,8 +3319,10 @@ class ForgeAgent:
             raise TaskNotFound(task_id=task.task_id) from e
         task = refreshed_task
 
-        # Caches expire based on TTL (1 hour) or can be cleaned up via scheduled job
-        # This allows multiple tasks with the same llm_key to share the same cache
+        # the prompt cache is shared with the other tasks sending the same static prompt, it's deleted once idle
+        context = skyvern_context.current()
+        if context:
+            await self._release_prompt_cache(context)
 
         # log the task status as an event
         analytics.capture("skyvern-oss-agent-task-status", {"status": task.status})
@@ -4150,12 +4317,7 @@ class ForgeAgent:
                         task_id=task.task_id,
                     )
                 else:
-                    distinct_id = task.workflow_run_id if task.workflow_run_id else task.task_id
-                    enable_parallel_verification = await app.EXPERIMENTATION_PROVIDER.is_feature_enabled_cached(
-                        "ENABLE_PARALLEL_USER_GOAL_CHECK",
-                        distinct_id,
-                        properties={"organization_id": task.organization_id, "task_url": task.url},
-                    )
+                    enable_parallel_verification = await self._is_speculative_step_pipeline_enabled(task)
 
                     if enable_parallel_verification:
                         LOG.info(
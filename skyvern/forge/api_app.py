@@ -23,6 +23,7 @@ from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
 from skyvern.forge.sdk.db.exceptions import NotFoundError
 from skyvern.forge.sdk.routes import internal_auth
 from skyvern.forge.sdk.routes.routers import base_router, legacy_base_router, legacy_v2_router
+from skyvern.forge.sdk.services.bitwarden_session_pool import bitwarden_session_pool
 
 LOG = structlog.get_logger()
 
@@ -64,6 +65,14 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, Any]:
         except Exception:
             LOG.exception("Failed to execute api app startup event")
     yield
+    try:
+        await forge_app.ARTIFACT_MANAGER.flush_buffered_writes()
+    except Exception:
+        LOG.exception("Failed to flush the buffered artifacts")
+    try:
+        await bitwarden_session_pool.close()
+    except Exception:
+        LOG.exception("Failed to close the Bitwarden session pool")
     if forge_app.api_app_shutdown_event:
         LOG.info("Calling api app shutdown event")
         try:
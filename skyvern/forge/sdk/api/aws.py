@@ -86,6 +86,35 @@ class AsyncAWSClient:
             LOG.exception("Failed to get secret.", secret_name=secret_name, error_code=error_code)
             return None
 
+    async def get_secrets(self, secret_names: list[str]) -> dict[str, str]:
+        """
+        Get several secrets with as few requests as possible. The secrets which couldn't be fetched are left out.
+        """
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/secretsmanager/client/batch_get_secret_value.html
+        secrets: dict[str, str] = {}
+        secret_names = list(dict.fromkeys(secret_names))
+        try:
+            async with self._secrets_manager_client() as client:
+                # a batch fetches at most 20 secrets
+                for idx in range(0, len(secret_names), 20):
+                    batch = secret_names[idx : idx + 20]
+                    response = await client.batch_get_secret_value(SecretIdList=batch)
+                    for secret_value in response.get("SecretValues", []):
+                        if "SecretString" not in secret_value:
+                            continue
+                        for secret_name in batch:
+                            if secret_name in (secret_value.get("Name"), secret_value.get("ARN")):
+                                secrets[secret_name] = secret_value["SecretString"]
+                    for error in response.get("Errors", []):
+                        LOG.warning(
+                            "Failed to get secret in batch.",
+                            secret_name=error.get("SecretId"),
+                            error_code=error.get("ErrorCode"),
+                        )
+        except Exception:
+            LOG.exception("Failed to get secrets in batch.", secret_count=len(secret_names))
+        return secrets
+
     async def create_secret(self, secret_name: str, secret_value: str) -> None:
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/secretsmanager/client/create_secret.html
         try:
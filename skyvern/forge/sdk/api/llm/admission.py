@@ -0,0 +1,270 @@
+"""
+Process wide admission control of the LLM requests, per llm_key.
+
+Every provider call waits for a slot of its llm_key. A slot is granted when the concurrency limit, the requests per
+minute and the tokens per minute budgets all allow it, the highest priority request first. The concurrency limit adapts
+AIMD style: it grows slowly while the provider answers in time, and is cut when the provider rate limits us or slows
+down, so a burst doesn't turn into a wave of 429s and router fallbacks. The latency is tracked per prompt name, since
+the prompts of the same llm_key take very different times to answer.
+
+Every admitted request logs its queue wait and the concurrency limit as the LLM admission metrics.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator
+
+import litellm
+import structlog
+
+from skyvern.forge.sdk.models import Step
+from skyvern.forge.sdk.settings_manager import SettingsManager
+from skyvern.utils.token_counter import estimate_tokens
+
+LOG = structlog.get_logger()
+
+# rough token cost of a screenshot for the tokens per minute budget
+SCREENSHOT_TOKEN_ESTIMATE = 1000
+# a response slower than this many times the average latency is taken as a sign of congestion
+LATENCY_CONGESTION_FACTOR = 2.0
+LATENCY_EWMA_WEIGHT = 0.2
+RATE_LIMITED_DECREASE_FACTOR = 0.5
+CONGESTION_DECREASE_FACTOR = 0.9
+
+BACKGROUND_PROMPT_NAMES = {
+    "data-extraction-summary",
+    "summarize-max-steps-reason",
+    "summarize-max-retries-reason",
+    "task_v2_summary",
+    "task_v2_summarize-max-steps-reason",
+}
+
+
+class LLMRequestPriority(IntEnum):
+    INTERACTIVE = 0
+    SPECULATIVE = 1
+    BACKGROUND = 2
+
+
+def get_request_priority(prompt_name: str, step: Step | None = None) -> LLMRequestPriority:
+    if step and step.is_speculative:
+        return LLMRequestPriority.SPECULATIVE
+    if prompt_name in BACKGROUND_PROMPT_NAMES:
+        return LLMRequestPriority.BACKGROUND
+    return LLMRequestPriority.INTERACTIVE
+
+
+def estimate_request_tokens(prompt: str, screenshots: list[bytes] | None = None) -> int:
+    return estimate_tokens(prompt) + SCREENSHOT_TOKEN_ESTIMATE * len(screenshots or [])
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.refill_per_second = per_minute / 60
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until the amount can be taken. An amount larger than the whole bucket waits for a full bucket."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMAdmission:
+    def __init__(
+        self,
+        llm_key: str,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ) -> None:
+        self.llm_key = llm_key
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        # by prompt name
+        self.latency_ewma: dict[str, float] = {}
+        self.queue_wait_ewma: float | None = None
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._queue: list[tuple[int, int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, _, waiter in self._queue if not waiter.done())
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        estimated_tokens: int,
+        priority: LLMRequestPriority,
+        prompt_name: str = "",
+    ) -> AsyncIterator[None]:
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), estimated_tokens, waiter))
+        enqueued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # the slot was granted right before the cancellation, hand it over to the next request
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+        wait_seconds = time.monotonic() - enqueued_at
+        if self.queue_wait_ewma is None:
+            self.queue_wait_ewma = wait_seconds
+        else:
+            self.queue_wait_ewma += LATENCY_EWMA_WEIGHT * (wait_seconds - self.queue_wait_ewma)
+        LOG.info(
+            "LLM admission metrics",
+            llm_key=self.llm_key,
+            prompt_name=prompt_name,
+            priority=priority.name,
+            queue_wait_seconds=wait_seconds,
+            queue_depth=self.queue_depth,
+            in_flight=self.in_flight,
+            concurrency_limit=int(self.concurrency_limit),
+        )
+
+        started_at = time.monotonic()
+        try:
+            yield
+        except litellm.exceptions.RateLimitError:
+            self._decrease(RATE_LIMITED_DECREASE_FACTOR, reason="rate_limited")
+            raise
+        else:
+            self._on_success(prompt_name, time.monotonic() - started_at)
+        finally:
+            self._release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "concurrency_limit": int(self.concurrency_limit),
+            "queue_wait_ewma": self.queue_wait_ewma,
+            "latency_ewma": dict(self.latency_ewma),
+        }
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _on_success(self, prompt_name: str, latency: float) -> None:
+        latency_ewma = self.latency_ewma.get(prompt_name)
+        if latency_ewma is not None and latency > latency_ewma * LATENCY_CONGESTION_FACTOR:
+            self._decrease(CONGESTION_DECREASE_FACTOR, reason="slow_response")
+        else:
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+
+        if latency_ewma is None:
+            self.latency_ewma[prompt_name] = latency
+        else:
+            self.latency_ewma[prompt_name] = latency_ewma + LATENCY_EWMA_WEIGHT * (latency - latency_ewma)
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        previous_limit = int(self.concurrency_limit)
+        self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * factor)
+        if int(self.concurrency_limit) != previous_limit:
+            LOG.info(
+                "Decreased the LLM concurrency limit",
+                llm_key=self.llm_key,
+                reason=reason,
+                previous_limit=previous_limit,
+                concurrency_limit=int(self.concurrency_limit),
+            )
+
+    def _dispatch(self) -> None:
+        if self._wakeup:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        while self._queue:
+            _, _, estimated_tokens, waiter = self._queue[0]
+            if waiter.done():
+                # cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= int(self.concurrency_limit):
+                return
+
+            now = time.monotonic()
+            delay = max(
+                self.request_bucket.wait_time(1, now) if self.request_bucket else 0,
+                self.token_bucket.wait_time(estimated_tokens, now) if self.token_bucket else 0,
+            )
+            if delay > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            heapq.heappop(self._queue)
+            if self.request_bucket:
+                self.request_bucket.take(1)
+            if self.token_bucket:
+                self.token_bucket.take(estimated_tokens)
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+class LLMAdmissionController:
+    def __init__(self) -> None:
+        self._admissions: dict[str, LLMAdmission] = {}
+
+    def get_admission(self, llm_key: str) -> LLMAdmission:
+        if llm_key not in self._admissions:
+            settings = SettingsManager.get_settings()
+            limits = settings.LLM_ADMISSION_KEY_LIMITS.get(llm_key, {})
+            self._admissions[llm_key] = LLMAdmission(
+                llm_key,
+                max_concurrency=limits.get("max_concurrency", settings.LLM_ADMISSION_MAX_CONCURRENCY),
+                min_concurrency=limits.get("min_concurrency", settings.LLM_ADMISSION_MIN_CONCURRENCY),
+                requests_per_minute=limits.get("requests_per_minute", settings.LLM_ADMISSION_REQUESTS_PER_MINUTE),
+                tokens_per_minute=limits.get("tokens_per_minute", settings.LLM_ADMISSION_TOKENS_PER_MINUTE),
+            )
+        return self._admissions[llm_key]
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        llm_key: str,
+        estimated_tokens: int,
+        priority: LLMRequestPriority = LLMRequestPriority.INTERACTIVE,
+        prompt_name: str = "",
+    ) -> AsyncIterator[None]:
+        if not SettingsManager.get_settings().ENABLE_LLM_ADMISSION_CONTROL:
+            yield
+            return
+
+        async with self.get_admission(llm_key).admit(estimated_tokens, priority, prompt_name=prompt_name):
+            yield
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {llm_key: admission.stats() for llm_key, admission in self._admissions.items()}
+
+
+_admission_controller = LLMAdmissionController()
+
+
+def get_admission_controller() -> LLMAdmissionController:
+    return _admission_controller
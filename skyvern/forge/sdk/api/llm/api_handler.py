@@ -1,5 +1,6 @@
 from typing import Any, Awaitable, Protocol
 
+from skyvern.forge.sdk.api.llm.utils import ActionStreamCallback
 from skyvern.forge.sdk.models import Step
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
 from skyvern.forge.sdk.schemas.task_v2 import TaskV2, Thought
@@ -23,6 +24,7 @@ class LLMAPIHandler(Protocol):
         raw_response: bool = False,
         window_dimension: Resolution | None = None,
         force_dict: bool = True,
+        on_action: ActionStreamCallback | None = None,
     ) -> Awaitable[dict[str, Any] | Any]: ...
 
 
@@ -41,5 +43,6 @@ async def dummy_llm_api_handler(
     raw_response: bool = False,
     window_dimension: Resolution | None = None,
     force_dict: bool = True,
+    on_action: ActionStreamCallback | None = None,
 ) -> dict[str, Any] | Any:
     raise NotImplementedError("Your LLM provider is not configured. Please configure it in the .env file.")
@@ -20,6 +20,12 @@ from skyvern.config import settings
 from skyvern.exceptions import SkyvernContextWindowExceededError
 from skyvern.forge import app
 from skyvern.forge.forge_openai_client import ForgeAsyncHttpxClientWrapper
+from skyvern.forge.prompts import prompt_engine
+from skyvern.forge.sdk.api.llm.admission import (
+    estimate_request_tokens,
+    get_admission_controller,
+    get_request_priority,
+)
 from skyvern.forge.sdk.api.llm.api_handler import LLMAPIHandler, dummy_llm_api_handler
 from skyvern.forge.sdk.api.llm.config_registry import LLMConfigRegistry
 from skyvern.forge.sdk.api.llm.exceptions import (
@@ -33,8 +39,22 @@ from skyvern.forge.sdk.api.llm.models import (
     LLMConfig,
     LLMRouterConfig,
 )
+from skyvern.forge.sdk.api.llm.prompt_cache_manager import PromptCacheProvider, get_prompt_cache_provider
+from skyvern.forge.sdk.api.llm.response_cache import LLMResponseCache, get_response_cache
+from skyvern.forge.sdk.api.llm.screenshot_optimizer import (
+    get_router_screenshot_optimization,
+    get_screenshot_optimization,
+)
+from skyvern.forge.sdk.api.llm.single_flight import coalesce_llm_request
 from skyvern.forge.sdk.api.llm.ui_tars_response import UITarsResponse
-from skyvern.forge.sdk.api.llm.utils import llm_messages_builder, llm_messages_builder_with_history, parse_api_response
+from skyvern.forge.sdk.api.llm.utils import (
+    ActionStreamCallback,
+    acompletion_with_actions_stream,
+    llm_messages_builder,
+    llm_messages_builder_with_history,
+    parse_api_response,
+    supports_stream_usage,
+)
 from skyvern.forge.sdk.artifact.models import ArtifactType
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
@@ -42,12 +62,14 @@ from skyvern.forge.sdk.models import SpeculativeLLMMetadata, Step
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
 from skyvern.forge.sdk.schemas.task_v2 import TaskV2, Thought
 from skyvern.forge.sdk.trace import TraceManager
-from skyvern.utils.image_resizer import Resolution, get_resize_target_dimension, resize_screenshots
+from skyvern.utils.image_resizer import Resolution, get_resize_target_dimension, resize_screenshots_async
 
 LOG = structlog.get_logger()
 
 EXTRACT_ACTION_PROMPT_NAME = "extract-actions"
 CHECK_USER_GOAL_PROMPT_NAMES = {"check-user-goal", "check-user-goal-with-termination"}
+# the providers only cache prompt prefixes of 1024 tokens or more, a shorter static prefix isn't split from the prompt
+MIN_STATIC_PROMPT_PREFIX_CHARS = 4096
 
 
 @runtime_checkable
@@ -63,6 +85,25 @@ def _get_primary_model_dict(router: Any, main_model_group: str) -> dict[str, Any
     return None
 
 
+def _get_static_prompt_prefix(context: SkyvernContext | None, prompt_name: str, prompt: str) -> str | None:
+    """
+    The part of the prompt which is the same for every call of the prompt, sent as its own block so the providers can
+    cache it. None when the prompt doesn't start with a static part worth caching.
+    """
+    if context and context.cached_static_prompt and prompt_name == EXTRACT_ACTION_PROMPT_NAME:
+        static_prefix = context.cached_static_prompt.rstrip()
+    else:
+        static_prefix = prompt_engine.get_static_prefix(prompt_name)
+    if len(static_prefix) < MIN_STATIC_PROMPT_PREFIX_CHARS or not prompt.startswith(static_prefix):
+        return None
+    return static_prefix
+
+
+def _supports_cache_control(model: str | None) -> bool:
+    """Anthropic only caches the blocks marked with cache_control, the other providers cache the prefixes themselves."""
+    return get_prompt_cache_provider(model) == PromptCacheProvider.ANTHROPIC
+
+
 class LLMCallStats(BaseModel):
     input_tokens: int | None = None
     output_tokens: int | None = None
@@ -353,6 +394,7 @@ class LLMAPIHandlerFactory:
             raw_response: bool = False,
             window_dimension: Resolution | None = None,
             force_dict: bool = True,
+            on_action: ActionStreamCallback | None = None,
         ) -> dict[str, Any] | Any:
             """
             Custom LLM API handler that utilizes the LiteLLM router and fallbacks to OpenAI GPT-4 Vision.
@@ -362,6 +404,8 @@ class LLMAPIHandlerFactory:
                 step: The step object associated with the prompt.
                 screenshots: The screenshots associated with the prompt.
                 parameters: Additional parameters to be passed to the LLM router.
+                on_action: Called with every action of the response as soon as it's generated, the response is streamed
+                    when it's set.
 
             Returns:
                 The response from the LLM router.
@@ -407,7 +451,19 @@ class LLMAPIHandlerFactory:
                     thought=thought,
                 )
             # Build messages and apply caching in one step
-            messages = await llm_messages_builder(prompt, screenshots, llm_config.add_assistant_prefix)
+            primary_model = (
+                (_get_primary_model_dict(router, main_model_group) or {}).get("litellm_params") or {}
+            ).get("model")
+            messages = await llm_messages_builder(
+                prompt,
+                screenshots,
+                llm_config.add_assistant_prefix,
+                screenshot_optimization=get_router_screenshot_optimization(
+                    [model.litellm_params.get("model", model.model_name) for model in llm_config.model_list]
+                ),
+                static_prefix=_get_static_prompt_prefix(context, prompt_name, prompt),
+                cache_static_prefix=_supports_cache_control(primary_model or main_model_group),
+            )
 
             async def _log_llm_request_artifact(model_label: str, vertex_cache_attached_flag: bool) -> str:
                 llm_request_payload = {
@@ -428,42 +484,6 @@ class LLMAPIHandlerFactory:
                     )
                 return llm_request_json
 
-            # Inject context caching system message when available
-            # IMPORTANT: Only inject for extract-actions prompt to avoid contaminating other prompts
-            # (e.g., check-user-goal) with the extract-action schema
-            try:
-                if (
-                    context
-                    and context.cached_static_prompt
-                    and prompt_name == EXTRACT_ACTION_PROMPT_NAME  # Only inject for extract-actions
-                    and isinstance(llm_config, LLMConfig)
-                    and isinstance(llm_config.model_name, str)
-                ):
-                    # Check if this is an OpenAI model
-                    if (
-                        llm_config.model_name.startswith("gpt-")
-                        or llm_config.model_name.startswith("o1-")
-                        or llm_config.model_name.startswith("o3-")
-                    ):
-                        # For OpenAI models, we need to add the cached content as a system message
-                        # and mark it for caching using the cache_control parameter
-                        caching_system_message = {
-                            "role": "system",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": context.cached_static_prompt,
-                                }
-                            ],
-                        }
-                        messages = [caching_system_message] + messages
-                        LOG.info(
-                            "Applied OpenAI context caching",
-                            prompt_name=prompt_name,
-                            model=llm_config.model_name,
-                        )
-            except Exception as e:
-                LOG.warning("Failed to apply context caching system message", error=str(e), exc_info=True)
 
             cache_resource_name = getattr(context, "vertex_cache_name", None)
             cache_variant = getattr(context, "vertex_cache_variant", None)
@@ -479,6 +499,8 @@ class LLMAPIHandlerFactory:
 
             model_used = main_model_group
             llm_request_json = ""
+            estimated_tokens = estimate_request_tokens(prompt, screenshots)
+            priority = get_request_priority(prompt_name, step)
 
             async def _call_primary_with_vertex_cache(
                 cache_name: str,
@@ -503,29 +525,82 @@ class LLMAPIHandlerFactory:
                     cache_variant=cache_variant_name,
                 )
                 request_payload_json = await _log_llm_request_artifact(request_model, True)
-                response = await litellm.acompletion(
-                    model=request_model,
-                    messages=messages,
-                    timeout=settings.LLM_CONFIG_TIMEOUT,
-                    drop_params=True,
-                    **active_params,
-                )
+                async with get_admission_controller().admit(
+                    llm_key, estimated_tokens, priority, prompt_name=prompt_name
+                ):
+                    response = await litellm.acompletion(
+                        model=request_model,
+                        messages=messages,
+                        timeout=settings.LLM_CONFIG_TIMEOUT,
+                        drop_params=True,
+                        **active_params,
+                    )
                 return response, request_model, request_payload_json
 
+            async def _router_acompletion() -> ModelResponse:
+                async with get_admission_controller().admit(
+                    llm_key, estimated_tokens, priority, prompt_name=prompt_name
+                ):
+                    if on_action:
+                        return await acompletion_with_actions_stream(
+                            router.acompletion,
+                            on_action,
+                            messages,
+                            llm_config.add_assistant_prefix,
+                            include_usage=supports_stream_usage(
+                                [model.litellm_params.get("model", model.model_name) for model in llm_config.model_list]
+                            ),
+                            model=main_model_group,
+                            timeout=settings.LLM_CONFIG_TIMEOUT,
+                            drop_params=True,
+                            **parameters,
+                        )
+                    return await router.acompletion(
+                        model=main_model_group,
+                        messages=messages,
+                        timeout=settings.LLM_CONFIG_TIMEOUT,
+                        drop_params=True,
+                        **parameters,
+                    )
+
             async def _call_router_without_cache() -> tuple[ModelResponse, str]:
                 request_payload_json = await _log_llm_request_artifact(llm_key, False)
-                response = await router.acompletion(
-                    model=main_model_group,
-                    messages=messages,
-                    timeout=settings.LLM_CONFIG_TIMEOUT,
-                    drop_params=True,
-                    **parameters,
-                )
+                if on_action:
+                    # every streamed request dispatches its own actions, it can't join another one
+                    response = await _router_acompletion()
+                else:
+                    response = await coalesce_llm_request(
+                        prompt_name,
+                        prompt,
+                        screenshots,
+                        main_model_group,
+                        llm_key,
+                        organization_id,
+                        parameters,
+                        _router_acompletion,
+                    )
                 return response, request_payload_json
 
+            organization_id = organization_id or (
+                step.organization_id if step else (thought.organization_id if thought else None)
+            )
+            response_cache_key: str | None = None
+            cached_response: ModelResponse | None = None
+            if LLMResponseCache.is_enabled(prompt_name):
+                response_cache_key = await get_response_cache().build_key(
+                    prompt_name,
+                    prompt,
+                    screenshots,
+                    main_model_group,
+                    llm_key,
+                    organization_id,
+                    {**parameters, "tools": tools},
+                )
+                cached_response = await get_response_cache().get(response_cache_key, prompt_name)
+
             try:
-                response: ModelResponse | None = None
-                if should_attach_vertex_cache and cache_resource_name:
+                response: ModelResponse | None = cached_response
+                if response is None and should_attach_vertex_cache and cache_resource_name:
                     try:
                         response, direct_model_used, llm_request_json = await _call_primary_with_vertex_cache(
                             cache_resource_name,
@@ -634,15 +709,13 @@ class LLMAPIHandlerFactory:
                 if cached_tokens == 0:
                     cached_tokens = getattr(response.usage, "cache_read_input_tokens", 0) or 0
             if step and not is_speculative_step:
-                await app.DATABASE.update_step(
-                    task_id=step.task_id,
-                    step_id=step.step_id,
-                    organization_id=step.organization_id,
-                    incremental_cost=llm_cost,
-                    incremental_input_tokens=prompt_tokens if prompt_tokens > 0 else None,
-                    incremental_output_tokens=completion_tokens if completion_tokens > 0 else None,
-                    incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
-                    incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
+                await app.ARTIFACT_MANAGER.record_step_usage(
+                    step=step,
+                    cost=llm_cost,
+                    input_tokens=prompt_tokens,
+                    output_tokens=completion_tokens,
+                    reasoning_tokens=reasoning_tokens,
+                    cached_tokens=cached_tokens,
                 )
             if thought:
                 await app.DATABASE.update_thought(
@@ -655,6 +728,9 @@ class LLMAPIHandlerFactory:
                     cached_token_count=cached_tokens if cached_tokens > 0 else None,
                 )
             parsed_response = parse_api_response(response, llm_config.add_assistant_prefix, force_dict)
+            # a response which doesn't parse isn't cached, the retry gets a new one
+            if response_cache_key and cached_response is None:
+                await get_response_cache().set(response_cache_key, response, prompt_name)
             parsed_response_json = json.dumps(parsed_response, indent=2)
             if persist_llm_artifacts:
                 await app.ARTIFACT_MANAGER.create_llm_artifact(
@@ -683,9 +759,6 @@ class LLMAPIHandlerFactory:
                     )
 
             # Track LLM API handler duration, token counts, and cost
-            organization_id = organization_id or (
-                step.organization_id if step else (thought.organization_id if thought else None)
-            )
             duration_seconds = time.time() - start_time
             LOG.info(
                 "LLM API handler duration metrics",
@@ -761,6 +834,7 @@ class LLMAPIHandlerFactory:
             raw_response: bool = False,
             window_dimension: Resolution | None = None,
             force_dict: bool = True,
+            on_action: ActionStreamCallback | None = None,
         ) -> dict[str, Any] | Any:
             start_time = time.time()
             active_parameters = base_parameters or {}
@@ -812,44 +886,15 @@ class LLMAPIHandlerFactory:
 
             model_name = llm_config.model_name
 
-            messages = await llm_messages_builder(prompt, screenshots, llm_config.add_assistant_prefix)
+            messages = await llm_messages_builder(
+                prompt,
+                screenshots,
+                llm_config.add_assistant_prefix,
+                screenshot_optimization=get_screenshot_optimization(model_name),
+                static_prefix=_get_static_prompt_prefix(context, prompt_name, prompt),
+                cache_static_prefix=_supports_cache_control(model_name),
+            )
 
-            # Inject context caching system message when available
-            # IMPORTANT: Only inject for extract-actions prompt to avoid contaminating other prompts
-            # (e.g., check-user-goal) with the extract-action schema
-            try:
-                if (
-                    context
-                    and context.cached_static_prompt
-                    and prompt_name == EXTRACT_ACTION_PROMPT_NAME  # Only inject for extract-actions
-                    and isinstance(llm_config, LLMConfig)
-                    and isinstance(llm_config.model_name, str)
-                ):
-                    # Check if this is an OpenAI model
-                    if (
-                        llm_config.model_name.startswith("gpt-")
-                        or llm_config.model_name.startswith("o1-")
-                        or llm_config.model_name.startswith("o3-")
-                    ):
-                        # For OpenAI models, we need to add the cached content as a system message
-                        # and mark it for caching using the cache_control parameter
-                        caching_system_message = {
-                            "role": "system",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": context.cached_static_prompt,
-                                }
-                            ],
-                        }
-                        messages = [caching_system_message] + messages
-                        LOG.info(
-                            "Applied OpenAI context caching",
-                            prompt_name=prompt_name,
-                            model=llm_config.model_name,
-                        )
-            except Exception as e:
-                LOG.warning("Failed to apply context caching system message", error=str(e), exc_info=True)
 
             # Add Vertex AI cache reference only for the intended cached prompt
             vertex_cache_attached = False
@@ -900,16 +945,68 @@ class LLMAPIHandlerFactory:
                     ai_suggestion=ai_suggestion,
                 )
 
+            organization_id = organization_id or (
+                step.organization_id if step else (thought.organization_id if thought else None)
+            )
+            response_cache_key: str | None = None
+            cached_response: ModelResponse | None = None
+            if LLMResponseCache.is_enabled(prompt_name):
+                response_cache_key = await get_response_cache().build_key(
+                    prompt_name,
+                    prompt,
+                    screenshots,
+                    model_name,
+                    llm_key,
+                    organization_id,
+                    {**parameters, "tools": tools},
+                )
+                cached_response = await get_response_cache().get(response_cache_key, prompt_name)
+
+            estimated_tokens = estimate_request_tokens(prompt, screenshots)
+            priority = get_request_priority(prompt_name, step)
+
+            async def _acompletion() -> ModelResponse:
+                async with get_admission_controller().admit(
+                    llm_key, estimated_tokens, priority, prompt_name=prompt_name
+                ):
+                    if on_action:
+                        return await acompletion_with_actions_stream(
+                            litellm.acompletion,
+                            on_action,
+                            messages,
+                            llm_config.add_assistant_prefix,
+                            include_usage=supports_stream_usage([model_name]),
+                            model=model_name,
+                            drop_params=True,
+                            **active_parameters,
+                        )
+                    # TODO (kerem): add a retry mechanism to this call (acompletion_with_retries)
+                    # TODO (kerem): use litellm fallbacks? https://litellm.vercel.app/docs/tutorials/fallbacks#how-does-completion_with_fallbacks-work
+                    return await litellm.acompletion(
+                        model=model_name,
+                        messages=messages,
+                        drop_params=True,  # Drop unsupported parameters gracefully
+                        **active_parameters,
+                    )
+
             t_llm_request = time.perf_counter()
             try:
-                # TODO (kerem): add a retry mechanism to this call (acompletion_with_retries)
-                # TODO (kerem): use litellm fallbacks? https://litellm.vercel.app/docs/tutorials/fallbacks#how-does-completion_with_fallbacks-work
-                response = await litellm.acompletion(
-                    model=model_name,
-                    messages=messages,
-                    drop_params=True,  # Drop unsupported parameters gracefully
-                    **active_parameters,
-                )
+                if cached_response is not None:
+                    response = cached_response
+                elif on_action:
+                    # every streamed request dispatches its own actions, it can't join another one
+                    response = await _acompletion()
+                else:
+                    response = await coalesce_llm_request(
+                        prompt_name,
+                        prompt,
+                        screenshots,
+                        model_name,
+                        llm_key,
+                        organization_id,
+                        active_parameters,
+                        _acompletion,
+                    )
             except litellm.exceptions.APIError as e:
                 raise LLMProviderErrorRetryableTask(llm_key) from e
             except litellm.exceptions.ContextWindowExceededError as e:
@@ -992,15 +1089,13 @@ class LLMAPIHandlerFactory:
             _log_vertex_cache_hit_if_needed(context, prompt_name, model_name, cached_tokens)
 
             if step:
-                await app.DATABASE.update_step(
-                    task_id=step.task_id,
-                    step_id=step.step_id,
-                    organization_id=step.organization_id,
-                    incremental_cost=llm_cost,
-                    incremental_input_tokens=prompt_tokens if prompt_tokens > 0 else None,
-                    incremental_output_tokens=completion_tokens if completion_tokens > 0 else None,
-                    incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
-                    incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
+                await app.ARTIFACT_MANAGER.record_step_usage(
+                    step=step,
+                    cost=llm_cost,
+                    input_tokens=prompt_tokens,
+                    output_tokens=completion_tokens,
+                    reasoning_tokens=reasoning_tokens,
+                    cached_tokens=cached_tokens,
                 )
             if thought:
                 await app.DATABASE.update_thought(
@@ -1013,6 +1108,9 @@ class LLMAPIHandlerFactory:
                     thought_cost=llm_cost,
                 )
             parsed_response = parse_api_response(response, llm_config.add_assistant_prefix, force_dict)
+            # a response which doesn't parse isn't cached, the retry gets a new one
+            if response_cache_key and cached_response is None:
+                await get_response_cache().set(response_cache_key, response, prompt_name)
             await app.ARTIFACT_MANAGER.create_llm_artifact(
                 data=json.dumps(parsed_response, indent=2).encode("utf-8"),
                 artifact_type=ArtifactType.LLM_RESPONSE_PARSED,
@@ -1036,9 +1134,6 @@ class LLMAPIHandlerFactory:
                 )
 
             # Track LLM API handler duration, token counts, and cost
-            organization_id = organization_id or (
-                step.organization_id if step else (thought.organization_id if thought else None)
-            )
             duration_seconds = time.time() - start_time
             LOG.info(
                 "LLM API handler duration metrics",
@@ -1158,6 +1253,8 @@ class LLMCaller:
         raw_response: bool = False,
         window_dimension: Resolution | None = None,
         force_dict: bool = True,
+        # not streamed, the actions are only available with the whole response
+        on_action: ActionStreamCallback | None = None,
         **extra_parameters: Any,
     ) -> dict[str, Any] | Any:
         start_time = time.perf_counter()
@@ -1197,7 +1294,7 @@ class LLMCaller:
                         tool["display_height_px"] = target_dimension["height"]
                     if "display_width_px" in tool:
                         tool["display_width_px"] = target_dimension["width"]
-            screenshots = resize_screenshots(screenshots, target_dimension)
+            screenshots = await resize_screenshots_async(screenshots, target_dimension)
 
         llm_prompt_value = prompt or ""
         if prompt and step and not is_speculative_step:
@@ -1294,15 +1391,13 @@ class LLMCaller:
 
         call_stats = await self.get_call_stats(response)
         if step and not is_speculative_step:
-            await app.DATABASE.update_step(
-                task_id=step.task_id,
-                step_id=step.step_id,
-                organization_id=step.organization_id,
-                incremental_cost=call_stats.llm_cost,
-                incremental_input_tokens=call_stats.input_tokens,
-                incremental_output_tokens=call_stats.output_tokens,
-                incremental_reasoning_tokens=call_stats.reasoning_tokens,
-                incremental_cached_tokens=call_stats.cached_tokens,
+            await app.ARTIFACT_MANAGER.record_step_usage(
+                step=step,
+                cost=call_stats.llm_cost,
+                input_tokens=call_stats.input_tokens or 0,
+                output_tokens=call_stats.output_tokens or 0,
+                reasoning_tokens=call_stats.reasoning_tokens or 0,
+                cached_tokens=call_stats.cached_tokens or 0,
             )
         if thought:
             await app.DATABASE.update_thought(
@@ -0,0 +1,246 @@
+"""
+Provider prompt caching of the static prompt prefixes, shared across tasks and organizations.
+
+The providers cache a prompt prefix in different ways:
+- Anthropic caches the blocks marked with cache_control, there's nothing to create
+- OpenAI caches the prompts starting with the same prefix automatically, there's nothing to create
+- Vertex AI only reuses the explicit cachedContents resources, which are created and referenced by name
+
+The PromptCacheManager hides the difference behind acquire/release. A cache is keyed by the provider, the model and the
+hash of the static prefix, so every run sending the same prefix shares one cache and pays its creation once. The
+explicit caches are reference counted: they're renewed before they expire while they're used, and deleted once nobody
+has used them for a while.
+"""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Callable, Protocol
+
+import structlog
+
+from skyvern.forge.sdk.settings_manager import SettingsManager
+
+LOG = structlog.get_logger()
+
+
+class PromptCacheProvider(StrEnum):
+    ANTHROPIC = "anthropic"
+    OPENAI = "openai"
+    VERTEX = "vertex"
+
+
+def get_prompt_cache_provider(model: str | None) -> PromptCacheProvider | None:
+    model = (model or "").lower()
+    if "claude" in model or "anthropic" in model:
+        return PromptCacheProvider.ANTHROPIC
+    if "gemini" in model or "vertex" in model:
+        return PromptCacheProvider.VERTEX
+    if any(name in model for name in ("gpt", "o1", "o3", "o4", "openai", "azure")):
+        return PromptCacheProvider.OPENAI
+    return None
+
+
+def build_prompt_cache_key(provider: PromptCacheProvider, model: str, static_prefix: str) -> str:
+    prefix_hash = hashlib.sha256(static_prefix.encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{prefix_hash}"
+
+
+@dataclass(frozen=True)
+class PromptCacheLease:
+    key: str
+    provider: PromptCacheProvider
+    model: str
+    # the resource the requests reference, None for the providers caching the prefixes themselves
+    cache_name: str | None = None
+
+
+class PromptCacheBackend(Protocol):
+    """The explicit caches of a provider."""
+
+    async def create(self, model: str, static_prefix: str, ttl_seconds: int) -> str:
+        """Create the cache and return its name."""
+
+    async def renew(self, cache_name: str, ttl_seconds: int) -> None:
+        """Make the cache expire ttl_seconds from now."""
+
+    async def delete(self, cache_name: str) -> None: ...
+
+
+class VertexPromptCacheBackend:
+    def __init__(self, vertex_cache_manager: Any) -> None:
+        self.vertex_cache_manager = vertex_cache_manager
+
+    async def create(self, model: str, static_prefix: str, ttl_seconds: int) -> str:
+        cache_data = await self.vertex_cache_manager.create_cache(
+            model_name=model,
+            static_content=static_prefix,
+            ttl_seconds=ttl_seconds,
+        )
+        return cache_data["name"]
+
+    async def renew(self, cache_name: str, ttl_seconds: int) -> None:
+        await self.vertex_cache_manager.update_cache_ttl(cache_name, ttl_seconds)
+
+    async def delete(self, cache_name: str) -> None:
+        await self.vertex_cache_manager.delete_cache(cache_name)
+
+
+class LocalPromptCacheBackend:
+    """In memory explicit caches, for local development and tests."""
+
+    def __init__(self) -> None:
+        self.caches: dict[str, str] = {}
+        self.created = 0
+        self.renewed = 0
+
+    async def create(self, model: str, static_prefix: str, ttl_seconds: int) -> str:
+        self.created += 1
+        cache_name = f"local/{model}/cachedContents/{self.created}"
+        self.caches[cache_name] = static_prefix
+        return cache_name
+
+    async def renew(self, cache_name: str, ttl_seconds: int) -> None:
+        if cache_name not in self.caches:
+            raise KeyError(cache_name)
+        self.renewed += 1
+
+    async def delete(self, cache_name: str) -> None:
+        self.caches.pop(cache_name, None)
+
+
+@dataclass
+class _PromptCacheEntry:
+    lease: PromptCacheLease
+    expires_at: float
+    last_used_at: float
+    refcount: int = 0
+
+
+class PromptCacheManager:
+    def __init__(
+        self,
+        backends: dict[PromptCacheProvider, PromptCacheBackend],
+        ttl_seconds: int = 3600,
+        renew_before_seconds: int = 600,
+        idle_seconds: int = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.backends = backends
+        self.ttl_seconds = ttl_seconds
+        self.renew_before_seconds = renew_before_seconds
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._entries: dict[str, _PromptCacheEntry] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def acquire(self, provider: PromptCacheProvider, model: str, static_prefix: str) -> PromptCacheLease:
+        """
+        The cache of the static prefix, created when no run uses it yet. Every acquired lease must be released.
+        """
+        key = build_prompt_cache_key(provider, model, static_prefix)
+        backend = self.backends.get(provider)
+        if backend is None:
+            return PromptCacheLease(key=key, provider=provider, model=model)
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            now = self.clock()
+            if entry and entry.expires_at - now < self.renew_before_seconds:
+                entry = await self._renew(backend, entry)
+            if entry is None:
+                cache_name = await backend.create(model, static_prefix, self.ttl_seconds)
+                entry = _PromptCacheEntry(
+                    lease=PromptCacheLease(key=key, provider=provider, model=model, cache_name=cache_name),
+                    expires_at=self.clock() + self.ttl_seconds,
+                    last_used_at=now,
+                )
+                self._entries[key] = entry
+                LOG.info("Created a prompt cache", cache_key=key, cache_name=cache_name)
+            entry.refcount += 1
+            entry.last_used_at = now
+
+        await self.evict_idle()
+        return entry.lease
+
+    async def release(self, lease: PromptCacheLease) -> None:
+        entry = self._entries.get(lease.key)
+        if entry and entry.lease == lease:
+            entry.refcount = max(0, entry.refcount - 1)
+            entry.last_used_at = self.clock()
+        await self.evict_idle()
+
+    async def evict_idle(self) -> int:
+        """Delete the caches nobody has used for idle_seconds, and forget the expired ones. Returns how many."""
+        now = self.clock()
+        evicted = 0
+        for key, entry in list(self._entries.items()):
+            expired = entry.expires_at <= now
+            idle = entry.refcount == 0 and now - entry.last_used_at >= self.idle_seconds
+            if not expired and not idle:
+                continue
+            lock = self._locks.get(key)
+            if lock and lock.locked():
+                continue
+            del self._entries[key]
+            self._locks.pop(key, None)
+            evicted += 1
+            if expired or entry.lease.cache_name is None:
+                continue
+            try:
+                await self.backends[entry.lease.provider].delete(entry.lease.cache_name)
+            except Exception:
+                LOG.warning("Failed to delete an idle prompt cache", cache_key=key, exc_info=True)
+            else:
+                LOG.info("Deleted an idle prompt cache", cache_key=key, cache_name=entry.lease.cache_name)
+        return evicted
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "caches": len(self._entries),
+            "references": sum(entry.refcount for entry in self._entries.values()),
+        }
+
+    async def _renew(self, backend: PromptCacheBackend, entry: _PromptCacheEntry) -> _PromptCacheEntry | None:
+        """Extend the cache about to expire, None when it's gone and has to be created again."""
+        if entry.expires_at > self.clock() and entry.lease.cache_name:
+            try:
+                await backend.renew(entry.lease.cache_name, self.ttl_seconds)
+                entry.expires_at = self.clock() + self.ttl_seconds
+                return entry
+            except Exception:
+                LOG.warning(
+                    "Failed to renew a prompt cache, creating it again",
+                    cache_key=entry.lease.key,
+                    exc_info=True,
+                )
+        del self._entries[entry.lease.key]
+        return None
+
+
+_prompt_cache_manager: PromptCacheManager | None = None
+
+
+def get_prompt_cache_manager() -> PromptCacheManager:
+    global _prompt_cache_manager
+
+    if _prompt_cache_manager is None:
+        # the vertex client pulls google auth in, only import it when the manager is needed
+        from skyvern.forge.sdk.api.llm.vertex_cache_manager import get_cache_manager  # noqa: PLC0415
+
+        settings = SettingsManager.get_settings()
+        _prompt_cache_manager = PromptCacheManager(
+            backends={PromptCacheProvider.VERTEX: VertexPromptCacheBackend(get_cache_manager())},
+            ttl_seconds=settings.PROMPT_CACHE_TTL_SECONDS,
+            renew_before_seconds=settings.PROMPT_CACHE_RENEW_BEFORE_SECONDS,
+            idle_seconds=settings.PROMPT_CACHE_IDLE_SECONDS,
+        )
+    return _prompt_cache_manager
+
+
+def set_prompt_cache_manager(prompt_cache_manager: PromptCacheManager | None) -> None:
+    global _prompt_cache_manager
+    _prompt_cache_manager = prompt_cache_manager
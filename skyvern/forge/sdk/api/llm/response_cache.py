@@ -0,0 +1,147 @@
+"""
+Opt-in cache of the LLM responses, for the prompts listed in LLM_RESPONSE_CACHE_PROMPT_NAMES.
+
+Repeated runs against the same site render near-identical prompts. A response is reused when the prompt template, the
+normalized prompt (which embeds the element tree), the perceptual hashes of the screenshots, the model, the call
+parameters (tools, temperature, response format...), the llm_key and the organization all match. Only the responses
+which parsed successfully are cached.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+from datetime import timedelta
+from typing import Any
+
+import litellm
+import structlog
+from litellm.utils import ModelResponse
+
+from skyvern.forge.sdk.cache.base import BaseCache
+from skyvern.forge.sdk.cache.local import LocalCache
+from skyvern.forge.sdk.settings_manager import SettingsManager
+from skyvern.utils.image_resizer import perceptual_hash
+
+LOG = structlog.get_logger()
+
+CACHE_KEY_PREFIX = "llm_response"
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# the prompts embed the current datetime, only its date is kept in the key so the cache survives within a day
+ISO_DATETIME_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?")
+
+
+def normalize_prompt(prompt: str) -> str:
+    prompt = ISO_DATETIME_PATTERN.sub(r"\1", prompt)
+    return WHITESPACE_PATTERN.sub(" ", prompt).strip()
+
+
+def build_cache_key(
+    prompt_name: str,
+    prompt: str,
+    screenshot_hashes: list[str],
+    model: str,
+    llm_key: str,
+    organization_id: str | None,
+    parameters: dict[str, Any] | None = None,
+) -> str:
+    key_data = json.dumps(
+        {
+            "prompt_name": prompt_name,
+            "prompt": normalize_prompt(prompt),
+            "screenshots": screenshot_hashes,
+            "model": model,
+            "llm_key": llm_key,
+            "organization_id": organization_id,
+            # the response formats and tools can be classes, their reprs name them
+            "parameters": parameters or {},
+        },
+        sort_keys=True,
+        default=repr,
+    )
+    return f"{CACHE_KEY_PREFIX}:{hashlib.sha256(key_data.encode('utf-8')).hexdigest()}"
+
+
+def _load_response_without_usage(response_json: str) -> ModelResponse:
+    response = ModelResponse(**json.loads(response_json))
+    response.usage = litellm.Usage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+    return response
+
+
+def copy_response_without_usage(response: ModelResponse) -> ModelResponse:
+    return _load_response_without_usage(response.model_dump_json())
+
+
+class LLMResponseCache:
+    def __init__(self, cache: BaseCache | None = None) -> None:
+        if cache is None:
+            settings = SettingsManager.get_settings()
+            cache = LocalCache(
+                maxsize=settings.LLM_RESPONSE_CACHE_MAX_SIZE,
+                ttl=timedelta(seconds=settings.LLM_RESPONSE_CACHE_TTL_SECONDS),
+            )
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_enabled(prompt_name: str) -> bool:
+        return prompt_name in SettingsManager.get_settings().LLM_RESPONSE_CACHE_PROMPT_NAMES
+
+    async def build_key(
+        self,
+        prompt_name: str,
+        prompt: str,
+        screenshots: list[bytes] | None,
+        model: str,
+        llm_key: str,
+        organization_id: str | None,
+        parameters: dict[str, Any] | None = None,
+    ) -> str:
+        # decoding the screenshots blocks for a while, keep it off the event loop
+        screenshot_hashes = await asyncio.to_thread(lambda: [perceptual_hash(s) for s in screenshots or []])
+        return build_cache_key(prompt_name, prompt, screenshot_hashes, model, llm_key, organization_id, parameters)
+
+    async def get(self, key: str, prompt_name: str) -> ModelResponse | None:
+        try:
+            cached_response = await self.cache.get(key)
+        except Exception:
+            LOG.warning("Failed to read the LLM response cache", prompt_name=prompt_name, exc_info=True)
+            cached_response = None
+
+        if cached_response is None:
+            self.misses += 1
+            LOG.debug("LLM response cache miss", prompt_name=prompt_name, hits=self.hits, misses=self.misses)
+            return None
+
+        self.hits += 1
+        LOG.info("LLM response cache hit", prompt_name=prompt_name, hits=self.hits, misses=self.misses)
+        # nothing is spent on a cached response, its cost and token counts must not be charged again
+        return _load_response_without_usage(cached_response)
+
+    async def set(self, key: str, response: ModelResponse, prompt_name: str) -> None:
+        settings = SettingsManager.get_settings()
+        try:
+            await self.cache.set(
+                key,
+                response.model_dump_json(),
+                ex=timedelta(seconds=settings.LLM_RESPONSE_CACHE_TTL_SECONDS),
+            )
+        except Exception:
+            LOG.warning("Failed to write the LLM response cache", prompt_name=prompt_name, exc_info=True)
+
+
+_response_cache: LLMResponseCache | None = None
+
+
+def get_response_cache() -> LLMResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LLMResponseCache()
+    return _response_cache
+
+
+def set_response_cache(response_cache: LLMResponseCache | None) -> None:
+    """Plug another backend, e.g. LLMResponseCache(app.CACHE) to share the cache across the workers."""
+    global _response_cache
+    _response_cache = response_cache
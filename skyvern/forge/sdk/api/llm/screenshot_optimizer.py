@@ -0,0 +1,185 @@
+"""
+Per model optimization of the screenshots sent in the multimodal prompts.
+
+Providers downscale the images above their effective vision resolution anyway, so the screenshots are resized to it
+before being sent, and encoded as JPEG or WEBP when enabled. A router can fall back to a model of another provider,
+so its screenshots are only resized when all of its deployments share the same vision resolution.
+
+Scrolled tiles with exactly the same pixels as the previous tile, e.g. at the bottom of a page shorter than the
+screenshots, can be dropped with SCREENSHOT_OPTIMIZATION_DROP_DUPLICATE_TILES.
+
+The base64 encodings are cached per screenshot: the same screenshots are sent with several prompts of a step. The
+screenshot an optimized image was made from is kept too, so the LLM request artifacts reference the artifacts of the
+screenshots instead of storing their optimized copies.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import NamedTuple
+
+import structlog
+from PIL import Image
+
+from skyvern.forge.sdk.settings_manager import SettingsManager
+from skyvern.utils.image_resizer import Resolution, encode_image, fit_resolution
+
+LOG = structlog.get_logger()
+
+# how many encoded screenshots are kept, a step sends the same few screenshots with several prompts
+ENCODED_SCREENSHOTS_CACHE_SIZE = 16
+MEDIA_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass(frozen=True)
+class ScreenshotOptimization:
+    max_long_edge: int | None = None
+    max_short_edge: int | None = None
+    image_format: str = "PNG"
+    quality: int | None = None
+    drop_duplicate_tiles: bool = False
+
+
+class EncodedScreenshot(NamedTuple):
+    media_type: str
+    data: str
+
+
+def get_screenshot_optimization(model: str) -> ScreenshotOptimization | None:
+    """
+    The optimization for the model's vision input, None when the screenshots are sent as they are.
+    """
+    settings = SettingsManager.get_settings()
+    if not settings.ENABLE_SCREENSHOT_OPTIMIZATION:
+        return None
+
+    image_format = settings.SCREENSHOT_OPTIMIZATION_FORMAT.upper()
+    if image_format not in MEDIA_TYPES:
+        LOG.warning("Unsupported screenshot optimization format, using PNG", image_format=image_format)
+        image_format = "PNG"
+    quality = settings.SCREENSHOT_OPTIMIZATION_QUALITY if image_format != "PNG" else None
+    optimization = ScreenshotOptimization(
+        image_format=image_format,
+        quality=quality,
+        drop_duplicate_tiles=settings.SCREENSHOT_OPTIMIZATION_DROP_DUPLICATE_TILES,
+    )
+
+    model = model.lower()
+    if "claude" in model or "anthropic" in model:
+        # images with a long edge above 1568px are downscaled by anthropic before being tokenized
+        return replace(optimization, max_long_edge=1568)
+    if "gemini" in model:
+        return replace(optimization, max_long_edge=3072)
+    if any(name in model for name in ("gpt", "o1", "o3", "o4", "openai", "azure")):
+        # openai's high detail mode fits the image in 2048x2048, then scales its short edge down to 768px
+        return replace(optimization, max_long_edge=2048, max_short_edge=768)
+    return optimization
+
+
+def get_router_screenshot_optimization(models: list[str]) -> ScreenshotOptimization | None:
+    """
+    The optimization for every deployment of a router: the messages are built once, before the router picks the
+    deployment or falls back to another model group. The screenshots are only resized when all the models have the
+    same vision resolution, a smaller one would lose details for the others.
+    """
+    optimizations = {get_screenshot_optimization(model) for model in models}
+    if len(optimizations) <= 1:
+        return optimizations.pop() if optimizations else None
+
+    optimization = next(iter(optimizations))
+    if optimization is None:
+        return None
+    return replace(optimization, max_long_edge=None, max_short_edge=None)
+
+
+# (sha256 of the screenshot, optimization) -> its encoding and the digest of its pixels, least recently used first
+_encoded_screenshots: OrderedDict[tuple[str, ScreenshotOptimization | None], tuple[EncodedScreenshot, str | None]] = (
+    OrderedDict()
+)
+# sha256 of an optimized screenshot -> the screenshot it was made from, oldest first
+_original_screenshots: OrderedDict[str, bytes] = OrderedDict()
+_encoded_screenshots_lock = threading.Lock()
+
+
+def get_original_screenshot(image: bytes) -> bytes | None:
+    """
+    The screenshot an image sent to the LLM was optimized from, None if it wasn't optimized recently.
+    """
+    with _encoded_screenshots_lock:
+        return _original_screenshots.get(hashlib.sha256(image).hexdigest())
+
+
+def _encode_screenshot(
+    screenshot: bytes, optimization: ScreenshotOptimization | None
+) -> tuple[EncodedScreenshot, str | None]:
+    if optimization is None:
+        return EncodedScreenshot(MEDIA_TYPES["PNG"], base64.b64encode(screenshot).decode("utf-8")), None
+
+    with Image.open(io.BytesIO(screenshot)) as img:
+        pixels_digest = None
+        if optimization.drop_duplicate_tiles:
+            pixels_digest = hashlib.sha256(f"{img.mode}:{img.size}".encode() + img.tobytes()).hexdigest()
+        current = Resolution(width=img.width, height=img.height)
+        target = fit_resolution(current, optimization.max_long_edge, optimization.max_short_edge)
+        if target == current and optimization.image_format == "PNG":
+            # nothing to change, the screenshots are taken as PNG
+            data = screenshot
+        else:
+            resized_img = img
+            if target != current:
+                resized_img = img.resize((target["width"], target["height"]), Image.Resampling.LANCZOS)
+            data = encode_image(resized_img, image_format=optimization.image_format, quality=optimization.quality)
+            with _encoded_screenshots_lock:
+                _original_screenshots[hashlib.sha256(data).hexdigest()] = screenshot
+                while len(_original_screenshots) > ENCODED_SCREENSHOTS_CACHE_SIZE:
+                    _original_screenshots.popitem(last=False)
+
+    encoded = EncodedScreenshot(MEDIA_TYPES[optimization.image_format], base64.b64encode(data).decode("utf-8"))
+    return encoded, pixels_digest
+
+
+def _get_encoded_screenshot(
+    screenshot: bytes, optimization: ScreenshotOptimization | None
+) -> tuple[EncodedScreenshot, str | None]:
+    key = (hashlib.sha256(screenshot).hexdigest(), optimization)
+    with _encoded_screenshots_lock:
+        if key in _encoded_screenshots:
+            _encoded_screenshots.move_to_end(key)
+            return _encoded_screenshots[key]
+
+    encoded_screenshot = _encode_screenshot(screenshot, optimization)
+    with _encoded_screenshots_lock:
+        _encoded_screenshots[key] = encoded_screenshot
+        while len(_encoded_screenshots) > ENCODED_SCREENSHOTS_CACHE_SIZE:
+            _encoded_screenshots.popitem(last=False)
+    return encoded_screenshot
+
+
+def encode_screenshots(
+    screenshots: list[bytes], optimization: ScreenshotOptimization | None = None
+) -> list[EncodedScreenshot]:
+    encoded_screenshots: list[EncodedScreenshot] = []
+    previous_digest: str | None = None
+    dropped = 0
+    for screenshot in screenshots:
+        encoded_screenshot, pixels_digest = _get_encoded_screenshot(screenshot, optimization)
+        if pixels_digest is not None and pixels_digest == previous_digest:
+            dropped += 1
+            continue
+        previous_digest = pixels_digest
+        encoded_screenshots.append(encoded_screenshot)
+
+    if dropped:
+        LOG.debug("Dropped duplicate screenshot tiles", dropped=dropped, kept=len(encoded_screenshots))
+    return encoded_screenshots
+
+
+async def encode_screenshots_async(
+    screenshots: list[bytes], optimization: ScreenshotOptimization | None = None
+) -> list[EncodedScreenshot]:
+    """encode_screenshots in a worker thread, decoding and encoding the images would block the event loop."""
+    return await asyncio.to_thread(encode_screenshots, screenshots, optimization)
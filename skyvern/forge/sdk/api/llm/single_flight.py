@@ -0,0 +1,128 @@
+"""
+Coalescing of identical in-flight LLM requests.
+
+Loops and parallel verifications fire the same prompt concurrently (same prompt template, rendered prompt, screenshots,
+model, parameters, llm_key and organization). Only the first request reaches the provider, the others wait for it and
+share its response. Opt-in with ENABLE_LLM_REQUEST_COALESCING.
+"""
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+import structlog
+from litellm.utils import ModelResponse
+
+from skyvern.forge.sdk.api.llm.response_cache import copy_response_without_usage
+from skyvern.forge.sdk.settings_manager import SettingsManager
+
+LOG = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+@dataclass
+class _InFlightCall(Generic[T]):
+    task: asyncio.Task[T]
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self) -> None:
+        self._calls: dict[str, _InFlightCall[T]] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Run fn, or join the call already running for the key. Returns the result and whether it was shared.
+
+        The call runs in its own task: a waiter being cancelled doesn't cancel it for the others, it's only cancelled
+        once nobody waits for it anymore.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            new_call: _InFlightCall[T] = _InFlightCall(task=asyncio.ensure_future(fn()))
+            self._calls[key] = new_call
+            new_call.task.add_done_callback(lambda _: self._forget(key, new_call))
+            call = new_call
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _InFlightCall[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+def build_request_key(
+    prompt_name: str,
+    prompt: str,
+    screenshots: list[bytes] | None,
+    model: str,
+    llm_key: str,
+    organization_id: str | None,
+    parameters: dict[str, Any] | None,
+) -> str:
+    request_hash = hashlib.sha256()
+    request_hash.update(
+        json.dumps(
+            {
+                "prompt_name": prompt_name,
+                "prompt": prompt,
+                "model": model,
+                # the requests of different organizations or llm configs are never merged, each one pays its own call
+                "llm_key": llm_key,
+                "organization_id": organization_id,
+                "parameters": parameters,
+            },
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    )
+    for screenshot in screenshots or []:
+        request_hash.update(hashlib.sha256(screenshot).digest())
+    return request_hash.hexdigest()
+
+
+_llm_requests: SingleFlight[ModelResponse] = SingleFlight()
+
+
+async def coalesce_llm_request(
+    prompt_name: str,
+    prompt: str,
+    screenshots: list[bytes] | None,
+    model: str,
+    llm_key: str,
+    organization_id: str | None,
+    parameters: dict[str, Any] | None,
+    call: Callable[[], Awaitable[ModelResponse]],
+) -> ModelResponse:
+    if not SettingsManager.get_settings().ENABLE_LLM_REQUEST_COALESCING:
+        return await call()
+
+    # hashing the screenshots blocks for a while, keep it off the event loop
+    key = await asyncio.to_thread(
+        build_request_key, prompt_name, prompt, screenshots, model, llm_key, organization_id, parameters
+    )
+    response, shared = await _llm_requests.do(key, call)
+    if not shared:
+        return response
+
+    LOG.info(
+        "Coalesced an identical in-flight LLM request",
+        prompt_name=prompt_name,
+        model=model,
+        in_flight=_llm_requests.in_flight(),
+    )
+    # the tokens were spent once, by the request which reached the provider
+    return copy_response_without_usage(response)
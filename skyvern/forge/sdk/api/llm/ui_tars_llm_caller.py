@@ -13,6 +13,7 @@
 UI-TARS LLM Caller that follows the standard LLMCaller pattern.
 """
 
+import asyncio
 import base64
 from io import BytesIO
 from typing import Any, Dict
@@ -63,15 +64,13 @@ class UITarsLLMCaller(LLMCaller):
             self._conversation_initialized = True
             LOG.debug("Initialized UI-TARS conversation", task_id=task.task_id)
 
-    def add_screenshot(self, screenshot_bytes: bytes) -> None:
+    async def add_screenshot(self, screenshot_bytes: bytes) -> None:
         """Add screenshot to conversation history."""
         if not screenshot_bytes:
             return
 
-        # Convert to PIL Image to get format
-        image = Image.open(BytesIO(screenshot_bytes))
-        image_format = self._get_image_format_from_pil(image)
-        screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
+        # decoding and encoding a full page screenshot blocks for a while, run them off the event loop
+        image_format, screenshot_b64 = await asyncio.to_thread(self._encode_screenshot, screenshot_bytes)
 
         # Add image message
         image_message = {
@@ -135,6 +134,13 @@ class UITarsLLMCaller(LLMCaller):
                 count += 1
         return count
 
+    def _encode_screenshot(self, screenshot_bytes: bytes) -> tuple[str, str]:
+        """Return the image format and the base64 encoding of a screenshot."""
+        # Convert to PIL Image to get format
+        image = Image.open(BytesIO(screenshot_bytes))
+        image_format = self._get_image_format_from_pil(image)
+        return image_format, base64.b64encode(screenshot_bytes).decode("utf-8")
+
     def _get_image_format_from_pil(self, image: Image.Image) -> str:
         """Extract and validate image format from PIL Image object."""
         format_str = image.format.lower() if image.format else "png"
@@ -2,7 +2,7 @@ import base64
 import copy
 import json
 import re
-from typing import Any
+from typing import Any, Awaitable, Callable
 
 import json_repair
 import litellm
@@ -11,40 +11,53 @@ import structlog
 from skyvern.constants import MAX_IMAGE_MESSAGES
 from skyvern.forge.sdk.api.llm import commentjson
 from skyvern.forge.sdk.api.llm.exceptions import EmptyLLMResponseError, InvalidLLMResponseFormat, InvalidLLMResponseType
+from skyvern.forge.sdk.api.llm.screenshot_optimizer import ScreenshotOptimization, encode_screenshots_async
 
 LOG = structlog.get_logger()
 
+ActionStreamCallback = Callable[[dict[str, Any]], Awaitable[None]]
+
 
 async def llm_messages_builder(
     prompt: str,
     screenshots: list[bytes] | None = None,
     add_assistant_prefix: bool = False,
     message_pattern: str = "openai",
+    screenshot_optimization: ScreenshotOptimization | None = None,
+    static_prefix: str | None = None,
+    cache_static_prefix: bool = False,
 ) -> list[dict[str, Any]]:
-    messages: list[dict[str, Any]] = [
-        {
-            "type": "text",
-            "text": prompt,
-        }
-    ]
+    messages: list[dict[str, Any]]
+    if static_prefix and prompt.startswith(static_prefix) and len(prompt) > len(static_prefix):
+        # the static prefix goes in its own block, the same for every call, so the providers can cache it
+        static_block: dict[str, Any] = {"type": "text", "text": static_prefix}
+        if cache_static_prefix:
+            static_block["cache_control"] = {"type": "ephemeral"}
+        messages = [static_block, {"type": "text", "text": prompt[len(static_prefix) :]}]
+    else:
+        messages = [
+            {
+                "type": "text",
+                "text": prompt,
+            }
+        ]
 
     if screenshots:
-        for screenshot in screenshots:
-            encoded_image = base64.b64encode(screenshot).decode("utf-8")
+        for encoded_screenshot in await encode_screenshots_async(screenshots, screenshot_optimization):
             if message_pattern == "anthropic":
                 message = {
                     "type": "image",
                     "source": {
                         "type": "base64",
-                        "media_type": "image/png",
-                        "data": encoded_image,
+                        "media_type": encoded_screenshot.media_type,
+                        "data": encoded_screenshot.data,
                     },
                 }
             else:
                 message = {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{encoded_image}",
+                        "url": f"data:{encoded_screenshot.media_type};base64,{encoded_screenshot.data}",
                     },
                 }
             messages.append(message)
@@ -213,6 +226,142 @@ def parse_api_response(
             raise InvalidLLMResponseFormat(str(response)) from e
 
 
+class StreamingActionsParser:
+    """
+    Incremental parser of a streamed LLM response shaped like {"actions": [{...}, {...}], ...}.
+
+    feed() returns the objects of the top level "actions" array as soon as their closing brace arrives, the same way
+    _fix_cutoff_json keeps the complete actions of a cutoff response. The rest of the response is only buffered, the
+    complete text is parsed with parse_api_response once the stream ends.
+    """
+
+    def __init__(self, key: str = "actions", prefix: str = "") -> None:
+        self.key = key
+        self.text = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: str | None = None
+        self._expect_actions = False
+        self._in_actions = False
+        self._action_start: int | None = None
+        if prefix:
+            self.feed(prefix)
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self.text += chunk
+        actions: list[dict[str, Any]] = []
+        for i in range(self._position, len(self.text)):
+            char = self.text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = self.text[self._string_start + 1 : i]
+                continue
+
+            if char.isspace():
+                continue
+            if self._expect_actions and char != "[":
+                self._expect_actions = False
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":":
+                self._expect_actions = self._depth == 1 and self._last_string == self.key
+            elif char == "[":
+                self._depth += 1
+                if self._expect_actions:
+                    self._expect_actions = False
+                    self._in_actions = True
+            elif char == "{":
+                self._depth += 1
+                if self._in_actions and self._depth == 3:
+                    self._action_start = i
+            elif char == "}":
+                if self._in_actions and self._depth == 3 and self._action_start is not None:
+                    action = self._parse_action(self.text[self._action_start : i + 1])
+                    if action is not None:
+                        actions.append(action)
+                    self._action_start = None
+                self._depth -= 1
+            elif char == "]":
+                if self._in_actions and self._depth == 2:
+                    self._in_actions = False
+                self._depth -= 1
+
+        self._position = len(self.text)
+        return actions
+
+    @staticmethod
+    def _parse_action(action_string: str) -> dict[str, Any] | None:
+        try:
+            action = json_repair.loads(action_string)
+        except Exception:
+            LOG.warning("Failed to parse a streamed action", action=action_string, exc_info=True)
+            return None
+        return action if isinstance(action, dict) else None
+
+
+def supports_stream_usage(model_names: list[str]) -> bool:
+    """
+    Whether every model accepts stream_options, some providers reject the request when it's set.
+    """
+    for model_name in model_names:
+        try:
+            supported_params = litellm.get_supported_openai_params(model=model_name) or []
+        except Exception:
+            return False
+        if "stream_options" not in supported_params:
+            return False
+    return True
+
+
+async def acompletion_with_actions_stream(
+    acompletion: Callable[..., Awaitable[Any]],
+    on_action: ActionStreamCallback,
+    messages: list[dict[str, Any]],
+    add_assistant_prefix: bool = False,
+    include_usage: bool = False,
+    **kwargs: Any,
+) -> litellm.ModelResponse:
+    """
+    Stream the completion, call on_action with every complete action while the model is still generating, and return
+    the whole response rebuilt from the chunks, same as a non streaming call would.
+    Without include_usage, the usage of the rebuilt response is counted from the messages and the chunks.
+    """
+    parser = StreamingActionsParser(prefix="{" if add_assistant_prefix else "")
+    chunks = []
+    if include_usage:
+        kwargs["stream_options"] = {"include_usage": True}
+    stream = await acompletion(
+        messages=messages,
+        stream=True,
+        **kwargs,
+    )
+    async for chunk in stream:
+        chunks.append(chunk)
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        if not content:
+            continue
+        for action in parser.feed(content):
+            try:
+                await on_action(action)
+            except Exception:
+                LOG.warning("Failed to dispatch a streamed action", action=action, exc_info=True)
+
+    response = litellm.stream_chunk_builder(chunks, messages=messages)
+    if response is None:
+        raise EmptyLLMResponseError(parser.text)
+    return response
+
+
 def _fix_cutoff_json(json_string: str, error_position: int) -> dict[str, Any]:
     """
     Fixes a cutoff JSON string by ignoring the last incomplete action and making it a valid JSON.
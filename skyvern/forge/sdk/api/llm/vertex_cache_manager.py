@@ -6,14 +6,16 @@ Unlike the Anthropic-style cache_control markers, Vertex AI requires:
 1. Creating a cache object via POST to /cachedContents
 2. Getting the cache resource name
 3. Referencing that cache name in subsequent requests
+
+The cache objects are shared and tracked by the PromptCacheManager in prompt_cache_manager.py.
 """
 
+import asyncio
 import json
-from datetime import datetime
 from typing import Any
 
 import google.auth
-import requests
+import httpx
 import structlog
 from google.auth.credentials import Credentials
 from google.auth.transport.requests import Request
@@ -40,7 +42,6 @@ class VertexCacheManager:
             self.api_endpoint = "aiplatform.googleapis.com"
         else:
             self.api_endpoint = f"{location}-aiplatform.googleapis.com"
-        self._cache_registry: dict[str, dict[str, Any]] = {}  # Maps cache_key -> cache_data
         self._scopes = ["https://www.googleapis.com/auth/cloud-platform"]
         self._default_credentials = None
         self._service_account_credentials = None
@@ -79,11 +80,15 @@ class VertexCacheManager:
             LOG.error("Failed to get access token", error=str(e))
             raise
 
-    def create_cache(
+    async def _get_headers(self) -> dict[str, str]:
+        # refreshing the credentials is a blocking call
+        access_token = await asyncio.to_thread(self._get_access_token)
+        return {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+
+    async def create_cache(
         self,
         model_name: str,
         static_content: str,
-        cache_key: str,
         ttl_seconds: int = 3600,
         system_instruction: str | None = None,
     ) -> dict[str, Any]:
@@ -93,29 +98,12 @@ class VertexCacheManager:
         Args:
             model_name: Full model path (e.g., "gemini-2.5-flash")
             static_content: The static content to cache
-            cache_key: Unique key to identify this cache (e.g., f"task_{task_id}")
             ttl_seconds: Time to live in seconds (default: 1 hour)
             system_instruction: Optional system instruction to include
 
         Returns:
             Cache data with 'name', 'expireTime', etc.
         """
-        # Check if cache already exists for this key
-        if cache_key in self._cache_registry:
-            cache_data = self._cache_registry[cache_key]
-            # Check if still valid
-            expire_time = datetime.fromisoformat(cache_data["expireTime"].replace("Z", "+00:00"))
-            if expire_time > datetime.now(expire_time.tzinfo):
-                LOG.info("Reusing existing cache", cache_key=cache_key, cache_name=cache_data["name"])
-                return cache_data
-            else:
-                LOG.info("Cache expired, creating new one", cache_key=cache_key)
-                # Clean up expired cache
-                try:
-                    self.delete_cache(cache_key)
-                except Exception:
-                    pass  # Best effort cleanup
-
         url = f"https://{self.api_endpoint}/v1/projects/{self.project_id}/locations/{self.location}/cachedContents"
 
         # Build the model path
@@ -132,86 +120,70 @@ class VertexCacheManager:
         if system_instruction:
             payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
 
-        headers = {"Authorization": f"Bearer {self._get_access_token()}", "Content-Type": "application/json"}
-
         LOG.info(
             "Creating Vertex AI cache object",
-            cache_key=cache_key,
             model=model_name,
             content_size=len(static_content),
             ttl_seconds=ttl_seconds,
         )
 
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-
-            if response.status_code != 200:
-                LOG.error(
-                    "Failed to create cache",
-                    cache_key=cache_key,
-                    status_code=response.status_code,
-                    response=response.text,
-                )
-                raise Exception(f"Cache creation failed: {response.text}")
-
-            cache_data = response.json()
-            cache_name = cache_data["name"]
-
-            # Store in registry
-            self._cache_registry[cache_key] = cache_data
-
-            LOG.info(
-                "Cache created successfully",
-                cache_key=cache_key,
-                cache_name=cache_name,
-                expires_at=cache_data.get("expireTime"),
-            )
-
-            return cache_data
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(url, headers=await self._get_headers(), json=payload)
 
-        except requests.exceptions.Timeout:
-            LOG.error("Cache creation timed out", cache_key=cache_key)
-            raise
-        except Exception as e:
-            LOG.error("Cache creation failed", cache_key=cache_key, error=str(e))
-            raise
+        if response.status_code != 200:
+            LOG.error("Failed to create cache", status_code=response.status_code, response=response.text)
+            raise Exception(f"Cache creation failed: {response.text}")
 
-    def delete_cache(self, cache_key: str) -> bool:
-        """Delete a cache object."""
-        cache_data = self._cache_registry.get(cache_key)
-        if not cache_data:
-            LOG.warning("Cache not found in registry", cache_key=cache_key)
-            return False
+        cache_data = response.json()
+        LOG.info("Cache created successfully", cache_name=cache_data["name"], expires_at=cache_data.get("expireTime"))
+        return cache_data
 
-        cache_name = cache_data["name"]
+    async def update_cache_ttl(self, cache_name: str, ttl_seconds: int) -> dict[str, Any]:
+        """Extend the expiration of a cache object, it expires ttl_seconds from now."""
         url = f"https://{self.api_endpoint}/v1/{cache_name}"
 
-        headers = {
-            "Authorization": f"Bearer {self._get_access_token()}",
-        }
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.patch(
+                url,
+                headers=await self._get_headers(),
+                params={"updateMask": "ttl"},
+                json={"ttl": f"{ttl_seconds}s"},
+            )
 
-        LOG.info("Deleting cache", cache_key=cache_key, cache_name=cache_name)
+        if response.status_code != 200:
+            LOG.warning(
+                "Failed to update cache ttl",
+                cache_name=cache_name,
+                status_code=response.status_code,
+                response=response.text,
+            )
+            raise Exception(f"Cache ttl update failed: {response.text}")
+        return response.json()
 
-        try:
-            response = requests.delete(url, headers=headers, timeout=10)
+    async def delete_cache(self, cache_name: str) -> bool:
+        """Delete a cache object."""
+        url = f"https://{self.api_endpoint}/v1/{cache_name}"
 
-            if response.status_code in (200, 204):
-                # Remove from registry
-                del self._cache_registry[cache_key]
-                LOG.info("Cache deleted successfully", cache_key=cache_key)
-                return True
-            else:
-                LOG.warning(
-                    "Failed to delete cache",
-                    cache_key=cache_key,
-                    status_code=response.status_code,
-                    response=response.text,
-                )
-                return False
+        LOG.info("Deleting cache", cache_name=cache_name)
+
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.delete(url, headers=await self._get_headers())
         except Exception as e:
-            LOG.error("Cache deletion failed", cache_key=cache_key, error=str(e))
+            LOG.error("Cache deletion failed", cache_name=cache_name, error=str(e))
             return False
 
+        if response.status_code in (200, 204):
+            LOG.info("Cache deleted successfully", cache_name=cache_name)
+            return True
+        LOG.warning(
+            "Failed to delete cache",
+            cache_name=cache_name,
+            status_code=response.status_code,
+            response=response.text,
+        )
+        return False
+
 
 # Global cache manager instance
 _global_cache_manager: VertexCacheManager | None = None
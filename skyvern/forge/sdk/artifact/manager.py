@@ -1,28 +1,94 @@
 import asyncio
+import base64
+import hashlib
+import json
 import shutil
 import time
 from collections import defaultdict
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable
 
 import structlog
 
 from skyvern.forge import app
 from skyvern.forge.sdk.api.files import get_skyvern_temp_dir
-from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType, LogEntityType
+from skyvern.forge.sdk.api.llm.screenshot_optimizer import get_original_screenshot
+from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType, BufferedArtifact, LogEntityType
+from skyvern.forge.sdk.artifact.storage.base import FILE_EXTENTSION_MAP
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.db.id import generate_artifact_id
-from skyvern.forge.sdk.models import Step
+from skyvern.forge.sdk.models import Step, StepUsageIncrement
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
 from skyvern.forge.sdk.schemas.task_v2 import TaskV2, Thought
 from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunBlock
+from skyvern.forge.sdk.settings_manager import SettingsManager
 
 LOG = structlog.get_logger(__name__)
 
+# how many blob uris are remembered as already stored, to skip uploading the same data again
+STORED_BLOB_URIS_MAX_SIZE = 10000
+# the API path an LLM request artifact references its images with, it returns the artifact with a signed url
+ARTIFACT_API_PATH = "/v1/artifacts/{artifact_id}"
+IMAGE_FILE_EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp", "image/gif": "gif"}
+
+
+def build_blob_uri(artifact_uri: str, data: bytes, file_ext: str) -> str:
+    """
+    The content addressed uri of the data, in the directory of an artifact uri of the same owner (step, thought, task v2
+    or AI suggestion): the artifacts of the owner with the same data share it, and it's kept and deleted with them.
+    """
+    return f"{artifact_uri.rsplit('/', 1)[0]}/blobs/{hashlib.sha256(data).hexdigest()}.{file_ext}"
+
+
+def extract_inline_images(llm_request: bytes, reference_image: Callable[[bytes, str], str]) -> bytes:
+    """
+    Replace the base64 images inlined in an LLM request payload with the references returned by
+    reference_image(image, media_type). Both the OpenAI style data urls and the Anthropic style base64 sources are
+    replaced.
+    """
+
+    def _replace(value: Any) -> Any:
+        if isinstance(value, list):
+            return [_replace(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if value.get("type") == "base64" and isinstance(value.get("data"), str):
+            replaced = {key: item for key, item in value.items() if key != "data"}
+            replaced["type"] = "url"
+            replaced["url"] = reference_image(base64.b64decode(value["data"]), value.get("media_type", "image/png"))
+            return replaced
+        url = value.get("url")
+        if isinstance(url, str) and url.startswith("data:image/") and ";base64," in url:
+            media_type, encoded_image = url.removeprefix("data:").split(";base64,", 1)
+            replaced = dict(value)
+            replaced["url"] = reference_image(base64.b64decode(encoded_image), media_type)
+            return replaced
+        return {key: _replace(item) for key, item in value.items()}
+
+    try:
+        payload = json.loads(llm_request)
+    except ValueError:
+        return llm_request
+    return json.dumps(_replace(payload)).encode("utf-8")
+
 
 class ArtifactManager:
     # task_id -> list of aio_tasks for uploading artifacts
     upload_aiotasks_map: dict[str, list[asyncio.Task[None]]] = defaultdict(list)
 
+    def __init__(self) -> None:
+        # the LLM artifact rows and the step usage are written to the database in batches by a background task,
+        # wait_for_upload_aiotasks flushes whatever is left before a run completes
+        self._buffered_artifacts: list[BufferedArtifact] = []
+        # step_id -> the usage added to the step since the last flush
+        self._buffered_step_usages: dict[str, StepUsageIncrement] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_aiotask: asyncio.Task[None] | None = None
+        # the content addressed blobs stored (or being stored) by this process, oldest first:
+        # uri -> the first artifact referencing it
+        self._stored_blobs: dict[str, str] = {}
+
     async def _write_streaming_screenshot(
         self,
         *,
@@ -91,6 +157,8 @@ class ArtifactManager:
         ai_suggestion_id: str | None = None,
         data: bytes | None = None,
         path: str | None = None,
+        buffered: bool = False,
+        content_addressed: bool = False,
     ) -> str:
         if data is None and path is None:
             raise ValueError("Either data or path must be provided to create an artifact.")
@@ -107,21 +175,43 @@ class ArtifactManager:
         if not run_id and context:
             run_id = context.run_id
 
-        artifact = await app.DATABASE.create_artifact(
-            artifact_id,
-            artifact_type,
-            uri,
-            step_id=step_id,
-            task_id=task_id,
-            workflow_run_id=workflow_run_id,
-            workflow_run_block_id=workflow_run_block_id,
-            thought_id=thought_id,
-            task_v2_id=task_v2_id,
-            run_id=run_id,
-            organization_id=organization_id,
-            ai_suggestion_id=ai_suggestion_id,
-        )
-        if data:
+        if buffered and SettingsManager.get_settings().ENABLE_ARTIFACT_WRITE_BEHIND:
+            now = datetime.utcnow()
+            artifact = Artifact(
+                created_at=now,
+                modified_at=now,
+                artifact_id=artifact_id,
+                artifact_type=artifact_type,
+                uri=uri,
+                task_id=task_id,
+                step_id=step_id,
+                workflow_run_id=workflow_run_id,
+                workflow_run_block_id=workflow_run_block_id,
+                observer_cruise_id=task_v2_id,
+                observer_thought_id=thought_id,
+                ai_suggestion_id=ai_suggestion_id,
+                organization_id=organization_id,
+            )
+            self._buffered_artifacts.append(BufferedArtifact(artifact=artifact, run_id=run_id))
+            self._schedule_flush()
+        else:
+            artifact = await app.DATABASE.create_artifact(
+                artifact_id,
+                artifact_type,
+                uri,
+                step_id=step_id,
+                task_id=task_id,
+                workflow_run_id=workflow_run_id,
+                workflow_run_block_id=workflow_run_block_id,
+                thought_id=thought_id,
+                task_v2_id=task_v2_id,
+                run_id=run_id,
+                organization_id=organization_id,
+                ai_suggestion_id=ai_suggestion_id,
+            )
+        if data and content_addressed:
+            self._store_blob(aio_task_primary_key, artifact, data)
+        elif data:
             # Fire and forget
             aio_task = asyncio.create_task(app.STORAGE.store_artifact(artifact, data))
             self.upload_aiotasks_map[aio_task_primary_key].append(aio_task)
@@ -141,17 +231,135 @@ class ArtifactManager:
 
         return artifact_id
 
+    def _store_blob(self, aio_task_primary_key: str, artifact: Artifact, data: bytes) -> None:
+        """Upload the data of an artifact whose uri is a content addressed blob, unless it's already stored."""
+        if artifact.uri in self._stored_blobs:
+            return
+        self._stored_blobs[artifact.uri] = artifact.artifact_id
+        if len(self._stored_blobs) > STORED_BLOB_URIS_MAX_SIZE:
+            del self._stored_blobs[next(iter(self._stored_blobs))]
+
+        # Fire and forget
+        aio_task = asyncio.create_task(app.STORAGE.store_artifact(artifact, data))
+        aio_task.add_done_callback(lambda task: self._forget_blob_if_not_stored(artifact.uri, task))
+        self.upload_aiotasks_map[aio_task_primary_key].append(aio_task)
+
+    def _forget_blob_if_not_stored(self, uri: str, aio_task: asyncio.Task[None]) -> None:
+        if aio_task.cancelled() or aio_task.exception() is not None:
+            self._stored_blobs.pop(uri, None)
+
+    def _get_llm_screenshot_owner(
+        self,
+        step: Step | None = None,
+        thought: Thought | None = None,
+        task_v2: TaskV2 | None = None,
+        ai_suggestion: AISuggestion | None = None,
+    ) -> tuple[str, str, dict[str, str]] | None:
+        """
+        The uri a SCREENSHOT_LLM artifact of the owner gets, the key of its upload tasks and its ids.
+        """
+        artifact_id = generate_artifact_id()
+        artifact_type = ArtifactType.SCREENSHOT_LLM
+        if step:
+            uri = app.STORAGE.build_uri(
+                organization_id=step.organization_id, artifact_id=artifact_id, step=step, artifact_type=artifact_type
+            )
+            return uri, step.task_id, {"step_id": step.step_id, "task_id": step.task_id}
+        if task_v2:
+            uri = app.STORAGE.build_task_v2_uri(
+                organization_id=task_v2.organization_id,
+                artifact_id=artifact_id,
+                task_v2=task_v2,
+                artifact_type=artifact_type,
+            )
+            return uri, task_v2.observer_cruise_id, {"task_v2_id": task_v2.observer_cruise_id}
+        if thought:
+            uri = app.STORAGE.build_thought_uri(
+                organization_id=thought.organization_id,
+                artifact_id=artifact_id,
+                thought=thought,
+                artifact_type=artifact_type,
+            )
+            return (
+                uri,
+                thought.observer_cruise_id,
+                {"thought_id": thought.observer_thought_id, "task_v2_id": thought.observer_cruise_id},
+            )
+        if ai_suggestion:
+            uri = app.STORAGE.build_ai_suggestion_uri(
+                organization_id=ai_suggestion.organization_id,
+                artifact_id=artifact_id,
+                ai_suggestion=ai_suggestion,
+                artifact_type=artifact_type,
+            )
+            return uri, ai_suggestion.ai_suggestion_id, {"ai_suggestion_id": ai_suggestion.ai_suggestion_id}
+        return None
+
+    async def _store_inline_images(
+        self,
+        data: bytes,
+        organization_id: str,
+        step: Step | None = None,
+        thought: Thought | None = None,
+        task_v2: TaskV2 | None = None,
+        ai_suggestion: AISuggestion | None = None,
+    ) -> bytes:
+        """
+        Store the images inlined in an LLM request as the content addressed blobs of SCREENSHOT_LLM artifacts, return
+        the request referencing them by their artifact API path. The images usually are the screenshots of the same
+        LLM call, whose artifacts are already created. The screenshots optimized for the LLM reference the artifacts of
+        the screenshots they were made from, so they don't show up twice.
+        """
+        owner = self._get_llm_screenshot_owner(step, thought, task_v2, ai_suggestion)
+        if owner is None:
+            return data
+        screenshot_uri, aio_task_primary_key, owner_ids = owner
+        # blob uri -> the id of the artifact to create for it and the image
+        new_images: dict[str, tuple[str, bytes]] = {}
+
+        def _reference_image(image: bytes, media_type: str) -> str:
+            original_screenshot = get_original_screenshot(image)
+            if original_screenshot is not None:
+                image, media_type = original_screenshot, "image/png"
+            file_ext = IMAGE_FILE_EXTENSIONS.get(media_type, media_type.rsplit("/", 1)[-1])
+            uri = build_blob_uri(screenshot_uri, image, file_ext)
+            artifact_id = self._stored_blobs.get(uri)
+            if artifact_id is None:
+                artifact_id, _ = new_images.setdefault(uri, (generate_artifact_id(), image))
+            return ARTIFACT_API_PATH.format(artifact_id=artifact_id)
+
+        # the payload embeds every screenshot in base64, parsing and hashing it blocks for a while
+        data = await asyncio.to_thread(extract_inline_images, data, _reference_image)
+        for uri, (artifact_id, image) in new_images.items():
+            await self._create_artifact(
+                aio_task_primary_key=aio_task_primary_key,
+                artifact_id=artifact_id,
+                artifact_type=ArtifactType.SCREENSHOT_LLM,
+                uri=uri,
+                organization_id=organization_id,
+                data=image,
+                buffered=True,
+                content_addressed=True,
+                **owner_ids,
+            )
+        return data
+
     async def create_artifact(
         self,
         step: Step,
         artifact_type: ArtifactType,
         data: bytes | None = None,
         path: str | None = None,
+        buffered: bool = False,
+        content_addressed: bool = False,
     ) -> str:
         artifact_id = generate_artifact_id()
         uri = app.STORAGE.build_uri(
             organization_id=step.organization_id, artifact_id=artifact_id, step=step, artifact_type=artifact_type
         )
+        if content_addressed and data:
+            # the artifacts of the owner with the same data reference the same blob, it's uploaded once
+            uri = build_blob_uri(uri, data, FILE_EXTENTSION_MAP[artifact_type])
         return await self._create_artifact(
             aio_task_primary_key=step.task_id,
             artifact_id=artifact_id,
@@ -162,6 +370,8 @@ class ArtifactManager:
             organization_id=step.organization_id,
             data=data,
             path=path,
+            buffered=buffered,
+            content_addressed=content_addressed,
         )
 
     async def create_log_artifact(
@@ -205,6 +415,8 @@ class ArtifactManager:
         artifact_type: ArtifactType,
         data: bytes | None = None,
         path: str | None = None,
+        buffered: bool = False,
+        content_addressed: bool = False,
     ) -> str:
         artifact_id = generate_artifact_id()
         uri = app.STORAGE.build_thought_uri(
@@ -213,6 +425,9 @@ class ArtifactManager:
             thought=thought,
             artifact_type=artifact_type,
         )
+        if content_addressed and data:
+            # the artifacts of the owner with the same data reference the same blob, it's uploaded once
+            uri = build_blob_uri(uri, data, FILE_EXTENTSION_MAP[artifact_type])
         return await self._create_artifact(
             aio_task_primary_key=thought.observer_cruise_id,
             artifact_id=artifact_id,
@@ -223,6 +438,8 @@ class ArtifactManager:
             organization_id=thought.organization_id,
             data=data,
             path=path,
+            buffered=buffered,
+            content_addressed=content_addressed,
         )
 
     async def create_task_v2_artifact(
@@ -231,6 +448,8 @@ class ArtifactManager:
         artifact_type: ArtifactType,
         data: bytes | None = None,
         path: str | None = None,
+        buffered: bool = False,
+        content_addressed: bool = False,
     ) -> str:
         artifact_id = generate_artifact_id()
         uri = app.STORAGE.build_task_v2_uri(
@@ -239,6 +458,9 @@ class ArtifactManager:
             task_v2=task_v2,
             artifact_type=artifact_type,
         )
+        if content_addressed and data:
+            # the artifacts of the owner with the same data reference the same blob, it's uploaded once
+            uri = build_blob_uri(uri, data, FILE_EXTENTSION_MAP[artifact_type])
         return await self._create_artifact(
             aio_task_primary_key=task_v2.observer_cruise_id,
             artifact_id=artifact_id,
@@ -248,6 +470,8 @@ class ArtifactManager:
             organization_id=task_v2.organization_id,
             data=data,
             path=path,
+            buffered=buffered,
+            content_addressed=content_addressed,
         )
 
     async def create_workflow_run_block_artifact(
@@ -282,6 +506,8 @@ class ArtifactManager:
         artifact_type: ArtifactType,
         data: bytes | None = None,
         path: str | None = None,
+        buffered: bool = False,
+        content_addressed: bool = False,
     ) -> str:
         artifact_id = generate_artifact_id()
         uri = app.STORAGE.build_ai_suggestion_uri(
@@ -290,6 +516,9 @@ class ArtifactManager:
             ai_suggestion=ai_suggestion,
             artifact_type=artifact_type,
         )
+        if content_addressed and data:
+            # the artifacts of the owner with the same data reference the same blob, it's uploaded once
+            uri = build_blob_uri(uri, data, FILE_EXTENTSION_MAP[artifact_type])
         return await self._create_artifact(
             aio_task_primary_key=ai_suggestion.ai_suggestion_id,
             artifact_id=artifact_id,
@@ -299,6 +528,8 @@ class ArtifactManager:
             organization_id=ai_suggestion.organization_id,
             data=data,
             path=path,
+            buffered=buffered,
+            content_addressed=content_addressed,
         )
 
     async def create_script_file_artifact(
@@ -348,55 +579,178 @@ class ArtifactManager:
         task_v2: TaskV2 | None = None,
         ai_suggestion: AISuggestion | None = None,
     ) -> None:
+        if artifact_type == ArtifactType.LLM_REQUEST:
+            owner = step or task_v2 or thought or ai_suggestion
+            if owner:
+                data = await self._store_inline_images(
+                    data,
+                    owner.organization_id,
+                    step=step,
+                    thought=thought,
+                    task_v2=task_v2,
+                    ai_suggestion=ai_suggestion,
+                )
+
         if step:
             await self.create_artifact(
                 step=step,
                 artifact_type=artifact_type,
                 data=data,
+                buffered=True,
             )
             for screenshot in screenshots or []:
                 await self.create_artifact(
                     step=step,
                     artifact_type=ArtifactType.SCREENSHOT_LLM,
                     data=screenshot,
+                    buffered=True,
+                    content_addressed=True,
                 )
         elif task_v2:
             await self.create_task_v2_artifact(
                 task_v2=task_v2,
                 artifact_type=artifact_type,
                 data=data,
+                buffered=True,
             )
             for screenshot in screenshots or []:
                 await self.create_task_v2_artifact(
                     task_v2=task_v2,
                     artifact_type=ArtifactType.SCREENSHOT_LLM,
                     data=screenshot,
+                    buffered=True,
+                    content_addressed=True,
                 )
         elif thought:
             await self.create_thought_artifact(
                 thought=thought,
                 artifact_type=artifact_type,
                 data=data,
+                buffered=True,
             )
             for screenshot in screenshots or []:
                 await self.create_thought_artifact(
                     thought=thought,
                     artifact_type=ArtifactType.SCREENSHOT_LLM,
                     data=screenshot,
+                    buffered=True,
+                    content_addressed=True,
                 )
         elif ai_suggestion:
             await self.create_ai_suggestion_artifact(
                 ai_suggestion=ai_suggestion,
                 artifact_type=artifact_type,
                 data=data,
+                buffered=True,
             )
             for screenshot in screenshots or []:
                 await self.create_ai_suggestion_artifact(
                     ai_suggestion=ai_suggestion,
                     artifact_type=ArtifactType.SCREENSHOT_LLM,
                     data=screenshot,
+                    buffered=True,
+                    content_addressed=True,
                 )
 
+    async def record_step_usage(
+        self,
+        step: Step,
+        cost: float | None = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        reasoning_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> None:
+        """
+        Add the cost and the token counts of an LLM call to the step.
+        With ENABLE_ARTIFACT_WRITE_BEHIND, the usage is merged per step and written with the buffered artifacts.
+        """
+        if not SettingsManager.get_settings().ENABLE_ARTIFACT_WRITE_BEHIND:
+            await app.DATABASE.update_step(
+                task_id=step.task_id,
+                step_id=step.step_id,
+                organization_id=step.organization_id,
+                incremental_cost=cost,
+                incremental_input_tokens=input_tokens if input_tokens > 0 else None,
+                incremental_output_tokens=output_tokens if output_tokens > 0 else None,
+                incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
+                incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
+            )
+            return
+
+        usage = self._buffered_step_usages.get(step.step_id)
+        if usage is None:
+            usage = StepUsageIncrement(
+                organization_id=step.organization_id,
+                task_id=step.task_id,
+                step_id=step.step_id,
+            )
+            self._buffered_step_usages[step.step_id] = usage
+        usage.cost += cost or 0
+        usage.input_tokens += max(input_tokens, 0)
+        usage.output_tokens += max(output_tokens, 0)
+        usage.reasoning_tokens += max(reasoning_tokens, 0)
+        usage.cached_tokens += max(cached_tokens, 0)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_aiotask is None or self._flush_aiotask.done():
+            self._flush_aiotask = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        # nothing is awaited between the last check and the end of the task, so a write buffered after the task ends
+        # always schedules a new one
+        while self._buffered_artifacts or self._buffered_step_usages:
+            await asyncio.sleep(SettingsManager.get_settings().ARTIFACT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS)
+            await self.flush_buffered_writes()
+
+    async def flush_buffered_writes(self) -> None:
+        """
+        Write the buffered artifact rows and step usage to the database.
+        Holding the lock, a flush in progress is waited for, so everything buffered before the call is written when it
+        returns.
+        """
+        async with self._flush_lock:
+            batch_size = SettingsManager.get_settings().ARTIFACT_WRITE_BEHIND_BATCH_SIZE
+            while self._buffered_artifacts:
+                artifacts = self._buffered_artifacts[:batch_size]
+                del self._buffered_artifacts[:batch_size]
+                try:
+                    await app.DATABASE.create_artifacts(artifacts)
+                except Exception:
+                    LOG.warning(
+                        "Failed to insert the buffered artifacts in a batch, inserting them one by one",
+                        artifact_count=len(artifacts),
+                        exc_info=True,
+                    )
+                    await self._insert_buffered_artifacts_one_by_one(artifacts)
+
+            if self._buffered_step_usages:
+                usages = list(self._buffered_step_usages.values())
+                self._buffered_step_usages = {}
+                try:
+                    await app.DATABASE.increment_steps_usage(usages)
+                except Exception:
+                    # the batch is a single transaction, none of its increments were applied
+                    LOG.warning(
+                        "Failed to update the buffered step usage in a batch, updating the steps one by one",
+                        step_count=len(usages),
+                        exc_info=True,
+                    )
+                    for usage in usages:
+                        try:
+                            await app.DATABASE.increment_steps_usage([usage])
+                        except Exception:
+                            LOG.exception("Failed to update the buffered step usage", step_id=usage.step_id)
+
+    async def _insert_buffered_artifacts_one_by_one(self, artifacts: list[BufferedArtifact]) -> None:
+        # a single bad row, like one referencing a deleted step, doesn't drop the rest of its batch
+        for buffered in artifacts:
+            try:
+                await app.DATABASE.create_artifacts([buffered])
+            except Exception:
+                LOG.exception("Failed to insert the buffered artifact", artifact_id=buffered.artifact.artifact_id)
+
     async def update_artifact_data(
         self,
         artifact_id: str | None,
@@ -426,6 +780,7 @@ class ArtifactManager:
         return await app.STORAGE.get_share_links(artifacts)
 
     async def wait_for_upload_aiotasks(self, primary_keys: list[str]) -> None:
+        await self.flush_buffered_writes()
         try:
             st = time.time()
             async with asyncio.timeout(30):
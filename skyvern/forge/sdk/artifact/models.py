@@ -86,6 +86,13 @@ class Artifact(BaseModel):
         return getattr(self, key)
 
 
+class BufferedArtifact(BaseModel):
+    """An artifact waiting in the ArtifactManager buffer to be inserted into the database."""
+
+    artifact: Artifact
+    run_id: str | None = None
+
+
 class LogEntityType(StrEnum):
     STEP = "step"
     TASK = "task"
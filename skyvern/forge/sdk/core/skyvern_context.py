@@ -1,10 +1,14 @@
+import copy
 from contextvars import ContextVar
-from dataclasses import dataclass, field
-from typing import Any
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any
 from zoneinfo import ZoneInfo
 
 from playwright.async_api import Frame, Page
 
+if TYPE_CHECKING:
+    from skyvern.forge.sdk.api.llm.prompt_cache_manager import PromptCacheLease
+
 
 @dataclass
 class SkyvernContext:
@@ -27,6 +31,8 @@ class SkyvernContext:
     hashed_href_map: dict[str, str] = field(default_factory=dict)
     refresh_working_page: bool = False
     frame_index_map: dict[Frame, int] = field(default_factory=dict)
+    # the url and the child frame count of the frame, and how many step scrapings in a row it was invisible or empty
+    frame_skip_count_map: dict[Frame, tuple[str, int, int]] = field(default_factory=dict)
     dropped_css_svg_element_map: dict[str, bool] = field(default_factory=dict)
     max_screenshot_scrolls: int | None = None
     browser_container_ip: str | None = None
@@ -39,6 +45,7 @@ class SkyvernContext:
     vertex_cache_name: str | None = None  # Vertex AI cache resource name for explicit caching
     vertex_cache_key: str | None = None  # Logical cache key (includes variant + llm key)
     vertex_cache_variant: str | None = None  # Variant identifier used when creating the cache
+    prompt_cache_lease: "PromptCacheLease | None" = None  # released when the next step or the task is done with it
     prompt_caching_settings: dict[str, bool] | None = None
     enable_speed_optimizations: bool = False
 
@@ -66,6 +73,12 @@ class SkyvernContext:
     # stores pre-scraped data for next step to avoid re-scraping
     next_step_pre_scraped_data: dict[str, Any] | None = None
     speculative_plans: dict[str, Any] = field(default_factory=dict)
+    # speculative step plans committed by the next step, or rolled back because the page changed
+    speculative_plan_commits: int = 0
+    speculative_plan_rollbacks: int = 0
+
+    # incremental scrape: the last scraped page, keyed by task_id. only the latest task is kept
+    last_scraped_page: dict[str, Any] = field(default_factory=dict)
 
     """
     Example output value:
@@ -142,6 +155,25 @@ def set(context: SkyvernContext) -> None:
     _context.set(context)
 
 
+def fork(context: SkyvernContext) -> SkyvernContext:
+    """
+    Copy the context for work running concurrently in its own asyncio task, set the copy with set() in that task.
+
+    Args:
+        context: The context to copy
+
+    Returns:
+        A shallow copy of the context whose dicts and lists are copied too, so the concurrent work doesn't overwrite
+        each other's entries
+    """
+    forked_context = copy.copy(context)
+    for context_field in fields(forked_context):
+        value = getattr(forked_context, context_field.name)
+        if isinstance(value, (dict, list)):
+            setattr(forked_context, context_field.name, copy.copy(value))
+    return forked_context
+
+
 def reset() -> None:
     """
     Reset the current context
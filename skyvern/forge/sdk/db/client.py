@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async
 from skyvern.config import settings
 from skyvern.constants import DEFAULT_SCRIPT_RUN_ID
 from skyvern.exceptions import BrowserProfileNotFound, WorkflowParameterNotFound, WorkflowRunNotFound
-from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType
+from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType, BufferedArtifact
 from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType, TaskType
 from skyvern.forge.sdk.db.exceptions import NotFoundError
 from skyvern.forge.sdk.db.models import (
@@ -78,7 +78,7 @@ from skyvern.forge.sdk.db.utils import (
 from skyvern.forge.sdk.encrypt import encryptor
 from skyvern.forge.sdk.encrypt.base import EncryptMethod
 from skyvern.forge.sdk.log_artifacts import save_workflow_run_logs
-from skyvern.forge.sdk.models import Step, StepStatus
+from skyvern.forge.sdk.models import Step, StepStatus, StepUsageIncrement
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
 from skyvern.forge.sdk.schemas.browser_profiles import BrowserProfile
 from skyvern.forge.sdk.schemas.credentials import Credential, CredentialType, CredentialVaultType
@@ -322,6 +322,74 @@ class AgentDB:
             LOG.exception("UnexpectedError")
             raise
 
+    async def create_artifacts(self, artifacts: list[BufferedArtifact]) -> None:
+        """
+        Insert the artifacts built in memory in a single batch.
+        """
+        if not artifacts:
+            return
+        try:
+            async with self.Session() as session:
+                session.add_all(
+                    [
+                        ArtifactModel(
+                            artifact_id=buffered.artifact.artifact_id,
+                            artifact_type=buffered.artifact.artifact_type,
+                            uri=buffered.artifact.uri,
+                            task_id=buffered.artifact.task_id,
+                            step_id=buffered.artifact.step_id,
+                            workflow_run_id=buffered.artifact.workflow_run_id,
+                            workflow_run_block_id=buffered.artifact.workflow_run_block_id,
+                            observer_cruise_id=buffered.artifact.observer_cruise_id,
+                            observer_thought_id=buffered.artifact.observer_thought_id,
+                            run_id=buffered.run_id,
+                            ai_suggestion_id=buffered.artifact.ai_suggestion_id,
+                            organization_id=buffered.artifact.organization_id,
+                            created_at=buffered.artifact.created_at,
+                            modified_at=buffered.artifact.modified_at,
+                        )
+                        for buffered in artifacts
+                    ]
+                )
+                await session.commit()
+        except SQLAlchemyError:
+            LOG.exception("SQLAlchemyError")
+            raise
+        except Exception:
+            LOG.exception("UnexpectedError")
+            raise
+
+    async def increment_steps_usage(self, usages: list[StepUsageIncrement]) -> None:
+        """
+        Add the costs and the token counts to the steps in a single transaction, without reading the steps first.
+        """
+        if not usages:
+            return
+        try:
+            async with self.Session() as session:
+                for usage in usages:
+                    await session.execute(
+                        update(StepModel)
+                        .filter_by(task_id=usage.task_id)
+                        .filter_by(step_id=usage.step_id)
+                        .filter_by(organization_id=usage.organization_id)
+                        .values(
+                            step_cost=func.coalesce(StepModel.step_cost, 0) + usage.cost,
+                            input_token_count=func.coalesce(StepModel.input_token_count, 0) + usage.input_tokens,
+                            output_token_count=func.coalesce(StepModel.output_token_count, 0) + usage.output_tokens,
+                            reasoning_token_count=func.coalesce(StepModel.reasoning_token_count, 0)
+                            + usage.reasoning_tokens,
+                            cached_token_count=func.coalesce(StepModel.cached_token_count, 0) + usage.cached_tokens,
+                        )
+                    )
+                await session.commit()
+        except SQLAlchemyError:
+            LOG.exception("SQLAlchemyError")
+            raise
+        except Exception:
+            LOG.exception("UnexpectedError")
+            raise
+
     async def get_task(self, task_id: str, organization_id: str | None = None) -> Task | None:
         """Get a task by its id"""
         try:
@@ -620,16 +688,25 @@ class AgentDB:
                         step.is_last = is_last
                     if retry_index is not None:
                         step.retry_index = retry_index
+                    # the increments are added by the database, the buffered step usage is written concurrently
                     if incremental_cost is not None:
-                        step.step_cost = incremental_cost + float(step.step_cost or 0)
+                        step.step_cost = func.coalesce(StepModel.step_cost, 0) + incremental_cost
                     if incremental_input_tokens is not None:
-                        step.input_token_count = incremental_input_tokens + (step.input_token_count or 0)
+                        step.input_token_count = (
+                            func.coalesce(StepModel.input_token_count, 0) + incremental_input_tokens
+                        )
                     if incremental_output_tokens is not None:
-                        step.output_token_count = incremental_output_tokens + (step.output_token_count or 0)
+                        step.output_token_count = (
+                            func.coalesce(StepModel.output_token_count, 0) + incremental_output_tokens
+                        )
                     if incremental_reasoning_tokens is not None:
-                        step.reasoning_token_count = incremental_reasoning_tokens + (step.reasoning_token_count or 0)
+                        step.reasoning_token_count = (
+                            func.coalesce(StepModel.reasoning_token_count, 0) + incremental_reasoning_tokens
+                        )
                     if incremental_cached_tokens is not None:
-                        step.cached_token_count = incremental_cached_tokens + (step.cached_token_count or 0)
+                        step.cached_token_count = (
+                            func.coalesce(StepModel.cached_token_count, 0) + incremental_cached_tokens
+                        )
                     if created_by is not None:
                         step.created_by = created_by
 
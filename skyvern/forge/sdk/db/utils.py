@@ -40,6 +40,7 @@ from skyvern.forge.sdk.schemas.organizations import (
 from skyvern.forge.sdk.schemas.task_v2 import TaskV2
 from skyvern.forge.sdk.schemas.tasks import Task, TaskStatus
 from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunBlock
+from skyvern.forge.sdk.workflow.compiled_workflow_cache import compiled_workflow_cache
 from skyvern.forge.sdk.workflow.models.parameter import (
     AWSSecretParameter,
     BitwardenLoginCredentialParameter,
@@ -328,7 +329,12 @@ def convert_to_workflow(workflow_model: WorkflowModel, debug_enabled: bool = Fal
         version=workflow_model.version,
         is_saved_task=workflow_model.is_saved_task,
         description=workflow_model.description,
-        workflow_definition=WorkflowDefinition.model_validate(workflow_model.workflow_definition),
+        workflow_definition=compiled_workflow_cache.get_workflow_definition(
+            workflow_id=workflow_model.workflow_id,
+            version=workflow_model.version,
+            modified_at=workflow_model.modified_at,
+            validate=lambda: WorkflowDefinition.model_validate(workflow_model.workflow_definition),
+        ),
         created_at=workflow_model.created_at,
         modified_at=workflow_model.modified_at,
         deleted_at=workflow_model.deleted_at,
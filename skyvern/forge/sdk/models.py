@@ -55,6 +55,17 @@ class SpeculativeLLMMetadata(BaseModel):
     llm_cost: float | None = None
 
 
+class StepUsageIncrement(BaseModel):
+    organization_id: str
+    task_id: str
+    step_id: str
+    cost: float = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    cached_tokens: int = 0
+
+
 class Step(BaseModel):
     created_at: datetime
     modified_at: datetime
@@ -20,17 +20,23 @@ class PromptEngine:
 
 import glob
 import os
+import re
 from difflib import get_close_matches
 from pathlib import Path
 from typing import Any, List
 
 import structlog
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, Template, meta
 
 from skyvern.constants import SKYVERN_DIR
 
 LOG = structlog.get_logger()
 
+# the start of the first jinja expression, statement or comment: the template source before it renders as it is
+JINJA_SYNTAX_START = re.compile(r"\{[{%#]")
+# how many rendered static templates are kept
+STATIC_PROMPT_CACHE_SIZE = 256
+
 
 class PromptEngine:
     """
@@ -57,11 +63,65 @@ class PromptEngine:
 
             self.model = self.get_closest_match(self.model, model_names)
 
-            self.env = Environment(loader=FileSystemLoader(models_dir))
+            # the templates don't change while running: they are compiled once here and never checked for updates
+            self.env = Environment(loader=FileSystemLoader(models_dir), cache_size=-1, auto_reload=False)
+            self._templates: dict[str, Template] = {}
+            # template name -> the text rendered before its first jinja syntax
+            self._static_prefixes: dict[str, str] = {}
+            # template name -> the variables it reads
+            self._template_variables: dict[str, frozenset[str]] = {}
+            self._rendered_static_prompts: dict[tuple, str] = {}
+            self._precompile_templates(Path(models_dir) / self.model)
         except Exception:
             LOG.error("Error initializing PromptEngine.", model=model, exc_info=True)
             raise
 
+    def _precompile_templates(self, model_dir: Path) -> None:
+        assert self.env.loader is not None
+        for template_path in sorted(model_dir.glob("*.j2")):
+            template_name = template_path.stem
+            source, _, _ = self.env.loader.get_source(self.env, f"{self.model}/{template_path.name}")
+            self._templates[template_name] = self.env.get_template(f"{self.model}/{template_path.name}")
+            match = JINJA_SYNTAX_START.search(source)
+            # jinja drops the single trailing newline of the template when rendering it
+            self._static_prefixes[template_name] = source[: match.start()] if match else source.removesuffix("\n")
+            self._template_variables[template_name] = frozenset(
+                meta.find_undeclared_variables(self.env.parse(source))
+            )
+
+    def _get_template(self, template: str) -> Template:
+        if template in self._templates:
+            return self._templates[template]
+        return self.env.get_template(f"{self.model}/{template}.j2")
+
+    def get_static_prefix(self, template: str) -> str:
+        """
+        The text every rendering of the template starts with, whatever the arguments. It's the part of the prompt the
+        providers can cache, "" when the template starts with a jinja expression.
+        """
+        return self._static_prefixes.get(template, "")
+
+    def load_static_prompt(self, template: str, **kwargs: Any) -> str:
+        """
+        load_prompt for the templates which only hold the static instructions of a prompt, like extract-action-static.
+        The rendering is cached by the values of the variables the template reads, so it's the same string, and the
+        same cacheable prefix, for every step that renders it with the same arguments.
+        """
+        variables = self._template_variables.get(template)
+        if variables is None:
+            return self.load_prompt(template, **kwargs)
+        try:
+            key = (template, tuple(sorted((name, kwargs.get(name)) for name in variables)))
+            hash(key)
+        except TypeError:
+            return self.load_prompt(template, **kwargs)
+
+        if key not in self._rendered_static_prompts:
+            if len(self._rendered_static_prompts) >= STATIC_PROMPT_CACHE_SIZE:
+                self._rendered_static_prompts.pop(next(iter(self._rendered_static_prompts)))
+            self._rendered_static_prompts[key] = self.load_prompt(template, **kwargs)
+        return self._rendered_static_prompts[key]
+
     @staticmethod
     def get_closest_match(target: str, model_dirs: List[str]) -> str:
         """
@@ -98,9 +158,7 @@ class PromptEngine:
             str: The populated template.
         """
         try:
-            template = "/".join([self.model, template])
-            jinja_template = self.env.get_template(f"{template}.j2")
-            return jinja_template.render(**kwargs)
+            return self._get_template(template).render(**kwargs)
         except Exception:
             LOG.error(
                 "Failed to load prompt.",
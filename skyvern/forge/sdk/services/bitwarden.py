@@ -2,8 +2,9 @@ import asyncio
 import json
 import os
 import re
+from contextlib import asynccontextmanager
 from enum import IntEnum, StrEnum
-from typing import Tuple
+from typing import AsyncIterator, Tuple
 
 import structlog
 import tldextract
@@ -135,6 +136,12 @@ class RunCommandResult(BaseModel):
     returncode: int
 
 
+class BitwardenSession(BaseModel):
+    session_key: str
+    # the environment of the bw commands using the session
+    env: dict[str, str] = {}
+
+
 class BitwardenService:
     @staticmethod
     async def run_command(
@@ -148,6 +155,8 @@ class BitwardenService:
         env["NODE_NO_WARNINGS"] = "1"
         if additional_env:
             env.update(additional_env)  # Update with any additional environment variables
+        if command and command[0] == "bw":
+            command = [settings.BITWARDEN_CLI_PATH, *command[1:]]
 
         try:
             async with asyncio.timeout(timeout):
@@ -194,6 +203,7 @@ class BitwardenService:
         item_id: str | None = None,
         max_retries: int = settings.BITWARDEN_MAX_RETRIES,
         timeout: int = settings.BITWARDEN_TIMEOUT_SECONDS,
+        organization_id: str | None = None,
     ) -> dict[str, str]:
         """
         Get the secret value from the Bitwarden CLI.
@@ -217,6 +227,7 @@ class BitwardenService:
                         collection_id=collection_id,
                         item_id=item_id,
                         timeout=timeout,
+                        organization_id=organization_id,
                     )
             except BitwardenAccessDeniedError as e:
                 raise e
@@ -258,18 +269,19 @@ class BitwardenService:
         collection_id: str | None = None,
         item_id: str | None = None,
         timeout: int = 60,
+        organization_id: str | None = None,
     ) -> dict[str, str]:
         """
         Get the secret value from the Bitwarden CLI.
         """
-        try:
-            await BitwardenService.login(client_id, client_secret)
-            await BitwardenService.sync()
-            session_key = await BitwardenService.unlock(master_password)
+        async with BitwardenService.vault_session(
+            client_id, client_secret, master_password, organization_id
+        ) as session:
+            session_key = session.session_key
 
             if item_id:  # if item_id provided, get single item by item id
                 command = ["bw", "get", "item", item_id, "--session", session_key]
-                item_result = await BitwardenService.run_command(command)
+                item_result = await BitwardenService.run_command(command, session.env)
                 if item_result.stderr:
                     raise BitwardenGetItemError(
                         f"Failed to get the bitwarden item {item_id}. Error: {item_result.stderr}"
@@ -315,7 +327,7 @@ class BitwardenService:
             else:
                 LOG.error("No collection ID or organization ID provided -- this is required")
                 raise BitwardenListItemsError("No collection ID or organization ID provided -- this is required")
-            items_result = await BitwardenService.run_command(list_command, timeout=timeout)
+            items_result = await BitwardenService.run_command(list_command, session.env, timeout=timeout)
 
             # Parse the items and extract credentials
             try:
@@ -373,9 +385,6 @@ class BitwardenService:
                             return single_result.credential
             LOG.warning("No credential in Bitwarden matches the rule, returning the first match")
             return bitwarden_result[0].credential
-        finally:
-            # Step 4: Log out
-            await BitwardenService.logout()
 
     @staticmethod
     async def get_sensitive_information_from_identity(
@@ -390,6 +399,7 @@ class BitwardenService:
         remaining_retries: int = settings.BITWARDEN_MAX_RETRIES,
         timeout: int = settings.BITWARDEN_TIMEOUT_SECONDS,
         fail_reasons: list[str] = [],
+        organization_id: str | None = None,
     ) -> dict[str, str]:
         """
         Get the secret value from the Bitwarden CLI.
@@ -407,6 +417,7 @@ class BitwardenService:
                     collection_id=collection_id,
                     identity_key=identity_key,
                     identity_fields=identity_fields,
+                    organization_id=organization_id,
                 )
         except BitwardenAccessDeniedError as e:
             raise e
@@ -431,6 +442,7 @@ class BitwardenService:
                 # Double the timeout for the next retry
                 timeout=timeout * 2,
                 fail_reasons=fail_reasons + [f"{type(e).__name__}: {str(e)}"],
+                organization_id=organization_id,
             )
 
     @staticmethod
@@ -443,14 +455,15 @@ class BitwardenService:
         identity_fields: list[str],
         bw_organization_id: str | None,
         bw_collection_ids: list[str] | None,
+        organization_id: str | None = None,
     ) -> dict[str, str]:
         """
         Get the sensitive information from the Bitwarden CLI.
         """
-        try:
-            await BitwardenService.login(client_id, client_secret)
-            await BitwardenService.sync()
-            session_key = await BitwardenService.unlock(master_password)
+        async with BitwardenService.vault_session(
+            client_id, client_secret, master_password, organization_id
+        ) as session:
+            session_key = session.session_key
 
             if not bw_organization_id and not collection_id:
                 raise BitwardenAccessDeniedError()
@@ -469,7 +482,7 @@ class BitwardenService:
             ]
             if bw_organization_id:
                 list_command.extend(["--organizationid", bw_organization_id])
-            items_result = await BitwardenService.run_command(list_command)
+            items_result = await BitwardenService.run_command(list_command, session.env)
 
             # Parse the items and extract sensitive information
             try:
@@ -508,16 +521,47 @@ class BitwardenService:
 
             return sensitive_information
 
+    @staticmethod
+    @asynccontextmanager
+    async def vault_session(
+        client_id: str | None,
+        client_secret: str | None,
+        master_password: str,
+        organization_id: str | None = None,
+    ) -> AsyncIterator[BitwardenSession]:
+        """
+        Log in and unlock the vault for the bw commands run in the context.
+
+        With an organization_id and the session pool enabled, the session is leased from the organization's pooled
+        sessions instead of logging in, syncing and logging out around every lookup.
+        """
+        # the pool runs the bw commands of this module, it imports this one
+        from skyvern.forge.sdk.services.bitwarden_session_pool import bitwarden_session_pool  # noqa: PLC0415
+
+        if organization_id and bitwarden_session_pool.enabled:
+            async with bitwarden_session_pool.lease(
+                organization_id, client_id, client_secret, master_password
+            ) as session:
+                yield session
+            return
+
+        try:
+            await BitwardenService.login(client_id, client_secret)
+            await BitwardenService.sync()
+            session_key = await BitwardenService.unlock(master_password)
+            yield BitwardenSession(session_key=session_key)
         finally:
-            # Step 4: Log out
             await BitwardenService.logout()
 
     @staticmethod
-    async def login(client_id: str | None, client_secret: str | None) -> None:
+    async def login(
+        client_id: str | None, client_secret: str | None, additional_env: dict[str, str] | None = None
+    ) -> None:
         """
         Log in to the Bitwarden CLI.
         """
         env = {
+            **(additional_env or {}),
             "BW_CLIENTID": client_id or "",
             "BW_CLIENTSECRET": client_secret or "",
         }
@@ -537,11 +581,12 @@ class BitwardenService:
         LOG.info("Bitwarden login successful")
 
     @staticmethod
-    async def unlock(master_password: str) -> str:
+    async def unlock(master_password: str, additional_env: dict[str, str] | None = None) -> str:
         """
         Unlock the Bitwarden CLI.
         """
         env = {
+            **(additional_env or {}),
             "BW_PASSWORD": master_password,
         }
         unlock_command = ["bw", "unlock", "--passwordenv", "BW_PASSWORD"]
@@ -565,24 +610,37 @@ class BitwardenService:
         return session_key
 
     @staticmethod
-    async def sync() -> None:
+    async def sync(additional_env: dict[str, str] | None = None) -> None:
         """
         Sync the Bitwarden CLI.
         """
         sync_command = ["bw", "sync"]
         LOG.info("Bitwarden CLI sync started")
-        sync_result = await BitwardenService.run_command(sync_command)
+        sync_result = await BitwardenService.run_command(sync_command, additional_env)
         LOG.info("Bitwarden CLI sync completed")
         if sync_result.stderr:
             raise BitwardenSyncError(sync_result.stderr)
 
     @staticmethod
-    async def logout() -> None:
+    async def get_status(session_key: str, additional_env: dict[str, str] | None = None) -> str:
+        """
+        The status of the Bitwarden CLI vault: unauthenticated, locked or unlocked.
+        """
+        status_command = ["bw", "status", "--session", session_key]
+        status_result = await BitwardenService.run_command(status_command, additional_env)
+        try:
+            return json.loads(status_result.stdout)["status"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            LOG.warning("Failed to parse the Bitwarden CLI status", stderr=status_result.stderr)
+            return "unknown"
+
+    @staticmethod
+    async def logout(additional_env: dict[str, str] | None = None) -> None:
         """
         Log out of the Bitwarden CLI.
         """
         logout_command = ["bw", "logout"]
-        logout_result = await BitwardenService.run_command(logout_command)
+        logout_result = await BitwardenService.run_command(logout_command, additional_env)
         if logout_result.stderr and "You are not logged in." not in logout_result.stderr:
             raise BitwardenLogoutError(logout_result.stderr)
 
@@ -595,14 +653,15 @@ class BitwardenService:
         bw_collection_ids: list[str] | None,
         collection_id: str,
         item_id: str,
+        organization_id: str | None = None,
     ) -> dict[str, str]:
         """
         Get the credit card data from the Bitwarden CLI.
         """
-        try:
-            await BitwardenService.login(client_id, client_secret)
-            await BitwardenService.sync()
-            session_key = await BitwardenService.unlock(master_password)
+        async with BitwardenService.vault_session(
+            client_id, client_secret, master_password, organization_id
+        ) as session:
+            session_key = session.session_key
 
             # Step 3: Get the item
             get_command = [
@@ -619,7 +678,7 @@ class BitwardenService:
                 LOG.error("No collection ID or organization ID provided -- this is required")
                 raise BitwardenAccessDeniedError()
 
-            item_result = await BitwardenService.run_command(get_command)
+            item_result = await BitwardenService.run_command(get_command, session.env)
 
             # Parse the item and extract credit card data
             try:
@@ -658,9 +717,6 @@ class BitwardenService:
             }
 
             return mapped_credit_card_data
-        finally:
-            # Step 4: Log out
-            await BitwardenService.logout()
 
     @staticmethod
     async def get_credit_card_data(
@@ -673,6 +729,7 @@ class BitwardenService:
         item_id: str,
         remaining_retries: int = settings.BITWARDEN_MAX_RETRIES,
         fail_reasons: list[str] = [],
+        organization_id: str | None = None,
     ) -> dict[str, str]:
         """
         Get the credit card data from the Bitwarden CLI.
@@ -687,6 +744,7 @@ class BitwardenService:
                     bw_collection_ids=bw_collection_ids,
                     collection_id=collection_id,
                     item_id=item_id,
+                    organization_id=organization_id,
                 )
         except BitwardenAccessDeniedError as e:
             raise e
@@ -708,10 +766,18 @@ class BitwardenService:
                 item_id=item_id,
                 remaining_retries=remaining_retries,
                 fail_reasons=fail_reasons + [f"{type(e).__name__}: {str(e)}"],
+                organization_id=organization_id,
             )
 
     @staticmethod
     async def _unlock_using_server(master_password: str) -> None:
+        # the pool module imports this one
+        from skyvern.forge.sdk.services.bitwarden_session_pool import bitwarden_session_pool  # noqa: PLC0415
+
+        if bitwarden_session_pool.enabled:
+            await bitwarden_session_pool.ensure_server_ready(master_password)
+            return
+
         status_response = await aiohttp_get_json(
             f"{BITWARDEN_SERVER_BASE_URL}/status", retry=3, retry_timeout=30, timeout=120
         )
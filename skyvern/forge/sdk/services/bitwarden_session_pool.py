@@ -0,0 +1,205 @@
+"""
+A pool of unlocked Bitwarden sessions, so the secret lookups don't log in, unlock and log out of the vault every time.
+
+For the bw CLI, every organization and account gets up to BITWARDEN_SESSION_POOL_SIZE sessions. Each session has its
+own CLI data directory, so the sessions of different organizations never share a login and the lookups holding
+different sessions run concurrently. A session is unlocked on its first lease and reused until the vault session cache
+expires it. A session which hasn't been checked for BITWARDEN_HEALTH_CHECK_INTERVAL_SECONDS is checked with `bw status`
+before it's leased again, and one which hasn't been synced for BITWARDEN_SYNC_INTERVAL_SECONDS is synced first.
+
+A bw serve instance, like the bitwarden-cli-server container, already keeps its session. The pool checks that it's
+unlocked and syncs it on the same schedules, instead of before every request.
+"""
+
+import asyncio
+import math
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable
+
+import structlog
+
+from skyvern.config import settings
+from skyvern.forge.sdk.core.aiohttp_helper import aiohttp_get_json, aiohttp_post
+from skyvern.forge.sdk.services.bitwarden import BITWARDEN_SERVER_BASE_URL, BitwardenService, BitwardenSession
+from skyvern.forge.sdk.services.vault_session_cache import (
+    VaultSessionCache,
+    get_account_fingerprint,
+    vault_session_cache,
+)
+
+LOG = structlog.get_logger()
+
+BITWARDEN_VAULT = "bitwarden"
+
+
+@dataclass
+class _PooledSession:
+    # identifies the session in the vault session cache
+    session_id: str
+    env: dict[str, str]
+    last_checked_at: float = -math.inf
+    last_synced_at: float = -math.inf
+
+
+@dataclass
+class _ServerState:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_checked_at: float = -math.inf
+    last_synced_at: float = -math.inf
+
+
+class BitwardenSessionPool:
+    def __init__(
+        self,
+        size: int,
+        session_cache: VaultSessionCache,
+        sync_interval_seconds: int,
+        health_check_interval_seconds: int,
+        data_dir: str,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.size = size
+        self.session_cache = session_cache
+        self.sync_interval_seconds = sync_interval_seconds
+        self.health_check_interval_seconds = health_check_interval_seconds
+        self.data_dir = data_dir
+        self.clock = clock
+        self._free_sessions: dict[tuple[str, str], asyncio.LifoQueue[_PooledSession]] = {}
+        self._server = _ServerState()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and self.session_cache.enabled
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        organization_id: str,
+        client_id: str | None,
+        client_secret: str | None,
+        master_password: str,
+    ) -> AsyncIterator[BitwardenSession]:
+        """
+        Wait for a free session of the organization's account and unlock it if needed. A lookup failing with the session
+        drops it, the next lease logs in again.
+        """
+        fingerprint = get_account_fingerprint(client_id, client_secret, master_password, settings.BITWARDEN_EMAIL)
+        free_sessions = self._free_sessions.get((organization_id, fingerprint))
+        if free_sessions is None:
+            free_sessions = self._create_sessions(organization_id, fingerprint)
+            self._free_sessions[(organization_id, fingerprint)] = free_sessions
+
+        pooled_session = await free_sessions.get()
+        try:
+            session_key = await self._get_ready_session_key(
+                organization_id, pooled_session, client_id, client_secret, master_password
+            )
+            try:
+                yield BitwardenSession(session_key=session_key, env=pooled_session.env)
+            except BaseException:
+                self.session_cache.invalidate(organization_id, BITWARDEN_VAULT, pooled_session.session_id)
+                raise
+        finally:
+            free_sessions.put_nowait(pooled_session)
+
+    async def ensure_server_ready(self, master_password: str) -> None:
+        """Unlock and sync the bw serve instance, when it's due."""
+        async with self._server.lock:
+            now = self.clock()
+            if now - self._server.last_checked_at >= self.health_check_interval_seconds:
+                status_response = await aiohttp_get_json(
+                    f"{BITWARDEN_SERVER_BASE_URL}/status", retry=3, retry_timeout=30, timeout=120
+                )
+                if status_response["data"]["template"]["status"] != "unlocked":
+                    LOG.info("Unlocking the Bitwarden server")
+                    await aiohttp_post(
+                        f"{BITWARDEN_SERVER_BASE_URL}/unlock",
+                        data={"password": master_password},
+                        retry_timeout=30,
+                        timeout=120,
+                    )
+                self._server.last_checked_at = now
+            if now - self._server.last_synced_at >= self.sync_interval_seconds:
+                await aiohttp_post(f"{BITWARDEN_SERVER_BASE_URL}/sync", retry_timeout=30, timeout=120)
+                self._server.last_synced_at = now
+
+    async def close(self) -> None:
+        """Log out of every pooled session and remove its data directory, called on shutdown."""
+        for (organization_id, _), free_sessions in list(self._free_sessions.items()):
+            while not free_sessions.empty():
+                pooled_session = free_sessions.get_nowait()
+                self.session_cache.invalidate(organization_id, BITWARDEN_VAULT, pooled_session.session_id)
+                session_data_dir = pooled_session.env["BITWARDENCLI_APPDATA_DIR"]
+                # the slots never leased have never logged in
+                if not os.path.isdir(session_data_dir):
+                    continue
+                try:
+                    await BitwardenService.logout(pooled_session.env)
+                except Exception:
+                    LOG.warning("Failed to log out of a pooled Bitwarden session", exc_info=True)
+                shutil.rmtree(session_data_dir, ignore_errors=True)
+        self._free_sessions.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "accounts": len(self._free_sessions),
+            "free_sessions": sum(free_sessions.qsize() for free_sessions in self._free_sessions.values()),
+        }
+
+    def _create_sessions(self, organization_id: str, fingerprint: str) -> asyncio.LifoQueue[_PooledSession]:
+        # the data directories are named after a hash, the organization id and the account stay out of the file system
+        pool_id = get_account_fingerprint(organization_id, fingerprint)
+        free_sessions: asyncio.LifoQueue[_PooledSession] = asyncio.LifoQueue()
+        # a LIFO queue reuses the most recently unlocked session first, the others only log in under load
+        for slot in reversed(range(self.size)):
+            free_sessions.put_nowait(
+                _PooledSession(
+                    session_id=f"{fingerprint}:{slot}",
+                    env={"BITWARDENCLI_APPDATA_DIR": os.path.join(self.data_dir, pool_id, str(slot))},
+                )
+            )
+        return free_sessions
+
+    async def _get_ready_session_key(
+        self,
+        organization_id: str,
+        pooled_session: _PooledSession,
+        client_id: str | None,
+        client_secret: str | None,
+        master_password: str,
+    ) -> str:
+        now = self.clock()
+        session_key = self.session_cache.get(organization_id, BITWARDEN_VAULT, pooled_session.session_id)
+        if session_key and now - pooled_session.last_checked_at >= self.health_check_interval_seconds:
+            status = await BitwardenService.get_status(session_key, pooled_session.env)
+            if status == "unlocked":
+                pooled_session.last_checked_at = now
+            else:
+                LOG.info("Pooled Bitwarden session isn't unlocked anymore", status=status)
+                session_key = None
+
+        if not session_key:
+            await BitwardenService.login(client_id, client_secret, pooled_session.env)
+            session_key = await BitwardenService.unlock(master_password, pooled_session.env)
+            self.session_cache.set(organization_id, BITWARDEN_VAULT, pooled_session.session_id, session_key)
+            pooled_session.last_checked_at = now
+            pooled_session.last_synced_at = -math.inf
+            LOG.info("Unlocked a pooled Bitwarden session", organization_id=organization_id)
+
+        if now - pooled_session.last_synced_at >= self.sync_interval_seconds:
+            await BitwardenService.sync(pooled_session.env)
+            pooled_session.last_synced_at = now
+        return session_key
+
+
+bitwarden_session_pool = BitwardenSessionPool(
+    size=settings.BITWARDEN_SESSION_POOL_SIZE,
+    session_cache=vault_session_cache,
+    sync_interval_seconds=settings.BITWARDEN_SYNC_INTERVAL_SECONDS,
+    health_check_interval_seconds=settings.BITWARDEN_HEALTH_CHECK_INTERVAL_SECONDS,
+    data_dir=os.path.join(settings.TEMP_PATH, "bitwarden"),
+)
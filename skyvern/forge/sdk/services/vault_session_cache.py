@@ -0,0 +1,90 @@
+"""
+Short-lived cache of the unlocked vault sessions, shared by the workflow runs of an organization.
+
+Unlocking a vault, like logging in and unlocking the Bitwarden CLI, takes seconds while the session it yields stays
+valid much longer. The sessions are cached per organization, vault and account for VAULT_SESSION_CACHE_TTL_SECONDS.
+They're encrypted with a key which only lives in the process memory, so the cached values aren't usable sessions on
+their own.
+"""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import structlog
+from cryptography.fernet import Fernet
+
+from skyvern.config import settings
+
+LOG = structlog.get_logger()
+
+
+def get_account_fingerprint(*credentials: str | None) -> str:
+    """A stable identifier of the vault account the credentials log in to, without keeping the credentials."""
+    return hashlib.sha256("\0".join(credential or "" for credential in credentials).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _VaultSessionEntry:
+    encrypted_session: bytes
+    expires_at: float
+
+
+class VaultSessionCache:
+    def __init__(self, ttl_seconds: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._fernet = Fernet(Fernet.generate_key())
+        self._entries: dict[tuple[str, str, str], _VaultSessionEntry] = {}
+        self._locks: dict[tuple[str, str, str], asyncio.Lock] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, organization_id: str, vault: str, fingerprint: str) -> str | None:
+        key = (organization_id, vault, fingerprint)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        return self._fernet.decrypt(entry.encrypted_session).decode("utf-8")
+
+    def set(self, organization_id: str, vault: str, fingerprint: str, session: str) -> None:
+        if not self.enabled:
+            return
+        self._entries[(organization_id, vault, fingerprint)] = _VaultSessionEntry(
+            encrypted_session=self._fernet.encrypt(session.encode("utf-8")),
+            expires_at=self.clock() + self.ttl_seconds,
+        )
+
+    def invalidate(self, organization_id: str, vault: str, fingerprint: str) -> None:
+        self._entries.pop((organization_id, vault, fingerprint), None)
+
+    async def get_or_create(
+        self,
+        organization_id: str,
+        vault: str,
+        fingerprint: str,
+        create: Callable[[], Awaitable[str]],
+    ) -> str:
+        """
+        The cached session, or the one create() unlocks. Concurrent runs needing the same session wait for a single
+        unlock.
+        """
+        key = (organization_id, vault, fingerprint)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            session = self.get(organization_id, vault, fingerprint)
+            if session is not None:
+                return session
+            session = await create()
+            self.set(organization_id, vault, fingerprint, session)
+            LOG.info("Unlocked a vault session", organization_id=organization_id, vault=vault)
+            return session
+
+
+vault_session_cache = VaultSessionCache(ttl_seconds=settings.VAULT_SESSION_CACHE_TTL_SECONDS)
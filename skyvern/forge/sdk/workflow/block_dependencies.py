@@ -0,0 +1,110 @@
+"""
+The data dependencies between the blocks of a workflow, to run the blocks which don't wait on each other concurrently.
+
+A block depends on an earlier block when it reads the earlier block's output, through:
+- a jinja reference to `<label>_output` or `<label>` in one of its fields
+- a parameter whose key or source key is `<label>_output`
+- a field naming `<label>_output` directly, like a FileParserBlock file_url
+
+The blocks using the browser share the workflow run's browser, so each of them also depends on the browser block before
+it. The browserless blocks reading the downloaded files wait for every browser block before them. The blocks with side
+effects outside the run, like sending an email or an HTTP request, wait for every block before them, since any of them
+can stop the run.
+"""
+
+from collections.abc import Iterator
+from typing import Any
+
+import structlog
+from jinja2 import Environment, TemplateSyntaxError, meta
+
+from skyvern.config import settings
+from skyvern.forge.sdk.workflow.models.block import BlockTypeVar
+from skyvern.schemas.workflows import BlockType
+
+LOG = structlog.get_logger()
+
+BROWSERLESS_BLOCK_TYPES = frozenset(
+    {
+        BlockType.TEXT_PROMPT,
+        BlockType.HTTP_REQUEST,
+        BlockType.FILE_URL_PARSER,
+        BlockType.PDF_PARSER,
+        BlockType.SEND_EMAIL,
+    }
+)
+
+# the blocks acting outside the run, which mustn't run when the run is stopped by an earlier block
+SIDE_EFFECT_BLOCK_TYPES = frozenset(
+    {
+        BlockType.HTTP_REQUEST,
+        BlockType.SEND_EMAIL,
+    }
+)
+
+# the fields identifying the block itself rather than what it reads
+_BLOCK_IDENTITY_FIELDS = {"label", "next_block_label", "block_type", "output_parameter"}
+
+_template_env = Environment()
+
+
+def block_uses_browser(block: BlockTypeVar) -> bool:
+    return block.block_type not in BROWSERLESS_BLOCK_TYPES
+
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def get_referenced_names(block: BlockTypeVar) -> set[str] | None:
+    """
+    The names the block reads from the workflow run context, None when one of its templates can't be parsed and what it
+    reads is unknown.
+    """
+    names: set[str] = set()
+    for value in _iter_strings(block.model_dump(mode="json", exclude=_BLOCK_IDENTITY_FIELDS)):
+        names.add(value)
+        if "{{" not in value and "{%" not in value:
+            continue
+        try:
+            names.update(meta.find_undeclared_variables(_template_env.parse(value)))
+        except TemplateSyntaxError:
+            LOG.warning("Unable to parse a block template to find its dependencies", block_label=block.label)
+            return None
+    return names
+
+
+def build_block_dependencies(blocks: list[BlockTypeVar]) -> dict[str, set[str]]:
+    """
+    The labels of the blocks each block has to wait for, for the blocks listed in their sequential execution order.
+    """
+    dependencies: dict[str, set[str]] = {}
+    browser_block_labels: list[str] = []
+    for idx, block in enumerate(blocks):
+        earlier_blocks = blocks[:idx]
+        referenced_names = get_referenced_names(block)
+        if referenced_names is None or block.block_type in SIDE_EFFECT_BLOCK_TYPES:
+            block_dependencies = {earlier_block.label for earlier_block in earlier_blocks}
+        else:
+            block_dependencies = {
+                earlier_block.label
+                for earlier_block in earlier_blocks
+                if earlier_block.label in referenced_names or earlier_block.output_parameter.key in referenced_names
+            }
+
+        if block_uses_browser(block):
+            if browser_block_labels:
+                block_dependencies.add(browser_block_labels[-1])
+            browser_block_labels.append(block.label)
+        elif referenced_names is not None and settings.WORKFLOW_DOWNLOAD_DIRECTORY_PARAMETER_KEY in referenced_names:
+            block_dependencies.update(browser_block_labels)
+
+        dependencies[block.label] = block_dependencies
+    return dependencies
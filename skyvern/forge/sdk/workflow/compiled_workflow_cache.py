@@ -0,0 +1,173 @@
+"""
+A cache of the compiled workflow definitions, so the runs of the same workflow version don't redo the work which only
+depends on the definition.
+
+A compiled workflow keeps, per (workflow_id, version):
+- the validated WorkflowDefinition, handed out as a deep copy since the blocks format their fields in place while they
+  run
+- the entry block and the next block of each block, from the graph validation
+- the parsed jinja templates of the block fields
+- the loaded modules of the workflow's generated scripts, per script revision
+
+A workflow updated without a new version gets a new modified_at, and the stale compiled workflow is dropped the next
+time it's looked up. update_workflow_definition also drops it right away.
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Callable
+
+import structlog
+from jinja2 import Template, TemplateSyntaxError
+
+from skyvern.config import settings
+
+if TYPE_CHECKING:
+    from skyvern.forge.sdk.workflow.models.workflow import Workflow, WorkflowDefinition
+
+LOG = structlog.get_logger()
+
+
+@dataclass
+class CompiledWorkflow:
+    modified_at: datetime
+    workflow_definition: "WorkflowDefinition"
+    templates: dict[str, Template]
+    start_label: str | None = None
+    default_next_map: dict[str, str | None] | None = None
+    script_modules: dict[str, ModuleType] = field(default_factory=dict)
+
+
+def _iter_templates(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        if "{{" in value or "{%" in value:
+            yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_templates(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_templates(item)
+
+
+class CompiledWorkflowCache:
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._compiled_workflows: OrderedDict[tuple[str, int], CompiledWorkflow] = OrderedDict()
+        # the templates of all the cached workflows, by their source
+        self._templates: dict[str, Template] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get_workflow_definition(
+        self,
+        workflow_id: str,
+        version: int,
+        modified_at: datetime,
+        validate: Callable[[], "WorkflowDefinition"],
+    ) -> "WorkflowDefinition":
+        """A copy of the validated workflow definition, validate() runs only when it isn't cached."""
+        if not self.enabled:
+            return validate()
+        compiled_workflow = self._get(workflow_id, version, modified_at)
+        if compiled_workflow is None:
+            compiled_workflow = self._compile(workflow_id, version, modified_at, validate())
+        return compiled_workflow.workflow_definition.model_copy(deep=True)
+
+    def get_workflow_graph(self, workflow: "Workflow") -> tuple[str, dict[str, str | None]] | None:
+        compiled_workflow = self._get(workflow.workflow_id, workflow.version, workflow.modified_at)
+        if compiled_workflow is None or compiled_workflow.start_label is None:
+            return None
+        return compiled_workflow.start_label, dict(compiled_workflow.default_next_map or {})
+
+    def set_workflow_graph(
+        self,
+        workflow: "Workflow",
+        start_label: str,
+        default_next_map: dict[str, str | None],
+    ) -> None:
+        if compiled_workflow := self._get(workflow.workflow_id, workflow.version, workflow.modified_at):
+            compiled_workflow.start_label = start_label
+            compiled_workflow.default_next_map = dict(default_next_map)
+
+    def get_script_module(self, workflow: "Workflow", script_revision_id: str) -> ModuleType | None:
+        compiled_workflow = self._get(workflow.workflow_id, workflow.version, workflow.modified_at)
+        if compiled_workflow is None:
+            return None
+        return compiled_workflow.script_modules.get(script_revision_id)
+
+    def set_script_module(self, workflow: "Workflow", script_revision_id: str, script_module: ModuleType) -> None:
+        if compiled_workflow := self._get(workflow.workflow_id, workflow.version, workflow.modified_at):
+            compiled_workflow.script_modules[script_revision_id] = script_module
+
+    def get_template(self, source: str) -> Template | None:
+        return self._templates.get(source)
+
+    def invalidate(self, workflow_id: str) -> None:
+        for key in [key for key in self._compiled_workflows if key[0] == workflow_id]:
+            del self._compiled_workflows[key]
+        self._rebuild_templates()
+
+    def clear(self) -> None:
+        self._compiled_workflows.clear()
+        self._templates.clear()
+
+    def _get(self, workflow_id: str, version: int, modified_at: datetime) -> CompiledWorkflow | None:
+        key = (workflow_id, version)
+        compiled_workflow = self._compiled_workflows.get(key)
+        if compiled_workflow is None:
+            return None
+        if compiled_workflow.modified_at != modified_at:
+            del self._compiled_workflows[key]
+            self._rebuild_templates()
+            return None
+        self._compiled_workflows.move_to_end(key)
+        return compiled_workflow
+
+    def _compile(
+        self,
+        workflow_id: str,
+        version: int,
+        modified_at: datetime,
+        workflow_definition: "WorkflowDefinition",
+    ) -> CompiledWorkflow:
+        # the blocks use the templates of the sandboxed environment they're rendered with
+        from skyvern.forge.sdk.workflow.models.block import jinja_sandbox_env  # noqa: PLC0415
+
+        templates: dict[str, Template] = {}
+        for source in _iter_templates(workflow_definition.model_dump(mode="json")["blocks"]):
+            if source in templates:
+                continue
+            try:
+                templates[source] = jinja_sandbox_env.from_string(source)
+            except TemplateSyntaxError:
+                # left to fail when the block renders it, with the block's error handling
+                continue
+
+        compiled_workflow = CompiledWorkflow(
+            modified_at=modified_at,
+            workflow_definition=workflow_definition,
+            templates=templates,
+        )
+        self._compiled_workflows[(workflow_id, version)] = compiled_workflow
+        self._templates.update(templates)
+        if len(self._compiled_workflows) > self.max_size:
+            self._compiled_workflows.popitem(last=False)
+            self._rebuild_templates()
+        LOG.debug("Compiled workflow", workflow_id=workflow_id, version=version, template_count=len(templates))
+        return compiled_workflow
+
+    def _rebuild_templates(self) -> None:
+        self._templates = {
+            source: template
+            for compiled_workflow in self._compiled_workflows.values()
+            for source, template in compiled_workflow.templates.items()
+        }
+
+
+compiled_workflow_cache = CompiledWorkflowCache(max_size=settings.WORKFLOW_COMPILE_CACHE_SIZE)
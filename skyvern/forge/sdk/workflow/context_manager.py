@@ -1,5 +1,9 @@
+import asyncio
 import copy
-from typing import TYPE_CHECKING, Any, Self
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any, Awaitable, Iterator, Self
 
 import structlog
 from jinja2.sandbox import SandboxedEnvironment
@@ -22,6 +26,7 @@ from skyvern.forge.sdk.schemas.credentials import CredentialVaultType, PasswordC
 from skyvern.forge.sdk.schemas.organizations import Organization
 from skyvern.forge.sdk.schemas.tasks import TaskStatus
 from skyvern.forge.sdk.services.bitwarden import BitwardenConstants, BitwardenService
+from skyvern.forge.sdk.services.bitwarden_session_pool import bitwarden_session_pool
 from skyvern.forge.sdk.services.credentials import AzureVaultConstants, OnePasswordConstants, parse_totp_secret
 from skyvern.forge.sdk.workflow.exceptions import OutputParameterKeyCollisionError
 from skyvern.forge.sdk.workflow.models.parameter import (
@@ -50,9 +55,43 @@ LOG = structlog.get_logger()
 
 BlockMetadata = dict[str, str | int | float | bool | dict | list | None]
 
+SecretParameter = (
+    AWSSecretParameter
+    | AzureSecretParameter
+    | BitwardenLoginCredentialParameter
+    | BitwardenCreditCardDataParameter
+    | BitwardenSensitiveInformationParameter
+    | OnePasswordCredentialParameter
+    | AzureVaultCredentialParameter
+    | CredentialParameter
+)
+
 jinja_sandbox_env = SandboxedEnvironment()
 
 
+class SecretBackend(StrEnum):
+    AWS = "aws"
+    AZURE = "azure"
+    CREDENTIAL = "credential"
+    ONEPASSWORD = "onepassword"
+    BITWARDEN = "bitwarden"
+
+    @property
+    def max_concurrency(self) -> int:
+        if self == SecretBackend.BITWARDEN:
+            # the pooled sessions have their own login, otherwise the bw CLI keeps a single login state and the
+            # lookups log in and out one at a time
+            return bitwarden_session_pool.size if bitwarden_session_pool.enabled else 1
+        return settings.SECRET_RESOLUTION_CONCURRENCY
+
+
+# workflow_run_id -> the copy of its context the current asyncio task uses, see WorkflowContextManager.isolated_context
+_isolated_workflow_run_contexts: ContextVar[dict[str, "WorkflowRunContext"] | None] = ContextVar(
+    "isolated_workflow_run_contexts",
+    default=None,
+)
+
+
 class WorkflowRunContext:
     @classmethod
     async def init(
@@ -66,15 +105,7 @@ class WorkflowRunContext:
         workflow_parameter_tuples: list[tuple[WorkflowParameter, "WorkflowRunParameter"]],
         workflow_output_parameters: list[OutputParameter],
         context_parameters: list[ContextParameter],
-        secret_parameters: list[
-            AWSSecretParameter
-            | BitwardenLoginCredentialParameter
-            | BitwardenCreditCardDataParameter
-            | BitwardenSensitiveInformationParameter
-            | OnePasswordCredentialParameter
-            | AzureVaultCredentialParameter
-            | CredentialParameter
-        ],
+        secret_parameters: list[SecretParameter],
         block_outputs: dict[str, Any] | None = None,
     ) -> Self:
         # key is label name
@@ -88,11 +119,10 @@ class WorkflowRunContext:
 
         workflow_run_context.organization_id = organization.organization_id
 
+        credential_id_parameter_tuples: list[tuple[WorkflowParameter, "WorkflowRunParameter"]] = []
         for parameter, run_parameter in workflow_parameter_tuples:
             if parameter.workflow_parameter_type == WorkflowParameterType.CREDENTIAL_ID:
-                await workflow_run_context.register_secret_workflow_parameter_value(
-                    parameter, run_parameter.value, organization
-                )
+                credential_id_parameter_tuples.append((parameter, run_parameter))
                 continue
             if parameter.key in workflow_run_context.parameters:
                 prev_value = workflow_run_context.parameters[parameter.key]
@@ -104,6 +134,18 @@ class WorkflowRunContext:
             workflow_run_context.parameters[parameter.key] = parameter
             workflow_run_context.values[parameter.key] = run_parameter.value
 
+        await workflow_run_context._register_concurrently(
+            [
+                (
+                    SecretBackend.CREDENTIAL,
+                    workflow_run_context.register_secret_workflow_parameter_value(
+                        parameter, run_parameter.value, organization
+                    ),
+                )
+                for parameter, run_parameter in credential_id_parameter_tuples
+            ]
+        )
+
         for output_parameter in workflow_output_parameters:
             if output_parameter.key in workflow_run_context.parameters:
                 raise OutputParameterKeyCollisionError(output_parameter.key)
@@ -113,33 +155,7 @@ class WorkflowRunContext:
             for label, value in block_outputs.items():
                 workflow_run_context.values[f"{label}_output"] = value
 
-        for secret_parameter in secret_parameters:
-            if isinstance(secret_parameter, AWSSecretParameter):
-                await workflow_run_context.register_aws_secret_parameter_value(secret_parameter)
-            elif isinstance(secret_parameter, AzureSecretParameter):
-                await workflow_run_context.register_azure_secret_parameter_value(secret_parameter)
-            elif isinstance(secret_parameter, CredentialParameter):
-                await workflow_run_context.register_credential_parameter_value(secret_parameter, organization)
-            elif isinstance(secret_parameter, OnePasswordCredentialParameter):
-                await workflow_run_context.register_onepassword_credential_parameter_value(
-                    secret_parameter, organization
-                )
-            elif isinstance(secret_parameter, AzureVaultCredentialParameter):
-                await workflow_run_context.register_azure_vault_credential_parameter_value(
-                    secret_parameter, organization
-                )
-            elif isinstance(secret_parameter, BitwardenLoginCredentialParameter):
-                await workflow_run_context.register_bitwarden_login_credential_parameter_value(
-                    secret_parameter, organization
-                )
-            elif isinstance(secret_parameter, BitwardenCreditCardDataParameter):
-                await workflow_run_context.register_bitwarden_credit_card_data_parameter_value(
-                    secret_parameter, organization
-                )
-            elif isinstance(secret_parameter, BitwardenSensitiveInformationParameter):
-                await workflow_run_context.register_bitwarden_sensitive_information_parameter_value(
-                    secret_parameter, organization
-                )
+        await workflow_run_context.register_secret_parameter_values(secret_parameters, organization)
 
         for context_parameter in context_parameters:
             # All context parameters will be registered with the context manager during initialization but the values
@@ -171,10 +187,24 @@ class WorkflowRunContext:
         self.values: dict[str, Any] = {}
         self.secrets: dict[str, Any] = {}
         self._aws_client = aws_client
+        # the AWS secrets fetched in a batch before registering the secret parameters
+        self._prefetched_aws_secrets: dict[str, str] = {}
         self.organization_id: str | None = None
         self.include_secrets_in_templates: bool = False
         self.credential_totp_identifiers: dict[str, str] = {}
 
+    def copy_for_concurrent_execution(self) -> "WorkflowRunContext":
+        """
+        A copy of the context for blocks running concurrently with the other blocks of the run, like the iterations of
+        a ForLoopBlock with a max_concurrency: the values and block metadata they set don't leak into each other. The
+        secrets are shared.
+        """
+        workflow_run_context = copy.copy(self)
+        workflow_run_context.parameters = dict(self.parameters)
+        workflow_run_context.values = copy.deepcopy(self.values)
+        workflow_run_context.blocks_metadata = copy.deepcopy(self.blocks_metadata)
+        return workflow_run_context
+
     def get_parameter(self, key: str) -> Parameter:
         return self.parameters[key]
 
@@ -235,6 +265,111 @@ class WorkflowRunContext:
             return self.secrets.get(secret_id_or_value)
         return None
 
+    async def register_secret_parameter_values(
+        self,
+        secret_parameters: list[SecretParameter],
+        organization: Organization,
+    ) -> None:
+        """
+        Fetch the secrets of the parameters concurrently. The AWS secrets, including the Bitwarden credentials stored
+        there, are fetched in batches first.
+        """
+        aws_secret_keys: list[str] = []
+        for secret_parameter in secret_parameters:
+            if isinstance(secret_parameter, AWSSecretParameter):
+                aws_secret_keys.append(secret_parameter.aws_key)
+            elif isinstance(
+                secret_parameter,
+                BitwardenLoginCredentialParameter
+                | BitwardenCreditCardDataParameter
+                | BitwardenSensitiveInformationParameter,
+            ):
+                if not settings.BITWARDEN_CLIENT_ID:
+                    aws_secret_keys.append(secret_parameter.bitwarden_client_id_aws_secret_key)
+                if not settings.BITWARDEN_CLIENT_SECRET:
+                    aws_secret_keys.append(secret_parameter.bitwarden_client_secret_aws_secret_key)
+                if not settings.BITWARDEN_MASTER_PASSWORD:
+                    aws_secret_keys.append(secret_parameter.bitwarden_master_password_aws_secret_key)
+        if len(aws_secret_keys) > 1:
+            self._prefetched_aws_secrets = await self._aws_client.get_secrets(aws_secret_keys)
+
+        registrations: list[tuple[SecretBackend, Awaitable[None]]] = []
+        for secret_parameter in secret_parameters:
+            if isinstance(secret_parameter, AWSSecretParameter):
+                registrations.append((SecretBackend.AWS, self.register_aws_secret_parameter_value(secret_parameter)))
+            elif isinstance(secret_parameter, AzureSecretParameter):
+                registrations.append(
+                    (SecretBackend.AZURE, self.register_azure_secret_parameter_value(secret_parameter))
+                )
+            elif isinstance(secret_parameter, CredentialParameter):
+                registrations.append(
+                    (SecretBackend.CREDENTIAL, self.register_credential_parameter_value(secret_parameter, organization))
+                )
+            elif isinstance(secret_parameter, OnePasswordCredentialParameter):
+                registrations.append(
+                    (
+                        SecretBackend.ONEPASSWORD,
+                        self.register_onepassword_credential_parameter_value(secret_parameter, organization),
+                    )
+                )
+            elif isinstance(secret_parameter, AzureVaultCredentialParameter):
+                registrations.append(
+                    (
+                        SecretBackend.AZURE,
+                        self.register_azure_vault_credential_parameter_value(secret_parameter, organization),
+                    )
+                )
+            elif isinstance(secret_parameter, BitwardenLoginCredentialParameter):
+                registrations.append(
+                    (
+                        SecretBackend.BITWARDEN,
+                        self.register_bitwarden_login_credential_parameter_value(secret_parameter, organization),
+                    )
+                )
+            elif isinstance(secret_parameter, BitwardenCreditCardDataParameter):
+                registrations.append(
+                    (
+                        SecretBackend.BITWARDEN,
+                        self.register_bitwarden_credit_card_data_parameter_value(secret_parameter, organization),
+                    )
+                )
+            elif isinstance(secret_parameter, BitwardenSensitiveInformationParameter):
+                registrations.append(
+                    (
+                        SecretBackend.BITWARDEN,
+                        self.register_bitwarden_sensitive_information_parameter_value(secret_parameter, organization),
+                    )
+                )
+        try:
+            await self._register_concurrently(registrations)
+        finally:
+            self._prefetched_aws_secrets = {}
+
+    @staticmethod
+    async def _register_concurrently(registrations: list[tuple[SecretBackend, Awaitable[None]]]) -> None:
+        """
+        Run the registrations, at most max_concurrency of them at once per backend. Once they're all done, raise the
+        error of the first failing one in their order.
+        """
+        semaphores = {backend: asyncio.Semaphore(backend.max_concurrency) for backend, _ in registrations}
+
+        async def register(backend: SecretBackend, registration: Awaitable[None]) -> None:
+            async with semaphores[backend]:
+                await registration
+
+        results = await asyncio.gather(
+            *[register(backend, registration) for backend, registration in registrations],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _get_aws_secret(self, secret_name: str) -> str | None:
+        if secret_name in self._prefetched_aws_secrets:
+            return self._prefetched_aws_secrets[secret_name]
+        return await self._aws_client.get_secret(secret_name)
+
     async def get_secrets_from_password_manager(self) -> dict[str, Any]:
         """
         Get the secrets from the password manager. The secrets dict will contain the actual secret values.
@@ -376,7 +511,7 @@ class WorkflowRunContext:
         # If the parameter is an AWS secret, fetch the secret value and store it in the secrets dict
         # The value of the parameter will be the random secret id with format `secret_<uuid>`.
         # We'll replace the random secret id with the actual secret value when we need to use it.
-        secret_value = await self._aws_client.get_secret(parameter.aws_key)
+        secret_value = await self._get_aws_secret(parameter.aws_key)
         if secret_value is not None:
             random_secret_id = self.generate_random_secret_id()
             self.secrets[random_secret_id] = secret_value
@@ -501,13 +636,13 @@ class WorkflowRunContext:
     ) -> None:
         try:
             # Get the Bitwarden login credentials from AWS secrets
-            client_id = settings.BITWARDEN_CLIENT_ID or await self._aws_client.get_secret(
+            client_id = settings.BITWARDEN_CLIENT_ID or await self._get_aws_secret(
                 parameter.bitwarden_client_id_aws_secret_key
             )
-            client_secret = settings.BITWARDEN_CLIENT_SECRET or await self._aws_client.get_secret(
+            client_secret = settings.BITWARDEN_CLIENT_SECRET or await self._get_aws_secret(
                 parameter.bitwarden_client_secret_aws_secret_key
             )
-            master_password = settings.BITWARDEN_MASTER_PASSWORD or await self._aws_client.get_secret(
+            master_password = settings.BITWARDEN_MASTER_PASSWORD or await self._get_aws_secret(
                 parameter.bitwarden_master_password_aws_secret_key
             )
         except Exception as e:
@@ -539,6 +674,7 @@ class WorkflowRunContext:
                 url,
                 collection_id=collection_id,
                 item_id=item_id,
+                organization_id=organization.organization_id,
             )
             if secret_credentials:
                 self.secrets[BitwardenConstants.BW_ORGANIZATION_ID] = organization.bw_organization_id
@@ -631,13 +767,13 @@ class WorkflowRunContext:
     ) -> None:
         try:
             # Get the Bitwarden login credentials from AWS secrets
-            client_id = settings.BITWARDEN_CLIENT_ID or await self._aws_client.get_secret(
+            client_id = settings.BITWARDEN_CLIENT_ID or await self._get_aws_secret(
                 parameter.bitwarden_client_id_aws_secret_key
             )
-            client_secret = settings.BITWARDEN_CLIENT_SECRET or await self._aws_client.get_secret(
+            client_secret = settings.BITWARDEN_CLIENT_SECRET or await self._get_aws_secret(
                 parameter.bitwarden_client_secret_aws_secret_key
             )
-            master_password = settings.BITWARDEN_MASTER_PASSWORD or await self._aws_client.get_secret(
+            master_password = settings.BITWARDEN_MASTER_PASSWORD or await self._get_aws_secret(
                 parameter.bitwarden_master_password_aws_secret_key
             )
         except Exception as e:
@@ -669,6 +805,7 @@ class WorkflowRunContext:
                 collection_id,
                 bitwarden_identity_key,
                 parameter.bitwarden_identity_fields,
+                organization_id=organization.organization_id,
             )
             if sensitive_values:
                 self.secrets[BitwardenConstants.BW_ORGANIZATION_ID] = organization.bw_organization_id
@@ -700,13 +837,13 @@ class WorkflowRunContext:
     ) -> None:
         try:
             # Get the Bitwarden login credentials from AWS secrets
-            client_id = settings.BITWARDEN_CLIENT_ID or await self._aws_client.get_secret(
+            client_id = settings.BITWARDEN_CLIENT_ID or await self._get_aws_secret(
                 parameter.bitwarden_client_id_aws_secret_key
             )
-            client_secret = settings.BITWARDEN_CLIENT_SECRET or await self._aws_client.get_secret(
+            client_secret = settings.BITWARDEN_CLIENT_SECRET or await self._get_aws_secret(
                 parameter.bitwarden_client_secret_aws_secret_key
             )
-            master_password = settings.BITWARDEN_MASTER_PASSWORD or await self._aws_client.get_secret(
+            master_password = settings.BITWARDEN_MASTER_PASSWORD or await self._get_aws_secret(
                 parameter.bitwarden_master_password_aws_secret_key
             )
         except Exception as e:
@@ -739,6 +876,7 @@ class WorkflowRunContext:
                 organization.bw_collection_ids,
                 collection_id,
                 item_id,
+                organization_id=organization.organization_id,
             )
             if not credit_card_data:
                 raise ValueError("Credit card data not found in Bitwarden")
@@ -1041,15 +1179,7 @@ class WorkflowContextManager:
         workflow_parameter_tuples: list[tuple[WorkflowParameter, "WorkflowRunParameter"]],
         workflow_output_parameters: list[OutputParameter],
         context_parameters: list[ContextParameter],
-        secret_parameters: list[
-            AWSSecretParameter
-            | BitwardenLoginCredentialParameter
-            | BitwardenCreditCardDataParameter
-            | BitwardenSensitiveInformationParameter
-            | OnePasswordCredentialParameter
-            | AzureVaultCredentialParameter
-            | CredentialParameter
-        ],
+        secret_parameters: list[SecretParameter],
         block_outputs: dict[str, Any] | None = None,
     ) -> WorkflowRunContext:
         workflow_run_context = await WorkflowRunContext.init(
@@ -1069,23 +1199,39 @@ class WorkflowContextManager:
         return workflow_run_context
 
     def get_workflow_run_context(self, workflow_run_id: str) -> WorkflowRunContext:
+        isolated_workflow_run_contexts = _isolated_workflow_run_contexts.get()
+        if isolated_workflow_run_contexts and workflow_run_id in isolated_workflow_run_contexts:
+            return isolated_workflow_run_contexts[workflow_run_id]
         self._validate_workflow_run_context(workflow_run_id)
         return self.workflow_run_contexts[workflow_run_id]
 
+    @contextmanager
+    def isolated_context(self, workflow_run_id: str) -> Iterator[WorkflowRunContext]:
+        """
+        Use a copy of the workflow run context in the current asyncio task, for blocks running concurrently with the
+        other blocks of the run.
+        """
+        workflow_run_context = self.get_workflow_run_context(workflow_run_id).copy_for_concurrent_execution()
+        token = _isolated_workflow_run_contexts.set(
+            {**(_isolated_workflow_run_contexts.get() or {}), workflow_run_id: workflow_run_context}
+        )
+        try:
+            yield workflow_run_context
+        finally:
+            _isolated_workflow_run_contexts.reset(token)
+
     async def register_block_parameters_for_workflow_run(
         self,
         workflow_run_id: str,
         parameters: list[PARAMETER_TYPE],
         organization: Organization,
     ) -> None:
-        self._validate_workflow_run_context(workflow_run_id)
-        await self.workflow_run_contexts[workflow_run_id].register_block_parameters(
+        await self.get_workflow_run_context(workflow_run_id).register_block_parameters(
             self.aws_client, parameters, organization
         )
 
     def add_context_parameter(self, workflow_run_id: str, context_parameter: ContextParameter) -> None:
-        self._validate_workflow_run_context(workflow_run_id)
-        self.workflow_run_contexts[workflow_run_id].parameters[context_parameter.key] = context_parameter
+        self.get_workflow_run_context(workflow_run_id).parameters[context_parameter.key] = context_parameter
 
     async def set_parameter_values_for_output_parameter_dependent_blocks(
         self,
@@ -1093,8 +1239,7 @@ class WorkflowContextManager:
         output_parameter: OutputParameter,
         value: dict[str, Any] | list | str | None,
     ) -> None:
-        self._validate_workflow_run_context(workflow_run_id)
-        await self.workflow_run_contexts[workflow_run_id].set_parameter_values_for_output_parameter_dependent_blocks(
+        await self.get_workflow_run_context(workflow_run_id).set_parameter_values_for_output_parameter_dependent_blocks(
             output_parameter,
             value,
         )
@@ -23,7 +23,7 @@ import pandas as pd
 import pyotp
 import structlog
 from email_validator import EmailNotValidError, validate_email
-from jinja2 import StrictUndefined
+from jinja2 import StrictUndefined, Template
 from jinja2.sandbox import SandboxedEnvironment
 from playwright.async_api import Page
 from pydantic import BaseModel, Field, model_validator
@@ -69,6 +69,7 @@ from skyvern.forge.sdk.schemas.tasks import Task, TaskOutput, TaskStatus
 from skyvern.forge.sdk.services.bitwarden import BitwardenConstants
 from skyvern.forge.sdk.services.credentials import AzureVaultConstants, OnePasswordConstants
 from skyvern.forge.sdk.trace import TraceManager
+from skyvern.forge.sdk.workflow.compiled_workflow_cache import compiled_workflow_cache
 from skyvern.forge.sdk.workflow.context_manager import BlockMetadata, WorkflowRunContext
 from skyvern.forge.sdk.workflow.exceptions import (
     CustomizedCodeException,
@@ -93,6 +94,7 @@ from skyvern.schemas.workflows import BlockResult, BlockStatus, BlockType, FileS
 from skyvern.utils.strings import generate_random_string
 from skyvern.utils.templating import get_missing_variables
 from skyvern.utils.url_validators import prepend_scheme_and_validate_url
+from skyvern.webeye.browser_pool import BrowserPool
 from skyvern.webeye.browser_state import BrowserState
 from skyvern.webeye.utils.page import SkyvernFrame
 
@@ -104,6 +106,11 @@ else:
     jinja_sandbox_env = SandboxedEnvironment()
 
 
+def get_jinja_template(source: str) -> Template:
+    """The template parsed when its workflow was compiled, or parsed now."""
+    return compiled_workflow_cache.get_template(source) or jinja_sandbox_env.from_string(source)
+
+
 # Mapping from TaskV2Status to the corresponding BlockStatus. Declared once at
 # import time so it is not recreated on each block execution.
 TASKV2_TO_BLOCK_STATUS: dict[TaskV2Status, BlockStatus] = {
@@ -233,7 +240,7 @@ class Block(BaseModel, abc.ABC):
         # Security: only allow real secret values for non-LLM blocks (HttpRequestBlock, CodeBlock)
         is_safe_block_for_secrets = self.block_type in [BlockType.CODE, BlockType.HTTP_REQUEST]
 
-        template = jinja_sandbox_env.from_string(potential_template)
+        template = get_jinja_template(potential_template)
 
         block_reference_data: dict[str, Any] = workflow_run_context.get_block_metadata(self.label)
         template_data = workflow_run_context.values.copy()
@@ -1025,6 +1032,16 @@ class LoopBlockExecutedResult(BaseModel):
         return self.block_outputs[-1].failure_reason if len(self.block_outputs) > 0 else "No block has been executed"
 
 
+class LoopIterationResult(BaseModel):
+    loop_output_values: list[dict[str, Any]]
+    block_outputs: list[BlockResult]
+    last_block: BlockTypeVar | None
+    # no iteration runs after this one
+    stop_loop: bool = False
+    # the context the iteration ran in, when it ran concurrently with the other iterations
+    workflow_run_context: Any = None
+
+
 class ForLoopBlock(Block):
     # There is a mypy bug with Literal. Without the type: ignore, mypy will raise an error:
     # Parameter 1 of Literal[...] cannot be of type "Any"
@@ -1034,6 +1051,8 @@ class ForLoopBlock(Block):
     loop_over: PARAMETER_TYPE | None = None
     loop_variable_reference: str | None = None
     complete_if_empty: bool = False
+    # how many iterations run at the same time, each in its own browser. None or 1 runs them one after the other
+    max_concurrency: int | None = None
 
     def get_all_parameters(
         self,
@@ -1342,6 +1361,22 @@ class ForLoopBlock(Block):
         organization_id: str | None = None,
         browser_session_id: str | None = None,
     ) -> LoopBlockExecutedResult:
+        if self.max_concurrency and self.max_concurrency > 1 and len(loop_over_values) > 1:
+            if browser_session_id:
+                LOG.info(
+                    "ForLoopBlock: the iterations share the browser session, running them sequentially",
+                    workflow_run_id=workflow_run_id,
+                    browser_session_id=browser_session_id,
+                    max_concurrency=self.max_concurrency,
+                )
+            else:
+                return await self.execute_loop_concurrently(
+                    workflow_run_id=workflow_run_id,
+                    workflow_run_block_id=workflow_run_block_id,
+                    loop_over_values=loop_over_values,
+                    organization_id=organization_id,
+                )
+
         outputs_with_loop_values: list[list[dict[str, Any]]] = []
         block_outputs: list[BlockResult] = []
         current_block: BlockTypeVar | None = None
@@ -1349,186 +1384,364 @@ class ForLoopBlock(Block):
         for loop_idx, loop_over_value in enumerate(loop_over_values):
             # Check max_iterations limit
             if loop_idx >= DEFAULT_MAX_LOOP_ITERATIONS:
-                LOG.info(
-                    f"ForLoopBlock: Reached max_iterations limit ({DEFAULT_MAX_LOOP_ITERATIONS}), stopping loop",
-                    workflow_run_id=workflow_run_id,
-                    loop_idx=loop_idx,
-                    max_iterations=DEFAULT_MAX_LOOP_ITERATIONS,
+                max_loop_iterations_result = await self._build_max_loop_iterations_result(
+                    workflow_run_id, workflow_run_block_id, organization_id
                 )
-                failure_block_result = await self.build_block_result(
-                    success=False,
-                    status=BlockStatus.failed,
-                    failure_reason=f"Reached max_loop_iterations limit of {DEFAULT_MAX_LOOP_ITERATIONS}",
-                    workflow_run_block_id=workflow_run_block_id,
-                    organization_id=organization_id,
-                )
-                block_outputs.append(failure_block_result)
+                block_outputs.append(max_loop_iterations_result)
                 return LoopBlockExecutedResult(
                     outputs_with_loop_values=outputs_with_loop_values,
                     block_outputs=block_outputs,
                     last_block=current_block,
                 )
-            LOG.info("Starting loop iteration", loop_idx=loop_idx, loop_over_value=loop_over_value)
-            # context parameter has been deprecated. However, it's still used by task v2 - we should migrate away from it.
-            context_parameters_with_value = self.get_loop_block_context_parameters(workflow_run_id, loop_over_value)
-            for context_parameter in context_parameters_with_value:
-                workflow_run_context.set_value(context_parameter.key, context_parameter.value)
 
-            each_loop_output_values: list[dict[str, Any]] = []
-
-            # Track steps for current iteration
-            iteration_step_count = 0
-            LOG.info(
-                f"ForLoopBlock: Starting iteration {loop_idx} with max_steps_per_iteration={DEFAULT_MAX_STEPS_PER_ITERATION}",
-                workflow_run_id=workflow_run_id,
+            iteration_result = await self.execute_loop_iteration(
                 loop_idx=loop_idx,
-                max_steps_per_iteration=DEFAULT_MAX_STEPS_PER_ITERATION,
+                loop_over_value=loop_over_value,
+                workflow_run_id=workflow_run_id,
+                workflow_run_block_id=workflow_run_block_id,
+                workflow_run_context=workflow_run_context,
+                organization_id=organization_id,
+                browser_session_id=browser_session_id,
             )
+            outputs_with_loop_values.append(iteration_result.loop_output_values)
+            block_outputs.extend(iteration_result.block_outputs)
+            current_block = iteration_result.last_block or current_block
+            if iteration_result.stop_loop:
+                break
 
-            for block_idx, loop_block in enumerate(self.loop_blocks):
-                metadata: BlockMetadata = {
-                    "current_index": loop_idx,
-                    "current_value": loop_over_value,
-                    "current_item": loop_over_value,
-                }
-                workflow_run_context.update_block_metadata(self.label, metadata)
-                workflow_run_context.update_block_metadata(loop_block.label, metadata)
-
-                original_loop_block = loop_block
-                loop_block = loop_block.copy()
-                current_block = loop_block
-
-                block_output = await loop_block.execute_safe(
-                    workflow_run_id=workflow_run_id,
-                    parent_workflow_run_block_id=workflow_run_block_id,
-                    organization_id=organization_id,
-                    browser_session_id=browser_session_id,
-                )
-
-                output_value = (
-                    workflow_run_context.get_value(block_output.output_parameter.key)
-                    if workflow_run_context.has_value(block_output.output_parameter.key)
-                    else None
-                )
+        return LoopBlockExecutedResult(
+            outputs_with_loop_values=outputs_with_loop_values,
+            block_outputs=block_outputs,
+            last_block=current_block,
+        )
 
-                # Log the output value for debugging
-                if block_output.output_parameter.key.endswith("_output"):
-                    LOG.debug("Block output", block_type=loop_block.block_type, output_value=output_value)
-
-                # Log URL information for goto_url blocks
-                if loop_block.block_type == BlockType.GOTO_URL:
-                    LOG.info("Goto URL block executed", url=loop_block.url, loop_idx=loop_idx)
-                each_loop_output_values.append(
-                    {
-                        "loop_value": loop_over_value,
-                        "output_parameter": block_output.output_parameter,
-                        "output_value": output_value,
-                    }
-                )
+    async def execute_loop_concurrently(
+        self,
+        workflow_run_id: str,
+        workflow_run_block_id: str,
+        loop_over_values: list[Any],
+        organization_id: str | None = None,
+    ) -> LoopBlockExecutedResult:
+        """
+        Run up to max_concurrency iterations at the same time. Each iteration runs in its own copy of the workflow run
+        context and in its own browser from a pool, starting on the page the loop started on with the cookies and local
+        storage of the loop's browser. The outputs are merged back in the order of the loop values. When an iteration
+        stops the loop, the iterations after it are cancelled or never started, and only the iterations up to it are
+        part of the result, like when the iterations run one after the other.
+        """
+        max_concurrency = min(self.max_concurrency or 1, settings.FOR_LOOP_MAX_CONCURRENCY)
+        workflow_run = await app.WORKFLOW_SERVICE.get_workflow_run(
+            workflow_run_id=workflow_run_id,
+            organization_id=organization_id,
+        )
+        start_url: str | None = None
+        storage_state: dict[str, Any] | None = None
+        browser_state = app.BROWSER_MANAGER.get_for_workflow_run(workflow_run_id)
+        if browser_state:
+            working_page = await browser_state.get_working_page()
+            if working_page and working_page.url != "about:blank":
+                start_url = working_page.url
+            if browser_state.browser_context:
                 try:
-                    if block_output.workflow_run_block_id:
-                        await app.DATABASE.update_workflow_run_block(
-                            workflow_run_block_id=block_output.workflow_run_block_id,
-                            organization_id=organization_id,
-                            current_value=str(loop_over_value),
-                            current_index=loop_idx,
-                        )
+                    storage_state = dict(await browser_state.browser_context.storage_state())
                 except Exception:
                     LOG.warning(
-                        "Failed to update workflow run block",
-                        workflow_run_block_id=block_output.workflow_run_block_id,
-                        loop_over_value=loop_over_value,
-                        loop_idx=loop_idx,
+                        "ForLoopBlock: failed to get the storage state, the pool browsers start without it",
+                        workflow_run_id=workflow_run_id,
+                        exc_info=True,
                     )
-                loop_block = original_loop_block
-                block_outputs.append(block_output)
 
-                # Check max_steps_per_iteration limit after each block execution
-                iteration_step_count += 1  # Count each block execution as a step
-                if iteration_step_count >= DEFAULT_MAX_STEPS_PER_ITERATION:
-                    LOG.info(
-                        f"ForLoopBlock: Reached max_steps_per_iteration limit ({DEFAULT_MAX_STEPS_PER_ITERATION}) in iteration {loop_idx}, stopping iteration",
-                        workflow_run_id=workflow_run_id,
+        loop_values = loop_over_values[:DEFAULT_MAX_LOOP_ITERATIONS]
+        browser_pool = BrowserPool(
+            workflow_run,
+            name=self.label,
+            size=min(max_concurrency, len(loop_values)),
+            start_url=start_url,
+            storage_state=storage_state,
+        )
+        iteration_results: dict[int, LoopIterationResult] = {}
+        iteration_tasks: list[asyncio.Task[None]] = []
+        # the index of the first iteration which stopped the loop
+        stop_idx: int | None = None
+        main_workflow_run_context = self.get_workflow_run_context(workflow_run_id)
+        context = skyvern_context.current()
+
+        async def run_iteration(loop_idx: int, loop_over_value: Any) -> None:
+            nonlocal stop_idx
+            async with browser_pool.slot():
+                if stop_idx is not None and loop_idx > stop_idx:
+                    return
+                await browser_pool.get_or_create_browser()
+                if context:
+                    skyvern_context.set(skyvern_context.fork(context))
+                with app.WORKFLOW_CONTEXT_MANAGER.isolated_context(workflow_run_id) as workflow_run_context:
+                    iteration_result = await self.execute_loop_iteration(
                         loop_idx=loop_idx,
-                        max_steps_per_iteration=DEFAULT_MAX_STEPS_PER_ITERATION,
-                        iteration_step_count=iteration_step_count,
-                    )
-                    # Create a failure block result for this iteration
-                    failure_block_result = await self.build_block_result(
-                        success=False,
-                        status=BlockStatus.failed,
-                        failure_reason=f"Reached max_steps_per_iteration limit of {DEFAULT_MAX_STEPS_PER_ITERATION}",
+                        loop_over_value=loop_over_value,
+                        workflow_run_id=workflow_run_id,
                         workflow_run_block_id=workflow_run_block_id,
+                        workflow_run_context=workflow_run_context,
                         organization_id=organization_id,
                     )
-                    block_outputs.append(failure_block_result)
-                    # If next_loop_on_failure is False, stop the entire loop
-                    if not self.next_loop_on_failure:
-                        outputs_with_loop_values.append(each_loop_output_values)
-                        return LoopBlockExecutedResult(
-                            outputs_with_loop_values=outputs_with_loop_values,
-                            block_outputs=block_outputs,
-                            last_block=current_block,
-                        )
-                    # If next_loop_on_failure is True, break out of the block loop for this iteration
-                    break
+                iteration_result.workflow_run_context = workflow_run_context
+                iteration_results[loop_idx] = iteration_result
+                if iteration_result.stop_loop and (stop_idx is None or loop_idx < stop_idx):
+                    stop_idx = loop_idx
+                    # the iterations after the stopping one would be dropped from the result, don't let them go on
+                    for task in iteration_tasks[loop_idx + 1 :]:
+                        task.cancel()
 
-                if block_output.status == BlockStatus.canceled:
-                    LOG.info(
-                        f"ForLoopBlock: Block with type {loop_block.block_type} at index {block_idx} during loop {loop_idx} was canceled for workflow run {workflow_run_id}, canceling for loop",
-                        block_type=loop_block.block_type,
-                        workflow_run_id=workflow_run_id,
-                        block_idx=block_idx,
-                        block_result=block_outputs,
-                    )
-                    outputs_with_loop_values.append(each_loop_output_values)
-                    return LoopBlockExecutedResult(
-                        outputs_with_loop_values=outputs_with_loop_values,
-                        block_outputs=block_outputs,
-                        last_block=current_block,
-                    )
+        LOG.info(
+            "ForLoopBlock: running the iterations concurrently",
+            workflow_run_id=workflow_run_id,
+            num_loop_over_values=len(loop_values),
+            max_concurrency=max_concurrency,
+        )
+        iteration_tasks.extend(
+            asyncio.create_task(run_iteration(loop_idx, loop_over_value))
+            for loop_idx, loop_over_value in enumerate(loop_values)
+        )
+        try:
+            results = await asyncio.gather(*iteration_tasks, return_exceptions=True)
+        finally:
+            await browser_pool.close()
+        for loop_idx, result in enumerate(results):
+            if isinstance(result, asyncio.CancelledError) and stop_idx is not None and loop_idx > stop_idx:
+                LOG.info(
+                    "ForLoopBlock: cancelled an iteration which was running after the loop was stopped",
+                    workflow_run_id=workflow_run_id,
+                    loop_idx=loop_idx,
+                    stop_idx=stop_idx,
+                )
+                continue
+            if isinstance(result, BaseException):
+                raise result
 
-                if (
-                    not block_output.success
-                    and not loop_block.continue_on_failure
-                    and not loop_block.next_loop_on_failure
-                    and not self.next_loop_on_failure
-                ):
-                    LOG.info(
-                        f"ForLoopBlock: Encountered a failure processing block {block_idx} during loop {loop_idx}, terminating early",
-                        block_outputs=block_outputs,
-                        loop_idx=loop_idx,
-                        block_idx=block_idx,
-                        loop_over_value=loop_over_value,
-                        loop_block_continue_on_failure=loop_block.continue_on_failure,
-                        failure_reason=block_output.failure_reason,
-                        next_loop_on_failure=loop_block.next_loop_on_failure or self.next_loop_on_failure,
+        outputs_with_loop_values: list[list[dict[str, Any]]] = []
+        block_outputs: list[BlockResult] = []
+        current_block: BlockTypeVar | None = None
+        last_workflow_run_context: WorkflowRunContext | None = None
+        for loop_idx in sorted(iteration_results):
+            if stop_idx is not None and loop_idx > stop_idx:
+                LOG.info(
+                    "ForLoopBlock: dropping an iteration which ran concurrently after the loop was stopped",
+                    workflow_run_id=workflow_run_id,
+                    loop_idx=loop_idx,
+                    stop_idx=stop_idx,
+                )
+                continue
+            iteration_result = iteration_results[loop_idx]
+            outputs_with_loop_values.append(iteration_result.loop_output_values)
+            block_outputs.extend(iteration_result.block_outputs)
+            current_block = iteration_result.last_block or current_block
+            last_workflow_run_context = iteration_result.workflow_run_context
+
+        # like after running the iterations one after the other, the run continues with the values of the last one
+        if last_workflow_run_context:
+            main_workflow_run_context.values.update(last_workflow_run_context.values)
+            main_workflow_run_context.blocks_metadata.update(last_workflow_run_context.blocks_metadata)
+
+        if stop_idx is None and len(loop_over_values) > DEFAULT_MAX_LOOP_ITERATIONS:
+            block_outputs.append(
+                await self._build_max_loop_iterations_result(workflow_run_id, workflow_run_block_id, organization_id)
+            )
+
+        return LoopBlockExecutedResult(
+            outputs_with_loop_values=outputs_with_loop_values,
+            block_outputs=block_outputs,
+            last_block=current_block,
+        )
+
+    async def _build_max_loop_iterations_result(
+        self,
+        workflow_run_id: str,
+        workflow_run_block_id: str,
+        organization_id: str | None,
+    ) -> BlockResult:
+        LOG.info(
+            f"ForLoopBlock: Reached max_iterations limit ({DEFAULT_MAX_LOOP_ITERATIONS}), stopping loop",
+            workflow_run_id=workflow_run_id,
+            max_iterations=DEFAULT_MAX_LOOP_ITERATIONS,
+        )
+        return await self.build_block_result(
+            success=False,
+            status=BlockStatus.failed,
+            failure_reason=f"Reached max_loop_iterations limit of {DEFAULT_MAX_LOOP_ITERATIONS}",
+            workflow_run_block_id=workflow_run_block_id,
+            organization_id=organization_id,
+        )
+
+    async def execute_loop_iteration(
+        self,
+        loop_idx: int,
+        loop_over_value: Any,
+        workflow_run_id: str,
+        workflow_run_block_id: str,
+        workflow_run_context: WorkflowRunContext,
+        organization_id: str | None = None,
+        browser_session_id: str | None = None,
+    ) -> LoopIterationResult:
+        block_outputs: list[BlockResult] = []
+        current_block: BlockTypeVar | None = None
+        LOG.info("Starting loop iteration", loop_idx=loop_idx, loop_over_value=loop_over_value)
+        # context parameter has been deprecated. However, it's still used by task v2 - we should migrate away from it.
+        context_parameters_with_value = self.get_loop_block_context_parameters(workflow_run_id, loop_over_value)
+        for context_parameter in context_parameters_with_value:
+            workflow_run_context.set_value(context_parameter.key, context_parameter.value)
+
+        each_loop_output_values: list[dict[str, Any]] = []
+
+        # Track steps for current iteration
+        iteration_step_count = 0
+        LOG.info(
+            f"ForLoopBlock: Starting iteration {loop_idx} with max_steps_per_iteration={DEFAULT_MAX_STEPS_PER_ITERATION}",
+            workflow_run_id=workflow_run_id,
+            loop_idx=loop_idx,
+            max_steps_per_iteration=DEFAULT_MAX_STEPS_PER_ITERATION,
+        )
+
+        for block_idx, loop_block in enumerate(self.loop_blocks):
+            metadata: BlockMetadata = {
+                "current_index": loop_idx,
+                "current_value": loop_over_value,
+                "current_item": loop_over_value,
+            }
+            workflow_run_context.update_block_metadata(self.label, metadata)
+            workflow_run_context.update_block_metadata(loop_block.label, metadata)
+
+            original_loop_block = loop_block
+            loop_block = loop_block.copy()
+            current_block = loop_block
+
+            block_output = await loop_block.execute_safe(
+                workflow_run_id=workflow_run_id,
+                parent_workflow_run_block_id=workflow_run_block_id,
+                organization_id=organization_id,
+                browser_session_id=browser_session_id,
+            )
+
+            output_value = (
+                workflow_run_context.get_value(block_output.output_parameter.key)
+                if workflow_run_context.has_value(block_output.output_parameter.key)
+                else None
+            )
+
+            # Log the output value for debugging
+            if block_output.output_parameter.key.endswith("_output"):
+                LOG.debug("Block output", block_type=loop_block.block_type, output_value=output_value)
+
+            # Log URL information for goto_url blocks
+            if loop_block.block_type == BlockType.GOTO_URL:
+                LOG.info("Goto URL block executed", url=loop_block.url, loop_idx=loop_idx)
+            each_loop_output_values.append(
+                {
+                    "loop_value": loop_over_value,
+                    "output_parameter": block_output.output_parameter,
+                    "output_value": output_value,
+                }
+            )
+            try:
+                if block_output.workflow_run_block_id:
+                    await app.DATABASE.update_workflow_run_block(
+                        workflow_run_block_id=block_output.workflow_run_block_id,
+                        organization_id=organization_id,
+                        current_value=str(loop_over_value),
+                        current_index=loop_idx,
                     )
-                    outputs_with_loop_values.append(each_loop_output_values)
-                    return LoopBlockExecutedResult(
-                        outputs_with_loop_values=outputs_with_loop_values,
+            except Exception:
+                LOG.warning(
+                    "Failed to update workflow run block",
+                    workflow_run_block_id=block_output.workflow_run_block_id,
+                    loop_over_value=loop_over_value,
+                    loop_idx=loop_idx,
+                )
+            loop_block = original_loop_block
+            block_outputs.append(block_output)
+
+            # Check max_steps_per_iteration limit after each block execution
+            iteration_step_count += 1  # Count each block execution as a step
+            if iteration_step_count >= DEFAULT_MAX_STEPS_PER_ITERATION:
+                LOG.info(
+                    f"ForLoopBlock: Reached max_steps_per_iteration limit ({DEFAULT_MAX_STEPS_PER_ITERATION}) in iteration {loop_idx}, stopping iteration",
+                    workflow_run_id=workflow_run_id,
+                    loop_idx=loop_idx,
+                    max_steps_per_iteration=DEFAULT_MAX_STEPS_PER_ITERATION,
+                    iteration_step_count=iteration_step_count,
+                )
+                # Create a failure block result for this iteration
+                failure_block_result = await self.build_block_result(
+                    success=False,
+                    status=BlockStatus.failed,
+                    failure_reason=f"Reached max_steps_per_iteration limit of {DEFAULT_MAX_STEPS_PER_ITERATION}",
+                    workflow_run_block_id=workflow_run_block_id,
+                    organization_id=organization_id,
+                )
+                block_outputs.append(failure_block_result)
+                # If next_loop_on_failure is False, stop the entire loop
+                if not self.next_loop_on_failure:
+                    return LoopIterationResult(
+                        loop_output_values=each_loop_output_values,
                         block_outputs=block_outputs,
                         last_block=current_block,
+                        stop_loop=True,
                     )
+                # If next_loop_on_failure is True, break out of the block loop for this iteration
+                break
 
-                if block_output.success or loop_block.continue_on_failure:
-                    continue
+            if block_output.status == BlockStatus.canceled:
+                LOG.info(
+                    f"ForLoopBlock: Block with type {loop_block.block_type} at index {block_idx} during loop {loop_idx} was canceled for workflow run {workflow_run_id}, canceling for loop",
+                    block_type=loop_block.block_type,
+                    workflow_run_id=workflow_run_id,
+                    block_idx=block_idx,
+                    block_result=block_outputs,
+                )
+                return LoopIterationResult(
+                    loop_output_values=each_loop_output_values,
+                    block_outputs=block_outputs,
+                    last_block=current_block,
+                    stop_loop=True,
+                )
 
-                if loop_block.next_loop_on_failure or self.next_loop_on_failure:
-                    LOG.info(
-                        f"ForLoopBlock: Block {block_idx} during loop {loop_idx} failed but will continue to next iteration",
-                        block_outputs=block_outputs,
-                        loop_idx=loop_idx,
-                        block_idx=block_idx,
-                        loop_over_value=loop_over_value,
-                        loop_block_next_loop_on_failure=loop_block.next_loop_on_failure or self.next_loop_on_failure,
-                    )
-                    break
+            if (
+                not block_output.success
+                and not loop_block.continue_on_failure
+                and not loop_block.next_loop_on_failure
+                and not self.next_loop_on_failure
+            ):
+                LOG.info(
+                    f"ForLoopBlock: Encountered a failure processing block {block_idx} during loop {loop_idx}, terminating early",
+                    block_outputs=block_outputs,
+                    loop_idx=loop_idx,
+                    block_idx=block_idx,
+                    loop_over_value=loop_over_value,
+                    loop_block_continue_on_failure=loop_block.continue_on_failure,
+                    failure_reason=block_output.failure_reason,
+                    next_loop_on_failure=loop_block.next_loop_on_failure or self.next_loop_on_failure,
+                )
+                return LoopIterationResult(
+                    loop_output_values=each_loop_output_values,
+                    block_outputs=block_outputs,
+                    last_block=current_block,
+                    stop_loop=True,
+                )
 
-            outputs_with_loop_values.append(each_loop_output_values)
+            if block_output.success or loop_block.continue_on_failure:
+                continue
 
-        return LoopBlockExecutedResult(
-            outputs_with_loop_values=outputs_with_loop_values,
+            if loop_block.next_loop_on_failure or self.next_loop_on_failure:
+                LOG.info(
+                    f"ForLoopBlock: Block {block_idx} during loop {loop_idx} failed but will continue to next iteration",
+                    block_outputs=block_outputs,
+                    loop_idx=loop_idx,
+                    block_idx=block_idx,
+                    loop_over_value=loop_over_value,
+                    loop_block_next_loop_on_failure=loop_block.next_loop_on_failure or self.next_loop_on_failure,
+                )
+                break
+
+        return LoopIterationResult(
+            loop_output_values=each_loop_output_values,
             block_outputs=block_outputs,
             last_block=current_block,
         )
@@ -4096,7 +4309,7 @@ class JinjaBranchCriteria(BranchCriteria):
         template_data = context.build_template_data()
 
         try:
-            template = jinja_sandbox_env.from_string(self.expression)
+            template = get_jinja_template(self.expression)
         except Exception as exc:
             raise FailedToFormatJinjaStyleParameter(
                 template=self.expression,
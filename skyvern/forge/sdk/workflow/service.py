@@ -8,6 +8,7 @@ from collections import deque
 from collections.abc import Sequence
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
+from types import ModuleType
 from typing import Any, Literal, cast
 
 import httpx
@@ -49,6 +50,8 @@ from skyvern.forge.sdk.schemas.persistent_browser_sessions import PersistentBrow
 from skyvern.forge.sdk.schemas.tasks import Task
 from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunBlock, WorkflowRunTimeline, WorkflowRunTimelineType
 from skyvern.forge.sdk.trace import TraceManager
+from skyvern.forge.sdk.workflow.block_dependencies import block_uses_browser, build_block_dependencies
+from skyvern.forge.sdk.workflow.compiled_workflow_cache import compiled_workflow_cache
 from skyvern.forge.sdk.workflow.exceptions import (
     ContextParameterSourceNotDefined,
     InvalidWaitBlockTime,
@@ -752,6 +755,30 @@ class WorkflowService:
 
         return workflow_run
 
+    async def _load_script_module(self, script: Script, script_id: str, organization_id: str) -> ModuleType | None:
+        # load the script files
+        script_files = await app.DATABASE.get_script_files(
+            script_revision_id=script.script_revision_id,
+            organization_id=organization_id,
+        )
+        await script_service.load_scripts(script, script_files)
+
+        script_path = os.path.join(settings.TEMP_PATH, script_id, "main.py")
+        if not os.path.exists(script_path):
+            LOG.warning(
+                "Script file not found at path",
+                script_path=script_path,
+                script_id=script_id,
+            )
+            return None
+
+        spec = importlib.util.spec_from_file_location("user_script", script_path)
+        if not spec or not spec.loader:
+            return None
+        script_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(script_module)
+        return script_module
+
     async def _execute_workflow_blocks(
         self,
         workflow: Workflow,
@@ -799,15 +826,20 @@ class WorkflowService:
                             script_blocks_by_label[script_block.script_block_label] = script_block
 
                     if is_script_run:
-                        # load the script files
-                        script_files = await app.DATABASE.get_script_files(
-                            script_revision_id=script.script_revision_id,
-                            organization_id=organization_id,
+                        # the script revisions don't change, their modules are loaded once per compiled workflow
+                        loaded_script_module = compiled_workflow_cache.get_script_module(
+                            workflow, script.script_revision_id
                         )
-                        await script_service.load_scripts(script, script_files)
+                        if loaded_script_module is None:
+                            loaded_script_module = await self._load_script_module(
+                                script, workflow_script.script_id, organization_id
+                            )
+                            if loaded_script_module:
+                                compiled_workflow_cache.set_script_module(
+                                    workflow, script.script_revision_id, loaded_script_module
+                                )
 
-                        script_path = os.path.join(settings.TEMP_PATH, workflow_script.script_id, "main.py")
-                        if os.path.exists(script_path):
+                        if loaded_script_module:
                             # setup script run
                             parameter_tuples = await app.DATABASE.get_workflow_run_parameters(
                                 workflow_run_id=workflow_run.workflow_run_id
@@ -815,25 +847,14 @@ class WorkflowService:
                             script_parameters = {
                                 wf_param.key: run_param.value for wf_param, run_param in parameter_tuples
                             }
-
-                            spec = importlib.util.spec_from_file_location("user_script", script_path)
-                            if spec and spec.loader:
-                                loaded_script_module = importlib.util.module_from_spec(spec)
-                                spec.loader.exec_module(loaded_script_module)
-                                await skyvern.setup(
-                                    script_parameters,
-                                    generated_parameter_cls=loaded_script_module.GeneratedWorkflowParameters,
-                                )
-                                LOG.info(
-                                    "Successfully loaded script module",
-                                    script_id=workflow_script.script_id,
-                                    block_count=len(script_blocks_by_label),
-                                )
-                        else:
-                            LOG.warning(
-                                "Script file not found at path",
-                                script_path=script_path,
+                            await skyvern.setup(
+                                script_parameters,
+                                generated_parameter_cls=loaded_script_module.GeneratedWorkflowParameters,
+                            )
+                            LOG.info(
+                                "Successfully loaded script module",
                                 script_id=workflow_script.script_id,
+                                block_count=len(script_blocks_by_label),
                             )
             except Exception as e:
                 LOG.warning(
@@ -928,9 +949,7 @@ class WorkflowService:
         blocks_to_update: set[str],
     ) -> tuple[WorkflowRun, set[str]]:
         try:
-            start_label, label_to_block, default_next_map = self._build_workflow_graph(
-                workflow.workflow_definition.blocks
-            )
+            start_label, label_to_block, default_next_map = self._get_workflow_graph(workflow)
         except InvalidWorkflowDefinition as exc:
             LOG.error("Workflow graph validation failed", error=str(exc), workflow_id=workflow.workflow_id)
             workflow_run = await self.mark_workflow_run_as_failed(
@@ -939,6 +958,28 @@ class WorkflowService:
             )
             return workflow_run, blocks_to_update
 
+        has_conditional_blocks = any(isinstance(block, ConditionalBlock) for block in label_to_block.values())
+        if (
+            not has_conditional_blocks
+            and not is_script_run
+            and await self._is_concurrent_workflow_blocks_enabled(workflow, organization)
+        ):
+            ordered_blocks: list[BlockTypeVar] = []
+            next_label: str | None = start_label
+            while next_label:
+                ordered_blocks.append(label_to_block[next_label])
+                next_label = default_next_map.get(next_label)
+            return await self._execute_workflow_blocks_concurrently(
+                blocks=ordered_blocks,
+                workflow_run=workflow_run,
+                organization=organization,
+                browser_session_id=browser_session_id,
+                script_blocks_by_label=script_blocks_by_label,
+                loaded_script_module=loaded_script_module,
+                is_script_run=is_script_run,
+                blocks_to_update=blocks_to_update,
+            )
+
         visited_labels: set[str] = set()
         current_label = start_label
         block_idx = 0
@@ -1015,6 +1056,98 @@ class WorkflowService:
 
         return workflow_run, blocks_to_update
 
+    async def _is_concurrent_workflow_blocks_enabled(self, workflow: Workflow, organization: Organization) -> bool:
+        """
+        Whether the blocks of the workflow run by their dependencies. It's enabled per organization, or per workflow
+        through the workflow_permanent_id property, with the ENABLE_CONCURRENT_WORKFLOW_BLOCKS flag.
+        """
+        return await app.EXPERIMENTATION_PROVIDER.is_feature_enabled_cached(
+            "ENABLE_CONCURRENT_WORKFLOW_BLOCKS",
+            organization.organization_id,
+            properties={
+                "organization_id": organization.organization_id,
+                "workflow_permanent_id": workflow.workflow_permanent_id,
+            },
+        )
+
+    async def _execute_workflow_blocks_concurrently(
+        self,
+        *,
+        blocks: list[BlockTypeVar],
+        workflow_run: WorkflowRun,
+        organization: Organization,
+        browser_session_id: str | None,
+        script_blocks_by_label: dict[str, Any],
+        loaded_script_module: Any,
+        is_script_run: bool,
+        blocks_to_update: set[str],
+    ) -> tuple[WorkflowRun, set[str]]:
+        """
+        Run every block as soon as the blocks it depends on are done, so the blocks which don't read each other's
+        outputs run concurrently while the browser blocks still run one at a time in their order. A block stopping the
+        run lets the running blocks finish but no other block starts.
+        """
+        dependencies = build_block_dependencies(blocks)
+        block_indices = {block.label: block_idx for block_idx, block in enumerate(blocks)}
+        pending_blocks = list(blocks)
+        done_labels: set[str] = set()
+        running: dict[asyncio.Task, BlockTypeVar] = {}
+        stopped = False
+        context = skyvern_context.current()
+
+        LOG.info(
+            "Executing workflow blocks concurrently by their dependencies",
+            workflow_run_id=workflow_run.workflow_run_id,
+            dependencies={label: sorted(block_dependencies) for label, block_dependencies in dependencies.items()},
+        )
+
+        async def run_block(
+            block: BlockTypeVar,
+        ) -> tuple[WorkflowRun, set[str], BlockResult | None, bool, dict[str, Any] | None]:
+            # the browser blocks run one at a time and keep sharing the context, like when running sequentially
+            if context and not block_uses_browser(block):
+                skyvern_context.set(skyvern_context.fork(context))
+            return await self._execute_single_block(
+                block=block,
+                block_idx=block_indices[block.label],
+                blocks_cnt=len(blocks),
+                workflow_run=workflow_run,
+                organization=organization,
+                workflow_run_id=workflow_run.workflow_run_id,
+                browser_session_id=browser_session_id,
+                script_blocks_by_label=script_blocks_by_label,
+                loaded_script_module=loaded_script_module,
+                is_script_run=is_script_run,
+                blocks_to_update=blocks_to_update,
+            )
+
+        try:
+            while pending_blocks or running:
+                if not stopped:
+                    for block in list(pending_blocks):
+                        if len(running) >= settings.WORKFLOW_MAX_CONCURRENT_BLOCKS:
+                            break
+                        if dependencies[block.label] <= done_labels:
+                            pending_blocks.remove(block)
+                            running[asyncio.create_task(run_block(block))] = block
+                if not running:
+                    break
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    block = running.pop(task)
+                    done_labels.add(block.label)
+                    block_workflow_run, _, _, should_stop, _ = task.result()
+                    # keep the workflow run of the block which stopped the run, the others may have read it earlier
+                    if should_stop or not stopped:
+                        workflow_run = block_workflow_run
+                    stopped = stopped or should_stop
+        finally:
+            for task in running:
+                task.cancel()
+
+        return workflow_run, blocks_to_update
+
     async def _execute_single_block(
         self,
         *,
@@ -1322,6 +1455,19 @@ class WorkflowService:
 
         return workflow_run, False
 
+    def _get_workflow_graph(
+        self,
+        workflow: Workflow,
+    ) -> tuple[str, dict[str, BlockTypeVar], dict[str, str | None]]:
+        blocks = workflow.workflow_definition.blocks
+        if cached_graph := compiled_workflow_cache.get_workflow_graph(workflow):
+            start_label, default_next_map = cached_graph
+            return start_label, {block.label: block for block in blocks}, default_next_map
+
+        start_label, label_to_block, default_next_map = self._build_workflow_graph(blocks)
+        compiled_workflow_cache.set_workflow_graph(workflow, start_label, default_next_map)
+        return start_label, label_to_block, default_next_map
+
     def _build_workflow_graph(
         self,
         blocks: list[BlockTypeVar],
@@ -1729,6 +1875,7 @@ class WorkflowService:
             description=description,
             workflow_definition=(workflow_definition.model_dump() if workflow_definition else None),
         )
+        compiled_workflow_cache.invalidate(workflow_id)
 
         return updated_workflow
 
@@ -3348,6 +3495,7 @@ class WorkflowService:
                 loop_variable_reference=block_yaml.loop_variable_reference,
                 loop_blocks=loop_blocks,
                 complete_if_empty=block_yaml.complete_if_empty,
+                max_concurrency=block_yaml.max_concurrency,
             )
         elif block_yaml.block_type == BlockType.CONDITIONAL:
             branch_conditions = []
@@ -259,6 +259,14 @@ class ForLoopBlockYAML(BlockYAML):
     loop_over_parameter_key: str = ""
     loop_variable_reference: str | None = None
     complete_if_empty: bool = False
+    max_concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "How many iterations run at the same time, each in its own browser. By default one at a time. "
+            "It's capped by the FOR_LOOP_MAX_CONCURRENCY setting."
+        ),
+    )
 
 
 class BranchCriteriaYAML(BaseModel):
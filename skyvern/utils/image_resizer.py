@@ -1,3 +1,4 @@
+import asyncio
 import io
 from typing import TypedDict
 
@@ -28,7 +29,30 @@ def get_resize_target_dimension(
     return window_size
 
 
-def resize_screenshots(screenshots: list[bytes], target_dimension: Resolution) -> list[bytes]:
+def encode_image(img: Image.Image, image_format: str = "PNG", quality: int | None = None) -> bytes:
+    """
+    Encode the image into PNG, JPEG or WEBP. quality only applies to the lossy formats.
+    """
+    image_format = image_format.upper()
+    save_kwargs: dict = {}
+    if image_format in ("JPEG", "WEBP"):
+        # JPEG doesn't support the alpha channel, and screenshots don't need it anyway
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if quality is not None:
+            save_kwargs["quality"] = quality
+
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format=image_format, **save_kwargs)
+    return img_byte_arr.getvalue()
+
+
+def resize_screenshots(
+    screenshots: list[bytes],
+    target_dimension: Resolution,
+    image_format: str = "PNG",
+    quality: int | None = None,
+) -> list[bytes]:
     """
     The image scaling logic is originated from anthropic's quickstart guide:
     https://github.com/anthropics/anthropic-quickstarts/blob/81c4085944abb1734db411f05290b538fdc46dcd/computer-use-demo/computer_use_demo/tools/computer.py#L49-L60
@@ -36,20 +60,65 @@ def resize_screenshots(screenshots: list[bytes], target_dimension: Resolution) -
     new_screenshots = []
     for screenshot in screenshots:
         # Convert bytes to PIL Image
-        img = Image.open(io.BytesIO(screenshot))
-
-        # Resize image to target dimensions
-        resized_img = img.resize((target_dimension["width"], target_dimension["height"]), Image.Resampling.LANCZOS)
+        with Image.open(io.BytesIO(screenshot)) as img:
+            # Resize image to target dimensions
+            resized_img = img.resize(
+                (target_dimension["width"], target_dimension["height"]), Image.Resampling.LANCZOS
+            )
 
         # Convert back to bytes
-        img_byte_arr = io.BytesIO()
-        resized_img.save(img_byte_arr, format="PNG")
-        img_byte = img_byte_arr.getvalue()
-
-        new_screenshots.append(img_byte)
+        new_screenshots.append(encode_image(resized_img, image_format=image_format, quality=quality))
     return new_screenshots
 
 
+async def resize_screenshots_async(
+    screenshots: list[bytes],
+    target_dimension: Resolution,
+    image_format: str = "PNG",
+    quality: int | None = None,
+) -> list[bytes]:
+    """
+    resize_screenshots in a worker thread. Decoding, resizing and encoding are CPU heavy and would block the event
+    loop for every other task in the worker; PIL releases the GIL while doing them.
+    """
+    return await asyncio.to_thread(resize_screenshots, screenshots, target_dimension, image_format, quality)
+
+
+def fit_resolution(
+    resolution: Resolution, max_long_edge: int | None = None, max_short_edge: int | None = None
+) -> Resolution:
+    """
+    Scale the resolution down, keeping its aspect ratio, until its long and short edges fit the limits.
+    """
+    scale = 1.0
+    long_edge = max(resolution["width"], resolution["height"])
+    short_edge = min(resolution["width"], resolution["height"])
+    if max_long_edge and long_edge > max_long_edge:
+        scale = max_long_edge / long_edge
+    if max_short_edge and short_edge * scale > max_short_edge:
+        scale = max_short_edge / short_edge
+    if scale == 1.0:
+        return resolution
+    return Resolution(
+        width=max(1, round(resolution["width"] * scale)), height=max(1, round(resolution["height"] * scale))
+    )
+
+
+def perceptual_hash(screenshot: bytes) -> str:
+    """
+    64 bit difference hash (dHash) of the image: visually identical screenshots get the same hash even if their bytes
+    differ, e.g. because of a blinking cursor or a re-encoding.
+    """
+    with Image.open(io.BytesIO(screenshot)) as img:
+        small_img = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small_img.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | int(pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
 def scale_coordinates(
     current_coordinates: tuple[int, int],
     current_dimension: Resolution,
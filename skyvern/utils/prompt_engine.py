@@ -1,3 +1,4 @@
+import functools
 from typing import Any
 
 import structlog
@@ -6,7 +7,7 @@ from pydantic import BaseModel
 from skyvern.constants import DEFAULT_MAX_TOKENS
 from skyvern.errors.errors import UserDefinedError
 from skyvern.forge.sdk.prompting import PromptEngine
-from skyvern.utils.token_counter import count_tokens
+from skyvern.utils.token_counter import count_tokens, count_tokens_for_budget
 from skyvern.webeye.scraper.scraped_page import ElementTreeBuilder
 
 LOG = structlog.get_logger()
@@ -44,20 +45,28 @@ def load_prompt_with_elements(
     html_need_skyvern_attrs: bool = True,
     **kwargs: Any,
 ) -> str:
+    # the trees are counted from the token counts of their subtrees, which are kept on the builder across the steps
+    count_elements_tokens = functools.partial(
+        element_tree_builder.count_element_tree_tokens, html_need_skyvern_attrs=html_need_skyvern_attrs
+    )
     elements = element_tree_builder.build_element_tree(html_need_skyvern_attrs=html_need_skyvern_attrs)
     prompt = prompt_engine.load_prompt(
         template_name,
         elements=elements,
         **kwargs,
     )
-    token_count = count_tokens(prompt)
+    token_count = count_tokens_for_budget(
+        prompt, DEFAULT_MAX_TOKENS, elements=elements, count_elements_tokens=count_elements_tokens
+    )
     if token_count > DEFAULT_MAX_TOKENS and element_tree_builder.support_economy_elements_tree():
         # get rid of all the secondary elements like SVG, etc
         economy_elements_tree = element_tree_builder.build_economy_elements_tree(
             html_need_skyvern_attrs=html_need_skyvern_attrs
         )
         prompt = prompt_engine.load_prompt(template_name, elements=economy_elements_tree, **kwargs)
-        economy_token_count = count_tokens(prompt)
+        economy_token_count = count_tokens_for_budget(
+            prompt, DEFAULT_MAX_TOKENS, elements=economy_elements_tree, count_elements_tokens=count_elements_tokens
+        )
         LOG.warning(
             "Prompt is longer than the max tokens. Going to use the economy elements tree.",
             template_name=template_name,
@@ -66,16 +75,23 @@ def load_prompt_with_elements(
             max_tokens=DEFAULT_MAX_TOKENS,
         )
         if economy_token_count > DEFAULT_MAX_TOKENS:
-            # !!! HACK alert
-            # dump the last 1/3 of the html context and keep the first 2/3 of the html context
+            # prune the economy tree to fit the tokens left by the rest of the prompt,
+            # keeping the interactable elements first, then the selectable ones, then the rest,
+            # each in page order
+            elements_max_tokens = DEFAULT_MAX_TOKENS - count_tokens(prompt.replace(economy_elements_tree, "", 1))
             economy_elements_tree_dumped = element_tree_builder.build_economy_elements_tree(
                 html_need_skyvern_attrs=html_need_skyvern_attrs,
-                percent_to_keep=2 / 3,
+                max_tokens=max(elements_max_tokens, 0),
             )
             prompt = prompt_engine.load_prompt(template_name, elements=economy_elements_tree_dumped, **kwargs)
-            token_count_after_dump = count_tokens(prompt)
+            token_count_after_dump = count_tokens_for_budget(
+                prompt,
+                DEFAULT_MAX_TOKENS,
+                elements=economy_elements_tree_dumped,
+                count_elements_tokens=count_elements_tokens,
+            )
             LOG.warning(
-                "Prompt is still longer than the max tokens. Will only keep the first 2/3 of the html context.",
+                "Prompt is still longer than the max tokens. Will prune the economy elements tree to fit in the max tokens.",
                 template_name=template_name,
                 token_count=token_count,
                 economy_token_count=economy_token_count,
@@ -1,5 +1,89 @@
+import functools
+import math
+from typing import Callable
+
 import tiktoken
 
+TOKENIZER_MODEL = "gpt-4o"
+# average characters per token of the element tree HTML and the prompts around it with the gpt-4o tokenizer
+HTML_CHARS_PER_TOKEN = 3.5
+# the estimation is only trusted over the budget, and only when it's over by more than this ratio of the budget
+EXACT_COUNT_MARGIN = 0.25
+# the estimation only holds for mostly ASCII text, the non-latin scripts take up to a token per character
+MAX_ESTIMATED_NON_ASCII_RATIO = 0.05
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    return tiktoken.encoding_for_model(model)
+
 
 def count_tokens(text: str) -> int:
-    return len(tiktoken.encoding_for_model("gpt-4o").encode(text))
+    return len(_get_encoding(TOKENIZER_MODEL).encode(text))
+
+
+@functools.lru_cache(maxsize=16)
+def count_tokens_cached(text: str) -> int:
+    """
+    count_tokens memoized by the text. It's meant for large texts which are reused across prompts, like the rendered
+    element trees: ScrapedPage returns the same string object every time, so a hit doesn't even rehash the text.
+    """
+    return count_tokens(text)
+
+
+@functools.lru_cache(maxsize=2**16)
+def count_fragment_tokens(fragment: str) -> int:
+    """
+    count_tokens memoized by the text, for the small fragments which come back across texts, like the tags and the
+    texts of the elements, which stay the same from one scraping of a page to the next.
+    """
+    return count_tokens(fragment)
+
+
+def estimate_tokens(text: str, chars_per_token: float = HTML_CHARS_PER_TOKEN) -> int:
+    return math.ceil(len(text) / chars_per_token)
+
+
+def get_utf8_length(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-8", errors="surrogatepass"))
+
+
+def is_mostly_ascii(text: str) -> bool:
+    if text.isascii():
+        return True
+    # each non-ASCII character takes 2 to 4 bytes in UTF-8, the extra bytes bound the number of those characters
+    extra_bytes = get_utf8_length(text) - len(text)
+    return extra_bytes <= len(text) * MAX_ESTIMATED_NON_ASCII_RATIO
+
+
+def count_tokens_for_budget(
+    text: str,
+    max_tokens: int,
+    elements: str | None = None,
+    count_elements_tokens: Callable[[str], int] = count_tokens_cached,
+) -> int:
+    """
+    Count the tokens of the text for checking it against max_tokens.
+    A text over the budget must never pass for one under it, so the count is only estimated in O(1) when the check
+    can't go wrong:
+    - under the budget when the text has at most max_tokens bytes, since every token takes at least one byte
+    - over the budget when the text is mostly ASCII and the estimation is over it by more than the margin
+    Otherwise the text is counted exactly.
+    If the text embeds the element tree HTML, pass it as elements: it's counted with count_elements_tokens, which
+    caches its count across the checks of the different prompts built on the same tree, so only the rest of the text
+    is encoded every time.
+    """
+    estimated_tokens = estimate_tokens(text)
+    if len(text) <= max_tokens and get_utf8_length(text) <= max_tokens:
+        return estimated_tokens
+    if estimated_tokens > max_tokens * (1 + EXACT_COUNT_MARGIN) and is_mostly_ascii(text):
+        return estimated_tokens
+
+    if elements:
+        text_without_elements = text.replace(elements, "", 1)
+        if len(text_without_elements) < len(text):
+            return count_tokens(text_without_elements) + count_elements_tokens(elements)
+
+    return count_tokens(text)
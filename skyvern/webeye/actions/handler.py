@@ -108,7 +108,12 @@ from skyvern.webeye.scraper.scraped_page import (
     ScrapedPage,
     json_to_html,
 )
-from skyvern.webeye.scraper.scraper import IncrementalScrapePage, hash_element, trim_element_tree
+from skyvern.webeye.scraper.scraper import (
+    IncrementalScrapePage,
+    copy_element_tree,
+    hash_element,
+    trim_element_tree,
+)
 from skyvern.webeye.utils.dom import COMMON_INPUT_TAGS, DomUtil, InteractiveElement, SkyvernElement
 from skyvern.webeye.utils.page import SkyvernFrame
 
@@ -2509,9 +2514,9 @@ async def choose_auto_completion_dropdown(
 
         if len(confirmed_preserved_list) > 0:
             confirmed_preserved_list = await app.AGENT_FUNCTION.cleanup_element_tree_factory(task=task, step=step)(
-                skyvern_frame.get_frame(), skyvern_frame.get_frame().url, copy.deepcopy(confirmed_preserved_list)
+                skyvern_frame.get_frame(), skyvern_frame.get_frame().url, copy_element_tree(confirmed_preserved_list)
             )
-            confirmed_preserved_list = trim_element_tree(copy.deepcopy(confirmed_preserved_list))
+            confirmed_preserved_list = trim_element_tree(copy_element_tree(confirmed_preserved_list))
 
         incremental_element.extend(confirmed_preserved_list)
 
@@ -3897,8 +3902,8 @@ async def _get_input_or_select_context(
                     frame=skyvern_element.get_frame_id(),
                 )
                 clean_up_func = app.AGENT_FUNCTION.cleanup_element_tree_factory(step=step)
-                element_tree = await clean_up_func(skyvern_element.get_frame(), "", copy.deepcopy(element_tree))
-                element_tree_trimmed = trim_element_tree(copy.deepcopy(element_tree))
+                element_tree = await clean_up_func(skyvern_element.get_frame(), "", copy_element_tree(element_tree))
+                element_tree_trimmed = trim_element_tree(copy_element_tree(element_tree))
                 element_tree_builder = ScrapedPage(
                     elements=elements,
                     element_tree=element_tree,
@@ -0,0 +1,119 @@
+"""
+Isolated browsers for work running concurrently inside a workflow run, like the iterations of a ForLoopBlock with a
+max_concurrency.
+
+Each piece of work borrows a slot of the pool for its asyncio task. While it holds the slot, the browser manager
+resolves the workflow run's browser to the slot's own browser, so the blocks run unchanged, each in its own browser.
+The slot browsers are created on first use, reused by the following work, and closed with the pool. They start with
+the cookies and local storage of the browser the pool was created from, so the work stays logged in.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+import structlog
+from playwright.async_api import BrowserContext
+
+from skyvern.forge import app
+from skyvern.webeye.browser_state import BrowserState
+
+if TYPE_CHECKING:
+    from skyvern.forge.sdk.workflow.models.workflow import WorkflowRun
+
+LOG = structlog.get_logger()
+
+_browser_slot_key: ContextVar[str | None] = ContextVar("browser_slot_key", default=None)
+
+
+def get_browser_slot_key() -> str | None:
+    """The key of the pool browser the current asyncio task uses instead of the workflow run's browser, if any."""
+    return _browser_slot_key.get()
+
+
+async def seed_storage_state(browser_context: BrowserContext, storage_state: dict[str, Any]) -> None:
+    """
+    Copy the cookies and the local storage of a playwright storage_state into an existing browser context. The local
+    storage is set by an init script, before the scripts of the pages of its origin run.
+    """
+    cookies = storage_state.get("cookies") or []
+    if cookies:
+        await browser_context.add_cookies(cookies)
+    local_storage = {
+        origin["origin"]: {item["name"]: item["value"] for item in origin.get("localStorage", [])}
+        for origin in storage_state.get("origins") or []
+        if origin.get("localStorage")
+    }
+    if local_storage:
+        await browser_context.add_init_script(
+            script=f"""
+            (() => {{
+                const items = {json.dumps(local_storage)}[window.location.origin];
+                if (!items) return;
+                try {{
+                    for (const [name, value] of Object.entries(items)) {{
+                        if (window.localStorage.getItem(name) === null) window.localStorage.setItem(name, value);
+                    }}
+                }} catch (e) {{}}
+            }})();
+            """
+        )
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        workflow_run: WorkflowRun,
+        name: str,
+        size: int,
+        start_url: str | None = None,
+        storage_state: dict[str, Any] | None = None,
+    ) -> None:
+        self.workflow_run = workflow_run
+        self.start_url = start_url
+        self.storage_state = storage_state
+        # a pool created inside a slot, like for a loop nested in a concurrent loop, is scoped to that slot
+        key_prefix = get_browser_slot_key() or workflow_run.workflow_run_id
+        self.slot_keys = [f"{key_prefix}:{name}:{slot}" for slot in range(size)]
+        self._free_slot_keys: asyncio.Queue[str] = asyncio.Queue()
+        for slot_key in self.slot_keys:
+            self._free_slot_keys.put_nowait(slot_key)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a free slot and use its browser in the current asyncio task."""
+        slot_key = await self._free_slot_keys.get()
+        token = _browser_slot_key.set(slot_key)
+        try:
+            yield
+        finally:
+            _browser_slot_key.reset(token)
+            self._free_slot_keys.put_nowait(slot_key)
+
+    async def get_or_create_browser(self) -> BrowserState:
+        """
+        The browser of the slot the current asyncio task holds. When it's created, it's seeded with the storage state
+        and then opened on the start url.
+        """
+        browser_state = app.BROWSER_MANAGER.get_for_workflow_run(self.workflow_run.workflow_run_id)
+        if browser_state:
+            return browser_state
+
+        browser_state = await app.BROWSER_MANAGER.get_or_create_for_workflow_run(workflow_run=self.workflow_run)
+        if self.storage_state and browser_state.browser_context:
+            await seed_storage_state(browser_state.browser_context, self.storage_state)
+        if self.start_url:
+            page = await browser_state.must_get_working_page()
+            await browser_state.navigate_to_url(page=page, url=self.start_url)
+        return browser_state
+
+    async def close(self) -> None:
+        for slot_key in self.slot_keys:
+            try:
+                await app.BROWSER_MANAGER.cleanup_for_workflow_run(slot_key, task_ids=[])
+            except Exception:
+                LOG.warning("Failed to close the pool browser", slot_key=slot_key, exc_info=True)
@@ -83,4 +83,7 @@ class BrowserState(Protocol):
         scroll: bool = True,
         support_empty_page: bool = False,
         wait_seconds: float = 0,
+        include_html: bool = True,
+        skip_empty_frames: bool = False,
+        track_dom_changes: bool = False,
     ) -> ScrapedPage: ...
@@ -12,6 +12,7 @@ from skyvern.forge.sdk.workflow.models.workflow import WorkflowRun
 from skyvern.schemas.runs import ProxyLocation, ProxyLocationInput
 from skyvern.webeye.browser_artifacts import VideoArtifact
 from skyvern.webeye.browser_factory import BrowserContextFactory
+from skyvern.webeye.browser_pool import get_browser_slot_key
 from skyvern.webeye.browser_state import BrowserState
 from skyvern.webeye.real_browser_state import RealBrowserState
 
@@ -63,6 +64,8 @@ class RealBrowserManager:
         if task_id in self.pages:
             return self.pages[task_id]
 
+        # a task running in a pool slot uses the slot's browser instead of the workflow run's one
+        workflow_run_id = get_browser_slot_key() or workflow_run_id
         if workflow_run_id and workflow_run_id in self.pages:
             LOG.info(
                 "Browser state for task not found. Using browser state for workflow run",
@@ -151,12 +154,18 @@ class RealBrowserManager:
         workflow_run_id = workflow_run.workflow_run_id
         if browser_profile_id is None:
             browser_profile_id = workflow_run.browser_profile_id
+        slot_key = get_browser_slot_key()
+        if slot_key:
+            # a pool slot has its own browser, it's never shared with a browser session or the parent workflow run
+            parent_workflow_run_id = None
+            browser_session_id = None
+        browser_key = slot_key or workflow_run_id
         browser_state = self.get_for_workflow_run(
             workflow_run_id=workflow_run_id, parent_workflow_run_id=parent_workflow_run_id
         )
         if browser_state:
             # always keep the browser state for the workflow run and the parent workflow run synced
-            self.pages[workflow_run_id] = browser_state
+            self.pages[browser_key] = browser_state
             if parent_workflow_run_id:
                 self.pages[parent_workflow_run_id] = browser_state
             return browser_state
@@ -204,7 +213,7 @@ class RealBrowserManager:
                     browser_state,
                 )
 
-        self.pages[workflow_run_id] = browser_state
+        self.pages[browser_key] = browser_state
         if parent_workflow_run_id:
             self.pages[parent_workflow_run_id] = browser_state
 
@@ -224,6 +233,10 @@ class RealBrowserManager:
     def get_for_workflow_run(
         self, workflow_run_id: str, parent_workflow_run_id: str | None = None
     ) -> BrowserState | None:
+        slot_key = get_browser_slot_key()
+        if slot_key:
+            return self.pages.get(slot_key)
+
         if parent_workflow_run_id and parent_workflow_run_id in self.pages:
             return self.pages[parent_workflow_run_id]
 
@@ -393,6 +393,9 @@ class RealBrowserState(BrowserState):
         scroll: bool = True,
         support_empty_page: bool = False,
         wait_seconds: float = 0,
+        include_html: bool = True,
+        skip_empty_frames: bool = False,
+        track_dom_changes: bool = False,
     ) -> ScrapedPage:
         return await scraper.scrape_website(
             browser_state=self,
@@ -407,6 +410,9 @@ class RealBrowserState(BrowserState):
             scroll=scroll,
             support_empty_page=support_empty_page,
             wait_seconds=wait_seconds,
+            include_html=include_html,
+            skip_empty_frames=skip_empty_frames,
+            track_dom_changes=track_dom_changes,
         )
 
     async def close(self, close_browser_on_completion: bool = True) -> None:
@@ -94,6 +94,8 @@ class Rect {
 class DomUtils {
   static elementListCache = [];
   static visibleClientRectCache = new WeakMap();
+  // when true, the rects below the viewport are kept, used to draw the boxes for a full page capture
+  static ignoreViewportBottom = false;
   //
   // Bounds the rect by the current viewport dimensions. If the rect is offscreen or has a height or
   // width < 3 then null is returned instead of a rect.
@@ -106,7 +108,8 @@ class DomUtils {
       rect.bottom,
     );
     if (
-      boundedRect.top >= window.innerHeight - 4 ||
+      (!DomUtils.ignoreViewportBottom &&
+        boundedRect.top >= window.innerHeight - 4) ||
       boundedRect.left >= window.innerWidth - 4
     ) {
       return null;
@@ -1625,6 +1628,7 @@ async function buildElementObject(
 async function buildTreeFromBody(
   frame = "main.frame",
   frame_index = undefined,
+  dom_change_tracker_id = null,
 ) {
   if (
     window.GlobalSkyvernFrameIndex === undefined &&
@@ -1641,6 +1645,10 @@ async function buildTreeFromBody(
     maxElementNumber,
   );
   DomUtils.elementListCache = elementsAndResultArray[0];
+  // start tracking right after the tree is built, so no change is missed between the two
+  if (dom_change_tracker_id) {
+    startDomChangeTracker(dom_change_tracker_id);
+  }
   return elementsAndResultArray;
 }
 
@@ -1650,6 +1658,7 @@ async function buildElementTree(
   full_tree = false,
   hoverStylesMap = undefined,
   maxElementNumber = 0,
+  withStarterXpath = false,
 ) {
   // Generate hover styles map at the start
   if (hoverStylesMap === undefined) {
@@ -1874,12 +1883,16 @@ async function buildElementTree(
   };
 
   let current_xpath = null;
+  let current_node_index = 1;
   if (starter === document.documentElement) {
     current_xpath = "";
+  } else if (withStarterXpath) {
+    // the xpaths of the subtree are the same as when it's built with the whole document
+    [current_xpath, current_node_index] = getParentXpathAndNodeIndex(starter);
   }
 
   // setup before parsing the dom
-  await processElement(starter, null, current_xpath, 1);
+  await processElement(starter, null, current_xpath, current_node_index);
 
   for (var element of elements) {
     if (
@@ -1904,6 +1917,45 @@ async function buildElementTree(
   return [elements, resultArray];
 }
 
+// the xpath of the parent and the index of the element among its siblings with the same tag, like processElement gets
+// them when the tree is built from the document. The xpath is null inside a shadow root.
+function getParentXpathAndNodeIndex(element) {
+  const getNodeIndex = (node) => {
+    const tagName = node.tagName.toLowerCase();
+    let nodeIndex = 1;
+    for (
+      let sibling = node.previousElementSibling;
+      sibling;
+      sibling = sibling.previousElementSibling
+    ) {
+      if (sibling.tagName.toLowerCase() === tagName) {
+        nodeIndex++;
+      }
+    }
+    return nodeIndex;
+  };
+
+  const steps = [];
+  let current = element.parentElement;
+  if (!current) {
+    return [null, 0];
+  }
+  while (current !== document.documentElement) {
+    if (!current.parentElement) {
+      return [null, 0];
+    }
+    steps.unshift(
+      '/*[name()="' +
+        current.tagName.toLowerCase() +
+        '"][' +
+        getNodeIndex(current) +
+        "]",
+    );
+    current = current.parentElement;
+  }
+  return ['/*[name()="html"][1]' + steps.join(""), getNodeIndex(element)];
+}
+
 function drawBoundingBoxes(elements) {
   // draw a red border around the elements
   DomUtils.clearVisibleClientRectCache();
@@ -1930,6 +1982,99 @@ async function buildElementsAndDrawBoundingBoxes(
   drawBoundingBoxes(elementsAndResultArray[0]);
 }
 
+async function buildElementsAndDrawBoundingBoxesForFullPage(
+  frame = "main.frame",
+  frame_index = undefined,
+) {
+  // the page is expected to be scrolled to the top, so the client rects are the same as the document rects
+  DomUtils.ignoreViewportBottom = true;
+  try {
+    await buildElementsAndDrawBoundingBoxes(frame, frame_index);
+  } finally {
+    DomUtils.ignoreViewportBottom = false;
+    DomUtils.clearVisibleClientRectCache();
+  }
+}
+
+// return the reason why a single full page capture can't represent the page like scrolling does, empty if it can
+// the elements which may be fixed or sticky: the ones matched by a stylesheet rule setting such a position, or
+// with an inline position. null when a stylesheet can't be read, every element has to be checked then
+function getFixedOrStickyCandidates() {
+  const selectors = ["[style*='fixed']", "[style*='sticky']"];
+  const collectSelectors = (rules) => {
+    for (const rule of rules) {
+      if (rule.cssRules) {
+        // grouping rules (@media, @supports, @layer, ...) and nested rules
+        if (!collectSelectors(rule.cssRules)) {
+          return false;
+        }
+      }
+      const position = rule.style?.getPropertyValue("position") ?? "";
+      if (position.includes("var(")) {
+        return false;
+      }
+      if (
+        rule.selectorText &&
+        (position === "fixed" || position === "sticky")
+      ) {
+        // the position of a pseudo element doesn't make its host fixed or sticky
+        selectors.push(
+          ...rule.selectorText
+            .split(",")
+            .filter((selector) => !selector.includes("::")),
+        );
+      }
+    }
+    return true;
+  };
+  for (const sheet of [
+    ...document.styleSheets,
+    ...(document.adoptedStyleSheets ?? []),
+  ]) {
+    let rules;
+    try {
+      rules = sheet.cssRules;
+    } catch (e) {
+      // cross origin stylesheet
+      return null;
+    }
+    if (!collectSelectors(rules)) {
+      return null;
+    }
+  }
+  const candidates = new Set();
+  for (const selector of selectors) {
+    try {
+      document.body
+        ?.querySelectorAll(selector)
+        .forEach((element) => candidates.add(element));
+    } catch (e) {
+      // a selector the engine can't query, e.g. a nested rule relative to its parent
+      return null;
+    }
+  }
+  return candidates;
+}
+
+function getFullPageCaptureBlocker() {
+  if (document.querySelector("img[loading='lazy'], iframe[loading='lazy']")) {
+    return "lazy loading elements";
+  }
+  const candidates =
+    getFixedOrStickyCandidates() ?? document.body?.querySelectorAll("*") ?? [];
+  for (const element of candidates) {
+    const position = getElementComputedStyle(element)?.position;
+    if (position !== "fixed" && position !== "sticky") {
+      continue;
+    }
+    const rect = element.getBoundingClientRect();
+    if (rect.width > 0 && rect.height > 0) {
+      return `${position} element`;
+    }
+  }
+  return "";
+}
+
 function captchaSolvedCallback() {
   _jsConsoleLog("captcha solved");
   if (!window["captchaSolvedCounter"]) {
@@ -2194,6 +2339,33 @@ function getScrollWidthAndHeight() {
   ];
 }
 
+function getPageContent() {
+  // same as playwright frame.content()
+  let content = "";
+  if (document.doctype) {
+    content = new XMLSerializer().serializeToString(document.doctype);
+  }
+  if (document.documentElement) {
+    content += document.documentElement.outerHTML;
+  }
+  return content;
+}
+
+// everything the scraper reads from the frame after taking the screenshots, in a single round trip
+function getPageSnapshot(include_html = true) {
+  return {
+    text: document.body?.innerText ?? "",
+    html: include_html ? getPageContent() : null,
+    viewport: getViewportWidthAndHeight(),
+    scroll_size: getScrollWidthAndHeight(),
+    scroll_position: getScrollXY(),
+  };
+}
+
+function getViewportWidthAndHeight() {
+  return [window.innerWidth, window.innerHeight];
+}
+
 function getScrollXY() {
   return [window.scrollX, window.scrollY];
 }
@@ -2763,6 +2935,215 @@ async function getIncrementElements(wait_until_finished = true) {
   return [Array.from(idToElement.values()), cleanedTreeList];
 }
 
+// track whether the page changed since the last scraping, so the previous scraped result can be reused.
+// a navigation or a reload wipes out the window, so the tracker is gone and the counter can't be read anymore.
+function isBoundingBoxNode(node) {
+  return node.id === "boundingBoxContainer";
+}
+
+// the changes made by the scraping itself aren't page changes: the unique_id attributes and the bounding boxes drawn
+// for the screenshots
+function isScrapingMutation(mutation) {
+  if (mutation.attributeName === "unique_id") return true;
+  const target =
+    mutation.target.nodeType === Node.ELEMENT_NODE
+      ? mutation.target
+      : mutation.target.parentElement;
+  if (target && target.closest("#boundingBoxContainer")) return true;
+  if (mutation.type !== "childList") return false;
+  const changedNodes = [
+    ...Array.from(mutation.addedNodes),
+    ...Array.from(mutation.removedNodes),
+  ];
+  return changedNodes.length > 0 && changedNodes.every(isBoundingBoxNode);
+}
+
+// the closest scraped element containing the node, crossing the shadow roots, null if it's outside of them
+function getClosestScrapedElement(node) {
+  let current = node;
+  while (current) {
+    if (
+      current.nodeType === Node.ELEMENT_NODE &&
+      current.hasAttribute("unique_id")
+    ) {
+      return current;
+    }
+    current =
+      current.parentNode instanceof ShadowRoot
+        ? current.parentNode.host
+        : current.parentNode;
+  }
+  return null;
+}
+
+// remember which scraped element has to be scraped again for the change, so only its subtree is rebuilt.
+// an attribute can change how the siblings are styled, the scraped element containing the siblings is rebuilt then.
+function markChangedNode(node) {
+  const changedElement = getClosestScrapedElement(node);
+  if (changedElement) {
+    window.globalDomChangedElements.add(changedElement);
+  } else {
+    window.globalDomChangeOutsideScrapedElements = true;
+  }
+}
+
+function recordPageMutations(mutationsList) {
+  const pageMutations = mutationsList.filter(
+    (mutation) => !isScrapingMutation(mutation),
+  );
+  for (const mutation of pageMutations) {
+    if (mutation.type === "attributes") {
+      markChangedNode(
+        mutation.target.parentNode instanceof ShadowRoot
+          ? mutation.target.parentNode.host
+          : mutation.target.parentNode,
+      );
+    } else {
+      markChangedNode(mutation.target);
+    }
+  }
+  window.globalDomChangeCounter += pageMutations.length;
+}
+
+if (window.globalDomChangeTracker === undefined) {
+  window.globalDomChangeCounter = 0;
+  window.globalDomChangeTrackerId = null;
+  window.globalDomChangedElements = new Set();
+  window.globalDomChangeOutsideScrapedElements = false;
+  window.globalDomChangeTracker = new MutationObserver(function (
+    mutationsList,
+  ) {
+    recordPageMutations(mutationsList);
+  });
+  const markDomChanged = (event) => {
+    window.globalDomChangeCounter++;
+    markChangedNode(event.target);
+  };
+  // input values are properties instead of attributes, the observer can't see them
+  document.addEventListener("input", markDomChanged, true);
+  document.addEventListener("change", markDomChanged, true);
+}
+
+function observeDomChanges(root) {
+  window.globalDomChangeTracker.observe(root, {
+    attributes: true,
+    childList: true,
+    subtree: true,
+    characterData: true,
+  });
+  // the observer of the document doesn't see into the shadow roots, each open one is observed on its own
+  for (const element of Array.from(root.querySelectorAll("*"))) {
+    if (element.shadowRoot) {
+      observeDomChanges(element.shadowRoot);
+    }
+  }
+}
+
+function startDomChangeTracker(trackerId) {
+  window.globalDomChangeTracker.disconnect();
+  window.globalDomChangeTracker.takeRecords(); // cleanup the older data
+  window.globalDomChangeCounter = 0;
+  window.globalDomChangedElements = new Set();
+  window.globalDomChangeOutsideScrapedElements = false;
+  observeDomChanges(document.documentElement);
+  window.globalDomChangeTrackerId = trackerId;
+}
+
+function getDomChangeCount(trackerId) {
+  // the tracker was restarted by another scraping, the changes before it are unknown
+  if (window.globalDomChangeTrackerId !== trackerId) {
+    return -1;
+  }
+  // flush the pending mutations which haven't been delivered to the callback yet
+  recordPageMutations(window.globalDomChangeTracker.takeRecords());
+  return window.globalDomChangeCounter;
+}
+
+function isInSubtreeOf(node, roots) {
+  let current = node;
+  while (current) {
+    if (roots.has(current)) {
+      return true;
+    }
+    current =
+      current.parentNode instanceof ShadowRoot
+        ? current.parentNode.host
+        : current.parentNode;
+  }
+  return false;
+}
+
+// build again the subtrees of the topmost scraped elements changed since the tracker started, then restart the
+// tracker, so the changes made while building are counted for the next patch. null when the changes can't be patched:
+// the tracker was restarted, a node outside of the scraped elements changed or too many elements changed.
+async function buildChangedSubtrees(
+  trackerId,
+  newTrackerId,
+  frame,
+  maxChangedSubtrees,
+) {
+  if (window.globalDomChangeTrackerId !== trackerId) {
+    return null;
+  }
+  recordPageMutations(window.globalDomChangeTracker.takeRecords());
+  if (window.globalDomChangeOutsideScrapedElements) {
+    return null;
+  }
+  // a removed element doesn't need to be built, its removal changed an element which is still on the page
+  const changedElements = new Set(
+    Array.from(window.globalDomChangedElements).filter(
+      (element) => element.isConnected,
+    ),
+  );
+  const roots = Array.from(changedElements).filter((element) => {
+    const parent =
+      element.parentNode instanceof ShadowRoot
+        ? element.parentNode.host
+        : element.parentNode;
+    return !isInSubtreeOf(parent, changedElements);
+  });
+  if (roots.length > maxChangedSubtrees) {
+    return null;
+  }
+
+  const hoverStylesMap = await getHoverStylesMap();
+  const subtrees = [];
+  for (const root of roots) {
+    const [elements, tree] = await buildElementTree(
+      root,
+      frame,
+      false,
+      hoverStylesMap,
+      0,
+      true,
+    );
+    subtrees.push({
+      id: root.getAttribute("unique_id"),
+      elements: elements,
+      tree: tree,
+    });
+  }
+
+  // keep the elements the bounding boxes are drawn for in sync with the patched tree
+  const rootSet = new Set(roots);
+  const rebuiltIds = new Set(
+    subtrees.flatMap((subtree) => subtree.elements.map((element) => element.id)),
+  );
+  DomUtils.elementListCache = DomUtils.elementListCache.filter((element) => {
+    if (rebuiltIds.has(element.id)) {
+      return false;
+    }
+    const domElement = getDOMElementBySkyvenElement(element);
+    return domElement !== null && !isInSubtreeOf(domElement, rootSet);
+  });
+  for (const subtree of subtrees) {
+    DomUtils.elementListCache.push(...subtree.elements);
+  }
+
+  startDomChangeTracker(newTrackerId);
+  return subtrees;
+}
+
 function isAnimationFinished() {
   const animations = document.getAnimations({ subtree: true });
   const unfinishedAnimations = animations.filter(
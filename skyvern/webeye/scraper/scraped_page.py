@@ -1,4 +1,4 @@
-import copy
+import asyncio
 import json
 import typing
 from abc import ABC, abstractmethod
@@ -12,6 +12,7 @@ from pydantic import BaseModel, PrivateAttr
 from skyvern.exceptions import UnknownElementTreeFormat
 from skyvern.forge.sdk.api.crypto import calculate_sha256
 from skyvern.forge.sdk.core import skyvern_context
+from skyvern.utils.token_counter import count_fragment_tokens, count_tokens_cached, estimate_tokens
 
 if typing.TYPE_CHECKING:
     from skyvern.webeye.browser_state import BrowserState
@@ -37,13 +38,30 @@ def json_to_html(element: dict, need_skyvern_attrs: bool = True) -> str:
     """
     if element is flagged as dropped, the html format is empty
     """
+    buffer: list[str] = []
+    _write_element_html(element, need_skyvern_attrs, buffer)
+    return "".join(buffer)
+
+
+def element_tree_to_html(element_tree: list[dict], need_skyvern_attrs: bool = True) -> str:
+    """
+    Render the whole element tree into a single buffer, instead of concatenating the HTML of every subtree.
+    """
+    buffer: list[str] = []
+    for element in element_tree:
+        _write_element_html(element, need_skyvern_attrs, buffer)
+    return "".join(buffer)
+
+
+def _write_element_html(element: dict, need_skyvern_attrs: bool, buffer: list[str]) -> None:
     tag = element["tagName"]
-    attributes: dict[str, Any] = copy.deepcopy(element.get("attributes", {}))
+    # only the top-level keys are overwritten below, so a shallow copy is enough to keep the element untouched
+    attributes: dict[str, Any] = dict(element.get("attributes", {}))
 
     interactable = element.get("interactable", False)
     if element.get("isDropped", False):
         if not interactable:
-            return ""
+            return
         else:
             LOG.debug("Element is interactable. Trimmed all attributes instead of dropping it", element=element)
             attributes = {}
@@ -74,35 +92,207 @@ def json_to_html(element: dict, need_skyvern_attrs: bool = True) -> str:
         tag = "select"
 
     text = element.get("text", "")
+    before_pseudo_text = element.get("beforePseudoText") or ""
+    after_pseudo_text = element.get("afterPseudoText") or ""
+
+    # the open tag and the leading text are decided after the children are written,
+    # so reserve their slots in the buffer first
+    open_tag_index = len(buffer)
+    buffer.append("")
+    buffer.append("")
+
     # build children HTML
-    children_html = "".join(
-        json_to_html(child, need_skyvern_attrs=need_skyvern_attrs) for child in element.get("children", [])
-    )
+    children_start = len(buffer)
+    for child in element.get("children", []):
+        _write_element_html(child, need_skyvern_attrs, buffer)
     # build option HTML
-    option_html = "".join(
-        f'<option index="{option.get("optionIndex")}">{option.get("text")}</option>'
-        if option.get("text")
-        else f'<option index="{option.get("optionIndex")}" value="{option.get("value")}">{option.get("text")}</option>'
-        for option in element.get("options", [])
-    )
+    for option in element.get("options", []):
+        buffer.append(
+            f'<option index="{option.get("optionIndex")}">{option.get("text")}</option>'
+            if option.get("text")
+            else f'<option index="{option.get("optionIndex")}" value="{option.get("value")}">{option.get("text")}</option>'
+        )
 
     if element.get("purgeable", False):
-        return children_html + option_html
-
-    before_pseudo_text = element.get("beforePseudoText") or ""
-    after_pseudo_text = element.get("afterPseudoText") or ""
+        return
 
+    open_tag = f"<{tag}{attributes_html if not attributes_html else ' ' + attributes_html}>"
     # Check if the element is self-closing
     if (
         tag in ["img", "input", "br", "hr", "meta", "link"]
-        and not option_html
-        and not children_html
         and not before_pseudo_text
         and not after_pseudo_text
+        and not any(buffer[index] for index in range(children_start, len(buffer)))
     ):
-        return f"<{tag}{attributes_html if not attributes_html else ' ' + attributes_html}>"
-    else:
-        return f"<{tag}{attributes_html if not attributes_html else ' ' + attributes_html}>{before_pseudo_text}{text}{children_html + option_html}{after_pseudo_text}</{tag}>"
+        buffer[open_tag_index] = open_tag
+        return
+
+    buffer[open_tag_index] = open_tag
+    buffer[open_tag_index + 1] = f"{before_pseudo_text}{text}"
+    buffer.append(f"{after_pseudo_text}</{tag}>")
+
+
+# rendered in the place of the children of an element, to split its own HTML into what comes before and after them
+_CHILDREN_PLACEHOLDER = {"tagName": "\x00"}
+_CHILDREN_PLACEHOLDER_HTML = "<\x00></\x00>"
+
+
+def count_element_tree_tokens(
+    element_tree: list[dict],
+    need_skyvern_attrs: bool = True,
+    subtree_token_counts: dict[int, tuple[dict, int]] | None = None,
+) -> int:
+    """
+    Count the tokens of the rendered tree as the sum of the token counts of its subtrees, so the HTML of the whole
+    tree is never encoded at once.
+    The count of every subtree is kept in subtree_token_counts by the id of its root, next to the root itself so the
+    id can't be reused by another element, and the subtrees shared between the tree variants are only counted once.
+    The HTML fragments of every element are counted with count_fragment_tokens, which is memoized by text, so the
+    elements which don't change from a step to the next aren't encoded again either.
+    The tokenizer doesn't merge the characters across the fragment boundaries, so the sum can be a few tokens over the
+    count of the whole HTML, which errs on the side of the budget.
+    """
+    if subtree_token_counts is None:
+        subtree_token_counts = {}
+
+    def count_subtree(element: dict) -> int:
+        cached = subtree_token_counts.get(id(element))
+        if cached is not None:
+            return cached[1]
+
+        if element.get("isDropped", False) and not element.get("interactable", False):
+            # dropped element renders nothing, neither its children
+            token_count = 0
+        else:
+            children_token_count = sum(count_subtree(child) for child in element.get("children", []))
+            element_html = json_to_html(
+                {**element, "children": [_CHILDREN_PLACEHOLDER] if children_token_count else []},
+                need_skyvern_attrs=need_skyvern_attrs,
+            )
+            before_children, _, after_children = element_html.partition(_CHILDREN_PLACEHOLDER_HTML)
+            token_count = (
+                count_fragment_tokens(before_children) + children_token_count + count_fragment_tokens(after_children)
+            )
+
+        subtree_token_counts[id(element)] = (element, token_count)
+        return token_count
+
+    return sum(count_subtree(element) for element in element_tree)
+
+
+def _element_importance(element: dict) -> int:
+    if element.get("interactable", False):
+        return 2
+    if element.get("isSelectable", False):
+        return 1
+    return 0
+
+
+def prune_element_tree(
+    element_tree: list[dict],
+    max_tokens: int,
+    need_skyvern_attrs: bool = True,
+    subtree_token_counts: dict[int, tuple[dict, int]] | None = None,
+) -> list[dict]:
+    """
+    Pick the elements to keep so the rendered tree fits in max_tokens, over the estimated token cost of every element:
+    1. interactable elements and their content go first, then the selectable ones, then everything else
+    2. with the same importance, the elements at the top of the page go first
+    3. an element is only kept with all of its ancestors, whose own tags are charged to the element's cost
+    The estimation can be off, so the rendered tree is counted with count_element_tree_tokens and picked again with a
+    budget shrunk by the overshoot until it fits.
+    The subtrees which are kept as a whole are shared with element_tree instead of being copied, and their token
+    counts are reused from subtree_token_counts.
+    """
+    # every node in pre-order: the element, the index of its parent, its importance and its own token cost
+    nodes: list[dict] = []
+    parent_indexes: list[int | None] = []
+    importances: list[int] = []
+    own_tokens: list[int] = []
+    children_indexes: list[list[int] | None] = []
+
+    def visit(element: dict, parent_index: int | None, inherited_importance: int) -> None:
+        index = len(nodes)
+        importance = max(inherited_importance, _element_importance(element))
+        nodes.append(element)
+        parent_indexes.append(parent_index)
+        importances.append(importance)
+        if element.get("isDropped", False) and not element.get("interactable", False):
+            # dropped element renders nothing, neither its children
+            own_tokens.append(0)
+            children_indexes.append(None)
+            return
+
+        own_tokens.append(
+            estimate_tokens(json_to_html({**element, "children": []}, need_skyvern_attrs=need_skyvern_attrs))
+        )
+        child_indexes: list[int] = []
+        children_indexes.append(child_indexes)
+        for child in element.get("children", []):
+            child_indexes.append(len(nodes))
+            visit(child, index, importance)
+
+    root_indexes: list[int] = []
+    for element in element_tree:
+        root_indexes.append(len(nodes))
+        visit(element, None, 0)
+
+    order = sorted(range(len(nodes)), key=lambda node_index: (-importances[node_index], node_index))
+
+    def pick(budget: int) -> list[bool]:
+        kept = [False] * len(nodes)
+        remaining_tokens = budget
+        for index in order:
+            path: list[int] = []
+            cost = 0
+            current: int | None = index
+            while current is not None and not kept[current]:
+                path.append(current)
+                cost += own_tokens[current]
+                current = parent_indexes[current]
+            if cost > remaining_tokens:
+                continue
+            for path_index in path:
+                kept[path_index] = True
+            remaining_tokens -= cost
+        return kept
+
+    def rebuild(kept: list[bool]) -> list[dict]:
+        fully_kept: dict[int, bool] = {}
+
+        def is_fully_kept(index: int) -> bool:
+            if index not in fully_kept:
+                child_indexes = children_indexes[index]
+                fully_kept[index] = kept[index] and (
+                    child_indexes is None or all(is_fully_kept(child_index) for child_index in child_indexes)
+                )
+            return fully_kept[index]
+
+        def rebuild_element(index: int) -> dict:
+            element = nodes[index]
+            child_indexes = children_indexes[index]
+            if child_indexes is None or is_fully_kept(index):
+                return element
+            element_pruned = dict(element)
+            element_pruned["children"] = [
+                rebuild_element(child_index) for child_index in child_indexes if kept[child_index]
+            ]
+            return element_pruned
+
+        return [rebuild_element(root_index) for root_index in root_indexes if kept[root_index]]
+
+    budget = max_tokens
+    while True:
+        pruned_element_tree = rebuild(pick(budget))
+        if not pruned_element_tree:
+            return pruned_element_tree
+        token_count = count_element_tree_tokens(
+            pruned_element_tree, need_skyvern_attrs=need_skyvern_attrs, subtree_token_counts=subtree_token_counts
+        )
+        if token_count <= max_tokens:
+            return pruned_element_tree
+        # shrink the budget by the overshoot, and by at least one token so the loop always ends
+        budget = min(budget - 1, budget * max_tokens // token_count)
 
 
 class ElementTreeFormat(StrEnum):
@@ -127,9 +317,16 @@ class ElementTreeBuilder(ABC):
         fmt: ElementTreeFormat = ElementTreeFormat.HTML,
         html_need_skyvern_attrs: bool = True,
         percent_to_keep: float = 1,
+        max_tokens: int | None = None,
     ) -> str:
         pass
 
+    def count_element_tree_tokens(self, element_tree_html: str, html_need_skyvern_attrs: bool = True) -> int:
+        """
+        Count the tokens of element_tree_html, the HTML of the element tree this builder built last.
+        """
+        return count_tokens_cached(element_tree_html)
+
 
 class ScrapedPage(BaseModel, ElementTreeBuilder):
     """
@@ -161,6 +358,14 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
     _browser_state: "BrowserState" = PrivateAttr()
     _clean_up_func: CleanupElementTreeFunc = PrivateAttr()
     _scrape_exclude: ScrapeExcludeFunc | None = PrivateAttr(default=None)
+    # rendered HTML of the trimmed/economy trees, keyed by (tree variant, need_skyvern_attrs)
+    _element_tree_html_cache: dict[tuple[str, bool], str] = PrivateAttr(default_factory=dict)
+    # token counts of the subtrees of the tree variants, keyed by need_skyvern_attrs, see count_element_tree_tokens
+    _subtree_token_counts: dict[bool, dict[int, tuple[dict, int]]] = PrivateAttr(default_factory=dict)
+    # id of the DOM change tracker started right after this page was scraped, None if the changes are not tracked
+    _dom_change_tracker_id: str | None = PrivateAttr(default=None)
+    # element lookups started while the LLM was still streaming the actions, by element id
+    _element_lookups: dict[str, asyncio.Task] = PrivateAttr(default_factory=dict)
 
     def __init__(self, **data: Any) -> None:
         missing_attrs = [attr for attr in ["_browser_state", "_clean_up_func"] if attr not in data]
@@ -181,6 +386,49 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
     def support_economy_elements_tree(self) -> bool:
         return True
 
+    def set_element_tree_html(self, html: str, need_skyvern_attrs: bool) -> None:
+        """
+        Reuse the HTML of element_tree_trimmed which is already rendered by the caller.
+        """
+        self._element_tree_html_cache[("full", need_skyvern_attrs)] = html
+
+    def set_dom_change_tracker_id(self, tracker_id: str | None) -> None:
+        self._dom_change_tracker_id = tracker_id
+
+    def get_dom_change_tracker_id(self) -> str | None:
+        return self._dom_change_tracker_id
+
+    def add_element_lookup(self, element_id: str, lookup: asyncio.Task) -> None:
+        self._element_lookups.setdefault(element_id, lookup)
+
+    def pop_element_lookup(self, element_id: str) -> asyncio.Task | None:
+        return self._element_lookups.pop(element_id, None)
+
+    def reset_element_lookups(self) -> None:
+        # a copy of the page shares the lookups dict, give it its own
+        self._element_lookups = {}
+
+    def _get_element_tree_html(self, variant: str, element_tree: list[dict], need_skyvern_attrs: bool) -> str:
+        key = (variant, need_skyvern_attrs)
+        if key not in self._element_tree_html_cache:
+            self._element_tree_html_cache[key] = element_tree_to_html(
+                element_tree, need_skyvern_attrs=need_skyvern_attrs
+            )
+        return self._element_tree_html_cache[key]
+
+    def count_element_tree_tokens(self, element_tree_html: str, html_need_skyvern_attrs: bool = True) -> int:
+        """
+        Count the tokens of the last tree built from the token counts of its subtrees, which are kept across the
+        trimmed, economy and pruned trees. The HTML of the tree mustn't be cut with percent_to_keep.
+        """
+        if self.last_used_element_tree is None:
+            return super().count_element_tree_tokens(element_tree_html, html_need_skyvern_attrs)
+        return count_element_tree_tokens(
+            self.last_used_element_tree,
+            need_skyvern_attrs=html_need_skyvern_attrs,
+            subtree_token_counts=self._subtree_token_counts.setdefault(html_need_skyvern_attrs, {}),
+        )
+
     def build_element_tree(
         self, fmt: ElementTreeFormat = ElementTreeFormat.HTML, html_need_skyvern_attrs: bool = True
     ) -> str:
@@ -189,10 +437,7 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
             return json.dumps(self.element_tree_trimmed)
 
         if fmt == ElementTreeFormat.HTML:
-            return "".join(
-                json_to_html(element, need_skyvern_attrs=html_need_skyvern_attrs)
-                for element in self.element_tree_trimmed
-            )
+            return self._get_element_tree_html("full", self.element_tree_trimmed, html_need_skyvern_attrs)
 
         raise UnknownElementTreeFormat(fmt=fmt)
 
@@ -201,22 +446,38 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
         fmt: ElementTreeFormat = ElementTreeFormat.HTML,
         html_need_skyvern_attrs: bool = True,
         percent_to_keep: float = 1,
+        max_tokens: int | None = None,
     ) -> str:
         """
         Economy elements tree doesn't include secondary elements like SVG, etc
+        If max_tokens is set, the tree is pruned to fit in it with prune_element_tree, instead of cutting the HTML
+        string with percent_to_keep.
         """
         if not self.economy_element_tree:
             economy_elements = []
-            copied_element_tree_trimmed = copy.deepcopy(self.element_tree_trimmed)
 
             # Process each root element
-            for root_element in copied_element_tree_trimmed:
+            for root_element in self.element_tree_trimmed:
                 processed_element = self._process_element_for_economy_tree(root_element)
                 if processed_element:
                     economy_elements.append(processed_element)
 
             self.economy_element_tree = economy_elements
 
+        if max_tokens is not None:
+            pruned_element_tree = prune_element_tree(
+                self.economy_element_tree,
+                max_tokens,
+                need_skyvern_attrs=html_need_skyvern_attrs,
+                subtree_token_counts=self._subtree_token_counts.setdefault(html_need_skyvern_attrs, {}),
+            )
+            self.last_used_element_tree = pruned_element_tree
+            if fmt == ElementTreeFormat.JSON:
+                return json.dumps(pruned_element_tree)
+            if fmt == ElementTreeFormat.HTML:
+                return element_tree_to_html(pruned_element_tree, need_skyvern_attrs=html_need_skyvern_attrs)
+            raise UnknownElementTreeFormat(fmt=fmt)
+
         self.last_used_element_tree = self.economy_element_tree
 
         if fmt == ElementTreeFormat.JSON:
@@ -224,10 +485,7 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
             return element_str[: int(len(element_str) * percent_to_keep)]
 
         if fmt == ElementTreeFormat.HTML:
-            element_str = "".join(
-                json_to_html(element, need_skyvern_attrs=html_need_skyvern_attrs)
-                for element in self.economy_element_tree
-            )
+            element_str = self._get_element_tree_html("economy", self.economy_element_tree, html_need_skyvern_attrs)
             return element_str[: int(len(element_str) * percent_to_keep)]
 
         raise UnknownElementTreeFormat(fmt=fmt)
@@ -236,6 +494,8 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
         """
         Helper method to process an element for the economy tree using BFS.
         Removes SVG elements and their children.
+        The subtrees without any SVG are shared with element_tree_trimmed instead of being copied,
+        only the nodes on the path to a removed SVG are copied.
         """
         # Skip SVG elements entirely
         if element.get("tagName", "").lower() == "svg":
@@ -244,11 +504,16 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
         # Process children using BFS
         if "children" in element:
             new_children = []
+            children_changed = False
             for child in element["children"]:
                 processed_child = self._process_element_for_economy_tree(child)
+                if processed_child is not child:
+                    children_changed = True
                 if processed_child:
                     new_children.append(processed_child)
-            element["children"] = new_children
+            if children_changed:
+                element = dict(element)
+                element["children"] = new_children
         return element
 
     async def refresh(self, draw_boxes: bool = True, scroll: bool = True, max_retries: int = 0) -> Self:
@@ -268,6 +533,9 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
         self.hash_to_element_ids = refreshed_page.hash_to_element_ids
         self.element_tree = refreshed_page.element_tree
         self.element_tree_trimmed = refreshed_page.element_tree_trimmed
+        self.economy_element_tree = None
+        self._element_tree_html_cache = dict(refreshed_page._element_tree_html_cache)
+        self._dom_change_tracker_id = refreshed_page._dom_change_tracker_id
         self.screenshots = refreshed_page.screenshots or self.screenshots
         self.html = refreshed_page.html
         self.extracted_text = refreshed_page.extracted_text
@@ -280,6 +548,7 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
         scroll: bool = True,
         take_screenshots: bool = True,
         max_retries: int = 0,
+        include_html: bool = True,
     ) -> Self:
         return await self._browser_state.scrape_website(
             url=self.url,
@@ -289,7 +558,9 @@ class ScrapedPage(BaseModel, ElementTreeBuilder):
             take_screenshots=take_screenshots,
             draw_boxes=draw_boxes,
             scroll=scroll,
+            include_html=include_html,
         )
 
     async def generate_scraped_page_without_screenshots(self, max_retries: int = 0) -> Self:
-        return await self.generate_scraped_page(take_screenshots=False, max_retries=max_retries)
+        # these pages are only used to look up the elements, the html isn't needed
+        return await self.generate_scraped_page(take_screenshots=False, max_retries=max_retries, include_html=False)
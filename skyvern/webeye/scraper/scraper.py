@@ -1,7 +1,9 @@
 import asyncio
-import copy
 import json
+import uuid
 from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterator
 
 import structlog
 from playwright._impl._errors import TimeoutError
@@ -22,7 +24,7 @@ from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.settings_manager import SettingsManager
 from skyvern.forge.sdk.trace import TraceManager
 from skyvern.utils.image_resizer import Resolution
-from skyvern.utils.token_counter import count_tokens
+from skyvern.utils.token_counter import count_tokens_for_budget
 from skyvern.webeye.browser_state import BrowserState
 from skyvern.webeye.scraper.scraped_page import (
     CleanupElementTreeFunc,
@@ -30,9 +32,10 @@ from skyvern.webeye.scraper.scraped_page import (
     ElementTreeFormat,
     ScrapedPage,
     ScrapeExcludeFunc,
-    json_to_html,
+    count_element_tree_tokens,
+    element_tree_to_html,
 )
-from skyvern.webeye.utils.page import SkyvernFrame
+from skyvern.webeye.utils.page import PageSnapshot, SkyvernFrame
 
 LOG = structlog.get_logger()
 RESERVED_ATTRIBUTES = {
@@ -106,12 +109,59 @@ def clean_element_before_hashing(element: dict) -> dict:
     return clean_nested(element)
 
 
-def hash_element(element: dict) -> str:
-    hash_ready_element = clean_element_before_hashing(element)
-    # Sort the keys to ensure consistent ordering
-    element_string = json.dumps(hash_ready_element, sort_keys=True)
+def copy_element(element: dict) -> dict:
+    """
+    Copy the element and its subtree node by node, sharing the leaf values (text, rect, options, ...) with the source.
+    The cleanup and trim passes only add, replace or delete the keys of a node and its attributes, so this is as safe
+    as a deepcopy for them, without walking and duplicating every value of the tree.
+    """
+    element_copied = dict(element)
+    if "attributes" in element:
+        element_copied["attributes"] = dict(element["attributes"])
+    if "children" in element:
+        element_copied["children"] = [copy_element(child) for child in element["children"]]
+    return element_copied
+
+
+def copy_element_tree(element_tree: list[dict]) -> list[dict]:
+    return [copy_element(element) for element in element_tree]
+
+
+def _serialize_element_for_hashing(element: dict, element_hashes: dict[int, str]) -> str:
+    """
+    Serialize the element bottom-up and record the hash of every node of the subtree in element_hashes (keyed by id()).
+
+    The output is byte-identical to json.dumps(clean_element_before_hashing(element), sort_keys=True), so the hashes
+    stay compatible with the skyvern_element_hash persisted on actions. Each child fragment is serialized only once
+    and reused by its ancestors, instead of every ancestor re-cleaning and re-serializing its whole subtree.
+    """
+    parts: list[str] = []
+    for key in sorted(element):
+        if key in {"id", "rect", "frame_index"}:
+            continue
+        value = element[key]
+        if key == "attributes":
+            value_string = json.dumps(
+                {attr_key: attr_value for attr_key, attr_value in value.items() if attr_key != SKYVERN_ID_ATTR},
+                sort_keys=True,
+            )
+        elif key == "children":
+            value_string = (
+                "[" + ", ".join(_serialize_element_for_hashing(child, element_hashes) for child in value) + "]"
+            )
+        else:
+            value_string = json.dumps(value, sort_keys=True)
+        parts.append(f"{json.dumps(key)}: {value_string}")
+
+    element_string = "{" + ", ".join(parts) + "}"
+    element_hashes[id(element)] = calculate_sha256(element_string)
+    return element_string
 
-    return calculate_sha256(element_string)
+
+def hash_element(element: dict) -> str:
+    element_hashes: dict[int, str] = {}
+    _serialize_element_for_hashing(element, element_hashes)
+    return element_hashes[id(element)]
 
 
 def build_element_dict(
@@ -123,15 +173,20 @@ def build_element_dict(
     id_to_element_hash: dict[str, str] = {}
     hash_to_element_ids: dict[str, list[str]] = {}
 
+    # the elements are shared with the children of their parents, and they come in the pre-order of the tree.
+    # hashing a root fills in the hashes of its whole subtree in one pass, so the descendants are not re-serialized.
+    element_hashes: dict[int, str] = {}
     for element in elements:
         element_id: str = element.get("id", "")
         # get_interactable_element_tree marks each interactable element with a unique_id attribute
         id_to_css_dict[element_id] = f"[{SKYVERN_ID_ATTR}='{element_id}']"
         id_to_element_dict[element_id] = element
         id_to_frame_dict[element_id] = element["frame"]
-        element_hash = hash_element(element)
+        if id(element) not in element_hashes:
+            _serialize_element_for_hashing(element, element_hashes)
+        element_hash = element_hashes[id(element)]
         id_to_element_hash[element_id] = element_hash
-        hash_to_element_ids[element_hash] = hash_to_element_ids.get(element_hash, []) + [element_id]
+        hash_to_element_ids.setdefault(element_hash, []).append(element_id)
 
     return id_to_css_dict, id_to_element_dict, id_to_frame_dict, id_to_element_hash, hash_to_element_ids
 
@@ -150,6 +205,9 @@ async def scrape_website(
     scroll: bool = True,
     support_empty_page: bool = False,
     wait_seconds: float = 0,
+    include_html: bool = True,
+    skip_empty_frames: bool = False,
+    track_dom_changes: bool = False,
 ) -> ScrapedPage:
     """
     ************************************************************************************************
@@ -186,6 +244,9 @@ async def scrape_website(
             scroll=scroll,
             support_empty_page=support_empty_page,
             wait_seconds=wait_seconds,
+            include_html=include_html,
+            skip_empty_frames=skip_empty_frames,
+            track_dom_changes=track_dom_changes,
         )
     except ScrapingFailedBlankPage:
         raise
@@ -216,25 +277,32 @@ async def scrape_website(
             draw_boxes=draw_boxes,
             max_screenshot_number=max_screenshot_number,
             scroll=scroll,
+            include_html=include_html,
+            skip_empty_frames=skip_empty_frames,
+            track_dom_changes=track_dom_changes,
         )
 
 
-async def get_frame_text(iframe: Frame) -> str:
+async def get_frame_text(iframe: Frame, frame_text: str | None = None) -> str:
     """
     Get all the visible text in the iframe.
     :param iframe: Frame instance to get the text from.
+    :param frame_text: The text of the iframe itself if it's already read, only the child frames are read then.
     :return: All the visible text from the iframe.
     """
     js_script = "() => document.body.innerText"
 
-    try:
-        text = await SkyvernFrame.evaluate(frame=iframe, expression=js_script)
-    except Exception:
-        LOG.warning(
-            "failed to get text from iframe",
-            exc_info=True,
-        )
-        return ""
+    if frame_text is not None:
+        text = frame_text
+    else:
+        try:
+            text = await SkyvernFrame.evaluate(frame=iframe, expression=js_script)
+        except Exception:
+            LOG.warning(
+                "failed to get text from iframe",
+                exc_info=True,
+            )
+            return ""
 
     for child_frame in iframe.child_frames:
         if child_frame.is_detached():
@@ -269,6 +337,9 @@ async def scrape_web_unsafe(
     scroll: bool = True,
     support_empty_page: bool = False,
     wait_seconds: float = 0,
+    include_html: bool = True,
+    skip_empty_frames: bool = False,
+    track_dom_changes: bool = False,
 ) -> ScrapedPage:
     """
     Asynchronous function that performs web scraping without any built-in error handling. This function is intended
@@ -278,6 +349,9 @@ async def scrape_web_unsafe(
     :param browser_context: BrowserContext instance used for scraping.
     :param url: URL of the web page to be scraped. Used only when creating a new page.
     :param page: Optional Page instance for scraping, a new page is created if None.
+    :param include_html: Whether to read the full HTML of the page, it's often several MB and only used for artifacts.
+    :param track_dom_changes: Whether to start the DOM change tracker even if ENABLE_INCREMENTAL_SCRAPE is off, e.g. to
+        check the page is unchanged before adopting a plan built from this scraping.
     :return: Tuple containing Page instance, base64 encoded screenshot, and page elements.
     :note: This function does not handle exceptions. Ensure proper error handling in the calling context.
     """
@@ -301,21 +375,33 @@ async def scrape_web_unsafe(
         LOG.info(f"Waiting for {wait_seconds} seconds before scraping the website.", wait_seconds=wait_seconds)
         await asyncio.sleep(wait_seconds)
 
-    elements, element_tree = await get_interactable_element_tree(page, scrape_exclude)
+    dom_change_tracker_id = (
+        uuid.uuid4().hex if SettingsManager.get_settings().ENABLE_INCREMENTAL_SCRAPE or track_dom_changes else None
+    )
+    elements, element_tree = await get_interactable_element_tree(
+        page,
+        scrape_exclude,
+        skip_empty_frames=skip_empty_frames,
+        dom_change_tracker_id=dom_change_tracker_id,
+    )
     if not elements and not support_empty_page:
         LOG.warning("No elements found on the page, wait and retry")
         await empty_page_retry_wait()
-        elements, element_tree = await get_interactable_element_tree(page, scrape_exclude)
+        elements, element_tree = await get_interactable_element_tree(
+            page,
+            scrape_exclude,
+            skip_empty_frames=skip_empty_frames,
+            dom_change_tracker_id=dom_change_tracker_id,
+        )
 
-    element_tree = await cleanup_element_tree(page, url, copy.deepcopy(element_tree))
-    element_tree_trimmed = trim_element_tree(copy.deepcopy(element_tree))
+    element_tree = await cleanup_element_tree(page, url, copy_element_tree(element_tree))
+    element_tree_trimmed = trim_element_tree(copy_element_tree(element_tree))
 
     screenshots = []
+    element_tree_trimmed_html_str: str | None = None
     if take_screenshots:
-        element_tree_trimmed_html_str = "".join(
-            json_to_html(element, need_skyvern_attrs=False) for element in element_tree_trimmed
-        )
-        token_count = count_tokens(element_tree_trimmed_html_str)
+        element_tree_trimmed_html_str = element_tree_to_html(element_tree_trimmed, need_skyvern_attrs=False)
+        token_count = _count_element_tree_tokens_for_budget(element_tree_trimmed, element_tree_trimmed_html_str)
         if token_count > DEFAULT_MAX_TOKENS:
             max_screenshot_number = min(max_screenshot_number, 1)
 
@@ -334,13 +420,12 @@ async def scrape_web_unsafe(
     if not elements and not support_empty_page:
         raise NoElementFound()
 
-    text_content = await get_frame_text(page.main_frame)
-
-    html = ""
+    # read after the screenshots, so the content loaded by scrolling the page is included
+    snapshot: PageSnapshot | None = None
     window_dimension = None
     try:
         skyvern_frame = await SkyvernFrame.create_instance(frame=page)
-        html = await skyvern_frame.get_content()
+        snapshot = await skyvern_frame.get_page_snapshot(include_html=include_html)
         if page.viewport_size:
             window_dimension = Resolution(width=page.viewport_size["width"], height=page.viewport_size["height"])
     except Exception:
@@ -349,8 +434,11 @@ async def scrape_web_unsafe(
             url=url,
             exc_info=True,
         )
+    # the text of the main frame comes with the snapshot, only the child frames are read here
+    text_content = await get_frame_text(page.main_frame, frame_text=snapshot.text if snapshot else None)
+    html = (snapshot.html or "") if snapshot else ""
 
-    return ScrapedPage(
+    scraped_page = ScrapedPage(
         elements=elements,
         id_to_css_dict=id_to_css_dict,
         id_to_element_dict=id_to_element_dict,
@@ -368,11 +456,327 @@ async def scrape_web_unsafe(
         _clean_up_func=cleanup_element_tree,
         _scrape_exclude=scrape_exclude,
     )
+    if element_tree_trimmed_html_str is not None:
+        scraped_page.set_element_tree_html(element_tree_trimmed_html_str, need_skyvern_attrs=False)
+    # the tracker only observes the main frame, the changes inside the iframes can't be detected
+    if dom_change_tracker_id and not page.main_frame.child_frames:
+        scraped_page.set_dom_change_tracker_id(dom_change_tracker_id)
+    return scraped_page
+
+
+@TraceManager.traced_async(ignore_input=True)
+async def is_page_unchanged_since_scraping(
+    browser_state: BrowserState,
+    scraped_page: ScrapedPage,
+    require_dom_tracking: bool = True,
+) -> bool:
+    """
+    Whether the working page is still the page scraped_page was scraped from and its DOM has not changed since.
+    False whenever it can't be told for sure.
+    :param require_dom_tracking: If False and the DOM changes of scraped_page aren't tracked (the tracker isn't
+        enabled, or the page has frames), only the URL is compared.
+    """
+    tracker_id = scraped_page.get_dom_change_tracker_id()
+    if tracker_id is None and require_dom_tracking:
+        return False
+
+    page = await browser_state.get_working_page()
+    if page is None or page.url != scraped_page.url:
+        return False
+    if tracker_id is None:
+        return True
+    # the tracker only observes the main frame, the frames added since the scraping can't be told apart
+    if page.main_frame.child_frames:
+        return False
+
+    try:
+        skyvern_frame = await SkyvernFrame.create_instance(frame=page)
+        dom_change_count = await skyvern_frame.get_dom_change_count(tracker_id)
+    except Exception:
+        LOG.warning("Failed to get the DOM change count", url=page.url, exc_info=True)
+        return False
+
+    if dom_change_count != 0:
+        LOG.debug("DOM changed since the last scraping", url=page.url, dom_change_count=dom_change_count)
+        return False
+    return True
+
+
+@dataclass
+class ChangedSubtree:
+    """An element which changed since the scraping, with the elements and the trees scraped again to replace it."""
+
+    element_id: str
+    elements: list[dict]
+    element_tree: list[dict]
+    # the element_tree after the cleanup, for the cleaned up element tree of the scraped page
+    element_tree_cleaned: list[dict]
+
+
+def _find_element_in_tree(element_tree: list[dict], element_id: str) -> tuple[list[dict], int] | None:
+    """The list holding the element in the tree and its index in it."""
+    siblings_to_visit = [element_tree]
+    while siblings_to_visit:
+        siblings = siblings_to_visit.pop()
+        for index, element in enumerate(siblings):
+            if element.get("id") == element_id:
+                return siblings, index
+            if element.get("children"):
+                siblings_to_visit.append(element["children"])
+    return None
+
+
+def _iter_element_ids(element_tree: list[dict]) -> Iterator[str]:
+    elements_to_visit = list(element_tree)
+    while elements_to_visit:
+        element = elements_to_visit.pop()
+        if "id" in element:
+            yield element["id"]
+        elements_to_visit.extend(element.get("children", []))
+
+
+def patch_element_trees(
+    elements: list[dict],
+    element_tree: list[dict],
+    changed_subtrees: list[ChangedSubtree],
+) -> tuple[list[dict], list[dict]] | None:
+    """
+    Replace the changed elements and their subtrees by the ones scraped again, in the elements and in the cleaned up
+    element tree of a scraped page. The elements stay in the order of the page. The given lists and elements are left
+    unchanged: the element tree is copied, and so are the ancestors of the changed elements, which get new children.
+    :return: The patched elements and element tree, None if a changed element isn't part of them.
+    """
+    id_to_element = {element["id"]: element for element in elements}
+    parent_ids: dict[str, str] = {}
+    for element in elements:
+        for child in element.get("children", []):
+            parent_ids[child["id"]] = element["id"]
+
+    element_tree = copy_element_tree(element_tree)
+    subtree_by_id: dict[str, ChangedSubtree] = {}
+    removed_ids: set[str] = set()
+    copied_ancestors: dict[str, dict] = {}
+    for changed_subtree in changed_subtrees:
+        element_id = changed_subtree.element_id
+        location = _find_element_in_tree(element_tree, element_id)
+        if location is None or element_id not in id_to_element:
+            return None
+        siblings, index = location
+        removed_ids.update(_iter_element_ids([siblings[index], id_to_element[element_id]]))
+        siblings[index : index + 1] = changed_subtree.element_tree_cleaned
+        subtree_by_id[element_id] = changed_subtree
+
+        ancestor_id = parent_ids.get(element_id)
+        while ancestor_id is not None and ancestor_id not in copied_ancestors:
+            copied_ancestors[ancestor_id] = dict(id_to_element[ancestor_id])
+            ancestor_id = parent_ids.get(ancestor_id)
+
+    # the children of the elements are the elements themselves, so the ancestors point to the new subtrees and copies
+    for ancestor_id, ancestor in copied_ancestors.items():
+        children: list[dict] = []
+        for child in id_to_element[ancestor_id].get("children", []):
+            if child["id"] in subtree_by_id:
+                children.extend(subtree_by_id[child["id"]].element_tree)
+            else:
+                children.append(copied_ancestors.get(child["id"], child))
+        ancestor["children"] = children
+
+    patched_elements: list[dict] = []
+    for element in elements:
+        element_id = element["id"]
+        if element_id in subtree_by_id:
+            patched_elements.extend(subtree_by_id[element_id].elements)
+        elif element_id not in removed_ids:
+            patched_elements.append(copied_ancestors.get(element_id, element))
+    return patched_elements, element_tree
+
+
+def _count_element_tree_tokens_for_budget(element_tree_trimmed: list[dict], element_tree_html: str) -> int:
+    """
+    Count the tokens of element_tree_html, the HTML of element_tree_trimmed, from the token counts of its subtrees
+    when the count can't be estimated.
+    """
+    return count_tokens_for_budget(
+        element_tree_html,
+        DEFAULT_MAX_TOKENS,
+        elements=element_tree_html,
+        count_elements_tokens=lambda _: count_element_tree_tokens(element_tree_trimmed, need_skyvern_attrs=False),
+    )
+
+
+async def _take_screenshots_of_scraped_page(
+    page: Page,
+    element_tree_trimmed: list[dict],
+    element_tree_html: str,
+    draw_boxes: bool,
+    max_screenshot_number: int,
+    scroll: bool,
+) -> list[bytes]:
+    token_count = _count_element_tree_tokens_for_budget(element_tree_trimmed, element_tree_html)
+    if token_count > DEFAULT_MAX_TOKENS:
+        max_screenshot_number = min(max_screenshot_number, 1)
+
+    return await SkyvernFrame.take_split_screenshots(
+        page=page,
+        url=page.url,
+        draw_boxes=draw_boxes,
+        max_number=max_screenshot_number,
+        scroll=scroll,
+    )
+
+
+async def _patch_changed_scraped_page(
+    browser_state: BrowserState,
+    scraped_page: ScrapedPage,
+    cleanup_element_tree: CleanupElementTreeFunc,
+    scrape_exclude: ScrapeExcludeFunc | None,
+    take_screenshots: bool,
+    draw_boxes: bool,
+    max_screenshot_number: int,
+    scroll: bool,
+) -> ScrapedPage | None:
+    tracker_id = scraped_page.get_dom_change_tracker_id()
+    page = await browser_state.get_working_page()
+    if tracker_id is None or page is None or page.url != scraped_page.url or page.main_frame.child_frames:
+        return None
+
+    # the tracker is restarted with the new id in the same evaluation, so the patched page keeps tracking the changes
+    new_tracker_id = uuid.uuid4().hex
+    try:
+        skyvern_frame = await SkyvernFrame.create_instance(frame=page)
+        subtrees = await skyvern_frame.build_changed_subtrees(
+            tracker_id,
+            new_tracker_id,
+            frame_name="main.frame",
+            max_changed_subtrees=SettingsManager.get_settings().INCREMENTAL_SCRAPE_MAX_CHANGED_SUBTREES,
+        )
+    except Exception:
+        LOG.warning("Failed to scrape the changed elements again", url=page.url, exc_info=True)
+        return None
+    if subtrees is None:
+        LOG.debug("The DOM changes can't be patched", url=page.url)
+        return None
+
+    changed_subtrees = [
+        ChangedSubtree(
+            element_id=subtree["id"],
+            elements=subtree["elements"],
+            element_tree=subtree["tree"],
+            element_tree_cleaned=await cleanup_element_tree(page, page.url, copy_element_tree(subtree["tree"])),
+        )
+        for subtree in subtrees
+    ]
+    patched = patch_element_trees(scraped_page.elements, scraped_page.element_tree, changed_subtrees)
+    if patched is None or not patched[0]:
+        LOG.info("The changed elements aren't in the scraped page, scraping the page again", url=page.url)
+        return None
+    elements, element_tree = patched
+
+    element_tree_trimmed = trim_element_tree(copy_element_tree(element_tree))
+    element_tree_trimmed_html_str = element_tree_to_html(element_tree_trimmed, need_skyvern_attrs=False)
+    screenshots = []
+    if take_screenshots:
+        screenshots = await _take_screenshots_of_scraped_page(
+            page, element_tree_trimmed, element_tree_trimmed_html_str, draw_boxes, max_screenshot_number, scroll
+        )
+
+    # read after the screenshots, like the full scraping, so the content loaded by scrolling the page is included
+    html = scraped_page.html
+    extracted_text = scraped_page.extracted_text
+    try:
+        snapshot = await skyvern_frame.get_page_snapshot()
+        html = snapshot.html or ""
+        extracted_text = await get_frame_text(page.main_frame, frame_text=snapshot.text)
+    except Exception:
+        LOG.warning("Failed to read the snapshot of the patched page", url=page.url, exc_info=True)
+
+    id_to_css_dict, id_to_element_dict, id_to_frame_dict, id_to_element_hash, hash_to_element_ids = build_element_dict(
+        elements
+    )
+    patched_page = ScrapedPage(
+        elements=elements,
+        id_to_css_dict=id_to_css_dict,
+        id_to_element_dict=id_to_element_dict,
+        id_to_frame_dict=id_to_frame_dict,
+        id_to_element_hash=id_to_element_hash,
+        hash_to_element_ids=hash_to_element_ids,
+        element_tree=element_tree,
+        element_tree_trimmed=element_tree_trimmed,
+        screenshots=screenshots,
+        url=page.url,
+        html=html,
+        extracted_text=extracted_text,
+        window_dimension=scraped_page.window_dimension,
+        _browser_state=browser_state,
+        _clean_up_func=cleanup_element_tree,
+        _scrape_exclude=scrape_exclude,
+    )
+    patched_page.set_element_tree_html(element_tree_trimmed_html_str, need_skyvern_attrs=False)
+    patched_page.set_dom_change_tracker_id(new_tracker_id)
+
+    LOG.info(
+        "DOM changed since the last scraping, patched the changed elements into the scraped page",
+        url=page.url,
+        changed_element_ids=[changed_subtree.element_id for changed_subtree in changed_subtrees],
+        num_elements=len(elements),
+    )
+    return patched_page
+
+
+async def reuse_scraped_page_if_unchanged(
+    browser_state: BrowserState,
+    scraped_page: ScrapedPage,
+    cleanup_element_tree: CleanupElementTreeFunc | None = None,
+    scrape_exclude: ScrapeExcludeFunc | None = None,
+    take_screenshots: bool = True,
+    draw_boxes: bool = True,
+    max_screenshot_number: int = settings.MAX_NUM_SCREENSHOTS,
+    scroll: bool = True,
+) -> ScrapedPage | None:
+    """
+    Reuse the elements, the element trees and the id maps of scraped_page if the DOM has not changed since it was
+    scraped, only the screenshots are taken again. If some scraped elements changed and cleanup_element_tree is given,
+    only the subtrees of the changed elements are scraped again and patched into them.
+    Return None when the page navigated, reloaded, or changed outside of the scraped elements; the caller is expected
+    to do a full scraping then.
+    """
+    if not await is_page_unchanged_since_scraping(browser_state, scraped_page):
+        if cleanup_element_tree is None:
+            return None
+        return await _patch_changed_scraped_page(
+            browser_state,
+            scraped_page,
+            cleanup_element_tree=cleanup_element_tree,
+            scrape_exclude=scrape_exclude,
+            take_screenshots=take_screenshots,
+            draw_boxes=draw_boxes,
+            max_screenshot_number=max_screenshot_number,
+            scroll=scroll,
+        )
+    page = await browser_state.must_get_working_page()
+
+    screenshots = []
+    if take_screenshots:
+        screenshots = await _take_screenshots_of_scraped_page(
+            page,
+            scraped_page.element_tree_trimmed,
+            scraped_page.build_element_tree(html_need_skyvern_attrs=False),
+            draw_boxes,
+            max_screenshot_number,
+            scroll,
+        )
+
+    LOG.info("DOM not changed since the last scraping, reusing the scraped page", url=page.url)
+    # the tracker ignores the bounding boxes drawn for the screenshots and keeps counting the changes from the scraping
+    reused_page = scraped_page.model_copy(update={"screenshots": screenshots})
+    # the element lookups of the last step's streamed actions are stale
+    reused_page.reset_element_lookups()
+    return reused_page
 
 
 async def get_all_children_frames(page: Page) -> list[Frame]:
     start_index = 0
-    frames = page.main_frame.child_frames
+    frames = list(page.main_frame.child_frames)
 
     while start_index < len(frames):
         frame = frames[start_index]
@@ -395,33 +799,33 @@ async def filter_frames(frames: list[Frame], scrape_exclude: ScrapeExcludeFunc |
     return filtered_frames
 
 
-async def add_frame_interactable_elements(
+async def scrape_frame_interactable_elements(
     frame: Frame,
     frame_index: int,
-    elements: list[dict],
-    element_tree: list[dict],
-) -> tuple[list[dict], list[dict]]:
+) -> tuple[str, list[dict], list[dict]] | None:
     """
-    Add the interactable element of the frame to the elements and element_tree.
+    Scrape the interactable elements of the frame.
+    :return: Tuple containing the unique_id of the frame element, the elements and the element tree of the frame.
+        None if the frame is invisible or can't be scraped.
     """
     try:
         frame_element = await frame.frame_element()
         # it will get stuck when we `frame.evaluate()` on an invisible iframe
         if not await frame_element.is_visible():
-            return elements, element_tree
+            return None
         unique_id = await frame_element.get_attribute("unique_id")
         if not unique_id:
             LOG.info(
                 "No unique_id found for frame, skipping",
                 frame_index=frame_index,
             )
-            return elements, element_tree
+            return None
     except Exception:
         LOG.warning(
             "Unable to get unique_id from frame_element",
             exc_info=True,
         )
-        return elements, element_tree
+        return None
 
     skyvern_frame = await SkyvernFrame.create_instance(frame)
     await skyvern_frame.safe_wait_for_animation_end()
@@ -429,30 +833,100 @@ async def add_frame_interactable_elements(
     frame_elements, frame_element_tree = await skyvern_frame.build_tree_from_body(
         frame_name=unique_id, frame_index=frame_index
     )
+    return unique_id, frame_elements, frame_element_tree
 
-    for element in elements:
-        if element["id"] == unique_id:
-            element["children"] = frame_element_tree
 
-    elements = elements + frame_elements
+def _get_frame_depth(frame: Frame) -> int:
+    depth = 0
+    parent_frame = frame.parent_frame
+    while parent_frame is not None:
+        depth += 1
+        parent_frame = parent_frame.parent_frame
+    return depth
 
-    return elements, element_tree
+
+async def _safe_scrape_frame_interactable_elements(
+    frame: Frame,
+    frame_index: int,
+    semaphore: asyncio.Semaphore,
+    skip_empty_frames: bool = False,
+) -> tuple[str, list[dict], list[dict]] | None:
+    current_settings = SettingsManager.get_settings()
+    context = skyvern_context.ensure_context()
+    skip_threshold = current_settings.BROWSER_SCRAPING_FRAME_SKIP_THRESHOLD
+    recheck_interval = current_settings.BROWSER_SCRAPING_FRAME_SKIP_RECHECK_INTERVAL
+    skip_empty_frames = skip_empty_frames and skip_threshold > 0
+    frame_url, child_frame_count = frame.url, len(frame.child_frames)
+    skip_count = 0
+    if skip_empty_frames:
+        # a frame which navigated or got new child frames starts over
+        previous_url, previous_child_frame_count, previous_skip_count = context.frame_skip_count_map.get(
+            frame, (frame_url, child_frame_count, 0)
+        )
+        if (previous_url, previous_child_frame_count) == (frame_url, child_frame_count):
+            skip_count = previous_skip_count
+        if skip_count >= skip_threshold and skip_count % recheck_interval != 0:
+            context.frame_skip_count_map[frame] = (frame_url, child_frame_count, skip_count + 1)
+            return None
+
+    timeout_ms = current_settings.BROWSER_SCRAPING_FRAME_TIMEOUT_MS
+    async with semaphore:
+        try:
+            async with asyncio.timeout(timeout_ms / 1000):
+                result = await scrape_frame_interactable_elements(frame, frame_index)
+        except Exception:
+            LOG.warning(
+                "Failed to scrape the frame, skipping",
+                frame_index=frame_index,
+                timeout_ms=timeout_ms,
+                exc_info=True,
+            )
+            result = None
+
+    if not skip_empty_frames:
+        return result
+    if result is None or not result[1]:
+        context.frame_skip_count_map[frame] = (frame_url, child_frame_count, skip_count + 1)
+    else:
+        context.frame_skip_count_map.pop(frame, None)
+    return result
 
 
 @TraceManager.traced_async(ignore_input=True)
 async def get_interactable_element_tree(
     page: Page,
     scrape_exclude: ScrapeExcludeFunc | None = None,
+    skip_empty_frames: bool = False,
+    dom_change_tracker_id: str | None = None,
 ) -> tuple[list[dict], list[dict]]:
     """
     Get the element tree of the page, including all the elements that are interactable.
     :param page: Page instance to get the element tree from.
+    :param skip_empty_frames: Whether to skip the frames which were invisible or empty for the previous step scrapings.
+    :param dom_change_tracker_id: Start the DOM change tracker of the main frame with this id, in the same evaluation.
     :return: Tuple containing the element tree and a map of element IDs to elements.
     """
     # main page index is 0
     skyvern_page = await SkyvernFrame.create_instance(page)
-    elements, element_tree = await skyvern_page.build_tree_from_body(frame_name="main.frame", frame_index=0)
+    elements, element_tree = await skyvern_page.build_tree_from_body(
+        frame_name="main.frame",
+        frame_index=0,
+        dom_change_tracker_id=dom_change_tracker_id,
+    )
+    await add_children_frames_interactable_elements(page, elements, scrape_exclude, skip_empty_frames)
+    return elements, element_tree
+
 
+async def add_children_frames_interactable_elements(
+    page: Page,
+    elements: list[dict],
+    scrape_exclude: ScrapeExcludeFunc | None = None,
+    skip_empty_frames: bool = False,
+) -> None:
+    """
+    Scrape the child frames of the page and attach their element trees under their iframe elements.
+    :param elements: The elements of the main frame, the elements of the frames are appended to it.
+    """
     context = skyvern_context.ensure_context()
     frames = await get_all_children_frames(page)
     frames = await filter_frames(frames, scrape_exclude)
@@ -463,16 +937,32 @@ async def get_interactable_element_tree(
             frame_index = len(context.frame_index_map) + 1
             context.frame_index_map[frame] = frame_index
 
+    # the unique_id of an iframe element is set when the frame containing it is scraped, so the frames are scraped
+    # one depth at a time, concurrently within a depth, and merged in the frame order
+    frames_by_depth: dict[int, list[Frame]] = defaultdict(list)
     for frame in frames:
-        frame_index = context.frame_index_map[frame]
-        elements, element_tree = await add_frame_interactable_elements(
-            frame,
-            frame_index,
-            elements,
-            element_tree,
+        frames_by_depth[_get_frame_depth(frame)].append(frame)
+
+    semaphore = asyncio.Semaphore(SettingsManager.get_settings().BROWSER_SCRAPING_FRAME_CONCURRENCY)
+    id_to_element: dict[str, dict] = {element["id"]: element for element in elements}
+    for depth in sorted(frames_by_depth):
+        frame_results = await asyncio.gather(
+            *[
+                _safe_scrape_frame_interactable_elements(
+                    frame, context.frame_index_map[frame], semaphore, skip_empty_frames
+                )
+                for frame in frames_by_depth[depth]
+            ]
         )
-
-    return elements, element_tree
+        for frame_result in frame_results:
+            if frame_result is None:
+                continue
+            unique_id, frame_elements, frame_element_tree = frame_result
+            if unique_id in id_to_element:
+                id_to_element[unique_id]["children"] = frame_element_tree
+            elements.extend(frame_elements)
+            for element in frame_elements:
+                id_to_element.setdefault(element["id"], element)
 
 
 class IncrementalScrapePage(ElementTreeBuilder):
@@ -517,8 +1007,8 @@ class IncrementalScrapePage(ElementTreeBuilder):
 
         self.elements = incremental_elements
 
-        incremental_tree = await cleanup_element_tree(frame, frame.url, copy.deepcopy(incremental_tree))
-        trimmed_element_tree = trim_element_tree(copy.deepcopy(incremental_tree))
+        incremental_tree = await cleanup_element_tree(frame, frame.url, copy_element_tree(incremental_tree))
+        trimmed_element_tree = trim_element_tree(copy_element_tree(incremental_tree))
 
         self.element_tree = incremental_tree
         self.element_tree_trimmed = trimmed_element_tree
@@ -602,12 +1092,7 @@ class IncrementalScrapePage(ElementTreeBuilder):
         return None
 
     def build_html_tree(self, element_tree: list[dict] | None = None, need_skyvern_attrs: bool = True) -> str:
-        return "".join(
-            [
-                json_to_html(element, need_skyvern_attrs=need_skyvern_attrs)
-                for element in (element_tree or self.element_tree_trimmed)
-            ]
-        )
+        return element_tree_to_html(element_tree or self.element_tree_trimmed, need_skyvern_attrs=need_skyvern_attrs)
 
     def support_economy_elements_tree(self) -> bool:
         return False
@@ -629,6 +1114,7 @@ class IncrementalScrapePage(ElementTreeBuilder):
         fmt: ElementTreeFormat = ElementTreeFormat.HTML,
         html_need_skyvern_attrs: bool = True,
         percent_to_keep: float = 1,
+        max_tokens: int | None = None,
     ) -> str:
         raise NotImplementedError("Not implemented")
 
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import typing
 from enum import StrEnum
 from random import uniform
@@ -28,7 +27,7 @@ from skyvern.exceptions import (
 from skyvern.experimentation.wait_utils import get_or_create_wait_config, get_wait_time, scroll_into_view_wait
 from skyvern.webeye.actions import handler_utils
 from skyvern.webeye.scraper.scraped_page import ScrapedPage, json_to_html
-from skyvern.webeye.scraper.scraper import IncrementalScrapePage, trim_element
+from skyvern.webeye.scraper.scraper import IncrementalScrapePage, copy_element, trim_element
 from skyvern.webeye.utils.page import SkyvernFrame
 
 LOG = structlog.get_logger()
@@ -143,7 +142,7 @@ class SkyvernElement:
     def build_HTML(self, need_trim_element: bool = True, need_skyvern_attrs: bool = True) -> str:
         element_dict = self.get_element_dict()
         if need_trim_element:
-            element_dict = trim_element(copy.deepcopy(element_dict))
+            element_dict = trim_element(copy_element(element_dict))
 
         return json_to_html(element_dict, need_skyvern_attrs)
 
@@ -997,6 +996,14 @@ class DomUtil:
         return False
 
     async def get_skyvern_element_by_id(self, element_id: str) -> SkyvernElement:
+        # the element of the first streamed action may already be looked up. a failed lookup is resolved again, the
+        # miss may be transient
+        lookup = self.scraped_page.pop_element_lookup(element_id)
+        if lookup is not None and lookup.done() and not lookup.cancelled() and lookup.exception() is None:
+            return lookup.result()
+        return await self.resolve_skyvern_element_by_id(element_id)
+
+    async def resolve_skyvern_element_by_id(self, element_id: str) -> SkyvernElement:
         element = self.scraped_page.id_to_element_dict.get(element_id)
         if not element:
             raise MissingElementDict(element_id)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import time
+from dataclasses import dataclass
 from enum import StrEnum
 from io import BytesIO
 from typing import Any
@@ -34,12 +35,44 @@ def load_js_script() -> str:
 
 JS_FUNCTION_DEFS = load_js_script()
 
+# chromium can't capture a texture higher than this in one go
+FULL_PAGE_CAPTURE_MAX_HEIGHT = 16384
+
 
 class ScreenshotMode(StrEnum):
     LITE = "lite"
     DETAILED = "detailed"
 
 
+@dataclass
+class PageSnapshot:
+    text: str
+    # None when the html isn't requested
+    html: str | None
+    viewport_width: int
+    viewport_height: int
+    scroll_width: int
+    scroll_height: int
+    scroll_x: int
+    scroll_y: int
+
+    @classmethod
+    def from_js(cls, snapshot: dict[str, Any]) -> PageSnapshot:
+        viewport_width, viewport_height = snapshot["viewport"]
+        scroll_width, scroll_height = snapshot["scroll_size"]
+        scroll_x, scroll_y = snapshot["scroll_position"]
+        return cls(
+            text=snapshot["text"],
+            html=snapshot["html"],
+            viewport_width=viewport_width,
+            viewport_height=viewport_height,
+            scroll_width=scroll_width,
+            scroll_height=scroll_height,
+            scroll_x=scroll_x,
+            scroll_y=scroll_y,
+        )
+
+
 async def _page_screenshot_helper(
     page: Page,
     file_path: str | None = None,
@@ -101,6 +134,93 @@ async def _current_viewpoint_screenshot_helper(
         raise FailedToTakeScreenshot(error_message=str(e)) from e
 
 
+def _get_scrolling_positions(
+    viewport_height: int, scroll_height: int, max_number: int, need_overlap: bool = True
+) -> list[int]:
+    """Return the scroll positions which scrollToNextPage goes through, with the same stop condition."""
+    step = viewport_height - 200 if need_overlap else viewport_height
+    max_scroll_y = max(scroll_height - viewport_height, 0)
+    positions = [0]
+    while len(positions) < max_number:
+        next_position = min(positions[-1] + step, max_scroll_y)
+        if next_position - positions[-1] <= 25:
+            break
+        positions.append(next_position)
+    return positions
+
+
+def _split_full_page_screenshot(
+    screenshot: bytes, positions: list[int], viewport_width: int, viewport_height: int
+) -> list[bytes]:
+    with Image.open(BytesIO(screenshot)) as img:
+        img.load()
+        # the capture is in device pixels, positions are in CSS pixels
+        scale = img.width / viewport_width
+        tiles: list[bytes] = []
+        for position in positions:
+            top = round(position * scale)
+            bottom = min(round((position + viewport_height) * scale), img.height)
+            buffer = BytesIO()
+            img.crop((0, top, img.width, bottom)).save(buffer, format="PNG")
+            tiles.append(buffer.getvalue())
+    return tiles
+
+
+async def _full_page_screenshots_helper(
+    page: Page,
+    skyvern_page: SkyvernFrame,
+    frame: str,
+    frame_index: int,
+    draw_boxes: bool,
+    max_number: int,
+    url: str | None = None,
+) -> tuple[list[bytes], list[int]] | None:
+    """
+    Take the split screenshots with a single full page capture instead of scrolling and capturing page by page.
+    Return None when the page can't be captured this way, the caller should fall back to scrolling.
+    """
+    blocker = await skyvern_page.get_full_page_capture_blocker()
+    if blocker:
+        LOG.debug("Page can't be captured in a single pass, fallback to scrolling", url=url, blocker=blocker)
+        return None
+
+    viewport_width, viewport_height = await skyvern_page.get_viewport_width_and_height()
+    _, scroll_height = await skyvern_page.get_scroll_width_and_height()
+    positions = _get_scrolling_positions(viewport_height, scroll_height, max_number)
+    capture_height = positions[-1] + viewport_height
+    if viewport_width <= 0 or viewport_height <= 0 or capture_height > FULL_PAGE_CAPTURE_MAX_HEIGHT:
+        LOG.debug(
+            "Page is too large to be captured in a single pass, fallback to scrolling",
+            url=url,
+            capture_height=capture_height,
+        )
+        return None
+
+    await skyvern_page.scroll_to_top(draw_boxes=False, frame=frame, frame_index=frame_index)
+    try:
+        if draw_boxes:
+            await skyvern_page.build_elements_and_draw_bounding_boxes_for_full_page(
+                frame=frame, frame_index=frame_index
+            )
+        await page.wait_for_load_state(timeout=SettingsManager.get_settings().BROWSER_LOADING_TIMEOUT_MS)
+        screenshot = await page.screenshot(
+            timeout=SettingsManager.get_settings().BROWSER_SCREENSHOT_TIMEOUT_MS,
+            full_page=True,
+            clip={"x": 0, "y": 0, "width": viewport_width, "height": capture_height},
+            animations="disabled",
+        )
+    finally:
+        if draw_boxes:
+            await skyvern_page.remove_bounding_boxes()
+
+    # decoding and encoding the tiles blocks for a while, keep it off the event loop
+    screenshots = await asyncio.to_thread(
+        _split_full_page_screenshot, screenshot, positions, viewport_width, viewport_height
+    )
+    LOG.debug("Captured the page in a single pass", url=url, num_screenshots=len(screenshots))
+    return screenshots, positions
+
+
 async def _scrolling_screenshots_helper(
     page: Page,
     url: str | None = None,
@@ -121,6 +241,27 @@ async def _scrolling_screenshots_helper(
     screenshots: list[bytes] = []
     positions: list[int] = []
     if await skyvern_page.is_window_scrollable():
+        if mode == ScreenshotMode.DETAILED and SettingsManager.get_settings().ENABLE_FULL_PAGE_CAPTURE_SCREENSHOTS:
+            try:
+                result = await _full_page_screenshots_helper(
+                    page=page,
+                    skyvern_page=skyvern_page,
+                    frame=frame,
+                    frame_index=frame_index,
+                    draw_boxes=draw_boxes,
+                    max_number=max_number,
+                    url=url,
+                )
+            except Exception:
+                LOG.warning(
+                    "Failed to capture the page in a single pass, fallback to scrolling",
+                    url=url,
+                    exc_info=True,
+                )
+                result = None
+            if result is not None:
+                return result
+
         scroll_y_px_old = -30.0
         _, initial_scroll_height = await skyvern_page.get_scroll_width_and_height()
         scroll_y_px = await skyvern_page.scroll_to_top(draw_boxes=draw_boxes, frame=frame, frame_index=frame_index)
@@ -213,6 +354,20 @@ def _merge_images_by_position(images: list[Image.Image], positions: list[int]) -
     return merged_img
 
 
+def _merge_screenshots_by_position(screenshots: list[bytes], positions: list[int]) -> bytes:
+    images = []
+    for screenshot in screenshots:
+        with Image.open(BytesIO(screenshot)) as img:
+            img.load()
+            images.append(img)
+
+    merged_img = _merge_images_by_position(images, positions)
+
+    buffer = BytesIO()
+    merged_img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
 class SkyvernFrame:
     @staticmethod
     async def evaluate(
@@ -266,20 +421,8 @@ class SkyvernFrame:
                 screenshots, positions = await _scrolling_screenshots_helper(
                     page=page, mode=mode, max_number=scrolling_number
                 )
-                images = []
-
-                for screenshot in screenshots:
-                    with Image.open(BytesIO(screenshot)) as img:
-                        img.load()
-                        images.append(img)
-
-                merged_img = _merge_images_by_position(images, positions)
-
-                buffer = BytesIO()
-                merged_img.save(buffer, format="PNG")
-                buffer.seek(0)
-
-                img_data = buffer.read()
+                # decoding, merging and encoding the images blocks for a while, keep it off the event loop
+                img_data = await asyncio.to_thread(_merge_screenshots_by_position, screenshots, positions)
                 if file_path is not None:
                     with open(file_path, "wb") as f:
                         f.write(img_data)
@@ -355,6 +498,10 @@ class SkyvernFrame:
         js_script = "() => getScrollWidthAndHeight()"
         return await self.evaluate(frame=self.frame, expression=js_script)
 
+    async def get_viewport_width_and_height(self) -> tuple[int, int]:
+        js_script = "() => getViewportWidthAndHeight()"
+        return await self.evaluate(frame=self.frame, expression=js_script)
+
     async def scroll_to_x_y(self, x: int, y: int) -> None:
         js_script = "([x, y]) => scrollToXY(x, y)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=[x, y])
@@ -448,6 +595,29 @@ class SkyvernFrame:
             arg=[frame, frame_index],
         )
 
+    async def build_elements_and_draw_bounding_boxes_for_full_page(self, frame: str, frame_index: int) -> None:
+        """
+        Draw the bounding boxes of all the elements on the page, including the ones out of the viewport.
+        The page should be scrolled to the top first.
+        """
+        js_script = (
+            "async ([frame, frame_index]) => await buildElementsAndDrawBoundingBoxesForFullPage(frame, frame_index)"
+        )
+        await self.evaluate(
+            frame=self.frame,
+            expression=js_script,
+            timeout_ms=SettingsManager.get_settings().BROWSER_SCRAPING_BUILDING_ELEMENT_TREE_TIMEOUT_MS,
+            arg=[frame, frame_index],
+        )
+
+    async def get_full_page_capture_blocker(self) -> str:
+        js_script = "() => getFullPageCaptureBlocker()"
+        return await self.evaluate(
+            frame=self.frame,
+            expression=js_script,
+            timeout_ms=SettingsManager.get_settings().BROWSER_SCRAPING_BUILDING_ELEMENT_TREE_TIMEOUT_MS,
+        )
+
     async def is_window_scrollable(self) -> bool:
         js_script = "() => isWindowScrollable()"
         return await self.evaluate(frame=self.frame, expression=js_script)
@@ -489,11 +659,66 @@ class SkyvernFrame:
         self,
         frame_name: str | None,
         frame_index: int,
+        dom_change_tracker_id: str | None = None,
         timeout_ms: float = SettingsManager.get_settings().BROWSER_SCRAPING_BUILDING_ELEMENT_TREE_TIMEOUT_MS,
     ) -> tuple[list[dict], list[dict]]:
-        js_script = "async ([frame_name, frame_index]) => await buildTreeFromBody(frame_name, frame_index)"
+        """
+        With a dom_change_tracker_id, the DOM change tracker is started right after the tree is built, in the same
+        evaluation.
+        """
+        js_script = "async ([frame_name, frame_index, tracker_id]) => await buildTreeFromBody(frame_name, frame_index, tracker_id)"
         return await self.evaluate(
-            frame=self.frame, expression=js_script, timeout_ms=timeout_ms, arg=[frame_name, frame_index]
+            frame=self.frame,
+            expression=js_script,
+            timeout_ms=timeout_ms,
+            arg=[frame_name, frame_index, dom_change_tracker_id],
+        )
+
+    async def get_page_snapshot(self, include_html: bool = True) -> PageSnapshot:
+        """
+        Read the text, the html and the window metrics of the frame in a single evaluation.
+        The html is often several MB, skip it with include_html=False if it's not needed.
+        """
+        js_script = "(include_html) => getPageSnapshot(include_html)"
+        snapshot = await self.evaluate(frame=self.frame, expression=js_script, arg=include_html)
+        return PageSnapshot.from_js(snapshot)
+
+    async def start_dom_change_tracker(self, tracker_id: str) -> None:
+        js_script = "(tracker_id) => startDomChangeTracker(tracker_id)"
+        await self.evaluate(frame=self.frame, expression=js_script, arg=tracker_id)
+
+    async def get_dom_change_count(self, tracker_id: str) -> int | None:
+        """
+        Return the number of DOM changes since start_dom_change_tracker(tracker_id) was called.
+        None means the changes are unknown: the frame navigated or reloaded, or the tracker was restarted since then.
+        """
+        js_script = "(tracker_id) => getDomChangeCount(tracker_id)"
+        count = await self.evaluate(frame=self.frame, expression=js_script, arg=tracker_id)
+        if count < 0:
+            return None
+        return count
+
+    async def build_changed_subtrees(
+        self,
+        tracker_id: str,
+        new_tracker_id: str,
+        frame_name: str,
+        max_changed_subtrees: int,
+        timeout_ms: float = SettingsManager.get_settings().BROWSER_SCRAPING_BUILDING_ELEMENT_TREE_TIMEOUT_MS,
+    ) -> list[dict] | None:
+        """
+        Build again the subtrees of the topmost scraped elements changed since start_dom_change_tracker(tracker_id) was
+        called, then restart the tracker with new_tracker_id, in the same evaluation.
+        :return: A dict per changed element, with its id, and the elements and the element tree replacing it. None
+            when the changes can't be patched: the tracker was restarted, a node outside of the scraped elements
+            changed, or more than max_changed_subtrees elements changed.
+        """
+        js_script = "async ([tracker_id, new_tracker_id, frame_name, max_changed_subtrees]) => await buildChangedSubtrees(tracker_id, new_tracker_id, frame_name, max_changed_subtrees)"
+        return await self.evaluate(
+            frame=self.frame,
+            expression=js_script,
+            timeout_ms=timeout_ms,
+            arg=[tracker_id, new_tracker_id, frame_name, max_changed_subtrees],
         )
 
     @TraceManager.traced_async()
@@ -0,0 +1,49 @@
+import types
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from skyvern.forge import app
+from skyvern.forge.sdk.models import Step, StepStatus
+
+
+@pytest.fixture
+def step() -> Step:
+    now = datetime.utcnow()
+    return Step(
+        created_at=now,
+        modified_at=now,
+        task_id="tsk_1",
+        step_id="stp_1",
+        status=StepStatus.running,
+        order=0,
+        is_last=False,
+        organization_id="o_1",
+    )
+
+
+@pytest.fixture
+def dummy_db(monkeypatch: pytest.MonkeyPatch) -> types.SimpleNamespace:
+    """app.DATABASE for the artifact manager, the rows aren't stored anywhere."""
+    dummy_db = types.SimpleNamespace(
+        create_artifact=AsyncMock(side_effect=lambda *args, **kwargs: types.SimpleNamespace(uri=args[2])),
+        create_artifacts=AsyncMock(return_value=None),
+        update_step=AsyncMock(),
+        increment_steps_usage=AsyncMock(return_value=None),
+    )
+    monkeypatch.setattr(app, "DATABASE", dummy_db)
+    return dummy_db
+
+
+@pytest.fixture
+def dummy_storage(monkeypatch: pytest.MonkeyPatch) -> types.SimpleNamespace:
+    """app.STORAGE for the artifact manager, every step artifact is a file of the step directory /tmp/stp_1."""
+    dummy_storage = types.SimpleNamespace(
+        build_uri=MagicMock(
+            side_effect=lambda **kwargs: f"file:///tmp/{kwargs['step'].step_id}/{kwargs['artifact_id']}",
+        ),
+        store_artifact=AsyncMock(return_value=None),
+    )
+    monkeypatch.setattr(app, "STORAGE", dummy_storage)
+    return dummy_storage
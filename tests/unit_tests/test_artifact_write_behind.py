@@ -0,0 +1,93 @@
+import types
+
+import pytest
+
+from skyvern.forge.sdk.artifact.manager import ArtifactManager
+from skyvern.forge.sdk.artifact.models import ArtifactType
+from skyvern.forge.sdk.models import Step
+from skyvern.forge.sdk.settings_manager import SettingsManager
+
+
+@pytest.fixture(autouse=True)
+def write_behind(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(SettingsManager.get_settings(), "ENABLE_ARTIFACT_WRITE_BEHIND", True)
+    # keep the background flush out of the way, the barrier flushes everything
+    monkeypatch.setattr(SettingsManager.get_settings(), "ARTIFACT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS", 60)
+
+
+@pytest.mark.asyncio
+async def test_llm_artifacts_and_step_usage_are_written_in_batch(
+    step: Step, dummy_db: types.SimpleNamespace, dummy_storage: types.SimpleNamespace
+) -> None:
+    manager = ArtifactManager()
+
+    await manager.create_llm_artifact(
+        data=b"prompt", artifact_type=ArtifactType.LLM_PROMPT, screenshots=[b"png1", b"png2"], step=step
+    )
+    await manager.create_llm_artifact(data=b"{}", artifact_type=ArtifactType.LLM_RESPONSE, step=step)
+    await manager.record_step_usage(step=step, cost=0.5, input_tokens=10, output_tokens=2)
+    await manager.record_step_usage(step=step, cost=0.25, input_tokens=5)
+
+    # nothing is written to the database inline, the files are still uploaded right away
+    dummy_db.create_artifact.assert_not_called()
+    dummy_db.update_step.assert_not_called()
+    assert dummy_storage.store_artifact.call_count == 4
+
+    await manager.wait_for_upload_aiotasks([step.task_id])
+
+    dummy_db.create_artifacts.assert_awaited_once()
+    buffered_artifacts = dummy_db.create_artifacts.await_args.args[0]
+    assert [buffered.artifact.artifact_type for buffered in buffered_artifacts] == [
+        ArtifactType.LLM_PROMPT,
+        ArtifactType.SCREENSHOT_LLM,
+        ArtifactType.SCREENSHOT_LLM,
+        ArtifactType.LLM_RESPONSE,
+    ]
+    assert all(buffered.artifact.step_id == step.step_id for buffered in buffered_artifacts)
+
+    dummy_db.increment_steps_usage.assert_awaited_once()
+    (usage,) = dummy_db.increment_steps_usage.await_args.args[0]
+    assert usage.step_id == step.step_id
+    assert usage.cost == 0.75
+    assert usage.input_tokens == 15
+    assert usage.output_tokens == 2
+
+    if manager._flush_aiotask:
+        manager._flush_aiotask.cancel()
+
+
+@pytest.mark.asyncio
+async def test_a_failed_batch_is_written_row_by_row(
+    step: Step, dummy_db: types.SimpleNamespace, dummy_storage: types.SimpleNamespace
+) -> None:
+    inserted_artifact_types: list[ArtifactType] = []
+
+    async def create_artifacts(artifacts):
+        if len(artifacts) > 1:
+            raise RuntimeError("batch insert failed")
+        if artifacts[0].artifact.artifact_type == ArtifactType.LLM_RESPONSE:
+            raise RuntimeError("bad row")
+        inserted_artifact_types.append(artifacts[0].artifact.artifact_type)
+
+    dummy_db.create_artifacts.side_effect = create_artifacts
+    dummy_db.increment_steps_usage.side_effect = [RuntimeError("batch update failed"), None, None]
+
+    manager = ArtifactManager()
+    other_step = step.model_copy(update={"step_id": "stp_2"})
+
+    await manager.create_llm_artifact(data=b"prompt", artifact_type=ArtifactType.LLM_PROMPT, step=step)
+    await manager.create_llm_artifact(data=b"{}", artifact_type=ArtifactType.LLM_RESPONSE, step=step)
+    await manager.create_llm_artifact(data=b"{}", artifact_type=ArtifactType.LLM_RESPONSE_PARSED, step=step)
+    await manager.record_step_usage(step=step, cost=0.5)
+    await manager.record_step_usage(step=other_step, cost=0.25)
+    await manager.flush_buffered_writes()
+
+    # only the bad row is lost
+    assert inserted_artifact_types == [ArtifactType.LLM_PROMPT, ArtifactType.LLM_RESPONSE_PARSED]
+    assert [call.args[0][0].step_id for call in dummy_db.increment_steps_usage.await_args_list[1:]] == [
+        "stp_1",
+        "stp_2",
+    ]
+
+    if manager._flush_aiotask:
+        manager._flush_aiotask.cancel()
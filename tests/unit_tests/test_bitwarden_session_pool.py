@@ -0,0 +1,144 @@
+import asyncio
+import json
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from skyvern.config import settings
+from skyvern.forge.sdk.services.bitwarden import BitwardenService
+from skyvern.forge.sdk.services.bitwarden_session_pool import BitwardenSessionPool
+from skyvern.forge.sdk.services.vault_session_cache import VaultSessionCache
+
+# a stand-in for the bw CLI, keeping its login state in BITWARDENCLI_APPDATA_DIR like the real one
+FAKE_BW = """
+import json
+import os
+import sys
+import uuid
+
+data_dir = os.environ["BITWARDENCLI_APPDATA_DIR"]
+os.makedirs(data_dir, exist_ok=True)
+state_path = os.path.join(data_dir, "state.json")
+state = json.load(open(state_path)) if os.path.exists(state_path) else {"status": "unauthenticated", "session": None}
+with open(os.environ["FAKE_BW_LOG"], "a") as log:
+    log.write(json.dumps({"command": sys.argv[1], "data_dir": data_dir}) + "\\n")
+
+command = sys.argv[1]
+if command == "login":
+    state["status"] = "locked"
+    print("You are logged in!")
+elif command == "unlock":
+    state["status"] = "unlocked"
+    state["session"] = uuid.uuid4().hex
+    print("Your vault is now unlocked!")
+    print('$ export BW_SESSION="' + state["session"] + '"')
+elif command == "status":
+    session = sys.argv[sys.argv.index("--session") + 1]
+    print(json.dumps({"status": state["status"] if session == state["session"] else "locked"}))
+elif command == "logout":
+    state = {"status": "unauthenticated", "session": None}
+    print("You have logged out.")
+elif command == "sync":
+    print("Syncing complete.")
+json.dump(state, open(state_path, "w"))
+"""
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def bw_log(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    bw_path = tmp_path / "bw"
+    bw_path.write_text(f"#!{sys.executable}\n{FAKE_BW}")
+    bw_path.chmod(bw_path.stat().st_mode | stat.S_IEXEC)
+    log_path = tmp_path / "bw.log"
+    log_path.touch()
+    monkeypatch.setattr(settings, "BITWARDEN_CLI_PATH", str(bw_path))
+    monkeypatch.setattr(settings, "BITWARDEN_EMAIL", None)
+    monkeypatch.setenv("FAKE_BW_LOG", str(log_path))
+    return log_path
+
+
+def _bw_calls(log_path: Path) -> list[dict[str, str]]:
+    return [json.loads(line) for line in log_path.read_text().splitlines()]
+
+
+def _pool(tmp_path: Path, clock: FakeClock, size: int = 2) -> BitwardenSessionPool:
+    return BitwardenSessionPool(
+        size=size,
+        session_cache=VaultSessionCache(ttl_seconds=3600, clock=clock),
+        sync_interval_seconds=300,
+        health_check_interval_seconds=60,
+        data_dir=str(tmp_path / "sessions"),
+        clock=clock,
+    )
+
+
+async def _lease(pool: BitwardenSessionPool, organization_id: str) -> str:
+    async with pool.lease(organization_id, "client-id", "client-secret", "master-password") as session:
+        status = await BitwardenService.get_status(session.session_key, session.env)
+        assert status == "unlocked"
+        return session.env["BITWARDENCLI_APPDATA_DIR"]
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_unlocked_once_and_isolated_per_organization(tmp_path: Path, bw_log: Path) -> None:
+    pool = _pool(tmp_path, FakeClock())
+
+    first_dir = await _lease(pool, "o_1")
+    second_dir = await _lease(pool, "o_1")
+    other_dir = await _lease(pool, "o_2")
+
+    commands = [call["command"] for call in _bw_calls(bw_log) if call["command"] != "status"]
+    # o_1 reused its session, o_2 got its own login
+    assert commands == ["login", "unlock", "sync", "login", "unlock", "sync"]
+    assert first_dir == second_dir
+    assert other_dir != first_dir
+
+    await pool.close()
+    # only the sessions which logged in are logged out, and their logins are removed from the disk
+    assert [call["command"] for call in _bw_calls(bw_log)].count("logout") == 2
+    assert not Path(first_dir).exists() and not Path(other_dir).exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_leases_use_separate_sessions(tmp_path: Path, bw_log: Path) -> None:
+    pool = _pool(tmp_path, FakeClock())
+
+    data_dirs = await asyncio.gather(_lease(pool, "o_1"), _lease(pool, "o_1"))
+
+    assert len(set(data_dirs)) == 2
+    assert pool.stats() == {"accounts": 1, "free_sessions": 2}
+
+
+@pytest.mark.asyncio
+async def test_locked_sessions_are_unlocked_again_and_synced_on_schedule(tmp_path: Path, bw_log: Path) -> None:
+    clock = FakeClock()
+    pool = _pool(tmp_path, clock, size=1)
+    data_dir = await _lease(pool, "o_1")
+
+    clock.now = 100
+    await _lease(pool, "o_1")
+    # the session is still unlocked and was synced less than the sync interval ago
+    assert [call["command"] for call in _bw_calls(bw_log)][-2:] == ["status", "status"]
+
+    clock.now = 400
+    await _lease(pool, "o_1")
+    assert [call["command"] for call in _bw_calls(bw_log)][-3:] == ["status", "sync", "status"]
+
+    # the vault got locked outside of the pool
+    state_path = Path(data_dir) / "state.json"
+    state_path.write_text(json.dumps({**json.loads(state_path.read_text()), "status": "locked"}))
+    clock.now = 500
+    await _lease(pool, "o_1")
+
+    commands = [call["command"] for call in _bw_calls(bw_log)]
+    assert commands[-5:] == ["status", "login", "unlock", "sync", "status"]
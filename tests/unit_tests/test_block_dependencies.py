@@ -0,0 +1,113 @@
+from datetime import datetime
+
+from skyvern.forge.sdk.workflow.block_dependencies import build_block_dependencies
+from skyvern.forge.sdk.workflow.models.block import (
+    FileParserBlock,
+    HttpRequestBlock,
+    NavigationBlock,
+    SendEmailBlock,
+    TextPromptBlock,
+)
+from skyvern.forge.sdk.workflow.models.parameter import AWSSecretParameter, OutputParameter
+from skyvern.schemas.workflows import FileType
+
+
+def _output_parameter(label: str) -> OutputParameter:
+    now = datetime.now()
+    return OutputParameter(
+        key=f"{label}_output",
+        output_parameter_id=f"op_{label}",
+        workflow_id="w_1",
+        created_at=now,
+        modified_at=now,
+    )
+
+
+def _secret_parameter(key: str) -> AWSSecretParameter:
+    now = datetime.now()
+    return AWSSecretParameter(
+        key=key,
+        aws_secret_parameter_id=f"asp_{key}",
+        workflow_id="w_1",
+        aws_key=key,
+        created_at=now,
+        modified_at=now,
+    )
+
+
+def test_blocks_reading_only_workflow_parameters_have_no_dependencies() -> None:
+    blocks = [
+        NavigationBlock(label="login", output_parameter=_output_parameter("login"), url="https://example.com"),
+        TextPromptBlock(label="summary", output_parameter=_output_parameter("summary"), prompt="Summarize {{ topic }}"),
+        NavigationBlock(label="search", output_parameter=_output_parameter("search"), url="https://example.com/s"),
+    ]
+
+    assert build_block_dependencies(blocks) == {
+        "login": set(),
+        "summary": set(),
+        # the browser blocks share the browser
+        "search": {"login"},
+    }
+
+
+def test_blocks_with_side_effects_wait_for_every_block_before_them() -> None:
+    blocks = [
+        NavigationBlock(label="login", output_parameter=_output_parameter("login"), url="https://example.com"),
+        TextPromptBlock(label="summary", output_parameter=_output_parameter("summary"), prompt="Summarize {{ topic }}"),
+        HttpRequestBlock(label="ping", output_parameter=_output_parameter("ping"), url="https://example.com/ping"),
+        TextPromptBlock(label="title", output_parameter=_output_parameter("title"), prompt="Title {{ topic }}"),
+    ]
+
+    assert build_block_dependencies(blocks) == {
+        "login": set(),
+        "summary": set(),
+        "ping": {"login", "summary"},
+        "title": set(),
+    }
+
+
+def test_blocks_reading_outputs_depend_on_the_blocks_producing_them() -> None:
+    blocks = [
+        TextPromptBlock(label="summary", output_parameter=_output_parameter("summary"), prompt="Summarize {{ topic }}"),
+        HttpRequestBlock(
+            label="report",
+            output_parameter=_output_parameter("report"),
+            url="https://example.com/report",
+            body={"summary": "{{ summary_output.llm_response }}"},
+        ),
+        FileParserBlock(
+            label="parse",
+            output_parameter=_output_parameter("parse"),
+            file_url="report_output",
+            file_type=FileType.CSV,
+        ),
+        TextPromptBlock(label="unparsable", output_parameter=_output_parameter("unparsable"), prompt="{{ oops"),
+    ]
+
+    assert build_block_dependencies(blocks) == {
+        "summary": set(),
+        "report": {"summary"},
+        "parse": {"report"},
+        "unparsable": {"summary", "report", "parse"},
+    }
+
+
+def test_blocks_reading_the_downloads_wait_for_the_browser_blocks() -> None:
+    blocks = [
+        NavigationBlock(label="download", output_parameter=_output_parameter("download"), url="https://example.com"),
+        SendEmailBlock(
+            label="email",
+            output_parameter=_output_parameter("email"),
+            smtp_host=_secret_parameter("smtp_host"),
+            smtp_port=_secret_parameter("smtp_port"),
+            smtp_username=_secret_parameter("smtp_username"),
+            smtp_password=_secret_parameter("smtp_password"),
+            sender="bot@example.com",
+            recipients=["me@example.com"],
+            subject="Files",
+            body="Attached",
+            file_attachments=["SKYVERN_DOWNLOAD_DIRECTORY"],
+        ),
+    ]
+
+    assert build_block_dependencies(blocks)["email"] == {"download"}
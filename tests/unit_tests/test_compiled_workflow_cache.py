@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from types import ModuleType
+from unittest.mock import MagicMock
+
+from skyvern.forge.sdk.workflow.compiled_workflow_cache import CompiledWorkflowCache
+from skyvern.forge.sdk.workflow.models.block import NavigationBlock, TextPromptBlock
+from skyvern.forge.sdk.workflow.models.parameter import OutputParameter
+from skyvern.forge.sdk.workflow.models.workflow import WorkflowDefinition
+
+MODIFIED_AT = datetime(2026, 1, 1)
+
+
+def _output_parameter(label: str) -> OutputParameter:
+    return OutputParameter(
+        key=f"{label}_output",
+        output_parameter_id=f"op_{label}",
+        workflow_id="w_1",
+        created_at=MODIFIED_AT,
+        modified_at=MODIFIED_AT,
+    )
+
+
+def _workflow_definition() -> WorkflowDefinition:
+    return WorkflowDefinition(
+        parameters=[],
+        blocks=[
+            NavigationBlock(
+                label="search",
+                output_parameter=_output_parameter("search"),
+                url="https://example.com/?q={{ query }}",
+            ),
+            TextPromptBlock(label="summary", output_parameter=_output_parameter("summary"), prompt="Summarize {{ oops"),
+        ],
+    )
+
+
+def _workflow(modified_at: datetime = MODIFIED_AT) -> MagicMock:
+    return MagicMock(workflow_id="w_1", version=1, modified_at=modified_at)
+
+
+def test_the_definition_is_validated_once_and_handed_out_as_copies() -> None:
+    cache = CompiledWorkflowCache(max_size=2)
+    validate = MagicMock(side_effect=_workflow_definition)
+
+    first = cache.get_workflow_definition("w_1", 1, MODIFIED_AT, validate)
+    # a run formatting its blocks doesn't change the cached definition
+    first.blocks[0].url = "https://example.com/?q=shoes"
+    second = cache.get_workflow_definition("w_1", 1, MODIFIED_AT, validate)
+
+    assert validate.call_count == 1
+    assert second.blocks[0].url == "https://example.com/?q={{ query }}"
+    template = cache.get_template("https://example.com/?q={{ query }}")
+    assert template is not None and template.render(query="hats") == "https://example.com/?q=hats"
+    # the unparsable template is left to the block
+    assert cache.get_template("Summarize {{ oops") is None
+
+
+def test_graph_and_script_modules_are_dropped_with_their_workflow() -> None:
+    cache = CompiledWorkflowCache(max_size=2)
+    cache.get_workflow_definition("w_1", 1, MODIFIED_AT, _workflow_definition)
+    script_module = ModuleType("user_script")
+    cache.set_workflow_graph(_workflow(), "search", {"search": "summary", "summary": None})
+    cache.set_script_module(_workflow(), "sr_1", script_module)
+
+    assert cache.get_workflow_graph(_workflow()) == ("search", {"search": "summary", "summary": None})
+    assert cache.get_script_module(_workflow(), "sr_1") is script_module
+
+    # a workflow updated in place by another process has a new modified_at
+    assert cache.get_workflow_graph(_workflow(MODIFIED_AT + timedelta(seconds=1))) is None
+    assert cache.get_script_module(_workflow(), "sr_1") is None
+
+    cache.get_workflow_definition("w_1", 1, MODIFIED_AT, _workflow_definition)
+    cache.invalidate("w_1")
+    assert cache.get_template("https://example.com/?q={{ query }}") is None
+    assert cache.get_workflow_graph(_workflow()) is None
+
+
+def test_the_least_recently_used_workflows_are_evicted() -> None:
+    cache = CompiledWorkflowCache(max_size=1)
+    validate = MagicMock(side_effect=_workflow_definition)
+
+    cache.get_workflow_definition("w_1", 1, MODIFIED_AT, validate)
+    cache.get_workflow_definition("w_2", 1, MODIFIED_AT, validate)
+    cache.get_workflow_definition("w_1", 1, MODIFIED_AT, validate)
+
+    assert validate.call_count == 3
+
+
+def test_nothing_is_cached_when_disabled() -> None:
+    cache = CompiledWorkflowCache(max_size=0)
+    validate = MagicMock(side_effect=_workflow_definition)
+
+    cache.get_workflow_definition("w_1", 1, MODIFIED_AT, validate)
+    cache.get_workflow_definition("w_1", 1, MODIFIED_AT, validate)
+
+    assert validate.call_count == 2
+    assert cache.get_workflow_graph(_workflow()) is None
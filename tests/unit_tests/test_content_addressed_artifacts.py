@@ -0,0 +1,131 @@
+import base64
+import io
+import json
+import types
+
+import pytest
+from PIL import Image
+
+from skyvern.forge.sdk.api.llm.screenshot_optimizer import ScreenshotOptimization, encode_screenshots
+from skyvern.forge.sdk.artifact.manager import ArtifactManager, extract_inline_images
+from skyvern.forge.sdk.artifact.models import ArtifactType
+from skyvern.forge.sdk.models import Step
+from skyvern.forge.sdk.settings_manager import SettingsManager
+
+
+def _data_url(image: bytes, media_type: str = "image/png") -> str:
+    return f"data:{media_type};base64,{base64.b64encode(image).decode('utf-8')}"
+
+
+def test_extract_inline_images_replaces_openai_and_anthropic_images() -> None:
+    encoded_image = base64.b64encode(b"png-bytes").decode("utf-8")
+    llm_request = {
+        "model": "test-model",
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "prompt"},
+                    {"type": "image_url", "image_url": {"url": _data_url(b"jpeg-bytes", "image/jpeg")}},
+                    {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": encoded_image}},
+                ],
+            }
+        ],
+    }
+    images: list[tuple[bytes, str]] = []
+
+    def reference_image(image: bytes, media_type: str) -> str:
+        images.append((image, media_type))
+        return f"/v1/artifacts/a_{len(images)}"
+
+    data = extract_inline_images(json.dumps(llm_request).encode("utf-8"), reference_image)
+
+    assert images == [(b"jpeg-bytes", "image/jpeg"), (b"png-bytes", "image/png")]
+    content = json.loads(data)["messages"][0]["content"]
+    assert content[0] == {"type": "text", "text": "prompt"}
+    assert content[1] == {"type": "image_url", "image_url": {"url": "/v1/artifacts/a_1"}}
+    assert content[2] == {
+        "type": "image",
+        "source": {"type": "url", "media_type": "image/png", "url": "/v1/artifacts/a_2"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_same_screenshot_is_stored_once_in_the_step_directory(
+    monkeypatch: pytest.MonkeyPatch, step: Step, dummy_db: types.SimpleNamespace, dummy_storage: types.SimpleNamespace
+) -> None:
+    monkeypatch.setattr(SettingsManager.get_settings(), "ENABLE_ARTIFACT_WRITE_BEHIND", False)
+    manager = ArtifactManager()
+    screenshot = b"png-bytes"
+    # the request sends the screenshot re-encoded, and the raw one
+    llm_request = {
+        "messages": [
+            {"type": "image_url", "image_url": {"url": _data_url(b"jpeg-bytes", "image/jpeg")}},
+            {"type": "image_url", "image_url": {"url": _data_url(screenshot)}},
+        ]
+    }
+
+    await manager.create_llm_artifact(
+        data=b"prompt", artifact_type=ArtifactType.LLM_PROMPT, screenshots=[screenshot], step=step
+    )
+    await manager.create_llm_artifact(
+        data=b"prompt", artifact_type=ArtifactType.LLM_PROMPT, screenshots=[screenshot], step=step
+    )
+    await manager.create_llm_artifact(
+        data=json.dumps(llm_request).encode("utf-8"), artifact_type=ArtifactType.LLM_REQUEST, step=step
+    )
+    await manager.wait_for_upload_aiotasks([step.task_id])
+
+    screenshot_artifacts = [
+        (call.args[0], call.args[2])
+        for call in dummy_db.create_artifact.await_args_list
+        if call.args[1] == ArtifactType.SCREENSHOT_LLM
+    ]
+    # both prompts reference the blob of the screenshot, the request adds the blob of its jpeg
+    assert len(screenshot_artifacts) == 3
+    (screenshot_id, screenshot_uri), _, (jpeg_id, jpeg_uri) = screenshot_artifacts
+    assert screenshot_artifacts[1][1] == screenshot_uri
+    assert screenshot_uri.startswith("file:///tmp/stp_1/blobs/") and screenshot_uri.endswith(".png")
+    assert jpeg_uri.startswith("file:///tmp/stp_1/blobs/") and jpeg_uri.endswith(".jpg")
+
+    stored_data = [call.args[1] for call in dummy_storage.store_artifact.await_args_list]
+    # two prompts, the screenshot and the jpeg once each, and the request
+    assert len(stored_data) == 5
+    assert stored_data.count(screenshot) == 1
+    stored_request = json.loads(stored_data[-1])
+    assert [message["image_url"]["url"] for message in stored_request["messages"]] == [
+        f"/v1/artifacts/{jpeg_id}",
+        f"/v1/artifacts/{screenshot_id}",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_optimized_screenshot_references_the_screenshot_artifact(
+    monkeypatch: pytest.MonkeyPatch, step: Step, dummy_db: types.SimpleNamespace, dummy_storage: types.SimpleNamespace
+) -> None:
+    monkeypatch.setattr(SettingsManager.get_settings(), "ENABLE_ARTIFACT_WRITE_BEHIND", False)
+    manager = ArtifactManager()
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), "white").save(buffer, format="PNG")
+    screenshot = buffer.getvalue()
+    (optimized,) = encode_screenshots([screenshot], ScreenshotOptimization(image_format="JPEG", quality=80))
+    optimized_url = _data_url(base64.b64decode(optimized.data), optimized.media_type)
+    llm_request = {"messages": [{"type": "image_url", "image_url": {"url": optimized_url}}]}
+
+    await manager.create_llm_artifact(
+        data=b"prompt", artifact_type=ArtifactType.LLM_PROMPT, screenshots=[screenshot], step=step
+    )
+    await manager.create_llm_artifact(
+        data=json.dumps(llm_request).encode("utf-8"), artifact_type=ArtifactType.LLM_REQUEST, step=step
+    )
+    await manager.wait_for_upload_aiotasks([step.task_id])
+
+    screenshot_ids = [
+        call.args[0]
+        for call in dummy_db.create_artifact.await_args_list
+        if call.args[1] == ArtifactType.SCREENSHOT_LLM
+    ]
+    # the jpeg sent to the LLM isn't stored as another screenshot
+    assert len(screenshot_ids) == 1
+    stored_request = json.loads(dummy_storage.store_artifact.await_args_list[-1].args[1])
+    assert stored_request["messages"][0]["image_url"]["url"] == f"/v1/artifacts/{screenshot_ids[0]}"
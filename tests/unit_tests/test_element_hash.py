@@ -0,0 +1,65 @@
+import json
+
+from skyvern.constants import SKYVERN_ID_ATTR
+from skyvern.forge.sdk.api.crypto import calculate_sha256
+from skyvern.webeye.scraper.scraper import build_element_dict, clean_element_before_hashing, hash_element
+
+
+def _legacy_hash(element: dict) -> str:
+    return calculate_sha256(json.dumps(clean_element_before_hashing(element), sort_keys=True))
+
+
+def _build_elements() -> list[dict]:
+    leaf = {
+        "id": "AAAc",
+        "frame": "main.frame",
+        "frame_index": 0,
+        "tagName": "input",
+        "interactable": True,
+        "rect": {"x": 1.5, "y": 2},
+        "attributes": {SKYVERN_ID_ATTR: "AAAc", "type": "text", "placeholder": "Name ✓"},
+        "children": [],
+    }
+    sibling = {
+        "id": "AAAd",
+        "frame": "main.frame",
+        "frame_index": 0,
+        "tagName": "span",
+        "interactable": False,
+        "text": 'quoted "text"',
+        "attributes": {},
+        "children": [],
+    }
+    middle = {
+        "id": "AAAb",
+        "frame": "main.frame",
+        "frame_index": 0,
+        "tagName": "div",
+        "interactable": False,
+        "attributes": {SKYVERN_ID_ATTR: "AAAb", "role": "group"},
+        "children": [leaf, sibling],
+    }
+    root = {
+        "id": "AAAa",
+        "frame": "main.frame",
+        "frame_index": 0,
+        "tagName": "form",
+        "interactable": False,
+        "children": [middle],
+    }
+    # the elements list shares the dicts with the tree, same as the output of buildTreeFromBody
+    return [root, middle, leaf, sibling]
+
+
+def test_hash_element_matches_legacy_serialization() -> None:
+    for element in _build_elements():
+        assert hash_element(element) == _legacy_hash(element)
+
+
+def test_build_element_dict_hashes_every_element() -> None:
+    elements = _build_elements()
+    _, _, _, id_to_element_hash, hash_to_element_ids = build_element_dict(elements)
+
+    for element in elements:
+        assert id_to_element_hash[element["id"]] == _legacy_hash(element)
+        assert element["id"] in hash_to_element_ids[id_to_element_hash[element["id"]]]
@@ -0,0 +1,101 @@
+import copy
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.webeye.scraper.scraped_page import ScrapedPage
+from skyvern.webeye.scraper.scraper import copy_element_tree, trim_element_tree
+
+
+@pytest.fixture(autouse=True)
+def setup_context():
+    skyvern_context.set(SkyvernContext())
+    yield
+    skyvern_context.reset()
+
+
+def _build_element_tree() -> list[dict]:
+    return [
+        {
+            "id": "AAAA",
+            "frame": "main.frame",
+            "frame_index": 0,
+            "tagName": "form",
+            "attributes": {"class": "form", "name": "n" * 600},
+            "text": " ",
+            "beforePseudoText": "",
+            "children": [
+                {
+                    "id": "AAAB",
+                    "frame": "main.frame",
+                    "tagName": "button",
+                    "interactable": True,
+                    "attributes": {"aria-label": "Submit", "src": "data:image/png;base64,AAAA", "style": "color: red"},
+                    "text": "Submit",
+                    "children": [
+                        {"tagName": "svg", "attributes": {"aria-label": "icon"}, "children": []},
+                        {"tagName": "span", "text": "now", "children": []},
+                    ],
+                },
+                {
+                    "id": "AAAC",
+                    "tagName": "div",
+                    "keepAllAttr": True,
+                    "attributes": {"data-testid": "footer"},
+                    "children": [{"tagName": "p", "text": "footer", "rect": {"x": 0, "y": 0}}],
+                },
+            ],
+        }
+    ]
+
+
+def _scraped_page(element_tree: list[dict], element_tree_trimmed: list[dict]) -> ScrapedPage:
+    return ScrapedPage(
+        elements=[],
+        element_tree=element_tree,
+        element_tree_trimmed=element_tree_trimmed,
+        _browser_state=MagicMock(),
+        _clean_up_func=AsyncMock(),
+        _scrape_exclude=None,
+    )
+
+
+def test_trimming_a_copied_tree_leaves_the_source_unchanged() -> None:
+    element_tree = _build_element_tree()
+    original_element_tree = copy.deepcopy(element_tree)
+
+    element_tree_trimmed = trim_element_tree(copy_element_tree(element_tree))
+
+    assert element_tree == original_element_tree
+    form = element_tree_trimmed[0]
+    assert set(form) == {"tagName", "attributes", "children"}
+    assert form["attributes"] == {"name": "n" * 500}
+    button, footer = form["children"]
+    assert button["id"] == "AAAB" and "frame" not in button
+    assert button["attributes"] == {"aria-label": "Submit"}
+    assert footer["attributes"] == {"data-testid": "footer"} and "keepAllAttr" not in footer
+    # the leaf values are shared with the source instead of being copied
+    assert footer["children"][0]["rect"] is element_tree[0]["children"][1]["children"][0]["rect"]
+
+
+def test_building_the_economy_tree_leaves_the_trees_unchanged() -> None:
+    element_tree = _build_element_tree()
+    element_tree_trimmed = trim_element_tree(copy_element_tree(element_tree))
+    original_element_tree = copy.deepcopy(element_tree)
+    original_element_tree_trimmed = copy.deepcopy(element_tree_trimmed)
+    scraped_page = _scraped_page(element_tree, element_tree_trimmed)
+
+    economy_html = scraped_page.build_economy_elements_tree()
+    full_html = scraped_page.build_element_tree()
+
+    assert scraped_page.element_tree == original_element_tree
+    assert scraped_page.element_tree_trimmed == original_element_tree_trimmed
+    assert "<svg" in full_html and "<svg" not in economy_html
+    # only the nodes on the path to the removed svg are copied, the other subtrees are shared
+    economy_form = scraped_page.economy_element_tree[0]
+    economy_button, economy_footer = economy_form["children"]
+    assert economy_form is not element_tree_trimmed[0] and economy_button is not element_tree_trimmed[0]["children"][0]
+    assert economy_button["children"] == [{"tagName": "span", "text": "now"}]
+    assert economy_footer is element_tree_trimmed[0]["children"][1]
@@ -0,0 +1,163 @@
+import copy
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from skyvern.forge.sdk.api.crypto import calculate_sha256
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.utils import token_counter
+from skyvern.webeye.scraper.scraped_page import (
+    ELEMENT_NODE_ATTRIBUTES,
+    build_attribute,
+    count_element_tree_tokens,
+    element_tree_to_html,
+    json_to_html,
+)
+
+
+@pytest.fixture(autouse=True)
+def setup_context():
+    skyvern_context.set(SkyvernContext())
+    yield
+    skyvern_context.reset()
+
+
+@pytest.fixture
+def count_characters(monkeypatch: pytest.MonkeyPatch):
+    # a token per character, so the counts of the fragments add up to the length of the whole HTML
+    count_tokens = MagicMock(side_effect=len)
+    monkeypatch.setattr(token_counter, "count_tokens", count_tokens)
+    token_counter.count_fragment_tokens.cache_clear()
+    yield count_tokens
+    token_counter.count_fragment_tokens.cache_clear()
+
+
+def _concatenating_json_to_html(element: dict, need_skyvern_attrs: bool = True) -> str:
+    """The recursive renderer concatenating the HTML of every subtree, which the buffered renderer replaced."""
+    tag = element["tagName"]
+    attributes: dict[str, Any] = copy.deepcopy(element.get("attributes", {}))
+    if element.get("isDropped", False):
+        if not element.get("interactable", False):
+            return ""
+        attributes = {}
+    if "href" in attributes and len(attributes.get("href", "")) > 150:
+        attributes["href"] = "{{_" + calculate_sha256(attributes["href"]) + "}}"
+    if need_skyvern_attrs:
+        for attr in ELEMENT_NODE_ATTRIBUTES:
+            if element.get(attr) is not None:
+                attributes[attr] = element[attr]
+    attributes_html = " ".join(build_attribute(key, value) for key, value in attributes.items())
+    if element.get("isSelectable", False):
+        tag = "select"
+    text = element.get("text", "")
+    children_html = "".join(
+        _concatenating_json_to_html(child, need_skyvern_attrs) for child in element.get("children", [])
+    )
+    option_html = "".join(
+        f'<option index="{option.get("optionIndex")}">{option.get("text")}</option>'
+        if option.get("text")
+        else f'<option index="{option.get("optionIndex")}" value="{option.get("value")}">{option.get("text")}</option>'
+        for option in element.get("options", [])
+    )
+    if element.get("purgeable", False):
+        return children_html + option_html
+    before_pseudo_text = element.get("beforePseudoText") or ""
+    after_pseudo_text = element.get("afterPseudoText") or ""
+    open_tag = f"<{tag}{attributes_html if not attributes_html else ' ' + attributes_html}>"
+    if (
+        tag in ["img", "input", "br", "hr", "meta", "link"]
+        and not option_html
+        and not children_html
+        and not before_pseudo_text
+        and not after_pseudo_text
+    ):
+        return open_tag
+    return f"{open_tag}{before_pseudo_text}{text}{children_html + option_html}{after_pseudo_text}</{tag}>"
+
+
+def _build_element_tree() -> list[dict]:
+    return [
+        {
+            "tagName": "div",
+            "id": "AAAA",
+            "attributes": {"class": "form", "hidden": False, "tabindex": 0, "title": ""},
+            "beforePseudoText": "*",
+            "children": [
+                {"tagName": "a", "id": "AAAB", "attributes": {"href": "https://example.com/" + "a" * 200}},
+                {"tagName": "img", "id": "AAAC", "attributes": {"src": "logo.png"}},
+                {"tagName": "img", "id": "AAAD", "children": [{"tagName": "span", "text": "caption"}]},
+                {"tagName": "input", "id": "AAAE", "afterPseudoText": "required"},
+                # a self-closing tag only keeps its children if they render to something
+                {"tagName": "input", "id": "AAAF", "children": [{"tagName": "p", "isDropped": True}]},
+                {
+                    "tagName": "div",
+                    "id": "AAAG",
+                    "isSelectable": True,
+                    "options": [{"optionIndex": 0, "text": "Yes"}, {"optionIndex": 1, "text": "", "value": "no"}],
+                },
+                {"tagName": "button", "id": "AAAH", "interactable": True, "isDropped": True, "text": "Submit"},
+                {
+                    "tagName": "section",
+                    "purgeable": True,
+                    "text": "purged text",
+                    "children": [{"tagName": "span", "text": "kept"}, {"tagName": "br", "purgeable": True}],
+                },
+            ],
+        },
+        {"tagName": "p", "text": "footer", "isDropped": True},
+        {"tagName": "hr"},
+    ]
+
+
+@pytest.mark.parametrize("need_skyvern_attrs", [True, False])
+def test_buffered_rendering_matches_concatenating_rendering(need_skyvern_attrs: bool) -> None:
+    element_tree = _build_element_tree()
+    original_element_tree = copy.deepcopy(element_tree)
+
+    html = element_tree_to_html(element_tree, need_skyvern_attrs=need_skyvern_attrs)
+
+    assert html == "".join(
+        _concatenating_json_to_html(element, need_skyvern_attrs=need_skyvern_attrs) for element in element_tree
+    )
+    assert html == "".join(json_to_html(element, need_skyvern_attrs=need_skyvern_attrs) for element in element_tree)
+    # the elements are rendered without being modified
+    assert element_tree == original_element_tree
+
+
+def test_element_tree_rendering() -> None:
+    html = element_tree_to_html(_build_element_tree())
+
+    assert html.startswith('<div class="form" hidden="false" tabindex="0" title id="AAAA">*<a href="{{_')
+    assert '<img src="logo.png" id="AAAC"><img id="AAAD"><span>caption</span></img>' in html
+    assert '<input id="AAAE">required</input><input id="AAAF">' in html
+    assert '<select id="AAAG"><option index="0">Yes</option><option index="1" value="no"></option></select>' in html
+    assert '<button id="AAAH">Submit</button><span>kept</span></div><hr>' in html
+    assert "purged text" not in html and "footer" not in html
+
+
+@pytest.mark.parametrize("need_skyvern_attrs", [True, False])
+def test_element_tree_tokens_are_counted_by_subtree(count_characters: MagicMock, need_skyvern_attrs: bool) -> None:
+    element_tree = _build_element_tree()
+
+    token_count = count_element_tree_tokens(element_tree, need_skyvern_attrs=need_skyvern_attrs)
+
+    assert token_count == len(element_tree_to_html(element_tree, need_skyvern_attrs=need_skyvern_attrs))
+
+
+def test_subtree_token_counts_are_reused_across_tree_variants(count_characters: MagicMock) -> None:
+    element_tree = _build_element_tree()
+    subtree_token_counts: dict[int, tuple[dict, int]] = {}
+    count_element_tree_tokens(element_tree, subtree_token_counts=subtree_token_counts)
+    count_characters.reset_mock()
+
+    # a variant sharing the subtrees of the first two children, like the economy and the pruned trees
+    root = element_tree[0]
+    variant = [{**root, "children": root["children"][:2]}]
+    token_count = count_element_tree_tokens(variant, subtree_token_counts=subtree_token_counts)
+
+    assert token_count == len(element_tree_to_html(variant))
+    # the shared subtrees aren't rendered again and the root renders the same fragments, nothing is encoded
+    count_characters.assert_not_called()
+    assert subtree_token_counts[id(variant[0])] == (variant[0], token_count)
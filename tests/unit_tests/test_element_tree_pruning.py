@@ -0,0 +1,71 @@
+import pytest
+
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.utils import token_counter
+from skyvern.webeye.scraper.scraped_page import element_tree_to_html, estimate_tokens, prune_element_tree
+
+
+@pytest.fixture(autouse=True)
+def setup_context():
+    skyvern_context.set(SkyvernContext())
+    yield
+    skyvern_context.reset()
+
+
+@pytest.fixture(autouse=True)
+def count_tokens(monkeypatch: pytest.MonkeyPatch):
+    # the same ratio as the estimation, so the tests don't depend on the tokenizer
+    monkeypatch.setattr(token_counter, "count_tokens", estimate_tokens)
+    token_counter.count_fragment_tokens.cache_clear()
+    yield
+    token_counter.count_fragment_tokens.cache_clear()
+
+
+def _build_element_tree() -> list[dict]:
+    return [
+        {
+            "tagName": "div",
+            "children": [
+                {"tagName": "p", "text": "long paragraph " * 50},
+                {
+                    "tagName": "button",
+                    "id": "AAAB",
+                    "interactable": True,
+                    "text": "Submit",
+                    "children": [{"tagName": "span", "text": "now"}],
+                },
+                {"tagName": "p", "text": "footer"},
+            ],
+        }
+    ]
+
+
+def test_prune_element_tree_keeps_whole_tree_within_budget() -> None:
+    element_tree = _build_element_tree()
+
+    pruned = prune_element_tree(element_tree, max_tokens=100_000)
+
+    # nothing is dropped, so the tree is shared instead of copied
+    assert pruned[0] is element_tree[0]
+
+
+def test_prune_element_tree_keeps_interactable_elements_first() -> None:
+    element_tree = _build_element_tree()
+
+    html = element_tree_to_html(prune_element_tree(element_tree, max_tokens=30))
+
+    # the long paragraph doesn't fit after the button is kept, but the short footer still does
+    assert html == '<div><button id="AAAB">Submit<span>now</span></button><p>footer</p></div>'
+    # the source tree is untouched
+    assert len(element_tree[0]["children"]) == 3
+
+
+def test_prune_element_tree_shrinks_the_budget_until_the_rendered_tree_fits(monkeypatch: pytest.MonkeyPatch) -> None:
+    # the tokenizer counts a token per character, far more than the estimation
+    monkeypatch.setattr(token_counter, "count_tokens", len)
+
+    html = element_tree_to_html(prune_element_tree(_build_element_tree(), max_tokens=60))
+
+    # the footer fits in the estimation, but not once the rendered tree is counted
+    assert html == '<div><button id="AAAB">Submit<span>now</span></button></div>'
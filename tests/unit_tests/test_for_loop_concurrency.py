@@ -0,0 +1,188 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Iterator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from skyvern.config import settings
+from skyvern.forge import app
+from skyvern.forge.forge_app_initializer import start_forge_app
+from skyvern.forge.sdk.workflow.models.block import ForLoopBlock, LoopIterationResult
+from skyvern.forge.sdk.workflow.models.parameter import OutputParameter
+from skyvern.webeye.browser_pool import seed_storage_state
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_forge_app():
+    start_forge_app()
+    yield
+
+
+@pytest.fixture
+def for_loop_block() -> ForLoopBlock:
+    output_parameter = MagicMock(spec=OutputParameter)
+    output_parameter.parameter_type = "output"
+    output_parameter.key = "loop_output"
+    output_parameter.output_parameter_id = "op_loop"
+    output_parameter.workflow_id = "w_1"
+    output_parameter.created_at = datetime.now()
+    output_parameter.modified_at = datetime.now()
+    output_parameter.deleted_at = None
+    return ForLoopBlock(label="loop", output_parameter=output_parameter, loop_blocks=[], max_concurrency=2)
+
+
+@contextmanager
+def _patched_app() -> Iterator[MagicMock]:
+    browser_manager = MagicMock()
+    browser_manager.get_for_workflow_run.return_value = None
+    browser_manager.get_or_create_for_workflow_run = AsyncMock()
+    browser_manager.cleanup_for_workflow_run = AsyncMock()
+
+    workflow_context_manager = MagicMock()
+    workflow_context_manager.get_workflow_run_context.return_value = SimpleNamespace(values={}, blocks_metadata={})
+
+    @contextmanager
+    def isolated_context(workflow_run_id: str) -> Iterator[SimpleNamespace]:
+        yield SimpleNamespace(values={}, blocks_metadata={})
+
+    workflow_context_manager.isolated_context = isolated_context
+    workflow_service = MagicMock()
+    workflow_service.get_workflow_run = AsyncMock(return_value=SimpleNamespace(workflow_run_id="wr_1"))
+    with (
+        patch.object(app, "BROWSER_MANAGER", browser_manager),
+        patch.object(app, "WORKFLOW_CONTEXT_MANAGER", workflow_context_manager),
+        patch.object(app, "WORKFLOW_SERVICE", workflow_service),
+    ):
+        yield browser_manager
+
+
+@pytest.mark.asyncio
+async def test_concurrent_iterations_are_merged_in_index_order(for_loop_block: ForLoopBlock) -> None:
+    running = 0
+    max_running = 0
+
+    async def execute_loop_iteration(
+        self: ForLoopBlock, loop_idx: int, loop_over_value: Any, **kwargs: Any
+    ) -> LoopIterationResult:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        # the later iterations finish first
+        await asyncio.sleep(0.01 * (4 - loop_idx))
+        running -= 1
+        return LoopIterationResult(
+            loop_output_values=[{"loop_value": loop_over_value}],
+            block_outputs=[],
+            last_block=None,
+        )
+
+    with (
+        _patched_app() as browser_manager,
+        patch.object(ForLoopBlock, "execute_loop_iteration", execute_loop_iteration),
+    ):
+        result = await for_loop_block.execute_loop_concurrently("wr_1", "wrb_1", ["a", "b", "c", "d"])
+
+    assert result.outputs_with_loop_values == [[{"loop_value": value}] for value in ["a", "b", "c", "d"]]
+    assert max_running == 2
+    assert browser_manager.cleanup_for_workflow_run.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_iteration_stopping_the_loop_drops_the_later_iterations(for_loop_block: ForLoopBlock) -> None:
+    started: list[int] = []
+
+    async def execute_loop_iteration(
+        self: ForLoopBlock, loop_idx: int, loop_over_value: Any, **kwargs: Any
+    ) -> LoopIterationResult:
+        started.append(loop_idx)
+        await asyncio.sleep(0.01 if loop_idx == 0 else 0)
+        return LoopIterationResult(
+            loop_output_values=[{"loop_value": loop_over_value}],
+            block_outputs=[],
+            last_block=None,
+            stop_loop=loop_over_value == "stop",
+        )
+
+    with _patched_app(), patch.object(ForLoopBlock, "execute_loop_iteration", execute_loop_iteration):
+        result = await for_loop_block.execute_loop_concurrently("wr_1", "wrb_1", ["a", "stop", "c", "d"])
+
+    assert result.outputs_with_loop_values == [[{"loop_value": "a"}], [{"loop_value": "stop"}]]
+    assert 3 not in started
+
+
+@pytest.mark.asyncio
+async def test_iteration_stopping_the_loop_cancels_the_running_later_iterations(for_loop_block: ForLoopBlock) -> None:
+    finished: list[int] = []
+
+    async def execute_loop_iteration(
+        self: ForLoopBlock, loop_idx: int, loop_over_value: Any, **kwargs: Any
+    ) -> LoopIterationResult:
+        await asyncio.sleep(0 if loop_over_value == "stop" else 10)
+        finished.append(loop_idx)
+        return LoopIterationResult(
+            loop_output_values=[{"loop_value": loop_over_value}],
+            block_outputs=[],
+            last_block=None,
+            stop_loop=loop_over_value == "stop",
+        )
+
+    with _patched_app(), patch.object(ForLoopBlock, "execute_loop_iteration", execute_loop_iteration):
+        result = await asyncio.wait_for(
+            for_loop_block.execute_loop_concurrently("wr_1", "wrb_1", ["stop", "b", "c"]), timeout=1
+        )
+
+    assert result.outputs_with_loop_values == [[{"loop_value": "stop"}]]
+    assert finished == [0]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_by_the_setting(
+    for_loop_block: ForLoopBlock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "FOR_LOOP_MAX_CONCURRENCY", 2)
+    for_loop_block.max_concurrency = 100
+    running = 0
+    max_running = 0
+
+    async def execute_loop_iteration(
+        self: ForLoopBlock, loop_idx: int, loop_over_value: Any, **kwargs: Any
+    ) -> LoopIterationResult:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return LoopIterationResult(loop_output_values=[], block_outputs=[], last_block=None)
+
+    with (
+        _patched_app() as browser_manager,
+        patch.object(ForLoopBlock, "execute_loop_iteration", execute_loop_iteration),
+    ):
+        await for_loop_block.execute_loop_concurrently("wr_1", "wrb_1", list(range(6)))
+
+    assert max_running == 2
+    assert browser_manager.cleanup_for_workflow_run.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_browsers_are_seeded_with_the_storage_state() -> None:
+    browser_context = MagicMock(add_cookies=AsyncMock(), add_init_script=AsyncMock())
+    cookie = {"name": "session", "value": "abc", "domain": "example.com", "path": "/"}
+
+    await seed_storage_state(
+        browser_context,
+        {
+            "cookies": [cookie],
+            "origins": [
+                {"origin": "https://example.com", "localStorage": [{"name": "token", "value": "xyz"}]},
+                {"origin": "https://empty.example.com", "localStorage": []},
+            ],
+        },
+    )
+
+    browser_context.add_cookies.assert_awaited_once_with([cookie])
+    script = browser_context.add_init_script.await_args.kwargs["script"]
+    assert '{"https://example.com": {"token": "xyz"}}' in script
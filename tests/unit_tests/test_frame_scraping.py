@@ -0,0 +1,80 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.forge.sdk.settings_manager import SettingsManager
+from skyvern.webeye.scraper import scraper
+
+
+@pytest.fixture(autouse=True)
+def setup_context():
+    skyvern_context.set(SkyvernContext())
+    yield
+    skyvern_context.reset()
+
+
+def _frame(name: str, parent_frame: MagicMock | None) -> MagicMock:
+    frame = MagicMock(url=f"https://example.com/{name}", parent_frame=parent_frame, child_frames=[])
+    frame.name = name
+    frame.is_detached.return_value = False
+    if parent_frame is not None:
+        parent_frame.child_frames.append(frame)
+    return frame
+
+
+def _page() -> tuple[MagicMock, MagicMock, MagicMock]:
+    main_frame = _frame("main", None)
+    outer_frame = _frame("outer", main_frame)
+    inner_frame = _frame("inner", outer_frame)
+    return MagicMock(main_frame=main_frame), outer_frame, inner_frame
+
+
+@pytest.mark.asyncio
+async def test_nested_frames_are_scraped_after_their_parent(monkeypatch: pytest.MonkeyPatch) -> None:
+    page, _, _ = _page()
+    # the iframe element of the inner frame only gets its unique_id once the outer frame is scraped
+    unique_ids = {"outer": "outer"}
+
+    async def scrape_frame(frame, frame_index):
+        if frame.name not in unique_ids:
+            return None
+        unique_ids["inner"] = "outer-element"
+        element_id = f"{frame.name}-element"
+        return unique_ids[frame.name], [{"id": element_id, "frame": frame.name}], [{"id": element_id}]
+
+    monkeypatch.setattr(scraper, "scrape_frame_interactable_elements", scrape_frame)
+    elements = [{"id": "outer", "frame": "main.frame"}]
+
+    await scraper.add_children_frames_interactable_elements(page, elements)
+
+    assert [element["id"] for element in elements] == ["outer", "outer-element", "inner-element"]
+    assert elements[0]["children"] == [{"id": "outer-element"}]
+    assert elements[1]["children"] == [{"id": "inner-element"}]
+
+
+@pytest.mark.asyncio
+async def test_empty_frames_are_skipped_until_they_change(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(SettingsManager.get_settings(), "BROWSER_SCRAPING_FRAME_SKIP_THRESHOLD", 2)
+    monkeypatch.setattr(SettingsManager.get_settings(), "BROWSER_SCRAPING_FRAME_SKIP_RECHECK_INTERVAL", 5)
+    page, outer_frame, _ = _page()
+    page.main_frame.child_frames = [outer_frame]
+    outer_frame.child_frames = []
+    scraped_frames: list[str] = []
+
+    async def scrape_frame(frame, frame_index):
+        scraped_frames.append(frame.name)
+        return None
+
+    monkeypatch.setattr(scraper, "scrape_frame_interactable_elements", scrape_frame)
+
+    # the scrapings outside of the steps don't count
+    await scraper.add_children_frames_interactable_elements(page, [])
+    for _ in range(3):
+        await scraper.add_children_frames_interactable_elements(page, [], skip_empty_frames=True)
+    assert scraped_frames == ["outer"] * 3
+
+    outer_frame.url = "https://example.com/loaded"
+    await scraper.add_children_frames_interactable_elements(page, [], skip_empty_frames=True)
+    assert scraped_frames == ["outer"] * 4
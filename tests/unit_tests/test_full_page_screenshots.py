@@ -0,0 +1,61 @@
+import io
+
+import pytest
+from PIL import Image
+
+from skyvern.webeye.utils.page import _get_scrolling_positions, _split_full_page_screenshot
+
+
+def _scroll_loop_positions(viewport_height: int, scroll_height: int, max_number: int, need_overlap: bool) -> list[int]:
+    """The positions the scroll loop takes its screenshots at: scrollToNextPage until scrollY moves by 25px or less."""
+    max_scroll_y = max(scroll_height - viewport_height, 0)
+    positions: list[int] = []
+    scroll_y_old, scroll_y = -30, 0
+    while abs(scroll_y_old - scroll_y) > 25 and len(positions) < max_number:
+        positions.append(scroll_y)
+        step = viewport_height - 200 if need_overlap else viewport_height
+        scroll_y_old, scroll_y = scroll_y, min(scroll_y + step, max_scroll_y)
+    return positions
+
+
+@pytest.mark.parametrize(
+    "viewport_height, scroll_height, max_number, need_overlap, expected",
+    [
+        # shorter than the viewport
+        (1080, 600, 10, True, [0]),
+        (1080, 1080, 10, True, [0]),
+        # the last page is scrolled to the bottom, overlapping more than 200px
+        (1080, 3000, 10, True, [0, 880, 1760, 1920]),
+        # a last step of 25px or less isn't taken
+        (1080, 1080 + 880 + 25, 10, True, [0, 880]),
+        (1080, 1080 + 880 + 26, 10, True, [0, 880, 906]),
+        (1080, 3000, 2, True, [0, 880]),
+        (1080, 3000, 10, False, [0, 1080, 1920]),
+    ],
+)
+def test_scrolling_positions_match_the_scroll_loop(
+    viewport_height: int, scroll_height: int, max_number: int, need_overlap: bool, expected: list[int]
+) -> None:
+    positions = _get_scrolling_positions(viewport_height, scroll_height, max_number, need_overlap=need_overlap)
+
+    assert positions == expected
+    assert positions == _scroll_loop_positions(viewport_height, scroll_height, max_number, need_overlap)
+
+
+def test_full_page_screenshot_is_split_into_viewport_tiles() -> None:
+    # a 100x250 CSS pixels page captured at a device scale factor of 2, with a band of color every 50 CSS pixels
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255)]
+    img = Image.new("RGB", (200, 500))
+    for index, color in enumerate(colors):
+        img.paste(color, (0, index * 100, 200, (index + 1) * 100))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+
+    tiles = _split_full_page_screenshot(buffer.getvalue(), [0, 100, 200], viewport_width=100, viewport_height=100)
+
+    tile_images = [Image.open(io.BytesIO(tile)) for tile in tiles]
+    assert all(tile.format == "PNG" for tile in tile_images)
+    # the last tile is cut at the bottom of the page
+    assert [tile.size for tile in tile_images] == [(200, 200), (200, 200), (200, 100)]
+    assert [tile.getpixel((0, 0)) for tile in tile_images] == [colors[0], colors[2], colors[4]]
+    assert [tile.getpixel((0, tile.height - 1)) for tile in tile_images] == [colors[1], colors[3], colors[4]]
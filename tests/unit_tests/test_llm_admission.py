@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from skyvern.forge.sdk.api.llm import admission as admission_module
+from skyvern.forge.sdk.api.llm.admission import LLMAdmission, LLMRequestPriority, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_admission_grants_slots_by_priority() -> None:
+    admission = LLMAdmission("LLM_KEY", max_concurrency=1)
+    admitted: list[str] = []
+    release = asyncio.Event()
+
+    async def request(name: str, priority: LLMRequestPriority) -> None:
+        async with admission.admit(estimated_tokens=100, priority=priority):
+            admitted.append(name)
+            await release.wait()
+
+    first = asyncio.create_task(request("first", LLMRequestPriority.INTERACTIVE))
+    await asyncio.sleep(0)
+    summary = asyncio.create_task(request("summary", LLMRequestPriority.BACKGROUND))
+    speculative = asyncio.create_task(request("speculative", LLMRequestPriority.SPECULATIVE))
+    interactive = asyncio.create_task(request("interactive", LLMRequestPriority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    assert admitted == ["first"]
+    assert admission.queue_depth == 3
+
+    release.set()
+    await asyncio.gather(first, summary, speculative, interactive)
+
+    assert admitted == ["first", "interactive", "speculative", "summary"]
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_halves_concurrency_when_rate_limited(monkeypatch) -> None:
+    class RateLimited(Exception):
+        pass
+
+    # litellm's RateLimitError needs a provider response, the admission only checks the exception type
+    monkeypatch.setattr(admission_module.litellm.exceptions, "RateLimitError", RateLimited)
+    admission = LLMAdmission("LLM_KEY", max_concurrency=8)
+
+    with pytest.raises(RateLimited):
+        async with admission.admit(estimated_tokens=100, priority=LLMRequestPriority.INTERACTIVE):
+            raise RateLimited()
+
+    assert admission.stats()["concurrency_limit"] == 4
+    assert admission.in_flight == 0
+
+
+def test_token_bucket_wait_time() -> None:
+    bucket = TokenBucket(per_minute=600)
+    now = bucket.updated_at
+
+    assert bucket.wait_time(600, now) == 0
+    bucket.take(600)
+    assert bucket.wait_time(10, now) == pytest.approx(1)
+    # more than the whole budget only waits for a full bucket
+    assert bucket.wait_time(10_000, now) == pytest.approx(60)
+
+
+def test_admission_compares_latency_per_prompt_name() -> None:
+    admission = LLMAdmission("LLM_KEY", max_concurrency=8)
+    admission.concurrency_limit = 4.0
+
+    admission._on_success("extract-actions", latency=2)
+    # a long summary isn't congestion, it's just a slower prompt
+    admission._on_success("data-extraction-summary", latency=20)
+    concurrency_limit = admission.concurrency_limit
+    assert concurrency_limit > 4
+
+    admission._on_success("extract-actions", latency=10)
+    assert admission.concurrency_limit < concurrency_limit
+    assert admission.stats()["latency_ewma"].keys() == {"extract-actions", "data-extraction-summary"}
@@ -0,0 +1,66 @@
+from typing import Any
+
+import pytest
+from litellm.utils import ModelResponse
+
+from skyvern.forge.sdk.api.llm.response_cache import LLMResponseCache, build_cache_key
+from skyvern.forge.sdk.cache.local import LocalCache
+
+
+def _key(
+    prompt: str,
+    screenshot_hashes: list[str] | None = None,
+    model: str = "gpt-4o",
+    llm_key: str = "OPENAI_GPT4O",
+    organization_id: str = "o_1",
+    parameters: dict[str, Any] | None = None,
+) -> str:
+    return build_cache_key(
+        "extract-actions",
+        prompt,
+        screenshot_hashes or ["ff00"],
+        model,
+        llm_key,
+        organization_id,
+        parameters if parameters is not None else {"temperature": 0},
+    )
+
+
+def test_build_cache_key_ignores_time_and_whitespace() -> None:
+    key = _key("now: 2024-05-01T10:00:00Z\n  click  it")
+
+    assert key == _key("now: 2024-05-01T18:30:12.5Z click it")
+    assert key != _key("now: 2024-05-02T10:00:00Z click it")
+    assert key != _key("now: 2024-05-01T10:00:00Z click it", ["ff01"])
+    assert key != _key("now: 2024-05-01T10:00:00Z click it", model="gpt-4o-mini")
+
+
+def test_build_cache_key_separates_call_parameters_and_organizations() -> None:
+    key = _key("click it")
+
+    assert key == _key("click it", parameters={"temperature": 0})
+    assert key != _key("click it", parameters={"temperature": 0.7})
+    assert key != _key("click it", parameters={"temperature": 0, "tools": [{"name": "click"}]})
+    assert key != _key("click it", parameters={"temperature": 0, "response_format": {"type": "json_object"}})
+    assert key != _key("click it", llm_key="OPENAI_GPT4O_MINI")
+    assert key != _key("click it", organization_id="o_2")
+
+
+@pytest.mark.asyncio
+async def test_cached_response_is_not_charged_again() -> None:
+    response_cache = LLMResponseCache(LocalCache())
+    key = _key("prompt")
+    response = ModelResponse(
+        model="gpt-4o",
+        choices=[{"message": {"role": "assistant", "content": '{"actions": []}'}}],
+        usage={"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+    )
+
+    assert await response_cache.get(key, "extract-actions") is None
+    await response_cache.set(key, response, "extract-actions")
+    cached_response = await response_cache.get(key, "extract-actions")
+
+    assert cached_response is not None
+    assert cached_response.choices[0].message.content == '{"actions": []}'
+    assert cached_response.usage.total_tokens == 0
+    assert (response_cache.hits, response_cache.misses) == (1, 1)
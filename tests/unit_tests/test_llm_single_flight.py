@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from skyvern.forge.sdk.api.llm.single_flight import SingleFlight, build_request_key
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call() -> None:
+    single_flight: SingleFlight[str] = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "response"
+
+    waiters = [asyncio.create_task(single_flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == [("response", False), ("response", True), ("response", True)]
+    assert calls == 1
+    assert single_flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_call_survives_a_cancelled_waiter() -> None:
+    single_flight: SingleFlight[str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def call() -> str:
+        await release.wait()
+        return "response"
+
+    first = asyncio.create_task(single_flight.do("key", call))
+    second = asyncio.create_task(single_flight.do("key", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == ("response", True)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+def test_requests_of_other_organizations_or_llm_keys_are_not_merged() -> None:
+    def key(llm_key: str, organization_id: str | None) -> str:
+        return build_request_key("extract-actions", "prompt", [b"png"], "gpt-4o", llm_key, organization_id, {})
+
+    assert key("OPENAI_GPT4O", "o_1") == key("OPENAI_GPT4O", "o_1")
+    assert key("OPENAI_GPT4O", "o_1") != key("OPENAI_GPT4O", "o_2")
+    assert key("OPENAI_GPT4O", "o_1") != key("AZURE_GPT4O", "o_1")
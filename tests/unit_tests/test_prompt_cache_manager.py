@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from skyvern.forge.sdk.api.llm.prompt_cache_manager import (
+    LocalPromptCacheBackend,
+    PromptCacheManager,
+    PromptCacheProvider,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _manager(backend: LocalPromptCacheBackend, clock: FakeClock) -> PromptCacheManager:
+    return PromptCacheManager(
+        backends={PromptCacheProvider.VERTEX: backend},
+        ttl_seconds=3600,
+        renew_before_seconds=600,
+        idle_seconds=600,
+        clock=clock,
+    )
+
+
+@pytest.mark.asyncio
+async def test_runs_with_the_same_static_prefix_share_one_cache() -> None:
+    backend = LocalPromptCacheBackend()
+    manager = _manager(backend, FakeClock())
+
+    leases = await asyncio.gather(
+        *[manager.acquire(PromptCacheProvider.VERTEX, "gemini-2.5-flash", "static prompt") for _ in range(5)]
+    )
+    other_lease = await manager.acquire(PromptCacheProvider.VERTEX, "gemini-2.5-flash", "another static prompt")
+
+    assert backend.created == 2
+    assert len({lease.cache_name for lease in leases}) == 1
+    assert other_lease.cache_name != leases[0].cache_name
+    assert manager.stats() == {"caches": 2, "references": 6}
+
+
+@pytest.mark.asyncio
+async def test_cache_is_renewed_while_used_and_deleted_once_idle() -> None:
+    backend = LocalPromptCacheBackend()
+    clock = FakeClock()
+    manager = _manager(backend, clock)
+
+    lease = await manager.acquire(PromptCacheProvider.VERTEX, "gemini-2.5-flash", "static prompt")
+    clock.now = 3100
+    renewed_lease = await manager.acquire(PromptCacheProvider.VERTEX, "gemini-2.5-flash", "static prompt")
+    assert renewed_lease == lease
+    assert backend.renewed == 1
+
+    await manager.release(lease)
+    await manager.release(renewed_lease)
+    assert lease.cache_name in backend.caches
+
+    clock.now += 600
+    assert await manager.evict_idle() == 1
+    assert backend.caches == {}
+
+    await manager.acquire(PromptCacheProvider.VERTEX, "gemini-2.5-flash", "static prompt")
+    assert backend.created == 2
+
+
+@pytest.mark.asyncio
+async def test_providers_caching_prefixes_themselves_need_no_resource() -> None:
+    backend = LocalPromptCacheBackend()
+    manager = _manager(backend, FakeClock())
+
+    lease = await manager.acquire(PromptCacheProvider.ANTHROPIC, "claude-sonnet-4", "static prompt")
+    await manager.release(lease)
+
+    assert lease.cache_name is None
+    assert backend.created == 0
@@ -0,0 +1,52 @@
+import asyncio
+from pathlib import Path
+
+from skyvern.forge.sdk.api.llm.utils import llm_messages_builder
+from skyvern.forge.sdk.prompting import PromptEngine
+
+
+def _prompt_engine(tmp_path: Path) -> PromptEngine:
+    model_dir = tmp_path / "skyvern"
+    model_dir.mkdir()
+    (model_dir / "greet.j2").write_text("Static instructions.\nMore instructions.\n{{ name }} is here.\n")
+    (model_dir / "greet-static.j2").write_text("Instructions for {{ name }}.\n")
+    (model_dir / "plain.j2").write_text("No variables at all.\n")
+    return PromptEngine("skyvern", prompts_dir=tmp_path)
+
+
+def test_static_prefix_is_the_text_before_the_first_jinja_syntax(tmp_path: Path) -> None:
+    prompt_engine = _prompt_engine(tmp_path)
+
+    prefix = prompt_engine.get_static_prefix("greet")
+    prompt = prompt_engine.load_prompt("greet", name="Bob")
+
+    assert prefix == "Static instructions.\nMore instructions.\n"
+    assert prompt.startswith(prefix)
+    assert prompt_engine.get_static_prefix("plain") == prompt_engine.load_prompt("plain")
+    assert prompt_engine.get_static_prefix("unknown") == ""
+
+
+def test_load_static_prompt_is_cached_by_the_variables_the_template_reads(tmp_path: Path) -> None:
+    prompt_engine = _prompt_engine(tmp_path)
+
+    first = prompt_engine.load_static_prompt("greet-static", name="Bob", elements="<div></div>")
+    second = prompt_engine.load_static_prompt("greet-static", name="Bob", elements="<span></span>")
+    other = prompt_engine.load_static_prompt("greet-static", name="Alice")
+
+    assert first == "Instructions for Bob."
+    assert second is first
+    assert other == "Instructions for Alice."
+
+
+def test_llm_messages_builder_splits_the_static_prefix() -> None:
+    messages = asyncio.run(
+        llm_messages_builder("static part\ndynamic part", static_prefix="static part\n", cache_static_prefix=True)
+    )
+
+    assert messages[0]["content"] == [
+        {"type": "text", "text": "static part\n", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "dynamic part"},
+    ]
+
+    messages = asyncio.run(llm_messages_builder("dynamic part", static_prefix="static part\n"))
+    assert messages[0]["content"] == [{"type": "text", "text": "dynamic part"}]
@@ -0,0 +1,183 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.webeye.scraper import scraper
+from skyvern.webeye.scraper.scraped_page import ScrapedPage
+from skyvern.webeye.utils.page import SkyvernFrame
+
+URL = "https://example.com/form"
+
+
+@pytest.fixture(autouse=True)
+def setup_context():
+    skyvern_context.set(SkyvernContext())
+    yield
+    skyvern_context.reset()
+
+
+def _browser_state(page: MagicMock) -> MagicMock:
+    browser_state = MagicMock()
+    browser_state.get_working_page = AsyncMock(return_value=page)
+    browser_state.must_get_working_page = AsyncMock(return_value=page)
+    return browser_state
+
+
+def _scraped_page(tracker_id: str | None = "tracker") -> MagicMock:
+    scraped_page = MagicMock(url=URL)
+    scraped_page.get_dom_change_tracker_id.return_value = tracker_id
+    scraped_page.build_element_tree.return_value = "<button>Submit</button>"
+    return scraped_page
+
+
+@pytest.fixture
+def dom_change_count(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    get_dom_change_count = AsyncMock(return_value=0)
+    monkeypatch.setattr(
+        SkyvernFrame,
+        "create_instance",
+        AsyncMock(return_value=MagicMock(get_dom_change_count=get_dom_change_count)),
+    )
+    monkeypatch.setattr(SkyvernFrame, "take_split_screenshots", AsyncMock(return_value=[b"new screenshot"]))
+    return get_dom_change_count
+
+
+@pytest.mark.asyncio
+async def test_unchanged_page_is_reused_with_new_screenshots(dom_change_count: AsyncMock) -> None:
+    page = MagicMock(url=URL)
+    page.main_frame.child_frames = []
+    scraped_page = _scraped_page()
+
+    reused_page = await scraper.reuse_scraped_page_if_unchanged(_browser_state(page), scraped_page)
+
+    assert reused_page is scraped_page.model_copy.return_value
+    scraped_page.model_copy.assert_called_once_with(update={"screenshots": [b"new screenshot"]})
+    dom_change_count.assert_awaited_once_with("tracker")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "change",
+    ["dom_changed", "tracker_restarted", "navigated", "iframe", "not_tracked"],
+)
+async def test_changed_page_is_scraped_again(dom_change_count: AsyncMock, change: str) -> None:
+    page = MagicMock(url=URL)
+    page.main_frame.child_frames = []
+    scraped_page = _scraped_page()
+    if change == "dom_changed":
+        dom_change_count.return_value = 3
+    elif change == "tracker_restarted":
+        dom_change_count.return_value = None
+    elif change == "navigated":
+        page.url = "https://example.com/confirmation"
+    elif change == "iframe":
+        page.main_frame.child_frames = [MagicMock()]
+    else:
+        scraped_page = _scraped_page(tracker_id=None)
+
+    assert await scraper.reuse_scraped_page_if_unchanged(_browser_state(page), scraped_page) is None
+    SkyvernFrame.take_split_screenshots.assert_not_awaited()
+
+
+def _element(element_id: str, tag_name: str, children: list[dict] | None = None, **fields: object) -> dict:
+    return {"id": element_id, "frame": "main.frame", "tagName": tag_name, "children": children or [], **fields}
+
+
+def _raw_elements() -> list[dict]:
+    """The elements of a form with a button and a footer, the children being the elements themselves."""
+    label = _element("AAAC", "span", text="Submit")
+    button = _element("AAAB", "button", [label], interactable=True)
+    footer = _element("AAAD", "p", text="footer")
+    form = _element("AAAA", "form", [button, footer])
+    return [form, button, label, footer]
+
+
+def test_changed_subtrees_are_patched_into_the_elements_and_the_tree() -> None:
+    elements = _raw_elements()
+    form, button, _, footer = elements
+    element_tree = scraper.copy_element_tree([form])
+    new_button = _element("AAAB", "button", interactable=True, text="Sending")
+    new_link = _element("AAAE", "a", interactable=True, text="Cancel")
+    changed_subtree = scraper.ChangedSubtree(
+        element_id="AAAB",
+        elements=[new_button, new_link],
+        element_tree=[new_button, new_link],
+        element_tree_cleaned=scraper.copy_element_tree([new_button, new_link]),
+    )
+
+    patched = scraper.patch_element_trees(elements, element_tree, [changed_subtree])
+
+    assert patched is not None
+    patched_elements, patched_tree = patched
+    assert [element["id"] for element in patched_elements] == ["AAAA", "AAAB", "AAAE", "AAAD"]
+    # the ancestor is copied with the new children, the elements outside of the change are shared
+    patched_form = patched_elements[0]
+    assert patched_form is not form and patched_form["children"] == [new_button, new_link, footer]
+    assert patched_elements[1] is new_button and patched_elements[3] is footer
+    assert [child["id"] for child in patched_tree[0]["children"]] == ["AAAB", "AAAE", "AAAD"]
+    # the scraped page the patch is based on is left unchanged
+    assert form["children"] == [button, footer]
+    assert [child["id"] for child in element_tree[0]["children"]] == ["AAAB", "AAAD"]
+
+
+def test_change_outside_of_the_tree_is_not_patched() -> None:
+    elements = _raw_elements()
+    changed_subtree = scraper.ChangedSubtree(element_id="ZZZZ", elements=[], element_tree=[], element_tree_cleaned=[])
+
+    assert scraper.patch_element_trees(elements, scraper.copy_element_tree(elements[:1]), [changed_subtree]) is None
+
+
+@pytest.mark.asyncio
+async def test_changed_page_is_patched(dom_change_count: AsyncMock) -> None:
+    dom_change_count.return_value = 2
+    page = MagicMock(url=URL)
+    page.main_frame.child_frames = []
+    elements = _raw_elements()
+    element_tree = scraper.copy_element_tree(elements[:1])
+    scraped_page = ScrapedPage(
+        elements=elements,
+        element_tree=element_tree,
+        element_tree_trimmed=scraper.trim_element_tree(scraper.copy_element_tree(element_tree)),
+        url=URL,
+        _browser_state=MagicMock(),
+        _clean_up_func=AsyncMock(),
+        _scrape_exclude=None,
+    )
+    scraped_page.set_dom_change_tracker_id("tracker")
+    new_footer = _element("AAAD", "p", text="Sent")
+    build_changed_subtrees = AsyncMock(return_value=[{"id": "AAAD", "elements": [new_footer], "tree": [new_footer]}])
+    get_page_snapshot = AsyncMock(return_value=MagicMock(html="<html></html>", text="Sent"))
+    SkyvernFrame.create_instance.return_value.configure_mock(
+        build_changed_subtrees=build_changed_subtrees, get_page_snapshot=get_page_snapshot
+    )
+    cleanup_element_tree = AsyncMock(side_effect=lambda frame, url, element_tree: element_tree)
+
+    patched_page = await scraper.reuse_scraped_page_if_unchanged(
+        _browser_state(page), scraped_page, cleanup_element_tree=cleanup_element_tree
+    )
+
+    assert patched_page is not None
+    assert patched_page.id_to_element_dict["AAAD"] is new_footer
+    assert "Sent" in patched_page.build_element_tree() and "footer" not in patched_page.build_element_tree()
+    assert patched_page.screenshots == [b"new screenshot"]
+    assert patched_page.extracted_text == "Sent"
+    # the patched page goes on tracking the changes with the restarted tracker
+    new_tracker_id = build_changed_subtrees.await_args.args[1]
+    assert patched_page.get_dom_change_tracker_id() == new_tracker_id != "tracker"
+
+
+@pytest.mark.asyncio
+async def test_changes_which_cant_be_patched_are_scraped_again(dom_change_count: AsyncMock) -> None:
+    dom_change_count.return_value = 2
+    page = MagicMock(url=URL)
+    page.main_frame.child_frames = []
+    SkyvernFrame.create_instance.return_value.build_changed_subtrees = AsyncMock(return_value=None)
+
+    reused_page = await scraper.reuse_scraped_page_if_unchanged(
+        _browser_state(page), _scraped_page(), cleanup_element_tree=AsyncMock()
+    )
+
+    assert reused_page is None
+    SkyvernFrame.take_split_screenshots.assert_not_awaited()
@@ -0,0 +1,64 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from skyvern.forge.sdk.api.llm import screenshot_optimizer
+from skyvern.forge.sdk.api.llm.screenshot_optimizer import (
+    ScreenshotOptimization,
+    encode_screenshots,
+    get_router_screenshot_optimization,
+)
+from skyvern.forge.sdk.settings_manager import SettingsManager
+
+
+def _png(width: int, height: int, split: int) -> bytes:
+    img = Image.new("RGB", (width, height), "white")
+    img.paste((0, 0, 0), (0, 0, split, height))
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format="PNG")
+    return img_byte_arr.getvalue()
+
+
+def test_encode_screenshots_resizes_and_drops_duplicate_tiles() -> None:
+    tile = _png(1920, 1080, split=600)
+    # a few pixels apart, e.g. a form field which got a character typed in
+    slightly_different_tile = _png(1920, 1080, split=602)
+    optimization = ScreenshotOptimization(
+        max_long_edge=2048,
+        max_short_edge=768,
+        image_format="JPEG",
+        quality=80,
+        drop_duplicate_tiles=True,
+    )
+
+    encoded_screenshots = encode_screenshots([tile, tile, slightly_different_tile], optimization)
+
+    assert len(encoded_screenshots) == 2
+    assert all(encoded.media_type == "image/jpeg" for encoded in encoded_screenshots)
+    with Image.open(io.BytesIO(base64.b64decode(encoded_screenshots[0].data))) as img:
+        assert img.format == "JPEG"
+        assert img.size == (1365, 768)
+
+
+def test_encode_screenshots_without_optimization_keeps_the_pngs() -> None:
+    tile = _png(800, 600, split=200)
+
+    encoded_screenshots = encode_screenshots([tile, tile])
+
+    assert [encoded.media_type for encoded in encoded_screenshots] == ["image/png", "image/png"]
+    assert base64.b64decode(encoded_screenshots[0].data) == tile
+    assert any(key[1] is None for key in screenshot_optimizer._encoded_screenshots)
+
+
+def test_router_screenshots_are_only_resized_for_a_common_resolution(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(SettingsManager.get_settings(), "ENABLE_SCREENSHOT_OPTIMIZATION", True)
+
+    same_provider = get_router_screenshot_optimization(["gpt-4.1", "azure/gpt-4.1"])
+    mixed_providers = get_router_screenshot_optimization(["gpt-4.1", "anthropic/claude-sonnet-4"])
+
+    assert same_provider is not None and mixed_providers is not None
+    assert (same_provider.max_long_edge, same_provider.max_short_edge) == (2048, 768)
+    assert (mixed_providers.max_long_edge, mixed_providers.max_short_edge) == (None, None)
+    assert mixed_providers.image_format == same_provider.image_format
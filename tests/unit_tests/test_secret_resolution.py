@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from skyvern.config import settings
+from skyvern.forge.sdk.services.vault_session_cache import VaultSessionCache
+from skyvern.forge.sdk.workflow.context_manager import SecretBackend, WorkflowRunContext
+from skyvern.forge.sdk.workflow.models.parameter import AWSSecretParameter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _workflow_run_context(aws_client: MagicMock) -> WorkflowRunContext:
+    return WorkflowRunContext(
+        workflow_title="workflow",
+        workflow_id="w_1",
+        workflow_permanent_id="wpid_1",
+        workflow_run_id="wr_1",
+        aws_client=aws_client,
+    )
+
+
+def _aws_secret_parameter(key: str) -> AWSSecretParameter:
+    now = datetime.now()
+    return AWSSecretParameter(
+        key=key,
+        aws_secret_parameter_id=f"asp_{key}",
+        workflow_id="w_1",
+        aws_key=f"aws/{key}",
+        created_at=now,
+        modified_at=now,
+    )
+
+
+@pytest.mark.asyncio
+async def test_registrations_run_concurrently_within_the_backend_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    running = {backend: 0 for backend in SecretBackend}
+    max_running = {backend: 0 for backend in SecretBackend}
+
+    async def registration(backend: SecretBackend) -> None:
+        running[backend] += 1
+        max_running[backend] = max(max_running[backend], running[backend])
+        await asyncio.sleep(0.01)
+        running[backend] -= 1
+
+    backends = [SecretBackend.AWS] * 4 + [SecretBackend.BITWARDEN] * 3
+    monkeypatch.setattr(settings, "SECRET_RESOLUTION_CONCURRENCY", 2)
+    await WorkflowRunContext._register_concurrently([(backend, registration(backend)) for backend in backends])
+
+    assert max_running[SecretBackend.AWS] == 2
+    assert max_running[SecretBackend.BITWARDEN] == 1
+
+
+@pytest.mark.asyncio
+async def test_the_first_failing_registration_is_raised_once_all_are_done() -> None:
+    finished: list[str] = []
+
+    async def registration(name: str, error: Exception | None = None) -> None:
+        await asyncio.sleep(0.01)
+        finished.append(name)
+        if error:
+            raise error
+
+    with pytest.raises(ValueError, match="first"):
+        await WorkflowRunContext._register_concurrently(
+            [
+                (SecretBackend.AZURE, registration("a")),
+                (SecretBackend.AZURE, registration("b", ValueError("first"))),
+                (SecretBackend.AZURE, registration("c", KeyError("second"))),
+            ]
+        )
+
+    assert sorted(finished) == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_aws_secrets_are_fetched_in_a_batch() -> None:
+    aws_client = MagicMock()
+    aws_client.get_secrets = AsyncMock(return_value={"aws/first": "one", "aws/second": "two"})
+    aws_client.get_secret = AsyncMock(return_value="three")
+    workflow_run_context = _workflow_run_context(aws_client)
+
+    await workflow_run_context.register_secret_parameter_values(
+        [_aws_secret_parameter("first"), _aws_secret_parameter("second"), _aws_secret_parameter("third")],
+        organization=MagicMock(organization_id="o_1"),
+    )
+
+    aws_client.get_secrets.assert_awaited_once_with(["aws/first", "aws/second", "aws/third"])
+    # the secret missing from the batch is fetched on its own
+    aws_client.get_secret.assert_awaited_once_with("aws/third")
+    assert sorted(workflow_run_context.secrets.values()) == ["one", "three", "two"]
+    assert workflow_run_context._prefetched_aws_secrets == {}
+
+
+@pytest.mark.asyncio
+async def test_vault_sessions_are_unlocked_once_and_stored_encrypted() -> None:
+    clock = FakeClock()
+    cache = VaultSessionCache(ttl_seconds=300, clock=clock)
+    unlock = AsyncMock(return_value="session-key")
+
+    sessions = await asyncio.gather(*[cache.get_or_create("o_1", "bitwarden", "account", unlock) for _ in range(3)])
+
+    assert sessions == ["session-key"] * 3
+    assert unlock.await_count == 1
+    assert all(b"session-key" not in entry.encrypted_session for entry in cache._entries.values())
+    # the sessions aren't shared across organizations
+    assert cache.get("o_2", "bitwarden", "account") is None
+
+    clock.now = 300
+    assert cache.get("o_1", "bitwarden", "account") is None
+
+
+def test_vault_session_cache_is_disabled_without_a_ttl() -> None:
+    cache = VaultSessionCache(ttl_seconds=0)
+    cache.set("o_1", "bitwarden", "account", "session-key")
+
+    assert not cache.enabled
+    assert cache.get("o_1", "bitwarden", "account") is None
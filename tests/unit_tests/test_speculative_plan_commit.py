@@ -0,0 +1,103 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from skyvern.forge.agent import ForgeAgent, SpeculativePlan
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.webeye.utils.page import SkyvernFrame
+
+URL = "https://example.com/form"
+
+
+@pytest.fixture(autouse=True)
+def setup_context():
+    skyvern_context.set(SkyvernContext())
+    yield
+    skyvern_context.reset()
+
+
+@pytest.fixture
+def dom_change_count(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    get_dom_change_count = AsyncMock(return_value=0)
+    monkeypatch.setattr(
+        SkyvernFrame,
+        "create_instance",
+        AsyncMock(return_value=MagicMock(get_dom_change_count=get_dom_change_count)),
+    )
+    return get_dom_change_count
+
+
+def _agent() -> ForgeAgent:
+    agent = ForgeAgent.__new__(ForgeAgent)
+    agent._persist_speculative_llm_metadata = AsyncMock()  # type: ignore[method-assign]
+    return agent
+
+
+def _speculative_plan(tracker_id: str | None) -> SpeculativePlan:
+    scraped_page = MagicMock(url=URL, screenshots=[b"screenshot"])
+    scraped_page.get_dom_change_tracker_id.return_value = tracker_id
+    return SpeculativePlan(
+        scraped_page=scraped_page,
+        extract_action_prompt="prompt",
+        use_caching=False,
+        llm_json_response={"actions": []},
+        llm_metadata=MagicMock(),
+        build_seconds=3,
+    )
+
+
+def _browser_state(url: str = URL) -> MagicMock:
+    page = MagicMock(url=url)
+    page.main_frame.child_frames = []
+    browser_state = MagicMock()
+    browser_state.get_working_page = AsyncMock(return_value=page)
+    return browser_state
+
+
+@pytest.mark.asyncio
+async def test_plan_is_committed_when_the_dom_is_unchanged(dom_change_count: AsyncMock) -> None:
+    agent = _agent()
+
+    committed = await agent._commit_speculative_plan(
+        MagicMock(), MagicMock(), _browser_state(), _speculative_plan(tracker_id="tracker")
+    )
+
+    assert committed
+    dom_change_count.assert_awaited_once_with("tracker")
+    agent._persist_speculative_llm_metadata.assert_not_awaited()
+    context = skyvern_context.ensure_context()
+    assert (context.speculative_plan_commits, context.speculative_plan_rollbacks) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_plan_is_rolled_back_when_the_dom_changed(dom_change_count: AsyncMock) -> None:
+    dom_change_count.return_value = 2
+    agent = _agent()
+    step = MagicMock()
+    speculative_plan = _speculative_plan(tracker_id="tracker")
+
+    committed = await agent._commit_speculative_plan(MagicMock(), step, _browser_state(), speculative_plan)
+
+    assert not committed
+    # the usage of the discarded LLM call is still recorded
+    agent._persist_speculative_llm_metadata.assert_awaited_once_with(
+        step, speculative_plan.llm_metadata, screenshots=[b"screenshot"]
+    )
+    context = skyvern_context.ensure_context()
+    assert (context.speculative_plan_commits, context.speculative_plan_rollbacks) == (0, 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url, expected", [(URL, True), ("https://example.com/confirmation", False)])
+async def test_plan_without_dom_tracking_is_committed_on_the_same_url(
+    dom_change_count: AsyncMock, url: str, expected: bool
+) -> None:
+    agent = _agent()
+
+    committed = await agent._commit_speculative_plan(
+        MagicMock(), MagicMock(), _browser_state(url), _speculative_plan(tracker_id=None)
+    )
+
+    assert committed is expected
+    dom_change_count.assert_not_awaited()
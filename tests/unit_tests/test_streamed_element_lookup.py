@@ -0,0 +1,45 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from skyvern.exceptions import MissingElement
+from skyvern.webeye.utils.dom import DomUtil
+
+
+def _dom(lookup: asyncio.Future | None) -> DomUtil:
+    scraped_page = MagicMock()
+    scraped_page.pop_element_lookup.return_value = lookup
+    dom = DomUtil(scraped_page=scraped_page, page=MagicMock())
+    dom.resolve_skyvern_element_by_id = AsyncMock(return_value="resolved element")  # type: ignore[method-assign]
+    return dom
+
+
+@pytest.mark.asyncio
+async def test_a_done_lookup_is_reused() -> None:
+    lookup = asyncio.get_running_loop().create_future()
+    lookup.set_result("streamed element")
+    dom = _dom(lookup)
+
+    assert await dom.get_skyvern_element_by_id("AAAB") == "streamed element"
+    dom.resolve_skyvern_element_by_id.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_a_failed_lookup_is_resolved_again() -> None:
+    lookup = asyncio.get_running_loop().create_future()
+    lookup.set_exception(MissingElement(selector="#gone", element_id="AAAB"))
+    dom = _dom(lookup)
+
+    assert await dom.get_skyvern_element_by_id("AAAB") == "resolved element"
+    dom.resolve_skyvern_element_by_id.assert_awaited_once_with("AAAB")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("done", [False, None])
+async def test_the_element_is_resolved_without_waiting_for_a_lookup(done: bool | None) -> None:
+    lookup = asyncio.get_running_loop().create_future() if done is False else None
+    dom = _dom(lookup)
+
+    assert await dom.get_skyvern_element_by_id("AAAB") == "resolved element"
+    dom.resolve_skyvern_element_by_id.assert_awaited_once_with("AAAB")
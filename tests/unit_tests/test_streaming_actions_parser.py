@@ -0,0 +1,29 @@
+from skyvern.forge.sdk.api.llm.utils import StreamingActionsParser
+
+RESPONSE = (
+    '{"user_goal_achieved": false, "actions": ['
+    '{"action_type": "CLICK", "id": "AAAB", "reasoning": "the \\"Next\\" button } ]"},'
+    '{"action_type": "INPUT_TEXT", "id": "AAAC", "text": "hello", "extra": {"nested": [1, {"a": 2}]}}'
+    '], "summary": {"actions": [{"not": "an action"}]}}'
+)
+
+
+def test_streaming_actions_parser_yields_each_complete_action() -> None:
+    parser = StreamingActionsParser()
+    streamed: list[tuple[int, dict]] = []
+    for i in range(0, len(RESPONSE), 5):
+        for action in parser.feed(RESPONSE[i : i + 5]):
+            streamed.append((i, action))
+
+    assert [action["id"] for _, action in streamed] == ["AAAB", "AAAC"]
+    assert streamed[0][1]["reasoning"] == 'the "Next" button } ]'
+    # the first action is available long before the response ends
+    assert streamed[0][0] < RESPONSE.index("INPUT_TEXT")
+    assert parser.text == RESPONSE
+
+
+def test_streaming_actions_parser_with_assistant_prefix() -> None:
+    parser = StreamingActionsParser(prefix="{")
+
+    assert parser.feed('"actions": [{"action_type": "WAIT"}, {"action_') == [{"action_type": "WAIT"}]
+    assert parser.feed('type": "COMPLETE"}]}') == [{"action_type": "COMPLETE"}]
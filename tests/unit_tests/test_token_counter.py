@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from skyvern.utils import token_counter
+from skyvern.utils.token_counter import count_tokens_for_budget, estimate_tokens, is_mostly_ascii
+
+
+@pytest.fixture
+def exact_count(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    count_tokens = MagicMock(side_effect=token_counter.count_tokens)
+    monkeypatch.setattr(token_counter, "count_tokens", count_tokens)
+    return count_tokens
+
+
+@pytest.mark.parametrize(
+    ("length", "estimated"),
+    [
+        # under the budget, the estimation is trusted only if the text has no more bytes than the budget has tokens
+        (1000, True),
+        (1001, False),
+        (int(3.5 * 740), False),
+        # over the budget, only outside of the 25% margin
+        (int(3.5 * 1240), False),
+        (int(3.5 * 1260), True),
+    ],
+)
+def test_ascii_text_is_estimated_away_from_the_budget(exact_count: MagicMock, length: int, estimated: bool) -> None:
+    text = ("<div>" * length)[:length]
+
+    token_count = count_tokens_for_budget(text, 1000)
+
+    assert (exact_count.call_count == 0) == estimated
+    if estimated:
+        assert token_count == estimate_tokens(text)
+
+
+def test_non_latin_text_under_the_budget_in_bytes_is_estimated(exact_count: MagicMock) -> None:
+    # 3 bytes per character, but still fewer bytes than the budget
+    text = "<div>購入手続きへ進む</div>" * 10
+
+    assert count_tokens_for_budget(text, 1000) == estimate_tokens(text)
+    exact_count.assert_not_called()
+
+
+def test_non_latin_text_over_the_budget_in_bytes_is_counted_exactly(exact_count: MagicMock) -> None:
+    # about a token per character, the estimation would see a third of the tokens and let it through the budget
+    text = "<div>購入手続きへ進む</div>" * 300
+
+    assert not is_mostly_ascii(text)
+    token_count = count_tokens_for_budget(text, 5000)
+
+    exact_count.assert_called_once_with(text)
+    assert token_count == token_counter.count_tokens(text)
+    assert token_count > estimate_tokens(text)
+
+
+def test_elements_are_counted_apart_from_the_rest_of_the_text(exact_count: MagicMock) -> None:
+    elements = "<button>Submit</button>" * 100
+    text = f"Pick the next action.\n{elements}\nReply in JSON."
+    count_elements_tokens = MagicMock(return_value=700)
+
+    token_count = count_tokens_for_budget(text, 1000, elements=elements, count_elements_tokens=count_elements_tokens)
+
+    count_elements_tokens.assert_called_once_with(elements)
+    exact_count.assert_called_once_with("Pick the next action.\n\nReply in JSON.")
+    assert token_count == token_counter.count_tokens("Pick the next action.\n\nReply in JSON.") + 700
+
+
+def test_a_few_non_ascii_characters_keep_the_estimation() -> None:
+    assert is_mostly_ascii("<button>Continuer vers la page suivante</button>" * 10 + "é")
+    assert not is_mostly_ascii("Продолжить оформление заказа")